@@ -0,0 +1,304 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to pack the backups of a run in one archive with a trailing index of the nodes."""
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import zipfile
+
+from network_backup_onsite.baseline import get_node_and_date
+from network_backup_onsite.run_lock import file_update_lock
+from network_backup_onsite.utils import TEMP_FILE_SUFFIX
+
+ARCHIVE_SUFFIX = ".zip"
+HASH_PREFIX = "sha256="
+READ_CHUNK_SIZE = 64 * 1024
+
+# The archives are shared by the capture threads of a run and by the daemon captures.
+_archive_lock = threading.Lock()
+
+
+def get_archive_file(bkp_folder_path):
+    """
+    Get the archive of a backup folder, named after the folder.
+
+    :param bkp_folder_path: backup folder.
+    :return: path of the archive.
+    """
+    return os.path.join(bkp_folder_path,
+                        os.path.basename(os.path.normpath(bkp_folder_path)) + ARCHIVE_SUFFIX)
+
+
+def get_file_hash(file_path):
+    """
+    Get the sha256 of a file, read one chunk at a time.
+
+    :param file_path: file.
+    :return: hexadecimal sha256.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as source:
+        for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), ""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+class HashedOutput(object):
+    """File-like object computing the sha256 of the data written to another stream."""
+
+    def __init__(self, output):
+        """
+        Initialize the stream.
+
+        :param output: file-like object receiving the data.
+        """
+        self.output = output
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        """
+        Write a chunk of data.
+
+        :param data: chunk of data.
+        """
+        self.sha256.update(data)
+        self.output.write(data)
+
+
+class ArchiveEntry(object):
+    """Index entry of one backup file in an archive."""
+
+    def __init__(self, name, offset, length, sha256):
+        """
+        Initialize the entry.
+
+        :param name: name of the backup file.
+        :param offset: position of the entry in the archive.
+        :param length: size of the backup file in bytes.
+        :param sha256: hexadecimal sha256 of the backup file.
+        """
+        self.name = name
+        self.offset = offset
+        self.length = length
+        self.sha256 = sha256
+
+    @property
+    def node(self):
+        """Get the node name of the backup file."""
+        return get_node_and_date(self.name)[0]
+
+    def __str__(self):
+        """Represent the entry as an index line."""
+        return "{}  offset {}  length {}  sha256 {}".format(self.name, self.offset, self.length,
+                                                            self.sha256)
+
+    def __repr__(self):
+        """Represent the entry."""
+        return self.__str__()
+
+
+class BackupArchive(object):
+    """
+    Archive of the backups of a run: a zip file with the backups stored uncompressed.
+
+    The central directory of the zip file is the trailing index of the archive: the offset and
+    length of each backup file, with its sha256 in the comment of the entry. A backup is added as
+    soon as it is captured and the index is rewritten at the end of the file, so the archive is
+    complete after each node. One backup is extracted by seeking to its entry, without reading
+    the others, and any unzip tool can restore the archive.
+    """
+
+    def __init__(self, path, source=None):
+        """
+        Initialize the archive.
+
+        :param path: archive file.
+        :param source: seekable file-like object the archive is read from instead of its path,
+                       e.g. a remote archive read by ranges.
+        """
+        self.path = path
+        self.source = source
+
+    def _open(self):
+        """
+        Open the archive for reading.
+
+        :return: instance of ZipFile.
+        """
+        return zipfile.ZipFile(self.path if self.source is None else self.source, "r",
+                               allowZip64=True)
+
+    @staticmethod
+    def _get_entry(info):
+        """
+        Get the index entry of a zip entry.
+
+        :param info: instance of ZipInfo.
+        :return: instance of ArchiveEntry.
+        """
+        return ArchiveEntry(info.filename, info.header_offset, info.file_size,
+                            info.comment[len(HASH_PREFIX):])
+
+    def add(self, backup_file):
+        """
+        Append a backup file to the archive. A file added again with the same content is not
+        added; with another content, e.g. a node captured again the same day, the archive is
+        rewritten without the previous entry.
+
+        :param backup_file: backup file.
+        :return: instance of ArchiveEntry.
+        """
+        name = os.path.basename(backup_file)
+        sha256 = get_file_hash(backup_file)
+
+        with _archive_lock, file_update_lock(self.path):
+            path = self.path
+            if os.path.exists(self.path):
+                with zipfile.ZipFile(self.path, "r", allowZip64=True) as archive:
+                    if name in archive.namelist():
+                        entry = self._get_entry(archive.getinfo(name))
+                        if entry.sha256 == sha256:
+                            return entry
+
+                        path = self._rewrite_without(archive, name)
+
+            try:
+                archive = zipfile.ZipFile(path, "a" if os.path.exists(path) else "w",
+                                          zipfile.ZIP_STORED, allowZip64=True)
+                try:
+                    archive.write(backup_file, name)
+
+                    info = archive.getinfo(name)
+                    info.comment = HASH_PREFIX + sha256
+                finally:
+                    archive.close()
+
+                if path != self.path:
+                    os.rename(path, self.path)
+            finally:
+                if path != self.path and os.path.exists(path):
+                    os.remove(path)
+
+        return ArchiveEntry(name, info.header_offset, info.file_size, sha256)
+
+    def _rewrite_without(self, archive, name):
+        """
+        Copy the entries of the archive to a temporary archive, except a backup file and the
+        entries replaced by a later entry of the same name.
+
+        :param archive: instance of ZipFile of the archive.
+        :param name: name of the backup file left out.
+        :return: path of the temporary archive, in the folder of the archive.
+        """
+        folder, archive_name = os.path.split(self.path)
+        temp_fd, temp_path = tempfile.mkstemp(TEMP_FILE_SUFFIX, "." + archive_name,
+                                              folder or os.curdir)
+        try:
+            with os.fdopen(temp_fd, "wb") as temp_file:
+                with zipfile.ZipFile(temp_file, "w", zipfile.ZIP_STORED,
+                                     allowZip64=True) as rewritten:
+                    for info in archive.infolist():
+                        if info.filename != name and info is archive.getinfo(info.filename):
+                            rewritten.writestr(info, archive.read(info))
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        return temp_path
+
+    def get_index(self):
+        """
+        Read the index of the archive.
+
+        :return: dictionary of backup file name and ArchiveEntry, the latest entry of each name.
+        """
+        with self._open() as archive:
+            return dict((info.filename, self._get_entry(info)) for info in archive.infolist())
+
+    def find_node(self, node):
+        """
+        Get the entry of the backup of a node.
+
+        :param node: node name.
+        :return: instance of ArchiveEntry, or None if the node is not in the archive.
+        """
+        entries = [entry for entry in self.get_index().values() if entry.node == node.lower()]
+
+        return max(entries, key=lambda entry: entry.name) if entries else None
+
+    def locate(self, name):
+        """
+        Get the position of the content of a backup file, after the local header of its entry.
+
+        :param name: name of the backup file.
+        :return: tuple of ArchiveEntry and offset of its content in the archive.
+        :raise KeyError: if the file is not in the archive.
+        :raise BadZipfile: if the local header of the entry is not valid.
+        """
+        with self._open() as archive:
+            entry = self._get_entry(archive.getinfo(name))
+
+        source = open(self.path, "rb") if self.source is None else self.source
+        try:
+            source.seek(entry.offset)
+            header = source.read(zipfile.sizeFileHeader)
+        finally:
+            if self.source is None:
+                source.close()
+
+        if len(header) != zipfile.sizeFileHeader or \
+                not header.startswith(zipfile.stringFileHeader):
+            raise zipfile.BadZipfile("Bad local header of {} in {}.".format(name, self.path))
+
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+
+        return entry, entry.offset + zipfile.sizeFileHeader + name_length + extra_length
+
+    def extract(self, name, output, copy_range=None):
+        """
+        Copy one backup file of the archive to a stream, checking its sha256.
+
+        :param name: name of the backup file.
+        :param output: file-like object.
+        :param copy_range: function copying a range of the archive to a stream, given its
+                           offset, length and the stream, to read only the content of the entry
+                           from a remote archive; the entry is read from the source by default.
+        :return: instance of ArchiveEntry.
+        :raise KeyError: if the file is not in the archive.
+        :raise ValueError: if the extracted content does not match the sha256 of the index.
+        """
+        hashed_output = HashedOutput(output)
+
+        if copy_range is None:
+            with self._open() as archive:
+                info = archive.getinfo(name)
+                entry = self._get_entry(info)
+
+                source = archive.open(info)
+                for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), ""):
+                    hashed_output.write(chunk)
+        else:
+            entry, data_offset = self.locate(name)
+            copy_range(data_offset, entry.length, hashed_output)
+
+        if hashed_output.sha256.hexdigest() != entry.sha256:
+            raise ValueError("Content of {} in {} does not match its sha256."
+                             .format(name, self.path))
+
+        return entry
@@ -17,18 +17,62 @@
 
 from ConfigParser import ConfigParser, MissingSectionHeaderError, NoOptionError, NoSectionError, \
     ParsingError
+from distutils.spawn import find_executable
 import os
+import socket
 
+from network_backup_onsite.checkpoint import DEFAULT_TARGET
+from network_backup_onsite.device_drivers import TERMINAL_RETRIEVAL
+from network_backup_onsite.encryptor import GPG_COMMAND
 from network_backup_onsite.exceptions import BackupSettingsException, ExceptionCodes
 from network_backup_onsite.logger import CustomLogger
 from network_backup_onsite.notification_handler import NotificationHandler
-from network_backup_onsite.utils import get_home_dir, to_bytes
+from network_backup_onsite.utils import get_home_dir, is_valid_duration, to_bytes, to_rate, \
+    to_seconds
 
 SCRIPT_FILE = os.path.basename(__file__).split('.')[0]
 
 SYSTEM_CONFIG_FILE_ROOT_PATH = os.path.join(get_home_dir(), "network_backup_offsite", "config")
 DEFAULT_CONFIG_FILE_ROOT_PATH = os.path.join(os.path.dirname(__file__), 'config')
 
+OPTIONAL_SECTIONS = ('SCHEDULER', 'GOVERNOR', 'TIMEOUTS', 'BASELINE', 'GNUPG', 'REACHABILITY',
+                     'SHARDING', 'DELAY')
+TARGET_SECTION_PREFIX = 'TARGET_'
+
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_DELAY = "10s"
+DEFAULT_MAX_RETRY_DELAY = "2m"
+
+DEFAULT_SCHEDULER_INTERVAL = "24h"
+DEFAULT_SCHEDULER_WINDOW = "1h"
+DEFAULT_SCHEDULER_JITTER = "30s"
+DEFAULT_SCHEDULER_SOCKET = os.path.join(get_home_dir(), "ntwk_bkp_onsite.sock")
+GROUP_SCHEDULE_PREFIX = "group_"
+
+DEFAULT_MAX_WORKERS = 1
+DEFAULT_SITE_SESSIONS = 2
+DEFAULT_POST_WORKERS = 0
+SITE_SESSIONS_PREFIX = "sessions_"
+SITE_RATE_PREFIX = "rate_"
+
+DEFAULT_TIMEOUT_MARGIN = 3.0
+DEFAULT_MIN_TIMEOUT = "10s"
+DEFAULT_MAX_TIMEOUT = "10m"
+DEFAULT_TIMEOUT_MIN_SAMPLES = 5
+DEFAULT_HISTORY_SIZE = 50
+
+DEFAULT_BASELINE_MIN_SAMPLES = 5
+DEFAULT_BASELINE_DEVIATION = 5.0
+DEFAULT_BASELINE_TOLERANCE = 0.2
+DEFAULT_BASELINE_HISTORY_SIZE = 10
+
+DEFAULT_TARGET_RETRIES = 2
+
+DEFAULT_REACHABILITY_TTL = "5m"
+DEFAULT_REACHABILITY_DOWN_TTL = "1m"
+
+DEFAULT_SHARD_LEASE_TIME = "10m"
+
 
 class SupportInfo:
     """Class used to hold parsed information from config.cfg about support."""
@@ -55,7 +99,8 @@ class SupportInfo:
 class NodeConfig:
     """Class used to hold parsed information from config.cfg about nodes."""
 
-    def __init__(self, hostname, ip, node_type, eq_prompt, username, password):
+    def __init__(self, hostname, ip, node_type, eq_prompt, username, password,
+                 retrieval=TERMINAL_RETRIEVAL, group=None, schedule=None, site=None):
         """
         Initialize Node Config object.
 
@@ -65,6 +110,10 @@ class NodeConfig:
         :param eq_prompt: prompt in node's OS system.
         :param username: node account user name.
         :param password: node account password.
+        :param retrieval: how the configuration is retrieved from the node (terminal or file).
+        :param group: schedule group of the node, used in daemon mode.
+        :param schedule: backup interval of the node in daemon mode (e.g. 12h).
+        :param site: site of the node, sharing the management network limits of the governor.
         """
         self.hostname = hostname
         self.ip = ip
@@ -72,12 +121,17 @@ class NodeConfig:
         self.eq_prompt = eq_prompt
         self.username = username
         self.password = password
+        self.retrieval = retrieval
+        self.group = group
+        self.schedule = schedule
+        self.site = site
         self.host = username + '@' + ip
 
     def __str__(self):
         """Represent Node Config object as string."""
-        return "({}, {}, {}, {}, {}, {})".format(self.hostname, self.ip, self.type,
-                                                 self.eq_prompt, self.username, self.password)
+        return "({}, {}, {}, {}, {}, {}, {})".format(self.hostname, self.ip, self.type,
+                                                     self.eq_prompt, self.username,
+                                                     self.password, self.retrieval)
 
     def __repr__(self):
         """Represent Node Config object."""
@@ -87,21 +141,36 @@ class NodeConfig:
 class BackupConfig:
     """Class used to hold parsed information from config.cfg about backup storage and properties."""
 
-    def __init__(self, path, buffer_size, min_backup_size):
+    def __init__(self, path, buffer_size, min_backup_size, retries=DEFAULT_RETRIES,
+                 retry_delay=DEFAULT_RETRY_DELAY, max_retry_delay=DEFAULT_MAX_RETRY_DELAY,
+                 mask_volatile=False, archive=False):
         """
         Initialize Backup Config object.
 
         :param path: path.
         :param buffer_size.
         :param min_backup_size.
+        :param retries: number of retries of a failed node backup.
+        :param retry_delay: delay before the first retry, doubled at each retry.
+        :param max_retry_delay: max delay between two retries.
+        :param mask_volatile: mask timestamps and counters in the captured configurations.
+        :param archive: pack the backups of each run in one indexed archive to be sent.
         """
         self.path = path
         self.buffer_size = buffer_size
         self.min_backup_size = min_backup_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.mask_volatile = mask_volatile
+        self.archive = archive
 
     def __str__(self):
         """Represent Backup Config object as string."""
-        return "({}, {}, {})".format(self.path, self.buffer_size, self.min_backup_size)
+        return "({}, {}, {}, {}, {}, {}, {}, {})".format(self.path, self.buffer_size,
+                                                         self.min_backup_size, self.retries,
+                                                         self.retry_delay, self.max_retry_delay,
+                                                         self.mask_volatile, self.archive)
 
     def __repr__(self):
         """Represent Backup Config object."""
@@ -134,14 +203,46 @@ class OMBSConfig:
         return self.__str__()
 
 
+class TargetConfig:
+    """Class used to hold parsed information from config.cfg about a destination of the backups."""
+
+    def __init__(self, name, ombs_config=None, path=None, retries=DEFAULT_TARGET_RETRIES):
+        """
+        Initialize Target Config object.
+
+        :param name: target name, used to journal the transfers.
+        :param ombs_config: instance of OMBSConfig of a remote target.
+        :param path: folder of a local target, e.g. an NFS mount, used without ombs_config.
+        :param retries: retries of a failed transfer to the target.
+        """
+        self.name = name
+        self.ombs_config = ombs_config
+        self.path = path
+        self.retries = retries
+
+    def __str__(self):
+        """Represent Target Config object as string."""
+        return "({}, {}, {})".format(self.name, self.ombs_config if self.ombs_config else self.path,
+                                     self.retries)
+
+    def __repr__(self):
+        """Represent Target Config object."""
+        return self.__str__()
+
+
 class DelayConfig:
-    """"Class used to hold parsed information from config.cfg about delay."""
+    """
+    Class used to hold parsed information from config.cfg about delay.
 
-    def __init__(self, max_delay):
+    Deprecated: the capture waits for the end of the output of the node instead of a fixed delay,
+    so the delay is not used any more.
+    """
+
+    def __init__(self, max_delay=None):
         """
         Initialize Delay Config object.
 
-        :param max_delay: max time of delay.
+        :param max_delay: max time of delay, None if not defined.
         """
         self.max_delay = max_delay
 
@@ -154,6 +255,247 @@ class DelayConfig:
         return self.__str__()
 
 
+class SchedulerConfig:
+    """Class used to hold parsed information from config.cfg about the daemon mode scheduling."""
+
+    def __init__(self, interval, window, jitter, socket_path, group_schedules=None):
+        """
+        Initialize Scheduler Config object.
+
+        :param interval: default interval between two backups of a node.
+        :param window: time over which the captures of one cycle are spread.
+        :param jitter: max random delay added to each capture.
+        :param socket_path: unix socket to receive on-demand requests.
+        :param group_schedules: dictionary of group name and its interval.
+        """
+        self.interval = interval
+        self.window = window
+        self.jitter = jitter
+        self.socket_path = socket_path
+        self.group_schedules = group_schedules if group_schedules else {}
+
+    def get_node_interval(self, node_config):
+        """
+        Get the interval between two backups of a node in seconds.
+
+        The node SCHEDULE has precedence over its GROUP schedule, then the default INTERVAL.
+
+        :param node_config: instance of NodeConfig.
+        :return: interval in seconds.
+        """
+        if node_config.schedule:
+            return to_seconds(node_config.schedule)
+
+        if node_config.group and node_config.group.lower() in self.group_schedules:
+            return to_seconds(self.group_schedules[node_config.group.lower()])
+
+        return to_seconds(self.interval)
+
+    def __str__(self):
+        """Represent Scheduler Config object as string."""
+        return "({}, {}, {}, {}, {})".format(self.interval, self.window, self.jitter,
+                                             self.socket_path, self.group_schedules)
+
+    def __repr__(self):
+        """Represent Scheduler Config object."""
+        return self.__str__()
+
+
+class GovernorConfig:
+    """Class used to hold parsed information from config.cfg about the management network limits."""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, site_sessions=DEFAULT_SITE_SESSIONS,
+                 site_rate=0, ombs_rate=0, sessions_by_site=None, rate_by_site=None,
+                 post_workers=DEFAULT_POST_WORKERS):
+        """
+        Initialize Governor Config object.
+
+        :param max_workers: number of nodes captured in parallel.
+        :param site_sessions: max concurrent device sessions per site.
+        :param site_rate: max bytes per second of the device sessions of a site, 0 for no limit.
+        :param ombs_rate: max bytes per second sent to OMBS, 0 for no limit.
+        :param sessions_by_site: dictionary of site name and its max concurrent sessions.
+        :param rate_by_site: dictionary of site name and its max bytes per second.
+        :param post_workers: processes checking and comparing the backups, 0 for one per core.
+        """
+        self.max_workers = max_workers
+        self.site_sessions = site_sessions
+        self.site_rate = site_rate
+        self.ombs_rate = ombs_rate
+        self.sessions_by_site = sessions_by_site if sessions_by_site else {}
+        self.rate_by_site = rate_by_site if rate_by_site else {}
+        self.post_workers = post_workers
+
+    def get_site_sessions(self, site):
+        """
+        Get the max concurrent device sessions of a site.
+
+        :param site: site name.
+        :return: number of sessions.
+        """
+        return self.sessions_by_site.get(site.lower(), self.site_sessions)
+
+    def get_site_rate(self, site):
+        """
+        Get the max bytes per second of the device sessions of a site.
+
+        :param site: site name.
+        :return: bytes per second, 0 for no limit.
+        """
+        return self.rate_by_site.get(site.lower(), self.site_rate)
+
+    def __str__(self):
+        """Represent Governor Config object as string."""
+        return "({}, {}, {}, {}, {}, {}, {})".format(self.max_workers, self.site_sessions,
+                                                     self.site_rate, self.ombs_rate,
+                                                     self.sessions_by_site, self.rate_by_site,
+                                                     self.post_workers)
+
+    def __repr__(self):
+        """Represent Governor Config object."""
+        return self.__str__()
+
+
+class TimeoutsConfig:
+    """Class used to hold parsed information from config.cfg about the node session timeouts."""
+
+    def __init__(self, margin=DEFAULT_TIMEOUT_MARGIN, min_timeout=DEFAULT_MIN_TIMEOUT,
+                 max_timeout=DEFAULT_MAX_TIMEOUT, min_samples=DEFAULT_TIMEOUT_MIN_SAMPLES,
+                 history_size=DEFAULT_HISTORY_SIZE):
+        """
+        Initialize Timeouts Config object.
+
+        :param margin: factor applied to the p99 of the durations of a node.
+        :param min_timeout: lower bound of the timeouts.
+        :param max_timeout: upper bound of the timeouts.
+        :param min_samples: durations needed before the history of a node is used.
+        :param history_size: durations kept per node and phase.
+        """
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.history_size = history_size
+
+    def __str__(self):
+        """Represent Timeouts Config object as string."""
+        return "({}, {}, {}, {}, {})".format(self.margin, self.min_timeout, self.max_timeout,
+                                             self.min_samples, self.history_size)
+
+    def __repr__(self):
+        """Represent Timeouts Config object."""
+        return self.__str__()
+
+
+class BaselineConfig:
+    """Class used to hold parsed information from config.cfg about the backup baselines."""
+
+    def __init__(self, min_samples=DEFAULT_BASELINE_MIN_SAMPLES,
+                 deviation=DEFAULT_BASELINE_DEVIATION, tolerance=DEFAULT_BASELINE_TOLERANCE,
+                 history_size=DEFAULT_BASELINE_HISTORY_SIZE):
+        """
+        Initialize Baseline Config object.
+
+        :param min_samples: backups needed before the baseline of a node replaces MIN_BACKUP_SIZE.
+        :param deviation: allowed deviation from the median, in scaled median absolute deviations.
+        :param tolerance: allowed deviation from the median, as a fraction of the median.
+        :param history_size: backups kept per node in the baseline.
+        """
+        self.min_samples = min_samples
+        self.deviation = deviation
+        self.tolerance = tolerance
+        self.history_size = history_size
+
+    def __str__(self):
+        """Represent Baseline Config object as string."""
+        return "({}, {}, {}, {})".format(self.min_samples, self.deviation, self.tolerance,
+                                         self.history_size)
+
+    def __repr__(self):
+        """Represent Baseline Config object."""
+        return self.__str__()
+
+
+class GnupgConfig:
+    """Class used to hold parsed information from config.cfg about the encryption of the backups."""
+
+    def __init__(self, recipient=None, key_file=None, gpg_home=None):
+        """
+        Initialize Gnupg Config object.
+
+        :param recipient: user id of the public key in the gpg keyring, None for no encryption.
+        :param key_file: file with the public key, used instead of the keyring.
+        :param gpg_home: gpg home directory, None for the default one.
+        """
+        self.recipient = recipient
+        self.key_file = key_file
+        self.gpg_home = gpg_home
+
+    @property
+    def enabled(self):
+        """Check if the backups are encrypted."""
+        return bool(self.recipient or self.key_file)
+
+    def __str__(self):
+        """Represent Gnupg Config object as string."""
+        return "({}, {}, {})".format(self.recipient, self.key_file, self.gpg_home)
+
+    def __repr__(self):
+        """Represent Gnupg Config object."""
+        return self.__str__()
+
+
+class ReachabilityConfig:
+    """Class used to hold parsed information from config.cfg about the reachability cache."""
+
+    def __init__(self, ttl=DEFAULT_REACHABILITY_TTL, down_ttl=DEFAULT_REACHABILITY_DOWN_TTL):
+        """
+        Initialize Reachability Config object.
+
+        :param ttl: time a node seen up is not pinged again.
+        :param down_ttl: deprecated and ignored, a node seen down is always pinged again.
+        """
+        self.ttl = ttl
+        self.down_ttl = down_ttl
+
+    def __str__(self):
+        """Represent Reachability Config object as string."""
+        return "({}, {})".format(self.ttl, self.down_ttl)
+
+    def __repr__(self):
+        """Represent Reachability Config object."""
+        return self.__str__()
+
+
+class ShardingConfig:
+    """Class used to hold parsed information from config.cfg about the runners sharing the nodes."""
+
+    def __init__(self, shared_path=None, runner_id=None, lease_time=DEFAULT_SHARD_LEASE_TIME):
+        """
+        Initialize Sharding Config object.
+
+        :param shared_path: folder on shared storage coordinating the runners, None for no sharding.
+        :param runner_id: unique name of this runner, the hostname by default.
+        :param lease_time: time after which a silent runner is dead and its leases are taken over.
+        """
+        self.shared_path = shared_path
+        self.runner_id = runner_id if runner_id else socket.gethostname()
+        self.lease_time = lease_time
+
+    @property
+    def enabled(self):
+        """Check if the nodes are shared between several runners."""
+        return bool(self.shared_path)
+
+    def __str__(self):
+        """Represent Sharding Config object as string."""
+        return "({}, {}, {})".format(self.shared_path, self.runner_id, self.lease_time)
+
+    def __repr__(self):
+        """Represent Sharding Config object."""
+        return self.__str__()
+
+
 class ScriptSettings:
     """
     Class used to hold and information from the configuration file config.cfg.
@@ -220,6 +562,35 @@ class ScriptSettings:
         self.logger.info("Reading configuration file '%s'.", self.config_file_path)
         return config
 
+    def _get_optional(self, section, option, default):
+        """
+        Read an option which is not mandatory in the configuration file.
+
+        :param section: section name.
+        :param option: option name.
+        :param default: value returned when the option is not defined or is empty.
+        :return: option value as string.
+        """
+        if self.config.has_option(section, option) and self.config.get(section, option).strip():
+            return str(self.config.get(section, option)).strip()
+
+        return default
+
+    def _get_boolean_optional(self, section, option, default):
+        """
+        Read a boolean option which is not mandatory in the configuration file.
+
+        :param section: section name.
+        :param option: option name.
+        :param default: value returned when the option is not defined or is empty.
+        :return: option value as boolean.
+        :raise ValueError: if the value is not a boolean.
+        """
+        if self.config.has_option(section, option) and self.config.get(section, option).strip():
+            return self.config.getboolean(section, option)
+
+        return default
+
     def get_notification_handler(self):
         """
         Read the support contact information from the config file.
@@ -269,6 +640,57 @@ class ScriptSettings:
 
         return ombs_config
 
+    def get_target_configs(self, ombs_config):
+        """
+        Read the destinations of the backups: OMBS_CONFIG and the TARGET_<NAME> sections.
+
+        A TARGET_<NAME> section is either a remote target, with the same options as OMBS_CONFIG,
+        or a local folder such as an NFS mount, with PATH.
+
+        1. IP, USERNAME, BKP_DIR, KEY_PATH: remote target.
+        2. PATH: local target, used instead of the remote options.
+        3. RETRIES: optional, retries of a failed transfer (default 2), also accepted in
+        OMBS_CONFIG.
+
+        :param ombs_config: instance of OMBSConfig.
+        :return: list of TargetConfig, OMBS_CONFIG first.
+        :raise BackupSettingsException: if invalid section/option given.
+        """
+        try:
+            target_configs = [TargetConfig(DEFAULT_TARGET, ombs_config, retries=int(
+                self._get_optional('OMBS_CONFIG', 'RETRIES', DEFAULT_TARGET_RETRIES)))]
+
+            for section in sorted(self.config.sections()):
+                if not section.startswith(TARGET_SECTION_PREFIX):
+                    continue
+
+                name = section[len(TARGET_SECTION_PREFIX):].lower()
+                retries = int(self._get_optional(section, 'RETRIES', DEFAULT_TARGET_RETRIES))
+                path = self._get_optional(section, 'PATH', None)
+
+                if path is not None:
+                    target_configs.append(TargetConfig(name, path=path, retries=retries))
+                else:
+                    target_ombs_config = OMBSConfig(str(self.config.get(section, 'IP')),
+                                                    str(self.config.get(section, 'USERNAME')),
+                                                    str(self.config.get(section, 'BKP_DIR')),
+                                                    str(self.config.get(section, 'KEY_PATH')))
+                    target_configs.append(TargetConfig(name, target_ombs_config,
+                                                       retries=retries))
+
+            if any(target_config.retries < 0 for target_config in target_configs):
+                raise ValueError("RETRIES must not be negative")
+
+        except (NoOptionError, ValueError) as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "target. {}".format(self.config_file_name,
+                                                              exception.message),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following targets were defined: %s.", target_configs)
+
+        return target_configs
+
     def get_node_config_dict(self, hostname=None):
         """
         Read node configuration details.
@@ -278,6 +700,10 @@ class ScriptSettings:
         3. EQ_PROMPT: prompt used on node OS system.
         4. USERNAME: account username used on the node.
         5. PASSWORD: account password used on the node.
+        6. RETRIEVAL: optional, 'terminal' (default) or 'file'.
+        7. GROUP: optional, schedule group used in daemon mode.
+        8. SCHEDULE: optional, backup interval of the node in daemon mode.
+        9. SITE: optional, site of the node for the GOVERNOR limits.
 
         If an error occurs, an Exception is raised with the details of the problem.
 
@@ -289,9 +715,15 @@ class ScriptSettings:
             sections = self.config.sections()
             sections.remove('SUPPORT_CONTACT')
             sections.remove('BACKUP_CONFIG')
-            sections.remove('DELAY')
             sections.remove('OMBS_CONFIG')
 
+            for section in OPTIONAL_SECTIONS:
+                if section in sections:
+                    sections.remove(section)
+
+            sections = [section for section in sections
+                        if not section.startswith(TARGET_SECTION_PREFIX)]
+
             self.logger.info("The following nodes were defined: %s.", sections)
 
             customer_config_dict = {}
@@ -303,9 +735,13 @@ class ScriptSettings:
                 eq_prompt = self.config.get(hostname, "EQ_PROMPT")
                 username = self.config.get(hostname, "USERNAME")
                 password = self.config.get(hostname, "PASSWORD")
+                retrieval = self._get_optional(hostname, "RETRIEVAL", TERMINAL_RETRIEVAL)
+                group = self._get_optional(hostname, "GROUP", None)
+                schedule = self._get_optional(hostname, "SCHEDULE", None)
+                site = self._get_optional(hostname, "SITE", None)
 
                 return {hostname: NodeConfig(hostname, ip, node_type, eq_prompt, username,
-                                             password)}
+                                             password, retrieval, group, schedule, site)}
 
             for section in sections:
                 hostname = self.config.get(section, "HOSTNAME")
@@ -314,9 +750,14 @@ class ScriptSettings:
                 eq_prompt = self.config.get(section, "EQ_PROMPT")
                 username = self.config.get(section, "USERNAME")
                 password = self.config.get(section, "PASSWORD")
+                retrieval = self._get_optional(section, "RETRIEVAL", TERMINAL_RETRIEVAL)
+                group = self._get_optional(section, "GROUP", None)
+                schedule = self._get_optional(section, "SCHEDULE", None)
+                site = self._get_optional(section, "SITE", None)
 
                 customer_config_dict[section] = NodeConfig(hostname, ip, node_type, eq_prompt,
-                                                           username, password)
+                                                           username, password, retrieval, group,
+                                                           schedule, site)
 
         except NoSectionError as error:
             raise BackupSettingsException(ExceptionCodes.MissingNodeSection, error)
@@ -333,6 +774,11 @@ class ScriptSettings:
         1. PATH: path to the folder to store backups.
         2. BUFFER_SIZE: size of pexpect buffer for reading the configuration.
         3. MIN_BACKUP_SIZE: minimal size of a backup eligible for sending.
+        4. RETRIES: optional, number of retries of a failed node backup.
+        5. RETRY_DELAY: optional, delay before the first retry, doubled at each retry.
+        6. MAX_RETRY_DELAY: optional, max delay between two retries.
+        7. MASK_VOLATILE: optional, mask timestamps and counters in the configurations.
+        8. ARCHIVE: optional, pack the backups of each run in one indexed archive.
 
         :return: the notification handler with the informed data.
         :raise BackupSettingsException: if invalid section/option given.
@@ -342,11 +788,32 @@ class ScriptSettings:
                                          int(to_bytes(self.config.get('BACKUP_CONFIG',
                                                                       'BUFFER_SIZE'))),
                                          int(to_bytes(self.config.get('BACKUP_CONFIG',
-                                                                      'MIN_BACKUP_SIZE'))))
+                                                                      'MIN_BACKUP_SIZE'))),
+                                         int(self._get_optional('BACKUP_CONFIG', 'RETRIES',
+                                                                DEFAULT_RETRIES)),
+                                         self._get_optional('BACKUP_CONFIG', 'RETRY_DELAY',
+                                                            DEFAULT_RETRY_DELAY),
+                                         self._get_optional('BACKUP_CONFIG', 'MAX_RETRY_DELAY',
+                                                            DEFAULT_MAX_RETRY_DELAY),
+                                         self._get_boolean_optional('BACKUP_CONFIG',
+                                                                    'MASK_VOLATILE', False),
+                                         self._get_boolean_optional('BACKUP_CONFIG',
+                                                                    'ARCHIVE', False))
         except (NoSectionError, NoOptionError) as exception:
             raise BackupSettingsException("Error reading the configuration file '{}': {}"
                                           .format(self.config_file_name, exception.message),
                                           ExceptionCodes.ConfigurationFileOptionError)
+        except ValueError as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': {}"
+                                          .format(self.config_file_name, exception),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        if backup_config.retries < 0 or not is_valid_duration(backup_config.retry_delay) or \
+                not is_valid_duration(backup_config.max_retry_delay):
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "RETRIES, RETRY_DELAY or MAX_RETRY_DELAY."
+                                          .format(self.config_file_name),
+                                          ExceptionCodes.ConfigurationFileOptionError)
 
         self.logger.info("The following backup information was defined: %s.", backup_config)
 
@@ -354,17 +821,304 @@ class ScriptSettings:
 
     def get_delay_config(self):
         """
-        Read the support contact information from the config file.
+        Read the delay information from the config file.
+
+        The section DELAY is optional and deprecated: its value is ignored, as the capture waits
+        for the end of the output of the node.
 
         1. BKP_MAX_DELAY: maximum time of delay.
 
-        :return: the notification handler with the informed data.
-        :raise BackupSettingsException: if invalid section/option given.
+        :return: the delay configuration.
+        """
+        delay_config = DelayConfig(self._get_optional('DELAY', 'BKP_MAX_DELAY', None))
+
+        if self.config.has_section('DELAY'):
+            self.logger.warning("The section DELAY of the configuration file '%s' is deprecated "
+                                "and ignored.", self.config_file_name)
+
+        return delay_config
+
+    def get_scheduler_config(self):
         """
+        Read the daemon mode scheduling information from the config file.
+
+        The section SCHEDULER is optional, default values are used for missing options.
+
+        1. INTERVAL: default interval between two backups of a node.
+        2. WINDOW: time over which the captures of one cycle are spread.
+        3. JITTER: max random delay added to each capture.
+        4. SOCKET_PATH: unix socket to receive on-demand backup requests.
+        5. GROUP_<NAME>: interval of the nodes with GROUP=<NAME>.
+
+        :return: the scheduler configuration.
+        :raise BackupSettingsException: if an invalid time is given.
+        """
+        group_schedules = {}
+        if self.config.has_section('SCHEDULER'):
+            for option, value in self.config.items('SCHEDULER'):
+                if option.lower().startswith(GROUP_SCHEDULE_PREFIX):
+                    group_schedules[option.lower()[len(GROUP_SCHEDULE_PREFIX):]] = value.strip()
+
+        scheduler_config = SchedulerConfig(
+            self._get_optional('SCHEDULER', 'INTERVAL', DEFAULT_SCHEDULER_INTERVAL),
+            self._get_optional('SCHEDULER', 'WINDOW', DEFAULT_SCHEDULER_WINDOW),
+            self._get_optional('SCHEDULER', 'JITTER', DEFAULT_SCHEDULER_JITTER),
+            self._get_optional('SCHEDULER', 'SOCKET_PATH', DEFAULT_SCHEDULER_SOCKET),
+            group_schedules)
+
         try:
-            delay_config = DelayConfig(str(self.config.get('DELAY', 'BKP_MAX_DELAY')))
-        except (NoSectionError, NoOptionError) as exception:
-            raise BackupSettingsException("Error reading the configuration file '{}': {}"
-                                          .format(self.config_file_name, exception.message),
+            for duration in [scheduler_config.interval, scheduler_config.window,
+                             scheduler_config.jitter] + group_schedules.values():
+                to_seconds(duration)
+        except (KeyError, ValueError) as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "SCHEDULER time. {}".format(self.config_file_name,
+                                                                      exception),
                                           ExceptionCodes.ConfigurationFileOptionError)
-        return delay_config
+
+        self.logger.info("The following scheduler information was defined: %s.",
+                         scheduler_config)
+
+        return scheduler_config
+
+    def get_governor_config(self):
+        """
+        Read the management network limits from the config file.
+
+        The section GOVERNOR is optional, default values are used for missing options.
+
+        1. MAX_WORKERS: number of nodes captured in parallel (default 1).
+        2. SITE_SESSIONS: max concurrent device sessions per site (default 2).
+        3. SITE_RATE: max bandwidth of the device sessions of a site, e.g. 500KB (no limit).
+        4. OMBS_RATE: max bandwidth of the transfers to OMBS, e.g. 5MB (no limit), shared by up
+           to MAX_WORKERS concurrent transfers.
+        5. SESSIONS_<SITE>, RATE_<SITE>: limits of the nodes with SITE=<SITE>.
+        6. POST_WORKERS: processes checking and comparing the backups (default 0, one per core).
+
+        :return: the governor configuration.
+        :raise BackupSettingsException: if an invalid value is given.
+        """
+        try:
+            sessions_by_site = {}
+            rate_by_site = {}
+            if self.config.has_section('GOVERNOR'):
+                for option, value in self.config.items('GOVERNOR'):
+                    option = option.lower()
+                    if option.startswith(SITE_SESSIONS_PREFIX):
+                        sessions_by_site[option[len(SITE_SESSIONS_PREFIX):]] = int(value)
+                    elif option.startswith(SITE_RATE_PREFIX):
+                        rate_by_site[option[len(SITE_RATE_PREFIX):]] = to_rate(value)
+
+            governor_config = GovernorConfig(
+                int(self._get_optional('GOVERNOR', 'MAX_WORKERS', DEFAULT_MAX_WORKERS)),
+                int(self._get_optional('GOVERNOR', 'SITE_SESSIONS', DEFAULT_SITE_SESSIONS)),
+                to_rate(self._get_optional('GOVERNOR', 'SITE_RATE', "0B")),
+                to_rate(self._get_optional('GOVERNOR', 'OMBS_RATE', "0B")),
+                sessions_by_site, rate_by_site,
+                int(self._get_optional('GOVERNOR', 'POST_WORKERS', DEFAULT_POST_WORKERS)))
+
+            if governor_config.max_workers < 1 or governor_config.site_sessions < 1 or \
+                    min(sessions_by_site.values() + [1]) < 1:
+                raise ValueError("MAX_WORKERS and the sessions must be at least 1")
+
+            if governor_config.post_workers < 0:
+                raise ValueError("POST_WORKERS must not be negative")
+
+        except (KeyError, ValueError) as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "GOVERNOR value. {}".format(self.config_file_name,
+                                                                      exception),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following governor information was defined: %s.", governor_config)
+
+        return governor_config
+
+    def get_timeouts_config(self):
+        """
+        Read the bounds of the node session timeouts learned from the run history.
+
+        The section TIMEOUTS is optional, default values are used for missing options.
+
+        1. MARGIN: factor applied to the p99 of the durations of a node (default 3).
+        2. MIN_TIMEOUT: lower bound of the timeouts (default 10s).
+        3. MAX_TIMEOUT: upper bound of the timeouts (default 10m).
+        4. MIN_SAMPLES: durations needed before the history of a node is used (default 5).
+        5. HISTORY_SIZE: durations kept per node and phase (default 50).
+
+        :return: the timeouts configuration.
+        :raise BackupSettingsException: if an invalid value is given.
+        """
+        try:
+            timeouts_config = TimeoutsConfig(
+                float(self._get_optional('TIMEOUTS', 'MARGIN', DEFAULT_TIMEOUT_MARGIN)),
+                self._get_optional('TIMEOUTS', 'MIN_TIMEOUT', DEFAULT_MIN_TIMEOUT),
+                self._get_optional('TIMEOUTS', 'MAX_TIMEOUT', DEFAULT_MAX_TIMEOUT),
+                int(self._get_optional('TIMEOUTS', 'MIN_SAMPLES', DEFAULT_TIMEOUT_MIN_SAMPLES)),
+                int(self._get_optional('TIMEOUTS', 'HISTORY_SIZE', DEFAULT_HISTORY_SIZE)))
+
+            if timeouts_config.margin < 1 or timeouts_config.min_samples < 1 or \
+                    timeouts_config.history_size < timeouts_config.min_samples:
+                raise ValueError("MARGIN and MIN_SAMPLES must be at least 1 and HISTORY_SIZE at "
+                                 "least MIN_SAMPLES")
+
+            if to_seconds(timeouts_config.min_timeout) > to_seconds(timeouts_config.max_timeout):
+                raise ValueError("MIN_TIMEOUT must not be greater than MAX_TIMEOUT")
+
+        except (KeyError, ValueError) as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "TIMEOUTS value. {}".format(self.config_file_name,
+                                                                      exception),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following timeouts information was defined: %s.", timeouts_config)
+
+        return timeouts_config
+
+    def get_baseline_config(self):
+        """
+        Read the thresholds of the size and line count baselines of the backups.
+
+        The section BASELINE is optional, default values are used for missing options.
+
+        1. MIN_SAMPLES: backups needed before the baseline of a node is used (default 5).
+        2. DEVIATION: allowed deviation in scaled median absolute deviations (default 5).
+        3. TOLERANCE: allowed deviation as a fraction of the median (default 0.2).
+        4. HISTORY_SIZE: backups kept per node in the baseline (default 10).
+
+        :return: the baseline configuration.
+        :raise BackupSettingsException: if an invalid value is given.
+        """
+        try:
+            baseline_config = BaselineConfig(
+                int(self._get_optional('BASELINE', 'MIN_SAMPLES', DEFAULT_BASELINE_MIN_SAMPLES)),
+                float(self._get_optional('BASELINE', 'DEVIATION', DEFAULT_BASELINE_DEVIATION)),
+                float(self._get_optional('BASELINE', 'TOLERANCE', DEFAULT_BASELINE_TOLERANCE)),
+                int(self._get_optional('BASELINE', 'HISTORY_SIZE',
+                                       DEFAULT_BASELINE_HISTORY_SIZE)))
+
+            if baseline_config.min_samples < 1 or baseline_config.deviation < 0 or \
+                    baseline_config.tolerance < 0 or \
+                    baseline_config.history_size < baseline_config.min_samples:
+                raise ValueError("MIN_SAMPLES must be at least 1, DEVIATION and TOLERANCE not "
+                                 "negative and HISTORY_SIZE at least MIN_SAMPLES")
+
+        except ValueError as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "BASELINE value. {}".format(self.config_file_name,
+                                                                      exception),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following baseline information was defined: %s.", baseline_config)
+
+        return baseline_config
+
+    def get_gnupg_config(self):
+        """
+        Read the key used to encrypt the backups before they are sent to OMBS.
+
+        The section GNUPG is optional, the backups are sent in plaintext without it.
+
+        1. GPG_RECIPIENT: user id of the public key in the keyring (default GPG_USER_EMAIL).
+        2. GPG_KEY_FILE: optional, file with the public key, used instead of the keyring.
+        3. GPG_HOME: optional, gpg home directory.
+
+        :return: the gnupg configuration.
+        :raise BackupSettingsException: if gpg is not installed or the key file can't be read.
+        """
+        gnupg_config = GnupgConfig(
+            self._get_optional('GNUPG', 'GPG_RECIPIENT',
+                               self._get_optional('GNUPG', 'GPG_USER_EMAIL', None)),
+            self._get_optional('GNUPG', 'GPG_KEY_FILE', None),
+            self._get_optional('GNUPG', 'GPG_HOME', None))
+
+        if gnupg_config.enabled and find_executable(GPG_COMMAND[0]) is None:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "GNUPG value. Command {} is not installed."
+                                          .format(self.config_file_name, GPG_COMMAND[0]),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        if gnupg_config.key_file and not os.access(gnupg_config.key_file, os.R_OK):
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "GNUPG value. Key file {} can't be read."
+                                          .format(self.config_file_name, gnupg_config.key_file),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following gnupg information was defined: %s.", gnupg_config)
+
+        return gnupg_config
+
+    def get_reachability_config(self):
+        """
+        Read the time the reachability of the nodes is cached across runs.
+
+        The section REACHABILITY is optional, default values are used for missing options.
+
+        1. TTL: time a node seen up is not pinged again (default 5m, 0s to always ping).
+        2. DOWN_TTL: deprecated and ignored, as a node reported down fails the run; a node seen
+        down is always pinged again.
+
+        :return: the reachability configuration.
+        :raise BackupSettingsException: if an invalid value is given.
+        """
+        try:
+            reachability_config = ReachabilityConfig(
+                self._get_optional('REACHABILITY', 'TTL', DEFAULT_REACHABILITY_TTL),
+                self._get_optional('REACHABILITY', 'DOWN_TTL', DEFAULT_REACHABILITY_DOWN_TTL))
+
+            to_seconds(reachability_config.ttl)
+            to_seconds(reachability_config.down_ttl)
+
+            if self.config.has_option('REACHABILITY', 'DOWN_TTL'):
+                self.logger.warning("The option DOWN_TTL of the configuration file '%s' is "
+                                    "deprecated and ignored.", self.config_file_name)
+
+        except (KeyError, ValueError) as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "REACHABILITY value. {}".format(self.config_file_name,
+                                                                          exception),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following reachability information was defined: %s.",
+                         reachability_config)
+
+        return reachability_config
+
+    def get_sharding_config(self):
+        """
+        Read the folder on shared storage used to share the nodes with other runners.
+
+        The section SHARDING is optional, all the nodes are captured by this runner without it.
+
+        1. SHARED_PATH: folder shared by the runners, e.g. on an NFS mount.
+        2. RUNNER_ID: optional, unique name of this runner (default the hostname).
+        3. LEASE_TIME: optional, time after which a silent runner is dead (default 10m).
+
+        :return: the sharding configuration.
+        :raise BackupSettingsException: if an invalid value is given.
+        """
+        try:
+            sharding_config = ShardingConfig(
+                self._get_optional('SHARDING', 'SHARED_PATH', None),
+                self._get_optional('SHARDING', 'RUNNER_ID', None),
+                self._get_optional('SHARDING', 'LEASE_TIME', DEFAULT_SHARD_LEASE_TIME))
+
+            if to_seconds(sharding_config.lease_time) <= 0:
+                raise ValueError("LEASE_TIME must be positive")
+
+            if sharding_config.enabled and not os.path.isdir(sharding_config.shared_path):
+                raise ValueError("SHARED_PATH {} is not a folder".format(
+                    sharding_config.shared_path))
+
+            if os.sep in sharding_config.runner_id:
+                raise ValueError("RUNNER_ID must not contain '{}'".format(os.sep))
+
+        except (KeyError, ValueError) as exception:
+            raise BackupSettingsException("Error reading the configuration file '{}': invalid "
+                                          "SHARDING value. {}".format(self.config_file_name,
+                                                                      exception),
+                                          ExceptionCodes.ConfigurationFileOptionError)
+
+        self.logger.info("The following sharding information was defined: %s.", sharding_config)
+
+        return sharding_config
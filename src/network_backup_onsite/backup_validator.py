@@ -0,0 +1,223 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to check the content of the backup files with the rules of their device driver."""
+
+import mmap
+import os
+import re
+import threading
+
+from network_backup_onsite.baseline import get_node_and_date
+from network_backup_onsite.device_drivers import DRIVER_REGISTRY, DeviceDriver
+
+# Header written by the node backup handler before the configuration.
+HEADER_RE = re.compile(r"^Equipment type: (.+?) -> .* with IP: .*\n-+\n", re.M)
+HEADER_MAX_SIZE = 1024
+
+# Only the end of the file is read to check the last line of the configuration.
+TAIL_SIZE = 4096
+
+COUNT_CHUNK_SIZE = 1024 * 1024
+
+_compiled_rules = {}
+_compiled_rules_lock = threading.Lock()
+
+
+class BackupVerdict(object):
+    """Result of the validation of one backup file."""
+
+    def __init__(self, backup_file, size=0, node_type=None, problems=None, lines=0,
+                 warnings=None):
+        """
+        Initialize the verdict.
+
+        :param backup_file: backup file validated.
+        :param size: size of the file in bytes.
+        :param node_type: equipment type read from the file header.
+        :param problems: list of problems found, empty if the file is valid.
+        :param lines: number of lines of the file.
+        :param warnings: list of deviations to be reported, which do not make the file invalid.
+        """
+        self.backup_file = backup_file
+        self.size = size
+        self.node_type = node_type
+        self.problems = problems if problems else []
+        self.lines = lines
+        self.warnings = warnings if warnings else []
+
+    @property
+    def valid(self):
+        """Check if the backup file can be sent."""
+        return not self.problems
+
+    def __str__(self):
+        """Represent the verdict as a report line."""
+        if self.valid:
+            return " ".join(["{}: valid ({} bytes).".format(self.backup_file, self.size)] +
+                            self.warnings)
+
+        return "{}: invalid. {}".format(self.backup_file, " ".join(self.problems))
+
+    def __repr__(self):
+        """Represent the verdict."""
+        return self.__str__()
+
+
+def get_content_rules(node_type):
+    """
+    Get the compiled content rules of the driver of a node type.
+
+    :param node_type: equipment type, None or unknown types get the generic rules.
+    :return: tuple of (required expressions, end expression or None, error expressions).
+    """
+    driver_class = DRIVER_REGISTRY.get(str(node_type).strip().lower(), DeviceDriver)
+
+    with _compiled_rules_lock:
+        if driver_class not in _compiled_rules:
+            _compiled_rules[driver_class] = (
+                [re.compile(pattern, re.M) for pattern in driver_class.required_patterns],
+                re.compile(driver_class.end_pattern, re.M) if driver_class.end_pattern else None,
+                [re.compile(pattern, re.M) for pattern in driver_class.error_patterns])
+
+        return _compiled_rules[driver_class]
+
+
+def check_content(content, node_type, start=0):
+    """
+    Check the configuration of a backup file with the rules of its driver.
+
+    :param content: memory-mapped file, or string, with the header and the configuration.
+    :param node_type: equipment type of the node.
+    :param start: position of the configuration, after the header.
+    :return: list of problems found.
+    """
+    required_res, end_re, error_res = get_content_rules(node_type)
+
+    problems = []
+    for error_re in error_res:
+        match = error_re.search(content, start)
+        if match:
+            line_end = content.find("\n", match.start())
+            line_end = line_end if line_end >= 0 else len(content)
+            problems.append("Error output found: '{}'."
+                            .format(content[match.start():min(line_end, match.start() + 100)]))
+            break
+
+    if not content[start:start + 1]:
+        problems.append("No configuration after the header.")
+        return problems
+
+    for required_re in required_res:
+        if not required_re.search(content, start):
+            problems.append("Expected content '{}' not found.".format(required_re.pattern))
+
+    if end_re is not None:
+        tail = content[max(start, len(content) - TAIL_SIZE):].rstrip()
+        if not end_re.search(tail):
+            problems.append("Configuration is truncated: last line '{}'."
+                            .format(tail.rsplit("\n", 1)[-1]))
+
+    return problems
+
+
+def count_lines(content):
+    """
+    Count the lines of a memory-mapped file, one chunk at a time.
+
+    :param content: memory-mapped file.
+    :return: number of line endings.
+    """
+    return sum(content[position:position + COUNT_CHUNK_SIZE].count("\n")
+               for position in xrange(0, len(content), COUNT_CHUNK_SIZE))
+
+
+def scan_backup_file(backup_file):
+    """
+    Read the equipment type of a backup file and check its configuration with the driver rules.
+
+    The file is memory-mapped, so the expressions scan it without copying it in memory. This is
+    the CPU-bound part of the validation, run by the post processor.
+
+    :param backup_file: backup file.
+    :return: tuple of the equipment type, list of problems found and number of lines.
+    :raise IOError, ValueError: if the file can't be read.
+    """
+    problems = []
+    with open(backup_file, "rb") as backup:
+        content = mmap.mmap(backup.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = HEADER_RE.search(content[:HEADER_MAX_SIZE])
+            if header is None:
+                problems.append("Backup header not found.")
+                node_type = None
+                start = 0
+            else:
+                node_type = header.group(1)
+                start = header.end()
+
+            problems.extend(check_content(content, node_type, start))
+            lines = count_lines(content)
+        finally:
+            content.close()
+
+    return node_type, problems, lines
+
+
+def validate_backup_file(backup_file, min_backup_size, baselines=None, post_processor=None):
+    """
+    Validate the size and the content of a backup file.
+
+    When the node has a baseline, its size is not compared with min_backup_size; a size or line
+    count out of the usual range of the node is a warning, as a change of the configuration is
+    legitimate. The backups with a valid content are added to the baseline.
+
+    :param backup_file: backup file.
+    :param min_backup_size: the file must be bigger than this number of bytes.
+    :param baselines: instance of BackupBaselines, None to check only min_backup_size.
+    :param post_processor: instance of PostProcessor to scan the content, None to scan it here.
+    :return: instance of BackupVerdict.
+    """
+    verdict = BackupVerdict(backup_file)
+    node, date = get_node_and_date(backup_file)
+    if node is None:
+        baselines = None
+
+    try:
+        verdict.size = os.path.getsize(backup_file)
+        has_baseline = baselines is not None and baselines.has_baseline(node, date)
+        if not has_baseline and verdict.size <= min_backup_size:
+            verdict.problems.append("Size {} is not bigger than {} bytes."
+                                    .format(verdict.size, min_backup_size))
+            return verdict
+
+        if post_processor is not None:
+            scan = post_processor.run(scan_backup_file, backup_file)
+        else:
+            scan = scan_backup_file(backup_file)
+
+        verdict.node_type, problems, verdict.lines = scan
+        verdict.problems.extend(problems)
+
+        if baselines is not None and verdict.valid:
+            verdict.warnings.extend(baselines.check(node, date, verdict.size, verdict.lines))
+
+            # The deviating backups are kept in the baseline too, so a lasting change of the
+            # configuration becomes the new usual range.
+            baselines.record(node, date, verdict.size, verdict.lines)
+
+    except (IOError, OSError, ValueError) as read_exception:
+        verdict.problems.append("File can't be read: {}.".format(read_exception))
+
+    return verdict
@@ -0,0 +1,165 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to keep the size and line count baselines of the backups of each node."""
+
+import os
+import threading
+
+from network_backup_onsite.run_lock import file_update_lock
+from network_backup_onsite.utils import read_json_file, write_json_file
+
+BASELINE_FILE_NAME = ".ntwk_bkp_onsite_baselines.json"
+
+BACKUP_FILE_SEPARATOR = "-backup-"
+
+# Scale of the median absolute deviation to estimate the standard deviation of normal data.
+MAD_SCALE = 1.4826
+
+
+def get_median(values):
+    """
+    Get the median of a list of values.
+
+    :param values: non-empty list of values.
+    :return: median.
+    """
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+
+    if len(ordered) % 2:
+        return float(ordered[middle])
+
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def get_node_and_date(backup_file):
+    """
+    Get the node name and the date from the name of a backup file.
+
+    :param backup_file: backup file, named <node>-backup-<date>.
+    :return: tuple of node name and date, or (None, None) for other names.
+    """
+    file_name = os.path.basename(backup_file)
+    if BACKUP_FILE_SEPARATOR not in file_name:
+        return None, None
+
+    node, date = file_name.rsplit(BACKUP_FILE_SEPARATOR, 1)
+
+    return node, date
+
+
+class BackupBaselines(object):
+    """
+    Rolling size and line count baselines of the backups of each node.
+
+    Each node keeps its last HISTORY_SIZE samples of (date, size, lines), one per backup date, in
+    a json file in the backup root folder. A backup is compared only with the samples of the
+    previous dates, so validating the same backup again gives the same verdict.
+    """
+
+    def __init__(self, backup_path, baseline_config):
+        """
+        Load the baselines of a backup root folder.
+
+        :param backup_path: root folder of the backup folders.
+        :param baseline_config: instance of BaselineConfig.
+        """
+        self.path = os.path.join(backup_path, BASELINE_FILE_NAME)
+        self.baseline_config = baseline_config
+
+        self._lock = threading.Lock()
+
+        # Dictionary of node name and list of [date, size, lines], sorted by date.
+        self._samples = read_json_file(self.path)
+
+    def get_samples(self, node, date):
+        """
+        Get the samples of a node older than a date.
+
+        :param node: node name.
+        :param date: date of the backup being checked.
+        :return: list of (date, size, lines).
+        """
+        with self._lock:
+            return [tuple(sample) for sample in self._samples.get(node.lower(), [])
+                    if sample[0] < date]
+
+    def has_baseline(self, node, date):
+        """
+        Check if a node has enough samples before a date to compare its backup with.
+
+        :param node: node name.
+        :param date: date of the backup being checked.
+        :return: true if the node has at least MIN_SAMPLES samples.
+        """
+        return len(self.get_samples(node, date)) >= self.baseline_config.min_samples
+
+    def get_allowed_range(self, values):
+        """
+        Get the range of values considered normal: the median plus or minus the largest of
+        DEVIATION times the scaled median absolute deviation and TOLERANCE times the median.
+
+        :param values: non-empty list of values.
+        :return: tuple of the lowest and highest normal values.
+        """
+        median = get_median(values)
+        mad = get_median([abs(value - median) for value in values]) * MAD_SCALE
+        margin = max(self.baseline_config.deviation * mad, self.baseline_config.tolerance * median)
+
+        return median - margin, median + margin
+
+    def check(self, node, date, size, lines):
+        """
+        Compare a backup with the baseline of its node.
+
+        :param node: node name.
+        :param date: date of the backup.
+        :param size: size of the backup in bytes.
+        :param lines: number of lines of the backup.
+        :return: list of problems found, empty if the node has no baseline.
+        """
+        samples = self.get_samples(node, date)
+        if len(samples) < self.baseline_config.min_samples:
+            return []
+
+        problems = []
+        for name, value, values in (("Size", size, [sample[1] for sample in samples]),
+                                    ("Line count", lines, [sample[2] for sample in samples])):
+            lowest, highest = self.get_allowed_range(values)
+            if not lowest <= value <= highest:
+                problems.append("{} {} is out of the usual range {:.0f}-{:.0f} of the node."
+                                .format(name, value, lowest, highest))
+
+        return problems
+
+    def record(self, node, date, size, lines):
+        """
+        Add or replace the sample of a backup, keeping only the last HISTORY_SIZE dates.
+
+        :param node: node name.
+        :param date: date of the backup.
+        :param size: size of the backup in bytes.
+        :param lines: number of lines of the backup.
+        """
+        with self._lock, file_update_lock(self.path):
+            # The samples are read again, as another run sharing the folder may have updated them.
+            self._samples = read_json_file(self.path)
+
+            samples = [sample for sample in self._samples.get(node.lower(), [])
+                       if sample[0] != date]
+            samples.append([date, size, lines])
+            samples.sort()
+
+            self._samples[node.lower()] = samples[-self.baseline_config.history_size:]
+            write_json_file(self.path, self._samples)
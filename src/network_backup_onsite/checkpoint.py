@@ -0,0 +1,162 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to journal which nodes of a daily backup folder were captured and sent."""
+
+import datetime
+import json
+import os
+import threading
+
+CHECKPOINT_FILE_NAME = ".checkpoint"
+
+CAPTURED = "captured"
+FAILED = "failed"
+SENT = "sent"
+
+# Target of the SENT events journaled before there were several targets.
+DEFAULT_TARGET = "ombs"
+
+
+class RunCheckpoint(object):
+    """
+    Append-only journal of node completions kept in the backup folder.
+
+    Each event is one JSON line written with a single append and flushed to disk, so a crash can
+    only lose the event being written. A truncated last line is ignored when the journal is read.
+    """
+
+    def __init__(self, bkp_folder_path):
+        """
+        Load the journal of the backup folder, if there is one.
+
+        :param bkp_folder_path: daily backup folder.
+        """
+        self.bkp_folder_path = bkp_folder_path
+        self.path = os.path.join(bkp_folder_path, CHECKPOINT_FILE_NAME)
+
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._truncated = False
+
+        self._load()
+
+    def _load(self):
+        """Replay the journal events to get the latest state of each node."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as journal:
+            for line in journal:
+                self._truncated = not line.endswith("\n")
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue
+
+    def _apply(self, event):
+        """
+        Update the state of a node with an event.
+
+        :param event: dictionary with node, status and file.
+        """
+        node_state = self._nodes.setdefault(event["node"], {"status": None, "file": None,
+                                                            "sent": set()})
+        if event["status"] == SENT:
+            if node_state["file"] == event["file"]:
+                node_state["sent"].add(event.get("target", DEFAULT_TARGET))
+            return
+
+        node_state["status"] = event["status"]
+        node_state["file"] = event.get("file")
+        node_state["sent"] = set()
+
+    def record(self, hostname, status, backup_file=None, target=DEFAULT_TARGET):
+        """
+        Append an event to the journal.
+
+        :param hostname: node name.
+        :param status: CAPTURED, FAILED or SENT.
+        :param backup_file: backup file of the node.
+        :param target: name of the target the file was sent to, for SENT events.
+        """
+        event = {"node": hostname, "status": status,
+                 "file": os.path.basename(backup_file) if backup_file else None,
+                 "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        if status == SENT:
+            event["target"] = target
+
+        line = json.dumps(event, sort_keys=True) + "\n"
+
+        with self._lock:
+            # Terminate an event left partially written by a crashed run.
+            if self._truncated:
+                line = "\n" + line
+                self._truncated = False
+
+            journal = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(journal, line)
+                os.fsync(journal)
+            finally:
+                os.close(journal)
+
+            self._apply(event)
+
+    def get_backup_file(self, hostname):
+        """
+        Get the backup file of a node captured in this folder.
+
+        :param hostname: node name.
+        :return: full path of the file, or None if the node was not captured.
+        """
+        node_state = self._nodes.get(hostname)
+        if not node_state or node_state["status"] != CAPTURED:
+            return None
+
+        backup_file = os.path.join(self.bkp_folder_path, node_state["file"])
+
+        return backup_file if os.path.isfile(backup_file) else None
+
+    def is_captured(self, hostname):
+        """
+        Check if a node was already captured successfully in this folder.
+
+        :param hostname: node name.
+        :return: true if captured and its file still exists.
+        """
+        return self.get_backup_file(hostname) is not None
+
+    def get_status(self, hostname):
+        """
+        Get the last status of a node.
+
+        :param hostname: node name.
+        :return: CAPTURED, FAILED or None if the node has no event.
+        """
+        return self._nodes.get(hostname, {}).get("status")
+
+    def get_unsent_files(self, target=DEFAULT_TARGET):
+        """
+        Get the backup files captured but not transferred yet to a target.
+
+        :param target: target name.
+        :return: dictionary of node name and backup file path.
+        """
+        unsent_files = {}
+        for hostname, node_state in self._nodes.items():
+            backup_file = self.get_backup_file(hostname)
+            if backup_file and target not in node_state["sent"]:
+                unsent_files[hostname] = backup_file
+
+        return unsent_files
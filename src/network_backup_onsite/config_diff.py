@@ -0,0 +1,315 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too many local variables
+# pylint: disable=C0103,R0914
+
+"""Module to compare the backup of a node with its previous backup."""
+
+from difflib import SequenceMatcher
+import os
+
+DIFF_FOLDER_NAME = "diffs"
+DIFF_FILE_SUFFIX = ".diff"
+DIFF_CONTEXT_LINES = 3
+
+
+class ConfigDiff(object):
+    """Summary of the changes of a backup compared with the previous backup of the node."""
+
+    def __init__(self, backup_file, previous_file=None, added=0, removed=0, diff_file=None):
+        """
+        Initialize the summary.
+
+        :param backup_file: new backup file.
+        :param previous_file: previous backup file of the node, None if there is none.
+        :param added: number of lines added.
+        :param removed: number of lines removed.
+        :param diff_file: unified diff file, None if nothing changed.
+        """
+        self.backup_file = backup_file
+        self.previous_file = previous_file
+        self.added = added
+        self.removed = removed
+        self.diff_file = diff_file
+
+    @property
+    def changed(self):
+        """Check if the configuration changed."""
+        return bool(self.added or self.removed)
+
+    def __str__(self):
+        """Represent the summary as a report line."""
+        name = os.path.basename(self.backup_file)
+
+        if self.previous_file is None:
+            return "{}: no previous backup to compare.".format(name)
+
+        previous_folder = os.path.basename(os.path.dirname(self.previous_file))
+        if not self.changed:
+            return "{}: unchanged since {}.".format(name, previous_folder)
+
+        return "{}: +{} -{} lines since {}.".format(name, self.added, self.removed,
+                                                    previous_folder)
+
+    def __repr__(self):
+        """Represent the summary."""
+        return self.__str__()
+
+
+def find_previous_backup(backup_file, backup_path, folder_template):
+    """
+    Find the latest backup of the same node in an older backup folder.
+
+    Backup folders are named with the template followed by the date, and the backup files with
+    the node name followed by the same date, so both sort chronologically by name.
+
+    :param backup_file: new backup file.
+    :param backup_path: root folder of the backup folders.
+    :param folder_template: prefix of the backup folder names.
+    :return: path of the previous backup file, or None.
+    """
+    current_folder = os.path.basename(os.path.dirname(backup_file))
+    node_prefix = os.path.basename(backup_file).rsplit("-", 1)[0] + "-"
+
+    folders = sorted((folder for folder in os.listdir(backup_path)
+                      if folder.startswith(folder_template) and folder < current_folder),
+                     reverse=True)
+
+    for folder in folders:
+        previous_file = os.path.join(backup_path, folder,
+                                     node_prefix + folder[len(folder_template):])
+        if os.path.isfile(previous_file):
+            return previous_file
+
+    return None
+
+
+def get_line_hashes(file_path):
+    """
+    Hash each line of a file, so files are compared without keeping their text in memory.
+
+    :param file_path: file to be read.
+    :return: list of line hashes.
+    """
+    with open(file_path, "rb") as lines:
+        return [hash(line) for line in lines]
+
+
+def get_opcodes(old_hashes, new_hashes):
+    """
+    Get the operations transforming the old lines into the new lines.
+
+    The common beginning and end, usually almost the whole configuration, are skipped before
+    matching the sequences, so the matching cost depends only on the changed region.
+
+    :param old_hashes: line hashes of the old file.
+    :param new_hashes: line hashes of the new file.
+    :return: list of (tag, old_start, old_end, new_start, new_end), as difflib get_opcodes.
+    """
+    prefix = 0
+    max_prefix = min(len(old_hashes), len(new_hashes))
+    while prefix < max_prefix and old_hashes[prefix] == new_hashes[prefix]:
+        prefix += 1
+
+    suffix = 0
+    max_suffix = max_prefix - prefix
+    while suffix < max_suffix and old_hashes[-suffix - 1] == new_hashes[-suffix - 1]:
+        suffix += 1
+
+    old_end = len(old_hashes) - suffix
+    new_end = len(new_hashes) - suffix
+
+    opcodes = []
+    if prefix:
+        opcodes.append(("equal", 0, prefix, 0, prefix))
+
+    matcher = SequenceMatcher(None, old_hashes[prefix:old_end], new_hashes[prefix:new_end],
+                              autojunk=False)
+    for tag, old_start, old_stop, new_start, new_stop in matcher.get_opcodes():
+        opcodes.append((tag, old_start + prefix, old_stop + prefix, new_start + prefix,
+                        new_stop + prefix))
+
+    if suffix:
+        opcodes.append(("equal", old_end, len(old_hashes), new_end, len(new_hashes)))
+
+    return opcodes
+
+
+def group_opcodes(opcodes, context=DIFF_CONTEXT_LINES):
+    """
+    Group the changes in hunks with up to context lines around them, as difflib does.
+
+    :param opcodes: list of opcodes.
+    :param context: number of unchanged lines around the changes.
+    :return: list of hunks, each a list of opcodes.
+    """
+    if not any(tag != "equal" for tag, _, _, _, _ in opcodes):
+        return []
+
+    opcodes = list(opcodes)
+    tag, old_start, old_end, new_start, new_end = opcodes[0]
+    if tag == "equal":
+        opcodes[0] = (tag, max(old_start, old_end - context), old_end,
+                      max(new_start, new_end - context), new_end)
+    tag, old_start, old_end, new_start, new_end = opcodes[-1]
+    if tag == "equal":
+        opcodes[-1] = (tag, old_start, min(old_end, old_start + context),
+                       new_start, min(new_end, new_start + context))
+
+    hunks = []
+    hunk = []
+    for tag, old_start, old_end, new_start, new_end in opcodes:
+        # A long unchanged region closes the current hunk.
+        if tag == "equal" and old_end - old_start > context * 2:
+            hunk.append((tag, old_start, old_start + context, new_start, new_start + context))
+            hunks.append(hunk)
+            hunk = []
+            old_start = max(old_start, old_end - context)
+            new_start = max(new_start, new_end - context)
+        hunk.append((tag, old_start, old_end, new_start, new_end))
+
+    if hunk and not (len(hunk) == 1 and hunk[0][0] == "equal"):
+        hunks.append(hunk)
+
+    return hunks
+
+
+def read_lines(file_path, line_numbers):
+    """
+    Read only the requested lines of a file.
+
+    :param file_path: file to be read.
+    :param line_numbers: set of line numbers, starting at 0.
+    :return: dictionary of line number and line.
+    """
+    lines = {}
+    if not line_numbers:
+        return lines
+
+    last_line = max(line_numbers)
+    with open(file_path, "rb") as source:
+        for line_number, line in enumerate(source):
+            if line_number in line_numbers:
+                lines[line_number] = line if line.endswith("\n") else line + "\n"
+            if line_number >= last_line:
+                break
+
+    return lines
+
+
+def format_range(start, stop):
+    """
+    Format a line range of a unified diff hunk header.
+
+    :param start: first line, starting at 0.
+    :param stop: line after the last one.
+    :return: range as 'start,length'.
+    """
+    length = stop - start
+    first = start + 1 if length else start
+
+    return str(first) if length == 1 else "{},{}".format(first, length)
+
+
+def write_unified_diff(old_file, new_file, hunks, diff_file):
+    """
+    Write the hunks as a unified diff, reading only the lines the hunks need.
+
+    :param old_file: old file.
+    :param new_file: new file.
+    :param hunks: list of hunks from group_opcodes.
+    :param diff_file: file to be written.
+    """
+    old_numbers = set()
+    new_numbers = set()
+    for hunk in hunks:
+        for _, old_start, old_end, new_start, new_end in hunk:
+            old_numbers.update(xrange(old_start, old_end))
+            new_numbers.update(xrange(new_start, new_end))
+
+    old_lines = read_lines(old_file, old_numbers)
+    new_lines = read_lines(new_file, new_numbers)
+
+    with open(diff_file, "wb") as diff:
+        diff.write("--- {}\n+++ {}\n".format(old_file, new_file))
+
+        for hunk in hunks:
+            diff.write("@@ -{} +{} @@\n".format(format_range(hunk[0][1], hunk[-1][2]),
+                                                format_range(hunk[0][3], hunk[-1][4])))
+
+            for tag, old_start, old_end, new_start, new_end in hunk:
+                if tag == "equal":
+                    for line_number in xrange(old_start, old_end):
+                        diff.write(" " + old_lines[line_number])
+                    continue
+
+                for line_number in xrange(old_start, old_end):
+                    diff.write("-" + old_lines[line_number])
+                for line_number in xrange(new_start, new_end):
+                    diff.write("+" + new_lines[line_number])
+
+
+def diff_backup_files(old_file, new_file, diff_file):
+    """
+    Compare two backup files and store their unified diff, if they differ.
+
+    :param old_file: previous backup file.
+    :param new_file: new backup file.
+    :param diff_file: file to store the diff.
+    :return: tuple with the number of lines added and removed.
+    """
+    opcodes = get_opcodes(get_line_hashes(old_file), get_line_hashes(new_file))
+
+    added = removed = 0
+    for tag, old_start, old_end, new_start, new_end in opcodes:
+        if tag != "equal":
+            removed += old_end - old_start
+            added += new_end - new_start
+
+    hunks = group_opcodes(opcodes)
+    if hunks:
+        write_unified_diff(old_file, new_file, hunks, diff_file)
+
+    return added, removed
+
+
+def create_backup_diff(backup_file, backup_path, folder_template):
+    """
+    Compare a new backup with the previous backup of the node.
+
+    The diff is stored in the diffs subfolder of the backup folder, which is not sent to OMBS.
+
+    :param backup_file: new backup file.
+    :param backup_path: root folder of the backup folders.
+    :param folder_template: prefix of the backup folder names.
+    :return: instance of ConfigDiff.
+    """
+    previous_file = find_previous_backup(backup_file, backup_path, folder_template)
+    if previous_file is None:
+        return ConfigDiff(backup_file)
+
+    diff_folder = os.path.join(os.path.dirname(backup_file), DIFF_FOLDER_NAME)
+    # The folder may be created at the same time by the diff of another node.
+    try:
+        os.makedirs(diff_folder)
+    except OSError:
+        if not os.path.isdir(diff_folder):
+            raise
+
+    diff_file = os.path.join(diff_folder, os.path.basename(backup_file) + DIFF_FILE_SUFFIX)
+    if os.path.exists(diff_file):
+        os.remove(diff_file)
+
+    added, removed = diff_backup_files(previous_file, backup_file, diff_file)
+
+    return ConfigDiff(backup_file, previous_file, added, removed,
+                      diff_file if os.path.exists(diff_file) else None)
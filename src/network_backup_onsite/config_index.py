@@ -0,0 +1,310 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to index the configuration lines of the backups, to search them across the history."""
+
+import os
+import re
+import sqlite3
+
+INDEX_FILE_NAME = ".ntwk_bkp_onsite_index.db"
+
+BACKUP_FILE_SEPARATOR = "-backup-"
+TOKEN_RE = re.compile(r"[\w.:/@-]+")
+TOKEN_COUNT_LIMIT = 10000
+
+# Lines of the header written by the script before the configuration.
+HEADER_LINE_RE = re.compile(r"^(?:-{10,}|Equipment type: .* with IP: .*)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS tokens (token TEXT NOT NULL, line_id INTEGER NOT NULL,
+                                   PRIMARY KEY (token, line_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS intervals (line_id INTEGER NOT NULL, node TEXT NOT NULL,
+                                      first_date TEXT NOT NULL, last_date TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS intervals_line ON intervals (line_id);
+CREATE INDEX IF NOT EXISTS intervals_node ON intervals (node, last_date);
+CREATE TABLE IF NOT EXISTS backups (node TEXT NOT NULL, date TEXT NOT NULL, mtime REAL,
+                                    size INTEGER, PRIMARY KEY (node, date));
+"""
+
+# Columns added to the tables of the indexes created by previous versions.
+BACKUPS_COLUMNS = (("mtime", "REAL"), ("size", "INTEGER"))
+
+
+def tokenize(text):
+    """
+    Split a configuration line or a search query in lowercase tokens.
+
+    :param text: text to be split.
+    :return: set of tokens.
+    """
+    return set(token.lower() for token in TOKEN_RE.findall(text))
+
+
+class SearchResult(object):
+    """A configuration line found in the backups of a node during an interval of dates."""
+
+    def __init__(self, node, line, first_date, last_date, current):
+        """
+        Initialize the result.
+
+        :param node: node name, as in the backup file name.
+        :param line: configuration line.
+        :param first_date: date of the first backup with the line.
+        :param last_date: date of the last backup with the line.
+        :param current: true if the line is in the latest backup of the node.
+        """
+        self.node = node
+        self.line = line
+        self.first_date = first_date
+        self.last_date = last_date
+        self.current = current
+
+    def __str__(self):
+        """Represent the result as an output line."""
+        return "{}  {} - {}  {}".format(self.node, self.first_date,
+                                        "now" if self.current else self.last_date, self.line)
+
+    def __repr__(self):
+        """Represent the result."""
+        return self.__str__()
+
+
+class ConfigIndex(object):
+    """
+    Inverted index of the configuration lines of every backup, kept in a sqlite database.
+
+    Each distinct line is stored once, with its tokens. For each node, the presence of a line is
+    stored as intervals of backup dates, so indexing a daily backup only extends the intervals of
+    the lines still present and opens intervals for the new lines. The latest backup of a node
+    is indexed again when its file changed, e.g. when the node was captured again the same day.
+    """
+
+    def __init__(self, backup_path):
+        """
+        Open the index of a backup root folder, creating it if needed.
+
+        :param backup_path: root folder of the backup folders.
+        """
+        self.path = os.path.join(backup_path, INDEX_FILE_NAME)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.text_factory = str
+        self.connection.executescript(SCHEMA)
+
+        columns = set(row[1] for row in self.connection.execute("PRAGMA table_info(backups)"))
+        with self.connection:
+            for column, column_type in BACKUPS_COLUMNS:
+                if column not in columns:
+                    self.connection.execute("ALTER TABLE backups ADD COLUMN {} {}"
+                                            .format(column, column_type))
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def get_last_date(self, node):
+        """
+        Get the date of the latest backup of a node in the index.
+
+        :param node: node name.
+        :return: date or None.
+        """
+        row = self.connection.execute("SELECT MAX(date) FROM backups WHERE node = ?",
+                                      (node,)).fetchone()
+        return row[0]
+
+    def is_indexed(self, node, date, backup_file):
+        """
+        Check if a backup file is indexed as it is, with the same modification time and size.
+
+        :param node: node name.
+        :param date: date of the backup.
+        :param backup_file: backup file.
+        :return: true if the file did not change since it was indexed.
+        """
+        stat = os.stat(backup_file)
+        row = self.connection.execute("SELECT mtime, size FROM backups WHERE node = ? AND "
+                                      "date = ?", (node, date)).fetchone()
+
+        return row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size
+
+    def get_backup_dates(self, node):
+        """
+        Get the dates of the backups of a node in the index, including the pruned ones.
+
+        :param node: node name.
+        :return: sorted list of dates.
+        """
+        return [row[0] for row in self.connection.execute(
+            "SELECT date FROM backups WHERE node = ? ORDER BY date", (node.lower(),))]
+
+    def update(self, backup_path, folder_template):
+        """
+        Index the backups not indexed yet, in chronological order.
+
+        Backups older than the latest indexed backup of their node are ignored, as the intervals
+        of the node are only extended forward. The latest indexed backup of a node is indexed
+        again if its file changed since.
+
+        :param backup_path: root folder of the backup folders.
+        :param folder_template: prefix of the backup folder names.
+        :return: number of backups indexed.
+        """
+        backups = []
+        for folder in sorted(os.listdir(backup_path)):
+            folder_path = os.path.join(backup_path, folder)
+            if not folder.startswith(folder_template) or not os.path.isdir(folder_path):
+                continue
+
+            date = folder[len(folder_template):]
+            for file_name in os.listdir(folder_path):
+                if BACKUP_FILE_SEPARATOR in file_name and not file_name.startswith(".") and \
+                        os.path.isfile(os.path.join(folder_path, file_name)):
+                    node = file_name.rsplit(BACKUP_FILE_SEPARATOR, 1)[0]
+                    backups.append((date, node, os.path.join(folder_path, file_name)))
+
+        last_dates = {}
+        indexed = 0
+        for date, node, backup_file in sorted(backups):
+            if node not in last_dates:
+                last_dates[node] = self.get_last_date(node)
+
+            if last_dates[node] is not None and date < last_dates[node]:
+                continue
+
+            previous_date = last_dates[node]
+            if date == previous_date:
+                if self.is_indexed(node, date, backup_file):
+                    continue
+                previous_date = self.remove_backup(node, date)
+
+            self.add_backup(node, date, backup_file, previous_date)
+            last_dates[node] = date
+            indexed += 1
+
+        return indexed
+
+    def add_backup(self, node, date, backup_file, previous_date=None):
+        """
+        Index one backup file of a node.
+
+        :param node: node name.
+        :param date: date of the backup.
+        :param backup_file: backup file.
+        :param previous_date: date of the previous backup of the node in the index.
+        """
+        stat = os.stat(backup_file)
+        with open(backup_file, "rb") as backup:
+            lines = set(line.strip() for line in backup)
+        lines = [(line,) for line in lines if line and not HEADER_LINE_RE.match(line)]
+
+        with self.connection:
+            cursor = self.connection.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS current (text TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM current")
+            cursor.executemany("INSERT INTO current (text) VALUES (?)", lines)
+
+            max_line_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM lines").fetchone()[0]
+            cursor.execute("INSERT OR IGNORE INTO lines (text) SELECT text FROM current")
+
+            new_lines = cursor.execute("SELECT id, text FROM lines WHERE id > ?",
+                                       (max_line_id,)).fetchall()
+            cursor.executemany("INSERT OR IGNORE INTO tokens (token, line_id) VALUES (?, ?)",
+                               ((token, line_id) for line_id, text in new_lines
+                                for token in tokenize(text)))
+
+            if previous_date is not None:
+                cursor.execute("UPDATE intervals SET last_date = ? WHERE node = ? AND "
+                               "last_date = ? AND line_id IN (SELECT lines.id FROM lines JOIN "
+                               "current ON lines.text = current.text)",
+                               (date, node, previous_date))
+
+            cursor.execute("INSERT INTO intervals (line_id, node, first_date, last_date) "
+                           "SELECT lines.id, ?, ?, ? FROM lines JOIN current ON "
+                           "lines.text = current.text WHERE NOT EXISTS (SELECT 1 FROM intervals "
+                           "WHERE intervals.line_id = lines.id AND intervals.node = ? AND "
+                           "intervals.last_date = ?)", (node, date, date, node, date))
+
+            cursor.execute("INSERT OR REPLACE INTO backups (node, date, mtime, size) VALUES "
+                           "(?, ?, ?, ?)", (node, date, stat.st_mtime, stat.st_size))
+            cursor.execute("DELETE FROM current")
+
+    def remove_backup(self, node, date):
+        """
+        Remove the latest backup of a node from the index, to index it again: the intervals it
+        opened are removed and the intervals it extended end again at the previous backup.
+
+        :param node: node name.
+        :param date: date of the latest backup of the node.
+        :return: date of the previous backup of the node in the index, or None.
+        """
+        with self.connection:
+            cursor = self.connection.cursor()
+            previous_date = cursor.execute("SELECT MAX(date) FROM backups WHERE node = ? AND "
+                                           "date < ?", (node, date)).fetchone()[0]
+
+            cursor.execute("DELETE FROM intervals WHERE node = ? AND first_date = ?",
+                           (node, date))
+            cursor.execute("UPDATE intervals SET last_date = ? WHERE node = ? AND last_date = ?",
+                           (previous_date, node, date))
+            cursor.execute("DELETE FROM backups WHERE node = ? AND date = ?", (node, date))
+
+        return previous_date
+
+    def _count_token(self, token):
+        """
+        Count the lines with a token, up to TOKEN_COUNT_LIMIT, to find the most selective one.
+
+        :param token: token.
+        :return: number of lines.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM (SELECT 1 FROM tokens WHERE "
+                                       "token = ? LIMIT ?)",
+                                       (token, TOKEN_COUNT_LIMIT)).fetchone()[0]
+
+    def search(self, query, node=None):
+        """
+        Find the configuration lines with every token of the query.
+
+        :param query: text to be searched, case insensitive.
+        :param node: if informed, only the backups of this node are searched.
+        :return: list of SearchResult sorted by node, line and date.
+        """
+        tokens = sorted(tokenize(query))
+        if not tokens:
+            return []
+
+        # The rarest token selects the candidate lines; the others are checked on the primary key.
+        tokens.sort(key=self._count_token)
+        conditions = " ".join(["AND EXISTS (SELECT 1 FROM tokens AS other WHERE other.token = ? "
+                               "AND other.line_id = tokens.line_id)"] * (len(tokens) - 1))
+        statement = "SELECT intervals.node, lines.text, intervals.first_date, " \
+                    "intervals.last_date, (SELECT MAX(date) FROM backups WHERE " \
+                    "backups.node = intervals.node) FROM tokens JOIN intervals ON " \
+                    "intervals.line_id = tokens.line_id JOIN lines ON " \
+                    "lines.id = tokens.line_id WHERE tokens.token = ? {}".format(conditions)
+        parameters = list(tokens)
+
+        if node is not None:
+            statement += " AND intervals.node = ?"
+            parameters.append(node.lower())
+
+        statement += " ORDER BY intervals.node, lines.text, intervals.first_date"
+
+        # Tokens only select the candidates; the query must be in the line, ignoring case.
+        query = " ".join(query.lower().split())
+        return [SearchResult(row_node, text, first_date, last_date, last_date == node_last_date)
+                for row_node, text, first_date, last_date, node_last_date
+                in self.connection.execute(statement, parameters)
+                if query in " ".join(text.lower().split())]
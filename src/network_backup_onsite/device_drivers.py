@@ -0,0 +1,484 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to describe how each supported network device family is backed up."""
+
+import gzip
+from operator import attrgetter
+import os
+import re
+import shutil
+import time
+
+import pexpect
+
+from network_backup_onsite.encryptor import TeeStream
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+from network_backup_onsite.governor import RateLimitedStream
+from network_backup_onsite.normalizer import ConfigNormalizer
+
+DRIVER_REGISTRY = {}
+
+HOST_KEY_PROMPT = r"(?i)are you sure you want to continue connecting"
+PASSWORD_PROMPT = r"(?i)password:"
+PERMISSION_DENIED = r"(?i)permission denied"
+PROMPT_CHARACTERS = " >#%"
+CONFIRMATION_PROMPT = r"(?i)\((?:y/n|yes/no)\)\s*\??\s*$"
+
+TERMINAL_RETRIEVAL = "terminal"
+FILE_RETRIEVAL = "file"
+
+PARTIAL_FILE_SUFFIX = ".part"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# The end of the output is searched only in the last bytes received, instead of the whole output.
+SEARCH_WINDOW_SIZE = 4096
+
+
+def register_driver(driver_class):
+    """
+    Register a driver class for every node type it declares.
+
+    :param driver_class: subclass of DeviceDriver.
+    :return: the same class, so it can be used as a decorator.
+    """
+    for node_type in driver_class.node_types:
+        DRIVER_REGISTRY[node_type.lower()] = driver_class
+
+    return driver_class
+
+
+def get_supported_node_types():
+    """
+    Get the node types which have a registered driver.
+
+    :return: sorted list of node types.
+    """
+    return sorted(DRIVER_REGISTRY.keys())
+
+
+def is_supported_node_type(node_type):
+    """
+    Check if there is a driver registered for the node type.
+
+    :param node_type: TYPE informed in the configuration file.
+    :return: true if supported, false otherwise.
+    """
+    return str(node_type).strip().lower() in DRIVER_REGISTRY
+
+
+def get_driver(node_config, mask_volatile=False, bucket=None):
+    """
+    Create the driver instance responsible for the node.
+
+    :param node_config: instance of NodeConfig.
+    :param mask_volatile: true to mask the volatile values of the captured configuration.
+    :param bucket: TokenBucket limiting the traffic with the node, None for no limit.
+    :return: instance of the registered DeviceDriver subclass.
+    :raise NodeBackupException: if the node type is not supported.
+    """
+    driver_class = DRIVER_REGISTRY.get(str(node_config.type).strip().lower())
+
+    if driver_class is None:
+        raise NodeBackupException("Equipment type '{}' of node {} is not supported. Supported "
+                                  "types: {}.".format(node_config.type, node_config.hostname,
+                                                      ", ".join(get_supported_node_types())),
+                                  ExceptionCodes.UnsupportedNodeType)
+
+    return driver_class(node_config, mask_volatile, bucket)
+
+
+class DeviceDriver(object):
+    """
+    Base class describing the terminal dialogue with a device family.
+
+    Subclasses declare the node types they handle and the commands/regular expressions used to
+    retrieve the configuration. Retrieval itself can be overridden when a faster method exists.
+    """
+
+    node_types = ()
+
+    # Pairs of (regular expression, answer) handled until the prompt shows up. The answer is a
+    # literal string or a callable receiving the NodeConfig object.
+    login_sequence = ((HOST_KEY_PROMPT, "yes"),
+                      (PASSWORD_PROMPT, attrgetter("password")))
+
+    pager_command = None
+    config_command = None
+
+    # Formatted with the escaped EQ_PROMPT of the node, without its trailing prompt characters.
+    prompt_template = r"{}[^\r\n]*[>#%] ?"
+    end_of_output_template = None
+
+    # File retrieval: commands making the device write its configuration to remote_config_file,
+    # which is then pulled with scp. The terminal session is used only to run these commands.
+    retrieval_modes = (TERMINAL_RETRIEVAL,)
+    save_config_commands = ()
+    remove_config_commands = ()
+    remote_config_file = None
+    remote_file_compressed = False
+
+    # Expressions of values changing between two captures of the same configuration, masked
+    # when requested. Group 1, or the whole match if there is no group, is masked.
+    volatile_patterns = ()
+
+    # Content validation of the backup files, as multiline expressions: every required pattern
+    # must be found, the end pattern must match the last line and no error pattern may be found.
+    required_patterns = ()
+    end_pattern = None
+    error_patterns = (r"^(?:ssh: |Connection (?:timed out|refused|closed)|Permission denied)",)
+
+    def __init__(self, node_config, mask_volatile=False, bucket=None):
+        """
+        Initialize the driver for one node.
+
+        :param node_config: instance of NodeConfig.
+        :param mask_volatile: true to mask the volatile values of the captured configuration.
+        :param bucket: TokenBucket limiting the traffic with the node, None for no limit.
+        """
+        self.node_config = node_config
+        self.mask_volatile = mask_volatile
+        self.bucket = bucket
+
+        # File-like object receiving a copy of the normalized configuration, e.g. an encryptor.
+        self.copy_stream = None
+
+        escaped_prompt = re.escape(str(node_config.eq_prompt).strip().rstrip(PROMPT_CHARACTERS))
+        self.prompt_re = re.compile(self.prompt_template.format(escaped_prompt))
+
+        # The output ends with a line starting with the prompt, at the end of what was received,
+        # not on a configuration line containing the prompt text.
+        end_of_output_template = self.end_of_output_template or self.prompt_template
+        self.end_of_output_re = re.compile(r"(?:^|[\r\n])" +
+                                           end_of_output_template.format(escaped_prompt) + r"\Z")
+
+        self._login_patterns = [re.compile(pattern) for pattern, _ in self.login_sequence]
+        self._compiled = {}
+
+    def _get_compiled_list(self, child, key, patterns):
+        """
+        Compile a pattern list once per session and reuse it for every expect call.
+
+        :param child: pexpect spawn object.
+        :param key: cache key of the list.
+        :param patterns: list of patterns.
+        :return: compiled pattern list to be used with expect_list.
+        """
+        if key not in self._compiled:
+            self._compiled[key] = child.compile_pattern_list(patterns)
+
+        return self._compiled[key]
+
+    def spawn(self, timeout, buffer_size):
+        """
+        Open the ssh session to the node.
+
+        :param timeout: default timeout of the session.
+        :param buffer_size: max number of bytes read at once from the session.
+        :return: pexpect spawn object.
+        """
+        return pexpect.spawn("ssh {}".format(self.node_config.host), timeout=timeout,
+                             maxread=buffer_size)
+
+    def login(self, child, timeout, connect_timeout=None):
+        """
+        Answer the login sequence until the node prompt is received.
+
+        :param child: pexpect spawn object.
+        :param timeout: time to wait for each step.
+        :param connect_timeout: time to wait for the first answer of the node, by default timeout.
+        :return: seconds until the first answer of the node, i.e. the connection time.
+        :raise NodeBackupException: if the prompt is not reached.
+        """
+        patterns = [self.prompt_re, re.compile(PERMISSION_DENIED), pexpect.TIMEOUT,
+                    pexpect.EOF] + self._login_patterns
+        compiled = self._get_compiled_list(child, "login", patterns)
+
+        start_time = time.time()
+        index = child.expect_list(compiled, timeout=connect_timeout or timeout)
+        connect_duration = time.time() - start_time
+
+        answered = set()
+        while True:
+            if index == 0:
+                return connect_duration
+
+            if index in (1, 2, 3) or index in answered:
+                raise NodeBackupException("Can't log in to {}. Check username and password."
+                                          .format(self.node_config.hostname),
+                                          ExceptionCodes.NodeConnectionError)
+
+            answered.add(index)
+            _, answer = self.login_sequence[index - 4]
+            child.sendline(answer(self.node_config) if callable(answer) else answer)
+
+            index = child.expect_list(compiled, timeout=timeout)
+
+    def expect_prompt(self, child, timeout):
+        """
+        Wait for the node prompt.
+
+        :param child: pexpect spawn object.
+        :param timeout: time to wait.
+        :raise NodeBackupException: if the prompt is not received.
+        """
+        compiled = self._get_compiled_list(child, "prompt",
+                                           [self.prompt_re, pexpect.TIMEOUT, pexpect.EOF])
+
+        if child.expect_list(compiled, timeout=timeout) != 0:
+            raise NodeBackupException("Prompt '{}' was not received from {}."
+                                      .format(self.node_config.eq_prompt,
+                                              self.node_config.hostname),
+                                      ExceptionCodes.NodeBackupCaptureError)
+
+    def disable_pager(self, child, timeout):
+        """
+        Disable paging of the terminal output, if the device family needs it.
+
+        :param child: pexpect spawn object.
+        :param timeout: time to wait for the prompt.
+        """
+        if self.pager_command:
+            child.sendline(self.pager_command)
+            self.expect_prompt(child, timeout)
+
+    def get_normalizer(self, output, echo_lines=()):
+        """
+        Create the normalizer of the configuration written to the backup file.
+
+        :param output: file object receiving the normalized configuration.
+        :param echo_lines: commands whose echo must be dropped.
+        :return: instance of ConfigNormalizer.
+        """
+        return ConfigNormalizer(output, self.prompt_re, echo_lines, self.volatile_patterns,
+                                self.mask_volatile)
+
+    def get_output(self, backup_file):
+        """
+        Get the stream the normalized configuration is written to.
+
+        :param backup_file: backup file opened for appending.
+        :return: the backup file, or a TeeStream also writing to copy_stream.
+        """
+        return TeeStream(backup_file, self.copy_stream) if self.copy_stream is not None \
+            else backup_file
+
+    def retrieve_config(self, child, backup_file_location, timeout):
+        """
+        Retrieve the configuration by reading the terminal output of the config command.
+
+        The output is normalized and appended to the backup file while it is received.
+
+        :param child: pexpect spawn object, already logged in.
+        :param backup_file_location: backup file to append the configuration to.
+        :param timeout: time to wait for the end of the output.
+        :raise NodeBackupException: if the end of the output is not received.
+        """
+        compiled = self._get_compiled_list(child, "end_of_output",
+                                           [self.end_of_output_re, pexpect.TIMEOUT, pexpect.EOF])
+
+        with open(backup_file_location, "ab") as backup_file:
+            normalizer = self.get_normalizer(self.get_output(backup_file), [self.config_command])
+
+            # Reading slower than the bucket rate makes the device send slower.
+            child.logfile_read = RateLimitedStream(normalizer, self.bucket) if self.bucket \
+                else normalizer
+            try:
+                child.sendline(self.config_command)
+                index = child.expect_list(compiled, timeout=timeout,
+                                          searchwindowsize=SEARCH_WINDOW_SIZE)
+            finally:
+                child.logfile_read = None
+                normalizer.close()
+
+        if index != 0:
+            raise NodeBackupException("Output of '{}' was not completed by {}."
+                                      .format(self.config_command, self.node_config.hostname),
+                                      ExceptionCodes.NodeBackupCaptureError)
+
+    def run_command(self, child, command, timeout):
+        """
+        Run a control command, confirming it if the device asks for it.
+
+        :param child: pexpect spawn object, already logged in.
+        :param command: command to be executed.
+        :param timeout: time to wait for the prompt.
+        :raise NodeBackupException: if the prompt is not received after the command.
+        """
+        compiled = self._get_compiled_list(child, "command",
+                                           [self.prompt_re, re.compile(CONFIRMATION_PROMPT),
+                                            pexpect.TIMEOUT, pexpect.EOF])
+        child.sendline(command)
+
+        index = child.expect_list(compiled, timeout=timeout)
+        if index == 1:
+            child.sendline("y")
+            index = child.expect_list(compiled, timeout=timeout)
+
+        if index != 0:
+            raise NodeBackupException("Command '{}' was not completed by {}."
+                                      .format(command, self.node_config.hostname),
+                                      ExceptionCodes.NodeBackupCaptureError)
+
+    def retrieve_config_file(self, child, backup_file_location, timeout):
+        """
+        Make the device save its configuration to a file, then pull it in binary mode.
+
+        The pulled content is normalized and appended to the backup file, decompressed if the
+        device compressed it. The file left on the device is removed afterwards.
+
+        :param child: pexpect spawn object, already logged in.
+        :param backup_file_location: backup file to append the configuration to.
+        :param timeout: time to wait for each command and for the transfer.
+        :raise NodeBackupException: if the driver does not support file retrieval or it fails.
+        """
+        if FILE_RETRIEVAL not in self.retrieval_modes:
+            raise NodeBackupException("Equipment type '{}' does not support '{}' retrieval."
+                                      .format(self.node_config.type, FILE_RETRIEVAL),
+                                      ExceptionCodes.NodeBackupCaptureError)
+
+        for command in self.save_config_commands:
+            self.run_command(child, command, timeout)
+
+        partial_file = backup_file_location + PARTIAL_FILE_SUFFIX
+        try:
+            self.pull_file(self.remote_config_file, partial_file, timeout)
+
+            source = gzip.open(partial_file, "rb") if self.remote_file_compressed \
+                else open(partial_file, "rb")
+
+            with source, open(backup_file_location, "ab") as backup_file:
+                normalizer = self.get_normalizer(self.get_output(backup_file))
+                shutil.copyfileobj(source, normalizer, COPY_CHUNK_SIZE)
+                normalizer.close()
+        finally:
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+
+        for command in self.remove_config_commands:
+            self.run_command(child, command, timeout)
+
+    def pull_file(self, remote_path, local_path, timeout):
+        """
+        Copy a file from the node with scp, answering the login sequence.
+
+        :param remote_path: path of the file on the node.
+        :param local_path: local destination.
+        :param timeout: time to wait for the transfer.
+        :raise NodeBackupException: if the transfer fails.
+        """
+        if self.bucket is None:
+            return self._pull_file(remote_path, local_path, timeout)
+
+        # The transfer share is taken from the bucket, so the site rate holds with the sessions.
+        with self.bucket.transfer_slot() as scp_limit:
+            return self._pull_file(remote_path, local_path, timeout, scp_limit)
+
+    def _pull_file(self, remote_path, local_path, timeout, scp_limit=None):
+        """
+        Copy a file from the node with scp, answering the login sequence.
+
+        :param remote_path: path of the file on the node.
+        :param local_path: local destination.
+        :param timeout: time to wait for the transfer.
+        :param scp_limit: scp -l limit in Kbit/s, None for no limit.
+        :raise NodeBackupException: if the transfer fails.
+        """
+        limit = "-l {} ".format(scp_limit) if scp_limit else ""
+        scp = pexpect.spawn("scp -q {}{}:{} {}".format(limit, self.node_config.host, remote_path,
+                                                       local_path), timeout=timeout)
+        compiled = scp.compile_pattern_list([pexpect.EOF, re.compile(PERMISSION_DENIED),
+                                             pexpect.TIMEOUT] + self._login_patterns)
+
+        try:
+            answered = set()
+            while True:
+                index = scp.expect_list(compiled, timeout=timeout)
+
+                if index == 0:
+                    break
+
+                if index in (1, 2) or index in answered:
+                    raise NodeBackupException("Can't copy '{}' from {}."
+                                              .format(remote_path, self.node_config.hostname),
+                                              ExceptionCodes.NodeBackupCaptureError)
+
+                answered.add(index)
+                _, answer = self.login_sequence[index - 3]
+                scp.sendline(answer(self.node_config) if callable(answer) else answer)
+        finally:
+            scp.close()
+
+        if scp.exitstatus != 0 or not os.path.exists(local_path):
+            raise NodeBackupException("Copy of '{}' from {} failed with exit status {}."
+                                      .format(remote_path, self.node_config.hostname,
+                                              scp.exitstatus),
+                                      ExceptionCodes.NodeBackupCaptureError)
+
+    def logout(self, child):
+        """
+        Close the session with the node.
+
+        :param child: pexpect spawn object.
+        """
+        child.sendline("exit")
+        child.close()
+
+
+@register_driver
+class SrxDriver(DeviceDriver):
+    """Driver for Juniper SRX firewalls (Junos)."""
+
+    node_types = ("srx",)
+
+    pager_command = "set cli screen-length 0"
+    config_command = "show configuration | display set | no-more"
+
+    prompt_template = r"{}[^\r\n]*> ?"
+
+    volatile_patterns = (r"^## Last (?:commit|changed): (.*)$",)
+
+    required_patterns = (r"^set ",)
+    end_pattern = r"^set [^\n]*\Z"
+    error_patterns = DeviceDriver.error_patterns + (r"^(?:error: |syntax error|unknown command)",)
+
+    retrieval_modes = (TERMINAL_RETRIEVAL, FILE_RETRIEVAL)
+    save_config_commands = ("show configuration | display set | save /var/tmp/ntwk_bkp_onsite.set",
+                            "file compress file /var/tmp/ntwk_bkp_onsite.set")
+    remove_config_commands = ("file delete /var/tmp/ntwk_bkp_onsite.set.gz",)
+    remote_config_file = "/var/tmp/ntwk_bkp_onsite.set.gz"
+    remote_file_compressed = True
+
+
+@register_driver
+class ExosDriver(DeviceDriver):
+    """Driver for the connectivity switches (Extreme EXOS)."""
+
+    node_types = ("connectivitySwitch",)
+
+    pager_command = "disable clipaging"
+    config_command = "show configuration"
+
+    # The prompt starts with '* ' while the configuration is not saved.
+    prompt_template = r"(?:\*\s*)?{}[^\r\n]*# ?"
+
+    volatile_patterns = (r"^# (?:Script|Configuration) generated (?:on|at) (.*)$",)
+
+    required_patterns = (r"^# Module \S+ configuration\.$",)
+    error_patterns = DeviceDriver.error_patterns + (r"^(?:%% |Error: )",)
+
+    retrieval_modes = (TERMINAL_RETRIEVAL, FILE_RETRIEVAL)
+    save_config_commands = ("save configuration as-script ntwk_bkp_onsite",)
+    remove_config_commands = ("rm ntwk_bkp_onsite.xsf",)
+    remote_config_file = "/usr/local/cfg/ntwk_bkp_onsite.xsf"
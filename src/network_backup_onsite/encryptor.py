@@ -0,0 +1,364 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to encrypt the backups with gpg while they are written, and decrypt them back."""
+
+import hashlib
+import os
+import shutil
+from subprocess import PIPE, Popen
+import tempfile
+import threading
+
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+from network_backup_onsite.process_manager import get_process_manager
+from network_backup_onsite.run_lock import file_update_lock
+from network_backup_onsite.utils import read_json_file, write_json_file
+
+ENCRYPTED_FOLDER_NAME = "encrypted"
+ENCRYPTED_FILE_SUFFIX = ".gpg"
+ENCRYPTED_PARTIAL_SUFFIX = ".part"
+MANIFEST_FILE_NAME = "manifest.json"
+
+GPG_COMMAND = ["gpg", "--batch", "--yes", "--no-tty", "--quiet", "--trust-model", "always"]
+READ_CHUNK_SIZE = 64 * 1024
+
+# Time allowed to a gpg process; a stuck gpg is killed so the capture or retrieval ends.
+GPG_TIMEOUT = 3600
+
+_manifest_lock = threading.Lock()
+
+
+def get_gpg_command(gnupg_config):
+    """
+    Get the gpg command encrypting its input to its output for the configured key.
+
+    :param gnupg_config: instance of GnupgConfig.
+    :return: list of arguments.
+    """
+    command = list(GPG_COMMAND)
+    if gnupg_config.gpg_home:
+        command.extend(["--homedir", gnupg_config.gpg_home])
+
+    if gnupg_config.key_file:
+        command.extend(["--recipient-file", gnupg_config.key_file])
+    else:
+        command.extend(["--recipient", gnupg_config.recipient])
+
+    return command + ["--encrypt"]
+
+
+def get_gpg_decrypt_command(gnupg_config):
+    """
+    Get the gpg command decrypting its input to its output with the keyring.
+
+    :param gnupg_config: instance of GnupgConfig.
+    :return: list of arguments.
+    """
+    command = list(GPG_COMMAND)
+    if gnupg_config.gpg_home:
+        command.extend(["--homedir", gnupg_config.gpg_home])
+
+    return command + ["--decrypt"]
+
+
+def get_encrypted_file(backup_file):
+    """
+    Get the encrypted copy of a backup file, in the encrypted subfolder of its backup folder.
+
+    :param backup_file: backup file.
+    :return: path of the encrypted file.
+    """
+    return os.path.join(os.path.dirname(backup_file), ENCRYPTED_FOLDER_NAME,
+                        os.path.basename(backup_file) + ENCRYPTED_FILE_SUFFIX)
+
+
+def get_manifest_file(encrypted_file):
+    """
+    Get the manifest of the folder of an encrypted file.
+
+    :param encrypted_file: encrypted file.
+    :return: path of the manifest.
+    """
+    return os.path.join(os.path.dirname(encrypted_file), MANIFEST_FILE_NAME)
+
+
+def update_manifest(encrypted_file, size, sha256):
+    """
+    Record the size and the sha256 of an encrypted file in the manifest of its folder.
+
+    :param encrypted_file: encrypted file.
+    :param size: size of the encrypted file in bytes.
+    :param sha256: hexadecimal sha256 of the encrypted file.
+    """
+    manifest_file = get_manifest_file(encrypted_file)
+
+    with _manifest_lock, file_update_lock(manifest_file):
+        manifest = read_json_file(manifest_file)
+        manifest[os.path.basename(encrypted_file)] = {"size": size, "sha256": sha256}
+        write_json_file(manifest_file, manifest)
+
+
+class TeeStream(object):
+    """File-like object writing the data to several streams."""
+
+    def __init__(self, *streams):
+        """
+        Initialize the stream.
+
+        :param streams: file-like objects receiving the data.
+        """
+        self.streams = streams
+
+    def write(self, data):
+        """
+        Write the data to every stream.
+
+        :param data: chunk of data.
+        """
+        for stream in self.streams:
+            stream.write(data)
+
+    def flush(self):
+        """Flush every stream."""
+        for stream in self.streams:
+            stream.flush()
+
+
+class GpgEncryptor(object):
+    """
+    File-like object encrypting the data written to it into a file with gpg.
+
+    The data is piped to gpg, which compresses and encrypts it, while a thread reads the
+    encrypted output, hashes it and writes it to a partial file renamed once gpg succeeds. The
+    plaintext is never read again to be encrypted.
+    """
+
+    def __init__(self, encrypted_file, gnupg_config, timeout=GPG_TIMEOUT):
+        """
+        Start gpg.
+
+        :param encrypted_file: file to store the encrypted data.
+        :param gnupg_config: instance of GnupgConfig.
+        :param timeout: time allowed to gpg in seconds.
+        :raise NodeBackupException: if gpg can't be started.
+        """
+        self.encrypted_file = encrypted_file
+        self.partial_file = encrypted_file + ENCRYPTED_PARTIAL_SUFFIX
+        self.size = 0
+        self.closed = False
+
+        encrypted_folder = os.path.dirname(encrypted_file)
+        if not os.path.exists(encrypted_folder):
+            try:
+                os.makedirs(encrypted_folder)
+            except OSError:
+                if not os.path.isdir(encrypted_folder):
+                    raise
+
+        self._sha256 = hashlib.sha256()
+        self._errors = tempfile.TemporaryFile()
+        try:
+            self._process = Popen(get_gpg_command(gnupg_config), stdin=PIPE, stdout=PIPE,
+                                  stderr=self._errors)
+        except OSError as start_error:
+            self._errors.close()
+            raise NodeBackupException("Encryption of {} failed: gpg can't be started. {}"
+                                      .format(encrypted_file, start_error),
+                                      ExceptionCodes.EncryptionError)
+
+        # The partial file is only created once gpg runs, so a failed start leaves nothing.
+        try:
+            self._output = open(self.partial_file, "wb")
+        except IOError:
+            self._process.kill()
+            self._process.wait()
+            self._errors.close()
+            raise
+
+        self._job = get_process_manager().watch(self._process, timeout)
+
+        self._reader = threading.Thread(target=self._read_output)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read_output(self):
+        """Hash and store the encrypted output of gpg until it ends."""
+        for chunk in iter(lambda: self._process.stdout.read(READ_CHUNK_SIZE), ""):
+            self._sha256.update(chunk)
+            self._output.write(chunk)
+            self.size += len(chunk)
+
+    def _get_error(self):
+        """
+        Get the error output of gpg.
+
+        :return: last line of the error output.
+        """
+        self._errors.seek(0)
+        lines = self._errors.read().strip().splitlines()
+
+        return lines[-1] if lines else "exit status {}".format(self._process.returncode)
+
+    def write(self, data):
+        """
+        Encrypt a chunk of data.
+
+        :param data: chunk of data.
+        :raise NodeBackupException: if gpg stopped.
+        """
+        try:
+            self._process.stdin.write(data)
+        except IOError as write_error:
+            self.abort()
+            raise NodeBackupException("Encryption of {} failed: {}. {}"
+                                      .format(self.encrypted_file, write_error,
+                                              self._get_error()),
+                                      ExceptionCodes.EncryptionError)
+
+    def flush(self):
+        """Flush the data to gpg."""
+        self._process.stdin.flush()
+
+    def close(self):
+        """
+        Finish the encryption and record the encrypted file in the manifest of its folder.
+
+        :return: hexadecimal sha256 of the encrypted file.
+        :raise NodeBackupException: if gpg failed.
+        """
+        self.closed = True
+        self._process.stdin.close()
+        self._reader.join()
+        self._output.close()
+        timed_out = self._job.release()
+
+        if self._process.wait() != 0:
+            error = "timeout" if timed_out else self._get_error()
+            self._errors.close()
+            os.remove(self.partial_file)
+            raise NodeBackupException("Encryption of {} failed: {}."
+                                      .format(self.encrypted_file, error),
+                                      ExceptionCodes.EncryptionError)
+
+        self._errors.close()
+        os.rename(self.partial_file, self.encrypted_file)
+
+        sha256 = self._sha256.hexdigest()
+        update_manifest(self.encrypted_file, self.size, sha256)
+
+        return sha256
+
+    def abort(self):
+        """Stop gpg and remove the partial encrypted file."""
+        if self.closed:
+            return
+
+        self.closed = True
+        self._job.release()
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._reader.join()
+        self._output.close()
+
+        if os.path.exists(self.partial_file):
+            os.remove(self.partial_file)
+
+
+class GpgDecryptor(object):
+    """
+    File-like object decrypting the data written to it with gpg into an output stream.
+
+    The encrypted data is piped to gpg while a thread copies the decrypted output, so a backup
+    is decrypted while it is read from its store, without a temporary file.
+    """
+
+    def __init__(self, output, gnupg_config, timeout=GPG_TIMEOUT):
+        """
+        Start gpg.
+
+        :param output: file-like object receiving the decrypted data.
+        :param gnupg_config: instance of GnupgConfig, with the gpg home of the private key.
+        :param timeout: time allowed to gpg in seconds.
+        """
+        self.output = output
+        self._errors = tempfile.TemporaryFile()
+        self._process = Popen(get_gpg_decrypt_command(gnupg_config), stdin=PIPE, stdout=PIPE,
+                              stderr=self._errors)
+        self._job = get_process_manager().watch(self._process, timeout)
+
+        self._writer = threading.Thread(target=self._write_output)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _write_output(self):
+        """Copy the decrypted output of gpg until it ends."""
+        for chunk in iter(lambda: self._process.stdout.read(READ_CHUNK_SIZE), ""):
+            self.output.write(chunk)
+
+    def write(self, data):
+        """
+        Decrypt a chunk of data.
+
+        :param data: chunk of encrypted data.
+        :raise NodeBackupException: if gpg stopped.
+        """
+        try:
+            self._process.stdin.write(data)
+        except IOError as write_error:
+            self.close()
+            raise NodeBackupException("Decryption stopped: {}.".format(write_error),
+                                      ExceptionCodes.EncryptionError)
+
+    def flush(self):
+        """Flush the data to gpg."""
+        self._process.stdin.flush()
+
+    def close(self):
+        """
+        Finish the decryption.
+
+        :raise NodeBackupException: if gpg failed.
+        """
+        if not self._process.stdin.closed:
+            self._process.stdin.close()
+        self._writer.join()
+        timed_out = self._job.release()
+
+        if self._process.wait() != 0:
+            self._errors.seek(0)
+            lines = self._errors.read().strip().splitlines()
+            error = "timeout" if timed_out else lines[-1] if lines else self._process.returncode
+            raise NodeBackupException("Decryption failed: {}.".format(error),
+                                      ExceptionCodes.EncryptionError)
+
+
+def encrypt_file(backup_file, gnupg_config):
+    """
+    Encrypt an existing backup file, e.g. created before the encryption was enabled.
+
+    :param backup_file: backup file.
+    :param gnupg_config: instance of GnupgConfig.
+    :return: path of the encrypted file.
+    :raise NodeBackupException: if gpg failed.
+    """
+    encryptor = GpgEncryptor(get_encrypted_file(backup_file), gnupg_config)
+    try:
+        with open(backup_file, "rb") as source:
+            shutil.copyfileobj(source, encryptor, READ_CHUNK_SIZE)
+        encryptor.close()
+    finally:
+        encryptor.abort()
+
+    return encryptor.encrypted_file
@@ -32,6 +32,12 @@ class ExceptionCodes(Enum):
     ConfigurationFileParsingError = 52
     ConfigurationFileOptionError = 53
 
+    UnsupportedNodeType = 61
+    NodeConnectionError = 62
+    NodeBackupCaptureError = 63
+    EncryptionError = 64
+    ResourceLocked = 65
+
 
 class BasicException(Exception):
     """Class for defining the structure of custom exceptions."""
@@ -84,3 +90,18 @@ class BackupSettingsException(BasicException):
         super(BackupSettingsException, self).__init__(message, code)
         self.message = message
         self.code = code if code else ExceptionCodes.DefaultExceptionCode
+
+
+class NodeBackupException(BasicException):
+    """Exception class to refer error raised while creating the backup of a node."""
+
+    def __init__(self, message, code=None):
+        """
+        Constructor.
+
+        :param message: the message.
+        :param code: exit code.
+        """
+        super(NodeBackupException, self).__init__(message, code)
+        self.message = message
+        self.code = code if code else ExceptionCodes.DefaultExceptionCode
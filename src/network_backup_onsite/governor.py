@@ -0,0 +1,250 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to limit the bandwidth and the concurrent sessions used on the management network."""
+
+from contextlib import contextmanager
+import threading
+import time
+
+from network_backup_onsite.post_processor import PostProcessor
+
+DEFAULT_SITE = "default"
+
+# scp -l expects the limit in Kbit/s.
+SCP_LIMIT_UNIT = 1000 / 8.0
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket limiting a flow of bytes to a rate, allowing bursts up to a size.
+
+    Consumers take as many tokens as bytes transferred; when the bucket is empty they sleep until
+    enough tokens are refilled. The transfers run by external commands, e.g. scp -l, can't take
+    tokens: the rate is divided between a fixed number of transfer slots instead, and the share of
+    each running transfer is not refilled for the consumers, so the transfers and the consumers
+    never exceed the rate together.
+    """
+
+    def __init__(self, rate, burst=None, transfers=1):
+        """
+        Initialize a full bucket.
+
+        :param rate: bytes per second.
+        :param burst: max bytes consumed at once without waiting, by default one second of rate.
+        :param transfers: max concurrent transfers of external commands sharing the rate.
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst else rate)
+        self.transfers = transfers
+
+        self._tokens = self.burst
+        self._last_refill = time.time()
+        self._lock = threading.Lock()
+        self._transfer_slots = threading.Semaphore(transfers)
+        self._running_transfers = 0
+
+    def _get_refill_rate(self):
+        """
+        Get the rate left to the consumers by the running transfers.
+
+        :return: bytes per second.
+        """
+        return self.rate * max(0, self.transfers - self._running_transfers) / self.transfers
+
+    def _refill(self, now):
+        """
+        Add the tokens accumulated since the last refill.
+
+        :param now: current time.
+        """
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._last_refill) * self._get_refill_rate())
+        self._last_refill = now
+
+    def get_wait_time(self, amount):
+        """
+        Take tokens from the bucket, going into debt if there are not enough.
+
+        :param amount: number of bytes.
+        :return: seconds the caller must wait before transferring the bytes.
+        """
+        with self._lock:
+            self._refill(time.time())
+            self._tokens -= amount
+
+            if self._tokens >= 0:
+                return 0
+
+            # With every slot running, the debt is paid once a transfer ends.
+            return -self._tokens / (self._get_refill_rate() or self.rate / self.transfers)
+
+    def consume(self, amount):
+        """
+        Wait until the bytes can be transferred within the rate.
+
+        :param amount: number of bytes.
+        """
+        wait_time = self.get_wait_time(amount)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def get_scp_limit(self):
+        """
+        Get the share of the rate of one transfer slot as a scp -l argument.
+
+        :return: limit in Kbit/s, at least 1.
+        """
+        return max(1, int(self.rate / self.transfers / SCP_LIMIT_UNIT))
+
+    @contextmanager
+    def transfer_slot(self):
+        """
+        Wait for a free transfer slot and hold it until the block ends, its share of the rate
+        being taken from the consumers meanwhile.
+
+        :return: scp -l limit of the slot.
+        """
+        self._transfer_slots.acquire()
+        try:
+            with self._lock:
+                self._refill(time.time())
+                self._running_transfers += 1
+            try:
+                yield self.get_scp_limit()
+            finally:
+                with self._lock:
+                    self._refill(time.time())
+                    self._running_transfers -= 1
+        finally:
+            self._transfer_slots.release()
+
+
+class RateLimitedStream(object):
+    """
+    File-like object forwarding the data written to another stream within the rate of a bucket.
+
+    Used as pexpect logfile_read, it delays the reads from the session, so the device sending the
+    data is slowed down by the TCP flow control.
+    """
+
+    def __init__(self, stream, bucket):
+        """
+        Initialize the stream.
+
+        :param stream: file-like object receiving the data.
+        :param bucket: instance of TokenBucket.
+        """
+        self.stream = stream
+        self.bucket = bucket
+
+    def write(self, data):
+        """
+        Forward the data, waiting for the bucket.
+
+        :param data: chunk of data.
+        """
+        self.bucket.consume(len(data))
+        self.stream.write(data)
+
+    def flush(self):
+        """Flush the underlying stream."""
+        self.stream.flush()
+
+
+class Governor(object):
+    """
+    Apply the GOVERNOR configuration: worker count, sessions per site and bandwidth per site.
+
+    The sessions and buckets of a site are shared by every worker, so the limits hold for the
+    whole run regardless of the number of workers. The rate of a site is divided between its
+    sessions for the scp transfers, the terminal sessions of the site using what the running
+    transfers leave, and the rate of OMBS between MAX_WORKERS transfers.
+    """
+
+    def __init__(self, governor_config):
+        """
+        Create the semaphores and buckets of the configuration.
+
+        :param governor_config: instance of GovernorConfig.
+        """
+        self.governor_config = governor_config
+        self.max_workers = governor_config.max_workers
+
+        self._lock = threading.Lock()
+        self._site_semaphores = {}
+        self._site_buckets = {}
+
+        self.ombs_bucket = TokenBucket(governor_config.ombs_rate,
+                                       transfers=governor_config.max_workers) \
+            if governor_config.ombs_rate else None
+
+        self.post_processor = PostProcessor(governor_config.post_workers)
+
+    @staticmethod
+    def get_site(node_config):
+        """
+        Get the site of a node.
+
+        :param node_config: instance of NodeConfig.
+        :return: site name in lowercase.
+        """
+        return (node_config.site or DEFAULT_SITE).lower()
+
+    def get_site_bucket(self, site):
+        """
+        Get the bucket limiting the traffic of the device sessions of a site.
+
+        :param site: site name.
+        :return: instance of TokenBucket, or None if the site traffic is not limited.
+        """
+        with self._lock:
+            if site not in self._site_buckets:
+                rate = self.governor_config.get_site_rate(site)
+                self._site_buckets[site] = TokenBucket(
+                    rate, transfers=self.governor_config.get_site_sessions(site)) \
+                    if rate else None
+
+            return self._site_buckets[site]
+
+    def _get_site_semaphore(self, site):
+        """
+        Get the semaphore limiting the concurrent sessions of a site.
+
+        :param site: site name.
+        :return: instance of threading.Semaphore.
+        """
+        with self._lock:
+            if site not in self._site_semaphores:
+                self._site_semaphores[site] = threading.Semaphore(
+                    self.governor_config.get_site_sessions(site))
+
+            return self._site_semaphores[site]
+
+    @contextmanager
+    def site_session(self, node_config):
+        """
+        Wait for a free session in the site of the node and hold it until the block ends.
+
+        :param node_config: instance of NodeConfig.
+        :return: bucket of the site, or None if the site traffic is not limited.
+        """
+        site = self.get_site(node_config)
+        semaphore = self._get_site_semaphore(site)
+
+        semaphore.acquire()
+        try:
+            yield self.get_site_bucket(site)
+        finally:
+            semaphore.release()
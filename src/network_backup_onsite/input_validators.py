@@ -21,12 +21,17 @@ import os
 from enum import Enum
 
 from network_backup_onsite.backup_settings import ScriptSettings
+from network_backup_onsite.device_drivers import get_driver, get_supported_node_types, \
+    is_supported_node_type
 from network_backup_onsite.exceptions import BackupSettingsException
 from network_backup_onsite.logger import CustomLogger
-from network_backup_onsite.utils import LOG_SUFFIX, create_path, is_host_accessible, is_valid_ip
+from network_backup_onsite.utils import LOG_SUFFIX, create_path, is_host_accessible, \
+    is_valid_duration, is_valid_ip
 
 SCRIPT_OBJECTS = Enum('SCRIPT_OBJECTS',
-                      'NOTIFICATION_HANDLER, NODE_CONFIG_DICT, BACKUP_CONFIG, DELAY, OMBS_CONFIG')
+                      'NOTIFICATION_HANDLER, NODE_CONFIG_DICT, BACKUP_CONFIG, DELAY, OMBS_CONFIG, '
+                      'SCHEDULER_CONFIG, GOVERNOR_CONFIG, TIMEOUTS_CONFIG, BASELINE_CONFIG, '
+                      'GNUPG_CONFIG, TARGET_CONFIGS, REACHABILITY_CONFIG, SHARDING_CONFIG')
 
 
 def validate_get_main_logger(console_input_args, main_script_file_name):
@@ -99,13 +104,14 @@ def validate_log_level(log_level):
     return log_level
 
 
-def validate_nodes_backup_location(config_file_name, script_objects, logger):
+def validate_nodes_backup_location(config_file_name, script_objects, logger, reachability=None):
     """
     Validate nodes and backup configs.
 
     :param config_file_name: BUR configuration file name.
     :param script_objects: dictionary of validated ScriptSettings objects.
     :param logger: logger object.
+    :param reachability: instance of ReachabilityCache, None to ping every node.
     :return: True if the validation was successful.
     :raise Exception: if the validation fails.
     """
@@ -114,7 +120,7 @@ def validate_nodes_backup_location(config_file_name, script_objects, logger):
 
     validation_error_list = []
 
-    validate_nodes(node_config_dict, config_file_name, validation_error_list)
+    validate_nodes(node_config_dict, config_file_name, validation_error_list, reachability)
     validate_backup_location(backup_config, validation_error_list)
 
     if validation_error_list:
@@ -125,13 +131,15 @@ def validate_nodes_backup_location(config_file_name, script_objects, logger):
     return True
 
 
-def validate_nodes(node_config_dict, config_file_name, validation_error_list=None):
+def validate_nodes(node_config_dict, config_file_name, validation_error_list=None,
+                   reachability=None):
     """
     Validate nodes config.
 
     :param node_config_dict: list of nodes specified in config file.
     :param config_file_name: name of a config file.
     :param validation_error_list: list of errors.
+    :param reachability: instance of ReachabilityCache, None to ping every node.
     :return: True if nodes are validated, False otherwise.
     """
     if validation_error_list is None:
@@ -141,6 +149,12 @@ def validate_nodes(node_config_dict, config_file_name, validation_error_list=Non
         validation_error_list.append("No nodes defined in the configuration file '{}'. "
                                      "Nothing to do.".format(config_file_name))
 
+    # The nodes not cached are probed together before the loop.
+    accessible_hosts = {}
+    if reachability is not None:
+        accessible_hosts = reachability.check_hosts(
+            [node_config.ip for node_config in node_config_dict.values()])
+
     for node_key in node_config_dict.keys():
         node_config = node_config_dict[node_key]
 
@@ -156,6 +170,18 @@ def validate_nodes(node_config_dict, config_file_name, validation_error_list=Non
         if not node_config.type.strip():
             validation_error_list.append("Node parameter 'TYPE' is empty for {}".format(
                 node_config.hostname))
+        elif not is_supported_node_type(node_config.type):
+            validation_error_list.append("Node parameter 'TYPE' {} is not supported for {}. "
+                                         "Supported types: {}".format(
+                                             node_config.type, node_config.hostname,
+                                             ", ".join(get_supported_node_types())))
+        elif node_config.retrieval not in get_driver(node_config).retrieval_modes:
+            validation_error_list.append("Node parameter 'RETRIEVAL' {} is not supported for {}"
+                                         .format(node_config.retrieval, node_config.hostname))
+
+        if node_config.schedule and not is_valid_duration(node_config.schedule):
+            validation_error_list.append("Node parameter 'SCHEDULE' {} is invalid for {}"
+                                         .format(node_config.schedule, node_config.hostname))
 
         if not node_config.eq_prompt.strip():
             validation_error_list.append("Node parameter 'EQ_PROMPT' is empty for {}".format(
@@ -173,7 +199,12 @@ def validate_nodes(node_config_dict, config_file_name, validation_error_list=Non
             validation_error_list.append("Informed IP {} for node {} is not valid".format(
                 node_config.ip, node_config.hostname))
 
-        if not is_host_accessible(node_config.ip):
+        if reachability is not None:
+            accessible = accessible_hosts[node_config.ip]
+        else:
+            accessible = is_host_accessible(node_config.ip)
+
+        if not accessible:
             validation_error_list.append("Node {} with credentials {} is not accessible"
                                          .format(node_config.hostname, node_config.ip))
 
@@ -228,6 +259,29 @@ def validate_script_settings(config_file_name, script_objects, logger):
         script_objects[SCRIPT_OBJECTS.OMBS_CONFIG.name] = \
             script_settings.get_ombs_config()
 
+        script_objects[SCRIPT_OBJECTS.SCHEDULER_CONFIG.name] = \
+            script_settings.get_scheduler_config()
+
+        script_objects[SCRIPT_OBJECTS.GOVERNOR_CONFIG.name] = \
+            script_settings.get_governor_config()
+
+        script_objects[SCRIPT_OBJECTS.TIMEOUTS_CONFIG.name] = \
+            script_settings.get_timeouts_config()
+
+        script_objects[SCRIPT_OBJECTS.BASELINE_CONFIG.name] = \
+            script_settings.get_baseline_config()
+
+        script_objects[SCRIPT_OBJECTS.GNUPG_CONFIG.name] = script_settings.get_gnupg_config()
+
+        script_objects[SCRIPT_OBJECTS.TARGET_CONFIGS.name] = \
+            script_settings.get_target_configs(script_objects[SCRIPT_OBJECTS.OMBS_CONFIG.name])
+
+        script_objects[SCRIPT_OBJECTS.REACHABILITY_CONFIG.name] = \
+            script_settings.get_reachability_config()
+
+        script_objects[SCRIPT_OBJECTS.SHARDING_CONFIG.name] = \
+            script_settings.get_sharding_config()
+
     except BackupSettingsException as exception:
         raise Exception("Error validating ScriptSettings object due to: {}."
                         .format(str(exception)))
@@ -10,12 +10,15 @@
 
 """Module to handle logging."""
 
+import functools
 import logging
 from logging.handlers import RotatingFileHandler
 import os
 import sys
+import threading
+import time
 
-from network_backup_onsite.utils import LOG_SUFFIX, format_time
+from network_backup_onsite.utils import LOG_SUFFIX, format_time, write_json_file
 
 SCRIPT_FILE = os.path.basename(__file__).split('.')[0]
 
@@ -24,6 +27,17 @@ DEFAULT_LOG_FILE_NAME = "{}.{}".format(SCRIPT_FILE, LOG_SUFFIX)
 
 OUTPUT_LINE = "===================================================================================="
 
+# Categories of the spans: the stages of a run, the nodes and the steps of each node.
+PHASE = "phase"
+NODE = "node"
+STEP = "step"
+
+SUMMARY_LIMIT = 10
+
+# Chrome trace event phases: complete event (with duration) and metadata event.
+TRACE_COMPLETE = "X"
+TRACE_METADATA = "M"
+
 
 class CustomLogger(logging.LoggerAdapter):
     """CustomLogger is a customized logger with auxiliary functions to display log messages."""
@@ -106,3 +120,297 @@ class CustomLogger(logging.LoggerAdapter):
         formatted_time = format_time(float(elapsed_time))
 
         self.info("%s : %s.", msg, str(formatted_time))
+
+
+class Span(object):
+    """Timed section of a run, entered and exited in the same thread."""
+
+    def __init__(self, recorder, name, category, args):
+        """
+        Initialize the span.
+
+        :param recorder: instance of SpanRecorder the span is recorded to.
+        :param name: name of the section, e.g. the phase or the node.
+        :param category: PHASE, NODE or STEP.
+        :param args: dictionary of details of the section, e.g. the node of a step.
+        """
+        self.recorder = recorder
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+        self.duration = None
+        self.thread_id = None
+        self.thread_name = None
+        self.parent = None
+
+    def __enter__(self):
+        """Start timing the section, nested in the span open in the same thread."""
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.parent = self.recorder.push(self)
+        self.start = time.time()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop timing the section and record it."""
+        self.duration = time.time() - self.start
+        self.recorder.pop(self)
+
+        return False
+
+    def __str__(self):
+        """Represent the span as string."""
+        return "({}, {}, {})".format(self.category, self.name, self.duration)
+
+    def __repr__(self):
+        """Represent the span."""
+        return self.__str__()
+
+
+class NullSpan(object):
+    """Span of a disabled recorder, timing nothing."""
+
+    def __enter__(self):
+        """Do nothing."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Do nothing."""
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class SpanRecorder(object):
+    """
+    Recorder of the spans of a run, to find the slowest phases and nodes.
+
+    Each thread keeps its own stack of open spans, so the spans of the worker threads nest in
+    the spans of their own thread. While the recorder is disabled, a span is a shared object
+    doing nothing.
+    """
+
+    def __init__(self):
+        """Initialize a disabled recorder."""
+        self.enabled = False
+        self.started = None
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans = []
+
+    def enable(self):
+        """Start recording the spans of a run, dropping the spans recorded before."""
+        with self._lock:
+            self._spans = []
+        self.started = time.time()
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording the spans; the spans recorded are kept."""
+        self.enabled = False
+
+    def span(self, name, category=PHASE, **args):
+        """
+        Get a span timing a section, to be used as a context manager.
+
+        :param name: name of the section.
+        :param category: PHASE, NODE or STEP.
+        :param args: details of the section, e.g. node=hostname.
+        :return: instance of Span, or NULL_SPAN if the recorder is disabled.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+
+        return Span(self, name, category, args)
+
+    def timed(self, name=None, category=PHASE):
+        """
+        Get a decorator timing each call of a function.
+
+        :param name: name of the section, the function name by default.
+        :param category: PHASE, NODE or STEP.
+        :return: decorator.
+        """
+        def decorator(function):
+            """Wrap the function in a span."""
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                """Call the function in a span."""
+                with self.span(name or function.__name__, category):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def push(self, span):
+        """
+        Open a span in the current thread.
+
+        :param span: instance of Span.
+        :return: span open in the thread before, None if it is the first one.
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        parent = stack[-1] if stack else None
+        stack.append(span)
+
+        return parent
+
+    def record(self, name, category, start, duration, **args):
+        """
+        Record a section timed by the caller, in the current thread, e.g. the phases of a
+        session already measured by their own clocks.
+
+        :param name: name of the section.
+        :param category: PHASE, NODE or STEP.
+        :param start: start time of the section.
+        :param duration: duration of the section in seconds.
+        :param args: details of the section, e.g. node=hostname.
+        """
+        if not self.enabled:
+            return
+
+        span = Span(self, name, category, args)
+        thread = threading.current_thread()
+        span.thread_id = thread.ident
+        span.thread_name = thread.name
+        stack = getattr(self._local, "stack", [])
+        span.parent = stack[-1] if stack else None
+        span.start = start
+        span.duration = duration
+
+        with self._lock:
+            self._spans.append(span)
+
+    def pop(self, span):
+        """
+        Close a span in the current thread and record it.
+
+        :param span: instance of Span.
+        """
+        stack = getattr(self._local, "stack", [])
+        if span in stack:
+            stack.remove(span)
+
+        with self._lock:
+            self._spans.append(span)
+
+    def get_spans(self):
+        """
+        Get the spans recorded.
+
+        :return: list of Span, in the order they were closed.
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def get_summary(self, limit=SUMMARY_LIMIT):
+        """
+        Get the slowest phases and steps, with their total time over all the nodes, and the
+        slowest nodes. A phase and a step with the same name are listed apart.
+
+        :param limit: number of phases and nodes listed.
+        :return: list of lines, empty if nothing was recorded.
+        """
+        phases = {}
+        nodes = []
+        for span in self.get_spans():
+            if span.category == NODE:
+                nodes.append(span)
+            else:
+                key = (span.category, span.name)
+                count, total, maximum = phases.get(key, (0, 0.0, 0.0))
+                phases[key] = (count + 1, total + span.duration, max(maximum, span.duration))
+
+        summary = []
+        if phases:
+            summary.append("Slowest phases:")
+            for (category, name), (count, total, maximum) in sorted(
+                    phases.items(), key=lambda item: item[1][1], reverse=True)[:limit]:
+                summary.append("{} ({}): {:.1f}s ({} time(s), max {:.1f}s)."
+                               .format(name, category, total, count, maximum))
+
+        if nodes:
+            summary.append("Slowest nodes:")
+            for span in sorted(nodes, key=lambda span: span.duration, reverse=True)[:limit]:
+                summary.append("{}: {:.1f}s.".format(span.name, span.duration))
+
+        return summary
+
+    def get_trace_events(self):
+        """
+        Get the spans as Chrome trace events, one track per thread, starting at the time the
+        recorder was enabled.
+
+        :return: list of trace event dictionaries.
+        """
+        pid = os.getpid()
+        thread_ids = {}
+        events = []
+
+        for span in sorted(self.get_spans(), key=lambda span: (span.start, -span.duration)):
+            # The id of an ended thread is reused by the next one, which has another name.
+            thread = (span.thread_id, span.thread_name)
+            if thread not in thread_ids:
+                thread_ids[thread] = len(thread_ids) + 1
+                events.append({"name": "thread_name", "ph": TRACE_METADATA, "pid": pid,
+                               "tid": thread_ids[thread], "args": {"name": span.thread_name}})
+
+            events.append({"name": span.name, "cat": span.category, "ph": TRACE_COMPLETE,
+                           "ts": int((span.start - (self.started or 0)) * 1000000),
+                           "dur": int(span.duration * 1000000), "pid": pid,
+                           "tid": thread_ids[thread], "args": span.args})
+
+        return events
+
+    def write_trace(self, file_path):
+        """
+        Write the spans to a Chrome trace event file, to be opened in about:tracing or Perfetto.
+
+        :param file_path: trace file.
+        """
+        write_json_file(file_path, {"traceEvents": self.get_trace_events(),
+                                    "displayTimeUnit": "ms"})
+
+
+_span_recorder = SpanRecorder()
+
+
+def get_span_recorder():
+    """
+    Get the span recorder of the process.
+
+    :return: instance of SpanRecorder.
+    """
+    return _span_recorder
+
+
+def span(name, category=PHASE, **args):
+    """
+    Get a span of the recorder of the process timing a section.
+
+    :param name: name of the section.
+    :param category: PHASE, NODE or STEP.
+    :param args: details of the section, e.g. node=hostname.
+    :return: instance of Span, or NULL_SPAN if the recorder is disabled.
+    """
+    return _span_recorder.span(name, category, **args)
+
+
+def timed(name=None, category=PHASE):
+    """
+    Get a decorator timing each call of a function in the recorder of the process.
+
+    :param name: name of the section, the function name by default.
+    :param category: PHASE, NODE or STEP.
+    :return: decorator.
+    """
+    return _span_recorder.timed(name, category)
@@ -20,26 +20,67 @@
 
 import argparse
 import os
-from subprocess import PIPE, Popen
+import pipes
+from multiprocessing.pool import ThreadPool
+import shutil
 import sys
+import time
 
 from enum import Enum
 
 from network_backup_onsite import __version__
-from network_backup_onsite.exceptions import NotificationHandlerException
+from network_backup_onsite.archive import BackupArchive, get_archive_file
+from network_backup_onsite.backup_validator import validate_backup_file
+from network_backup_onsite.backup_settings import TargetConfig
+from network_backup_onsite.baseline import BackupBaselines
+from network_backup_onsite.checkpoint import CAPTURED, DEFAULT_TARGET, FAILED, RunCheckpoint, SENT
+from network_backup_onsite.config_diff import create_backup_diff
+from network_backup_onsite.config_index import ConfigIndex
+from network_backup_onsite.encryptor import encrypt_file, get_encrypted_file, get_manifest_file
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException, \
+    NotificationHandlerException
+from network_backup_onsite.governor import Governor
 from network_backup_onsite.input_validators import SCRIPT_OBJECTS, validate_get_main_logger, \
     validate_log_level, validate_log_root_path, validate_nodes_backup_location, \
     validate_script_settings
-from network_backup_onsite.logger import logging
+from network_backup_onsite.logger import NODE, STEP, get_span_recorder, logging, span, timed
 from network_backup_onsite.node_backup_handler import NodeBackupHandler, \
     create_backup_folder_onsite
-from network_backup_onsite.utils import LOG_ROOT_PATH_CLI, LOG_SUFFIX, get_home_dir
+from network_backup_onsite.planner import plan_run
+from network_backup_onsite.post_processor import PostProcessor
+from network_backup_onsite.process_manager import get_process_manager
+from network_backup_onsite.reachability import ReachabilityCache
+from network_backup_onsite.remote_session import RemoteSession
+from network_backup_onsite.retriever import LATEST, LocalStore, RemoteStore, retrieve_backup
+from network_backup_onsite.run_history import RunHistory
+from network_backup_onsite.run_lock import FAIL, LOCK_MODES, RunLocks
+from network_backup_onsite.scheduler import BackupScheduler, send_daemon_request
+from network_backup_onsite.sharding import ShardCoordinator
+from network_backup_onsite.utils import LOG_ROOT_PATH_CLI, LOG_SUFFIX, TEMP_FILE_SUFFIX, \
+    create_path, get_backoff_delay, get_home_dir, to_seconds
 
 LOG_ROOT_PATH_HELP = "Provide a path to store the logs."
 LOG_LEVEL_HELP = "Provide the log level. Options: [CRITICAL, ERROR, WARNING, INFO, DEBUG]."
 BACKUP_DESTINATION_HELP = "Provide the destination of the backup."
 USAGE_HELP = "Display detailed help."
 NTWK_BKP_VERSION_HELP = "Show currently installed ntwk_bkp version."
+DAEMON_HELP = "Run as a daemon, capturing the nodes according to the SCHEDULER section."
+TRIGGER_HELP = "Request a running daemon to back up the informed node now."
+RESUME_HELP = "Capture and send only the nodes missing or failed in today's backup folder."
+COMMAND_HELP = "Command to be executed: 'backup' (default), 'search <text>' to find the " \
+               "nodes and dates of the configuration lines with the text or 'retrieve <node> " \
+               "[<date>|latest]' to print a backup of a node."
+QUERY_HELP = "Text to be searched, or node and date to be retrieved."
+OUTPUT_HELP = "File to write the retrieved backup to, instead of the standard output."
+PLAN_HELP = "Predict the duration of a backup run from the run history, without any session."
+NODE_HELP = "Back up only the informed node, alongside a full run. Can be repeated."
+TRACE_HELP = "Write the timeline of the run to a Chrome trace event file (not with --daemon)."
+LOCK_MODE_HELP = "What to do if another full run is in progress: 'wait' for it, 'skip' this " \
+                 "run or 'fail' (default)."
+
+BACKUP_COMMAND = "backup"
+SEARCH_COMMAND = "search"
+RETRIEVE_COMMAND = "retrieve"
 
 SCRIPT_FILE = os.path.basename(__file__).split('.')[0]
 
@@ -50,8 +91,18 @@ DEFAULT_LOG_ROOT_PATH = os.path.join(get_home_dir(), "network_device_backup_logs
 
 BKP_FOLDER_TEMPLATE = 'network_device_backup_'
 
+# Time allowed to one transfer to a remote target; a hung scp is killed at this deadline.
+TRANSFER_TIMEOUT = 3600
+
+VALIDATION_WORKERS = 4
+
+SSH_KEEP_ALIVE_OPTIONS = ["-o", "ControlMaster=auto",
+                          "-o", "ControlPath={}".format(
+                              os.path.join(get_home_dir(), ".ntwk_bkp_onsite_ssh_%r@%h:%p")),
+                          "-o", "ControlPersist=10m"]
+
 EXIT_CODES = Enum('ExitCodes', 'SUCCESS, INVALID_INPUT, FAILED_BKP_CREATION, '
-                               'FAILED_BKP_VALIDATION, FAILED_BKP_SEND')
+                               'FAILED_BKP_VALIDATION, FAILED_BKP_SEND, RUN_LOCKED')
 
 
 def main():
@@ -79,19 +130,80 @@ def main():
 
     logger = validate_get_main_logger(args, MAIN_LOG_FILE_NAME)
 
+    if args.trigger is not None:
+        return execute_daemon_request(args.trigger, logger)
+
+    if args.command == SEARCH_COMMAND:
+        return execute_search(" ".join(args.query), logger)
+
+    if args.command == RETRIEVE_COMMAND:
+        return execute_retrieve(args.query[0], args.query[1] if len(args.query) > 1 else LATEST,
+                                args.output, logger)
+
+    if args.plan:
+        return execute_plan(logger)
+
     logger.log_info("Running ntwk_bkp_onsite")
 
-    config_object_dict = execute_validation_input(logger)
+    # The spans of a daemon would pile up forever; a run records its own.
+    if not args.daemon:
+        get_span_recorder().enable()
+
+    config_object_dict = execute_validation_input(logger, args.node)
 
     node_config_dict = config_object_dict[SCRIPT_OBJECTS.NODE_CONFIG_DICT.name]
     backup_config = config_object_dict[SCRIPT_OBJECTS.BACKUP_CONFIG.name]
     delay = config_object_dict[SCRIPT_OBJECTS.DELAY.name]
     ombs_config = config_object_dict[SCRIPT_OBJECTS.OMBS_CONFIG.name]
     notification_handler = config_object_dict[SCRIPT_OBJECTS.NOTIFICATION_HANDLER.name]
-
-    backup_execution_result = execute_backup_creation_and_sending(node_config_dict, backup_config,
-                                                                  delay, ombs_config,
-                                                                  notification_handler, logger)
+    governor = Governor(config_object_dict[SCRIPT_OBJECTS.GOVERNOR_CONFIG.name])
+    history = RunHistory(backup_config.path,
+                         config_object_dict[SCRIPT_OBJECTS.TIMEOUTS_CONFIG.name])
+    baselines = BackupBaselines(backup_config.path,
+                                config_object_dict[SCRIPT_OBJECTS.BASELINE_CONFIG.name])
+    gnupg_config = config_object_dict[SCRIPT_OBJECTS.GNUPG_CONFIG.name]
+    target_configs = config_object_dict[SCRIPT_OBJECTS.TARGET_CONFIGS.name]
+    sharding_config = config_object_dict[SCRIPT_OBJECTS.SHARDING_CONFIG.name]
+    run_locks = RunLocks(backup_config.path, args.lock_mode)
+
+    # Only one full run at a time; the targeted runs and the daemon only lock their nodes.
+    if not args.daemon and not args.node:
+        try:
+            if not run_locks.acquire_run(logger):
+                logger.log_info("Another run is in progress ({}), this run is skipped."
+                                .format(run_locks.run_lock.get_holder_text()))
+                return EXIT_CODES.SUCCESS.value
+        except Exception as lock_exception:
+            logger.log_error_exit("Run lock could not be taken: {}".format(lock_exception),
+                                  EXIT_CODES.RUN_LOCKED.value)
+
+    # The post processing workers are forked before any capture thread is started.
+    governor.post_processor.start()
+    try:
+        if args.daemon:
+            scheduler_config = config_object_dict[SCRIPT_OBJECTS.SCHEDULER_CONFIG.name]
+            execute_backup_daemon(node_config_dict, backup_config, delay, ombs_config,
+                                  notification_handler, scheduler_config, logger, governor,
+                                  history, baselines, gnupg_config, target_configs, run_locks)
+            return EXIT_CODES.SUCCESS.value
+
+        # A targeted run captures its own nodes, whatever the share of this runner.
+        coordinator = ShardCoordinator(sharding_config) \
+            if sharding_config.enabled and not args.node else None
+
+        backup_execution_result = execute_backup_creation_and_sending(
+            node_config_dict, backup_config, delay, ombs_config, notification_handler, logger,
+            args.resume, governor, history, baselines, gnupg_config, target_configs, coordinator,
+            run_locks)
+    finally:
+        governor.post_processor.close()
+        run_locks.release_run()
+
+    for line in get_span_recorder().get_summary():
+        logger.info(line)
+
+    if args.trace:
+        write_trace(args.trace, logger)
 
     if not backup_execution_result:
         return EXIT_CODES.FAILED_BKP_CREATION.value
@@ -107,32 +219,66 @@ def parse_arguments():
     """
     parser = argparse.ArgumentParser()
 
+    parser.add_argument("command", nargs='?', default=BACKUP_COMMAND,
+                        choices=[BACKUP_COMMAND, SEARCH_COMMAND, RETRIEVE_COMMAND],
+                        help=COMMAND_HELP)
+    parser.add_argument("query", nargs='*', help=QUERY_HELP)
     parser.add_argument(LOG_ROOT_PATH_CLI, nargs='?', default=DEFAULT_LOG_ROOT_PATH,
                         help=LOG_ROOT_PATH_HELP)
     parser.add_argument("--log_level", nargs='?', default=logging.INFO, help=LOG_LEVEL_HELP)
     parser.add_argument("--usage", action="store_true", help=USAGE_HELP)
     parser.add_argument("--version", action="store_true", help=NTWK_BKP_VERSION_HELP)
+    parser.add_argument("--daemon", action="store_true", help=DAEMON_HELP)
+    parser.add_argument("--resume", action="store_true", help=RESUME_HELP)
+    parser.add_argument("--trigger", default=None, help=TRIGGER_HELP)
+    parser.add_argument("--plan", action="store_true", help=PLAN_HELP)
+    parser.add_argument("--output", nargs='?', default=None, help=OUTPUT_HELP)
+    parser.add_argument("--trace", nargs='?', default=None, help=TRACE_HELP)
+    parser.add_argument("--node", action="append", default=[], help=NODE_HELP)
+    parser.add_argument("--lock-mode", dest="lock_mode", default=FAIL, choices=LOCK_MODES,
+                        help=LOCK_MODE_HELP)
 
     args = parser.parse_args()
 
+    # An empty trigger must not be taken for a full backup of every node.
+    if args.trigger is not None and not args.trigger.strip():
+        raise Exception("No node informed to the '--trigger' option.")
+
+    if args.command == SEARCH_COMMAND and not args.query:
+        raise Exception("No text informed to the '{}' command.".format(SEARCH_COMMAND))
+
+    if args.command == RETRIEVE_COMMAND and not 1 <= len(args.query) <= 2:
+        raise Exception("The '{}' command needs a node and optionally a date."
+                        .format(RETRIEVE_COMMAND))
+
     args.log_root_path = validate_log_root_path(args.log_root_path, DEFAULT_LOG_ROOT_PATH)
     args.log_level = validate_log_level(args.log_level)
 
     return args
 
 
-def execute_validation_input(logger):
+@timed("configuration")
+def execute_validation_input(logger, hostnames=None):
     """
     Validate input parameters.
 
     :param logger: instance of Custom Logger.
+    :param hostnames: nodes of a targeted run; only these nodes are kept and validated.
     :return: script_objects.
     """
     script_objects = {}
     try:
         script_objects = validate_script_settings(CONF_FILE_NAME, script_objects, logger)
 
-        validate_nodes_backup_location(CONF_FILE_NAME, script_objects, logger)
+        if hostnames:
+            script_objects[SCRIPT_OBJECTS.NODE_CONFIG_DICT.name] = select_nodes(
+                script_objects[SCRIPT_OBJECTS.NODE_CONFIG_DICT.name], hostnames)
+
+        reachability = ReachabilityCache(
+            script_objects[SCRIPT_OBJECTS.BACKUP_CONFIG.name].path,
+            script_objects[SCRIPT_OBJECTS.REACHABILITY_CONFIG.name])
+
+        validate_nodes_backup_location(CONF_FILE_NAME, script_objects, logger, reachability)
 
     except Exception as validation_exception:
         logger.log_error_exit(validation_exception.message, EXIT_CODES.FAILED_BKP_VALIDATION.value)
@@ -140,6 +286,42 @@ def execute_validation_input(logger):
     return script_objects
 
 
+def write_trace(trace_file, logger):
+    """
+    Write the spans of the run to a trace file. A failure is only logged.
+
+    :param trace_file: Chrome trace event file.
+    :param logger: instance of Custom Logger.
+    """
+    try:
+        get_span_recorder().write_trace(trace_file)
+        logger.info("Trace of the run written to {}.".format(trace_file))
+    except Exception as trace_exception:
+        logger.warning("Trace of the run could not be written to {}: {}"
+                       .format(trace_file, trace_exception))
+
+
+def select_nodes(node_config_dict, hostnames):
+    """
+    Select the nodes of a targeted run.
+
+    :param node_config_dict: dictionary of node configurations.
+    :param hostnames: node names, case insensitive.
+    :return: dictionary of the configurations of the nodes.
+    :raise Exception: if a node is not in the configuration file.
+    """
+    wanted = set(hostname.lower() for hostname in hostnames)
+    selected = dict((section, node_config) for section, node_config in node_config_dict.items()
+                    if node_config.hostname.lower() in wanted)
+
+    missing = wanted - set(node_config.hostname.lower() for node_config in selected.values())
+    if missing:
+        raise Exception("Node(s) not found in the configuration file: {}."
+                        .format(", ".join(sorted(missing))))
+
+    return selected
+
+
 def show_ntwk_bkp_usage():
     """ Display this usage help message whenever the script is run with '--usage' argument."""
     print """
@@ -156,6 +338,54 @@ def show_ntwk_bkp_usage():
 
         1. Creates a backup of a nodes, specified in the configuration file
         2. Send created backup to OMBS
+
+        With '--daemon' it keeps running and captures each node according to the SCHEDULER
+        section. A running daemon can be requested to back up one node with
+        '--trigger <HOSTNAME>' or by writing 'backup <HOSTNAME>' to its unix socket.
+
+        The captured configurations are normalized while received: escape sequences, CRLF line
+        endings, the echo of the commands and the prompt lines are removed.
+
+        Each backup is compared with the previous backup of the node. The unified diff is stored
+        in the 'diffs' subfolder of the backup folder (not sent to OMBS) and the number of lines
+        added/removed per node is included in the success notification.
+
+        The configuration lines of the backups are indexed at the end of each run. The command
+        'search <text>' lists, without reading the backup files, the nodes with configuration
+        lines containing the text and the dates they were found, e.g.:
+
+            ntwk_bkp_onsite search vlan 100
+
+        The command 'retrieve <node> [<date>|latest]' prints a backup of a node, or writes it
+        to the file given with '--output'. The date of the latest backup is read from the index.
+        The backup is read from the onsite folder or, if it was removed, from the local targets
+        and then from OMBS and the remote targets, decrypted with the key of GPG_HOME if it was
+        encrypted and extracted from the archive of the run if it was archived, e.g.:
+
+            ntwk_bkp_onsite retrieve Connectivity_Switch_Test latest --output switch.cfg
+
+        Each node is backed up independently and retried on failure. The nodes backed up are
+        sent to OMBS and the nodes that failed after all retries are reported by email.
+
+        Each daily backup folder keeps a journal (.checkpoint) of the nodes captured and sent.
+        With '--resume' only the nodes missing or failed in today's folder are captured and only
+        the files not transferred yet are sent to OMBS.
+
+        A run backing up all the nodes holds a lock in the backup root folder, so a second run
+        started meanwhile, e.g. by cron, does not write the same folder. '--lock-mode' chooses
+        whether the second run waits for the first one, is skipped or fails (default). With
+        '--node <HOSTNAME>', repeated for several nodes, only these nodes are backed up and
+        the run proceeds alongside a full run: each node is locked while it is captured, so a
+        node is never captured by two runs at once. A lock left by a process which is gone is
+        detected and taken over.
+
+        Each run times its phases (configuration, backup, validation, transfer, ...) and its
+        nodes. The slowest phases, with their total time over the nodes, and the slowest nodes
+        are logged at the end of the run and listed in the success or error notification.
+        With '--trace <FILE>' the timeline of the run is also written to a Chrome trace event
+        file, to be opened in about:tracing or https://ui.perfetto.dev: one track per worker
+        thread with the connect, login, capture and write steps of each node, and the
+        validation, transfer and notify phases.
         
         ============================================================================================
                                     Script Exit Codes:
@@ -167,6 +397,7 @@ def show_ntwk_bkp_usage():
         FAILED_BKP_CREATION (3): Error while creating backup.
         FAILED_BKP_VALIDATION (4): Error while validating backup file.
         FAILED_BKP_SEND (5): Error while sending backup to OMBS.
+        RUN_LOCKED (6): Another run is in progress and '--lock-mode' is 'fail'.
 
         ============================================================================================
                                         Configuration File ({}):
@@ -185,10 +416,13 @@ def show_ntwk_bkp_usage():
         [NODE]
         HOSTNAME                          name of the host node
         IP                                ip of the node
-        TYPE                              type of a node
+        TYPE                              type of a node (srx or connectivitySwitch)
         EQ_PROMPT                         prompt used in a node's OS
         USERNAME                          account username on the node
         PASSWORD                          account password on the node
+        RETRIEVAL                         optional, 'terminal' (default) to read the config from
+                                          the terminal or 'file' to make the node save it to a
+                                          file and copy it with scp
         
         
         [OFFSITE_CONN]
@@ -200,10 +434,100 @@ def show_ntwk_bkp_usage():
         BKP_TEMP_FOLDER local temporary folder to store files during the upload process before
                         transferring.
                         
+        [SCHEDULER] (optional, used in daemon mode)
+        INTERVAL           default interval between two backups of a node (default 24h)
+        WINDOW             the captures of one cycle are spread over this time (default 1h)
+        JITTER             max random delay added to each capture (default 30s)
+        SOCKET_PATH        unix socket for on-demand requests
+        GROUP_<NAME>       interval of the nodes with GROUP=<NAME>
+
+        The node sections also accept GROUP and SCHEDULE (node interval, e.g. 6h).
+
+        [GOVERNOR] (optional, limits of the management network)
+        MAX_WORKERS        number of nodes backed up in parallel (default 1)
+        SITE_SESSIONS      max concurrent sessions with the nodes of a site (default 2)
+        SITE_RATE          max bandwidth with the nodes of a site, e.g. 500KB (no limit), shared
+                           by the terminal sessions and the scp transfers of the site
+        OMBS_RATE          max bandwidth of the transfers to OMBS, e.g. 5MB (no limit), shared
+                           by up to MAX_WORKERS concurrent transfers
+        SESSIONS_<SITE>    max concurrent sessions with the nodes with SITE=<SITE>
+        RATE_<SITE>        max bandwidth with the nodes with SITE=<SITE>
+        POST_WORKERS       processes checking and comparing the captured backups, out of the
+                           capture process (default 0, one per core; 1 to use no process)
+
+        The node sections also accept SITE (default 'default').
+
+        [TIMEOUTS] (optional, timeouts learned from the durations of the previous runs)
+        MARGIN             factor applied to the p99 of the durations of a node (default 3)
+        MIN_TIMEOUT        lower bound of the timeouts (default 10s)
+        MAX_TIMEOUT        upper bound of the timeouts (default 10m)
+        MIN_SAMPLES        runs needed before the durations of a node are used; until then the
+                           timeouts are 2m for the login and 4m for the capture (default 5)
+        HISTORY_SIZE       durations kept per node (default 50)
+
+        The timeouts are doubled at each retry of a node.
+
+        With '--plan' the run is simulated with the GOVERNOR limits and the median durations and
+        sizes of the run history, without contacting any node. The predicted wall time, bytes to
+        transfer and the nodes of the critical path are printed.
+
         [BACKUP_CONFIG]
         PATH               path to the folder where the backup is stored
         BUFFER_SIZE        size of the buffer (needed for re4ading the config of the nodes)
         MIN_BACKUP_SIZE    minimal size of a backup eligible for sending to OMBS
+        RETRIES            optional, retries of a failed node backup (default 2)
+        RETRY_DELAY        optional, delay before the first retry, doubled at each retry with a
+                           random jitter (default 10s)
+        MAX_RETRY_DELAY    optional, max delay between two retries (default 2m)
+        MASK_VOLATILE      optional, true to mask timestamps and counters in the captured
+                           configurations (default false)
+        ARCHIVE            optional, true to pack the backups of each run in one zip file,
+                           sent instead of the loose files, with the offset, length and sha256
+                           of each backup in its trailing index (default false)
+
+        [BASELINE] (optional, usual size and line count of the backups of each node)
+        MIN_SAMPLES        backups of a node needed before its baseline replaces MIN_BACKUP_SIZE
+                           (default 5)
+        DEVIATION          allowed deviation from the median of the node, in scaled median
+                           absolute deviations (default 5)
+        TOLERANCE          allowed deviation from the median, as a fraction of it (default 0.2)
+        HISTORY_SIZE       backups kept per node; a lasting change of a configuration is
+                           accepted once it is the majority of them (default 10)
+        A backup out of the usual range of its node is still sent, with a warning in the
+        notification.
+
+        [GNUPG] (optional, encryption of the backups before they are sent to OMBS)
+        GPG_USER_EMAIL     user id of the public key in the gpg keyring
+        GPG_RECIPIENT      optional, user id used instead of GPG_USER_EMAIL
+        GPG_KEY_FILE       optional, file with the public key, used instead of the keyring
+        GPG_HOME           optional, gpg home directory
+
+        The backups are compressed and encrypted by gpg while they are captured, to the
+        'encrypted' subfolder of the backup folder. Only the encrypted files are sent to OMBS,
+        with a manifest.json of their sizes and sha256 hashes.
+
+        [REACHABILITY] (optional, ping results reused across runs)
+        TTL                time a node seen up is not pinged again (default 5m, 0s to always
+                           ping)
+        DOWN_TTL           deprecated and ignored, a node seen down is always pinged again
+
+        [SHARDING] (optional, nodes of the inventory shared between several runners)
+        SHARED_PATH        folder shared by the runners, e.g. on an NFS mount
+        RUNNER_ID          optional, unique name of this runner (default the hostname)
+        LEASE_TIME         optional, time after which a silent runner is dead and its nodes
+                           are taken over by the others (default 10m)
+
+        Each node goes to one of the live runners by consistent hashing and is captured under
+        a lease file in SHARED_PATH, so it is captured once per day. Not used with --daemon.
+
+        [TARGET_<NAME>] (optional, other destinations of the backups, sent in parallel)
+        IP, USERNAME, BKP_DIR, KEY_PATH   remote target, as in OMBS_CONFIG
+        PATH               local target, e.g. an NFS mount, used instead of the remote options
+        RETRIES            optional, retries of a failed transfer (default 2), also accepted in
+                           OMBS_CONFIG
+
+        Each target is journaled separately, so with '--resume' only the targets which failed
+        receive the backup again.
 
         For example:
 
@@ -232,12 +556,12 @@ def show_ntwk_bkp_usage():
         IP=10.0.2.4
         USERNAME=vagrant
         DIR=/home/vagrant/backups
-        
-        [DELAY]
-        BKP_MAX_DELAY=2s
 
         Note: Path variables should not contain quotes.
 
+        Note: The section [DELAY] is deprecated and ignored, the capture waits for the end of the
+        output of the node.
+
         ============================================================================================
         ============================================================================================
         """.format(SCRIPT_FILE, CONF_FILE_NAME, CONF_FILE_NAME)
@@ -257,25 +581,39 @@ def show_ntwk_bkp_version():
     sys.exit(EXIT_CODES.SUCCESS.value)
 
 
-def validate_backup_file_onsite(backup_config, backup_file, logger):
+def validate_backup_file_onsite(backup_config, backup_file, logger, baselines=None,
+                                post_processor=None, warning_list=None):
     """
-    Check the size of a file.
+    Check the size of a file and its content with the rules of the driver of the node.
 
     :param backup_config: instance on BackupConfig class.
     :param backup_file: file to be validated.
     :param logger: instance of CustomLogger.
+    :param baselines: instance of BackupBaselines, to compare the file with the node baseline.
+    :param post_processor: instance of PostProcessor to scan the content in its pool.
+    :param warning_list: list receiving the deviations from the baseline of a valid file.
     :return: True if success, else False.
     """
-    if os.path.getsize(backup_file) > backup_config.min_backup_size:
+    verdict = validate_backup_file(backup_file, backup_config.min_backup_size, baselines,
+                                   post_processor)
+
+    if verdict.valid and verdict.warnings:
+        warning = "{}: {}".format(os.path.basename(backup_file), " ".join(verdict.warnings))
+        logger.warning("File: {} is validated with a warning. {}".format(backup_file, warning))
+        if warning_list is not None:
+            warning_list.append(warning)
+    elif verdict.valid:
         logger.info("File: {} is validated".format(backup_file))
     else:
-        logger.error("There was a problem with {}! It's size is smaller than expected!\n"
-                     .format(backup_file))
-        return False
-    return True
+        logger.error("There was a problem with {}! {}\n".format(backup_file,
+                                                                " ".join(verdict.problems)))
+    return verdict.valid
 
 
-def validate_backup_folder_and_files_onsite(number_nodes, backup_config, folder_path, logger):
+@timed("validation")
+def validate_backup_folder_and_files_onsite(number_nodes, backup_config, folder_path, logger,
+                                            backup_files=None, baselines=None,
+                                            post_processor=None, warning_list=None):
     """
     Checks the number of files in the folder. In case it matches the number of nodes and validates
     files.
@@ -284,10 +622,18 @@ def validate_backup_folder_and_files_onsite(number_nodes, backup_config, folder_
     :param backup_config: instance of BackupConfig.
     :param folder_path: path to a backup.
     :param logger: instance of CustomLogger.
+    :param backup_files: if informed, only these files of the folder are checked.
+    :param baselines: instance of BackupBaselines, to compare the files with the node baselines.
+    :param post_processor: instance of PostProcessor to scan the contents in its pool.
+    :param warning_list: list receiving the deviations from the baselines of the valid files.
     :return: True if success, else False.
     """
-    files = [backup_file for backup_file in os.listdir(folder_path) if os.path.isfile(
-        os.path.join(folder_path, backup_file))]
+    if backup_files is None:
+        files = [backup_file for backup_file in os.listdir(folder_path) if os.path.isfile(
+            os.path.join(folder_path, backup_file)) and not backup_file.startswith('.')]
+    else:
+        files = [os.path.basename(backup_file) for backup_file in backup_files
+                 if os.path.isfile(backup_file)]
 
     if len(files) == number_nodes:
         logger.info("Backup folder {} has {} node backup files specified in config file"
@@ -297,41 +643,522 @@ def validate_backup_folder_and_files_onsite(number_nodes, backup_config, folder_
                      "config file".format(folder_path, number_nodes))
         return False
 
-    for backup_file in files:
-        validation_result = validate_backup_file_onsite(backup_config,
-                                                        os.path.join(folder_path, backup_file),
-                                                        logger)
-        if not validation_result:
-            return False
+    def validate_file(backup_file):
+        """Validate one file of the folder."""
+        return validate_backup_file_onsite(backup_config, os.path.join(folder_path, backup_file),
+                                           logger, baselines, post_processor, warning_list)
+
+    # Every file is validated, so all the problems of the folder are logged at once.
+    max_workers = min(VALIDATION_WORKERS, len(files))
+    if max_workers <= 1:
+        return all([validate_file(backup_file) for backup_file in files])
+
+    pool = ThreadPool(max_workers)
+    try:
+        return all(pool.map(validate_file, files, chunksize=1))
+    finally:
+        pool.close()
+        pool.join()
 
-    return True
 
+def get_ssh_options(ombs_config, keep_alive=False):
+    """
+    Get the ssh/scp options used to connect to OMBS.
 
-def send_backup_to_ombs(bkp_dir, ombs_config, logger):
+    :param ombs_config: instance of OMBSConfig.
+    :param keep_alive: keep the ssh connection open to be reused by the next transfer.
+    :return: list of options.
+    """
+    options = []
+    if ombs_config.key_path:
+        options.extend(["-i", ombs_config.key_path])
+    if keep_alive:
+        options.extend(SSH_KEEP_ALIVE_OPTIONS)
+
+    return options
+
+
+def check_sent_files(remote_dir, backup_files, ombs_config, keep_alive=False):
+    """
+    Check the files sent to OMBS have the size of the local files, in one ssh session.
+
+    :param remote_dir: folder of the files on OMBS.
+    :param backup_files: list of the local files sent.
+    :param ombs_config: instance of OMBSConfig.
+    :param keep_alive: reuse the ssh connection kept open by the transfer.
+    :return: list of errors, empty if every file was sent whole.
+    """
+    session = RemoteSession(ombs_config.host, get_ssh_options(ombs_config, keep_alive))
+    for backup_file in backup_files:
+        session.add("wc -c < {}".format(
+            pipes.quote(os.path.join(remote_dir, os.path.basename(backup_file)))))
+    results, ssh_result = session.run()
+
+    errors = []
+    for backup_file, result in zip(backup_files, results):
+        size = os.path.getsize(backup_file)
+        if not result.succeeded:
+            errors.append("{} can't be read: {}".format(
+                os.path.basename(backup_file), (result.stderr or ssh_result.stderr).strip()))
+        elif result.stdout.strip() != str(size):
+            errors.append("{} has {} bytes instead of {}.".format(
+                os.path.basename(backup_file), result.stdout.strip(), size))
+
+    return errors
+
+
+def send_backup_to_ombs(bkp_dir, ombs_config, logger, keep_alive=False, backup_files=None,
+                        governor=None):
     """
     Send the folder with node backups to OMBS.
 
     :param bkp_dir: folder to be sent.
     :param ombs_config: instance of OMBSConfig.
     :param logger: instance of CustomLogger.
+    :param keep_alive: keep the ssh connection open to be reused by the next transfer.
+    :param backup_files: if informed, only these files of the folder are sent.
+    :param governor: instance of Governor, to limit the bandwidth of the transfer; the transfer
+                     waits for a transfer slot of OMBS, sharing its rate.
     :return: True in case of success, False otherwise.
     """
+    if governor is not None and governor.ombs_bucket is not None:
+        with governor.ombs_bucket.transfer_slot() as scp_limit:
+            return _send_backup_to_ombs(bkp_dir, ombs_config, logger, keep_alive, backup_files,
+                                        ["-l", str(scp_limit)])
+
+    return _send_backup_to_ombs(bkp_dir, ombs_config, logger, keep_alive, backup_files)
+
+
+def _send_backup_to_ombs(bkp_dir, ombs_config, logger, keep_alive=False, backup_files=None,
+                         limit_options=None):
+    """
+    Send the folder with node backups to OMBS with scp. When only some files are sent, their
+    folder is created before and their size is checked after the transfer, each in one ssh
+    session.
+
+    :param bkp_dir: folder to be sent.
+    :param ombs_config: instance of OMBSConfig.
+    :param logger: instance of CustomLogger.
+    :param keep_alive: keep the ssh connection open to be reused by the next transfer.
+    :param backup_files: if informed, only these files of the folder are sent.
+    :param limit_options: scp options limiting the bandwidth of the transfer.
+    :return: True in case of success, False otherwise.
+    """
+    scp_options = get_ssh_options(ombs_config, keep_alive) + (limit_options or [])
+
     try:
-        command = "scp -r -i {} {} {}:{}".format(ombs_config.key_path, bkp_dir, ombs_config.host, ombs_config.dir)
-        process = Popen(command.split(), stdout=PIPE)
-        _, error = process.communicate()
-        if error:
-            error_msg = "Error occurred while sending the file: {} to OMBS server.".format(bkp_dir)
+        if backup_files is None:
+            command = ["scp", "-r"] + scp_options + \
+                [bkp_dir, "{}:{}".format(ombs_config.host, ombs_config.dir)]
+        else:
+            remote_dir = os.path.join(ombs_config.dir, os.path.basename(bkp_dir))
+
+            session = RemoteSession(ombs_config.host, get_ssh_options(ombs_config, keep_alive))
+            session.add("mkdir -p {}".format(pipes.quote(remote_dir)))
+            results, ssh_result = session.run()
+            if not results[0].succeeded:
+                raise Exception("Error occurred while creating the folder {} on OMBS server. {}"
+                                .format(remote_dir,
+                                        (results[0].stderr or ssh_result.stderr).strip()))
+
+            command = ["scp"] + scp_options + list(backup_files) + \
+                ["{}:{}/".format(ombs_config.host, remote_dir)]
+
+        result = get_process_manager().run(command, timeout=TRANSFER_TIMEOUT)
+        if not result.succeeded:
+            error_msg = "Error occurred while sending the file: {} to OMBS server. {}".format(
+                bkp_dir, "Timeout after {}s.".format(TRANSFER_TIMEOUT) if result.timed_out
+                else result.stderr.strip())
             logger.error(error_msg)
             raise Exception(error_msg)
+
+        if backup_files is not None:
+            errors = check_sent_files(remote_dir, backup_files, ombs_config, keep_alive)
+            if errors:
+                error_msg = "Error occurred while checking the files of {} on OMBS server. {}" \
+                    .format(bkp_dir, " ".join(errors))
+                logger.error(error_msg)
+                raise Exception(error_msg)
+
         return True
 
     except Exception as send_exception:
         raise Exception(send_exception.message)
 
 
+def copy_backup_to_folder(bkp_dir, path, backup_files=None):
+    """
+    Copy the folder with node backups to a local target, e.g. an NFS mount.
+
+    Each file is copied to a temporary name and renamed, so the target never has a partial file.
+
+    :param bkp_dir: folder to be copied.
+    :param path: folder of the target.
+    :param backup_files: if informed, only these files are copied.
+    :raise Exception: if the target folder can't be created.
+    """
+    target_dir = os.path.join(path, os.path.basename(bkp_dir))
+    if not create_path(target_dir):
+        raise Exception("Error occurred while creating the folder {}.".format(target_dir))
+
+    if backup_files is None:
+        backup_files = [os.path.join(bkp_dir, file_name)
+                        for file_name in sorted(os.listdir(bkp_dir))
+                        if os.path.isfile(os.path.join(bkp_dir, file_name)) and
+                        not file_name.startswith('.')]
+
+    for backup_file in backup_files:
+        target_file = os.path.join(target_dir, os.path.basename(backup_file))
+        shutil.copyfile(backup_file, target_file + TEMP_FILE_SUFFIX)
+        os.rename(target_file + TEMP_FILE_SUFFIX, target_file)
+
+
+def send_backup_to_target(bkp_dir, target_config, backup_config, logger, keep_alive=False,
+                          backup_files=None, governor=None):
+    """
+    Send the folder with node backups to one target, retrying with exponential backoff.
+
+    :param bkp_dir: folder to be sent.
+    :param target_config: instance of TargetConfig.
+    :param backup_config: backup configuration, with the delays between retries.
+    :param logger: instance of CustomLogger.
+    :param keep_alive: keep the ssh connection open to be reused by the next transfer.
+    :param backup_files: if informed, only these files of the folder are sent.
+    :param governor: instance of Governor, to limit the bandwidth of the transfer.
+    :return: None in case of success, the error of the last attempt otherwise.
+    """
+    max_attempts = target_config.retries + 1
+    error = None
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            if target_config.ombs_config is not None:
+                send_backup_to_ombs(bkp_dir, target_config.ombs_config, logger, keep_alive,
+                                    backup_files, governor)
+            else:
+                copy_backup_to_folder(bkp_dir, target_config.path, backup_files)
+            return None
+
+        except Exception as send_exception:
+            error = send_exception
+            logger.error("Attempt {} of {} to send {} to {} failed: {}"
+                         .format(attempt, max_attempts, bkp_dir, target_config.name,
+                                 send_exception))
+
+            if attempt < max_attempts:
+                time.sleep(get_backoff_delay(attempt, to_seconds(backup_config.retry_delay),
+                                             to_seconds(backup_config.max_retry_delay)))
+
+    return error
+
+
+def get_files_to_send(backup_files, gnupg_config=None, archive=False):
+    """
+    Get the files to be sent to OMBS for a list of backup files.
+
+    With a GNUPG key, these are the encrypted files and the manifest of their folder. The backup
+    files captured before the encryption was enabled are encrypted first. With ARCHIVE, this is
+    the archive of their folder, where the files missing are added first.
+
+    :param backup_files: list of backup files.
+    :param gnupg_config: instance of GnupgConfig.
+    :param archive: send the archive of the folder instead of the files.
+    :return: list of files.
+    """
+    files = list(backup_files)
+    if not files:
+        return files
+
+    if gnupg_config is not None and gnupg_config.enabled:
+        files = []
+        for backup_file in backup_files:
+            encrypted_file = get_encrypted_file(backup_file)
+            if not os.path.exists(encrypted_file):
+                encrypted_file = encrypt_file(backup_file, gnupg_config)
+            files.append(encrypted_file)
+
+        if not archive:
+            return files + [get_manifest_file(files[0])]
+
+    if not archive:
+        return files
+
+    backup_archive = BackupArchive(get_archive_file(os.path.dirname(backup_files[0])))
+    index = backup_archive.get_index() if os.path.exists(backup_archive.path) else {}
+    for archived_file in files:
+        if os.path.basename(archived_file) not in index:
+            backup_archive.add(archived_file)
+
+    return [backup_archive.path]
+
+
+def create_node_backups(node_config_list, backup_config, delay, bkp_folder_path, logger,
+                        checkpoint=None, governor=None, history=None, gnupg_config=None,
+                        run_locks=None):
+    """
+    Create the backup file of each node.
+
+    Each node is backed up independently, with the retries configured in the backup
+    configuration, so the failure of one node does not stop the backup of the others. With a
+    governor allowing more than one worker, the nodes are backed up in parallel within the
+    session and bandwidth limits of their sites.
+
+    :param node_config_list: list of node configurations.
+    :param backup_config: backup configuration.
+    :param delay: max number of seconds to wait.
+    :param bkp_folder_path: folder to store the backup files.
+    :param logger: instance of Custom Logger.
+    :param checkpoint: instance of RunCheckpoint to journal each node completion.
+    :param governor: instance of Governor.
+    :param history: instance of RunHistory to learn the timeouts of each node from.
+    :param gnupg_config: instance of GnupgConfig to encrypt the backups while they are captured.
+    :param run_locks: instance of RunLocks, to lock each node while it is captured.
+    :return: list of NodeBackupResult, one per node.
+    """
+    post_processor = governor.post_processor if governor is not None else PostProcessor(1)
+
+    def create_node_backup(node_config):
+        """Back up one node, journal its result and compare it with its previous backup."""
+        node_lock = run_locks.acquire_node(node_config.hostname, logger) \
+            if run_locks is not None else None
+        try:
+            get_sw_config = NodeBackupHandler(node_config, backup_config, delay, logger,
+                                              governor, history, gnupg_config)
+            result = get_sw_config.backup_node(bkp_folder_path)
+
+            if result.success and backup_config.archive:
+                archived_file = result.backup_file
+                if gnupg_config is not None and gnupg_config.enabled:
+                    archived_file = get_encrypted_file(result.backup_file)
+                try:
+                    BackupArchive(get_archive_file(bkp_folder_path)).add(archived_file)
+                except Exception as archive_exception:
+                    result.error = "Backup could not be archived: {}".format(archive_exception)
+                    result.backup_file = None
+
+            if checkpoint is not None:
+                if result.success:
+                    checkpoint.record(node_config.hostname, CAPTURED, result.backup_file)
+                else:
+                    checkpoint.record(node_config.hostname, FAILED)
+        finally:
+            if node_lock is not None:
+                node_lock.release()
+
+        logger.info(str(result))
+
+        if result.success:
+            try:
+                with span("diff", STEP, node=node_config.hostname):
+                    result.diff = post_processor.run(create_backup_diff, result.backup_file,
+                                                     backup_config.path, BKP_FOLDER_TEMPLATE)
+                logger.info(str(result.diff))
+            except Exception as diff_exception:
+                logger.warning("Backup of {} could not be compared with the previous one: {}"
+                               .format(node_config.hostname, diff_exception))
+
+        return result
+
+    def backup_node(node_config):
+        """Back up one node, timing it."""
+        with span(node_config.hostname, NODE):
+            return create_node_backup(node_config)
+
+    max_workers = min(governor.max_workers, len(node_config_list)) if governor else 1
+    if max_workers <= 1:
+        return [backup_node(node_config) for node_config in node_config_list]
+
+    pool = ThreadPool(max_workers)
+    try:
+        return pool.map(backup_node, node_config_list, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def create_shard_backups(node_config_list, coordinator, cycle, logger, create_backups):
+    """
+    Create the backup files of the nodes of this runner when the nodes are shared with others.
+
+    The nodes are captured in rounds: each round takes the nodes the hash ring of the live
+    runners gives to this runner and which are neither done nor leased by another runner. A
+    runner dying during the run changes the ring, so its nodes are taken in the next round. The
+    nodes of the shard leased by another runner are waited for until they are done, or taken
+    once their lease is released or expired, e.g. when their capture failed or the runner
+    holding them died during the capture.
+
+    :param node_config_list: list of node configurations of the whole inventory.
+    :param coordinator: instance of ShardCoordinator.
+    :param cycle: name of the cycle, the backup folder of the day.
+    :param logger: instance of Custom Logger.
+    :param create_backups: function creating the backups of a list of nodes and returning their
+                           NodeBackupResult.
+    :return: list of NodeBackupResult of the nodes captured by this runner.
+    """
+    results = []
+    attempted = set()
+
+    coordinator.start()
+    try:
+        while True:
+            shard = coordinator.get_shard([node_config.hostname for node_config in node_config_list
+                                           if node_config.hostname not in attempted], cycle)
+            if not shard:
+                break
+
+            claimed_list = [node_config for node_config in node_config_list
+                            if node_config.hostname in shard and
+                            coordinator.claim(node_config.hostname, cycle)]
+            attempted.update(node_config.hostname for node_config in claimed_list)
+
+            if not claimed_list:
+                logger.info("Runner {} waits for {} nodes leased by other runners.".format(
+                    coordinator.runner_id, len(shard)))
+                coordinator.wait_for_leases(shard, cycle)
+                continue
+
+            logger.info("Runner {} captures {} of {} nodes.".format(
+                coordinator.runner_id, len(claimed_list), len(node_config_list)))
+
+            round_results = create_backups(claimed_list)
+            for node_config, result in zip(claimed_list, round_results):
+                coordinator.release(node_config.hostname, cycle, result.success)
+
+            results.extend(round_results)
+    finally:
+        coordinator.stop()
+
+    return results
+
+
+def validate_and_send_backup(backup_files, bkp_folder_path, backup_config, ombs_config,
+                             notification_handler, logger, keep_alive=False, checkpoint=None,
+                             number_nodes=None, summary_list=None, governor=None,
+                             baselines=None, gnupg_config=None, target_configs=None,
+                             update_index=False):
+    """
+    Validate the created backup files and send them to OMBS and the other targets.
+
+    The targets are sent to in parallel, each with its own retries. When a checkpoint is informed
+    only the files not transferred yet to a target are sent to it, and each transfer is journaled
+    per target. With a GNUPG key, the encrypted files and their manifest are sent instead of the
+    backup files.
+
+    :param backup_files: list of backup files created.
+    :param bkp_folder_path: folder with the backup files.
+    :param backup_config: backup configuration.
+    :param ombs_config: OMBS configuration.
+    :param notification_handler: instance of Notification Handler.
+    :param logger: instance of Custom Logger.
+    :param keep_alive: keep the ssh connection to OMBS open for the next transfer.
+    :param checkpoint: instance of RunCheckpoint of the backup folder.
+    :param number_nodes: number of backup files expected, by default len(backup_files).
+    :param summary_list: lines added to the success notification, e.g. the changes per node.
+    :param governor: instance of Governor, to limit the bandwidth of the transfer.
+    :param baselines: instance of BackupBaselines, to compare the files with the node baselines.
+    :param gnupg_config: instance of GnupgConfig, to send the encrypted files.
+    :param target_configs: list of TargetConfig, by default only OMBS_CONFIG.
+    :param update_index: add the backup files to the search index once they are valid.
+    :return: True if the backup was sent, False if the validation failed.
+    :raise Exception: if the backup could not be sent to some of the targets.
+    """
+    if number_nodes is None:
+        number_nodes = len(backup_files)
+
+    # A backup out of the usual range of its node is sent, and reported in the notification.
+    warning_list = []
+    validation_result = validate_backup_folder_and_files_onsite(
+        number_nodes, backup_config, bkp_folder_path, logger, backup_files, baselines,
+        governor.post_processor if governor is not None else None, warning_list)
+
+    if not validation_result:
+        error_list = ["Backup {} will not be sent to OMBS".format(bkp_folder_path)]
+        logger.error(error_list)
+        report_error(notification_handler, logger, error_list,
+                     EXIT_CODES.FAILED_BKP_VALIDATION.value, "")
+        return False
+
+    logger.info("Backup folder {} is valid and can be sent to OMBS".format(bkp_folder_path))
+
+    if update_index:
+        update_config_index(backup_config, logger)
+
+    if not target_configs:
+        target_configs = [TargetConfig(DEFAULT_TARGET, ombs_config)]
+
+    # The files of each target are listed (and encrypted if needed) before the transfers start.
+    encrypted = gnupg_config is not None and gnupg_config.enabled
+    transfers = []
+    for target_config in target_configs:
+        if checkpoint is None:
+            unsent_files = None
+            files = get_files_to_send(backup_files, gnupg_config, backup_config.archive) \
+                if encrypted or backup_config.archive else None
+        else:
+            unsent_files = checkpoint.get_unsent_files(target_config.name)
+            if not unsent_files:
+                logger.info("All backup files of {} were already sent to {}"
+                            .format(bkp_folder_path, target_config.name))
+                continue
+            files = get_files_to_send(sorted(unsent_files.values()), gnupg_config,
+                                      backup_config.archive)
+
+        transfers.append((target_config, files, unsent_files))
+
+    if not transfers:
+        return True
+
+    def send_transfer(transfer):
+        """Send the files to one target and journal them once sent."""
+        target_config, files, unsent_files = transfer
+        with span("send", STEP, target=target_config.name):
+            error = send_backup_to_target(bkp_folder_path, target_config, backup_config,
+                                          logger, keep_alive, files, governor)
+
+        if error is None and unsent_files is not None:
+            for hostname, backup_file in unsent_files.items():
+                checkpoint.record(hostname, SENT, backup_file, target_config.name)
+
+        return error
+
+    with span("transfer"):
+        if len(transfers) == 1:
+            errors = [send_transfer(transfers[0])]
+        else:
+            pool = ThreadPool(len(transfers))
+            try:
+                errors = pool.map(send_transfer, transfers, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+
+    failed_list = ["{}: {}".format(transfer[0].name, error)
+                   for transfer, error in zip(transfers, errors) if error is not None]
+    if failed_list:
+        raise Exception("Backup {} could not be sent to {} of {} targets. {}"
+                        .format(bkp_folder_path, len(failed_list), len(transfers),
+                                " ".join(failed_list)))
+
+    logger.log_info("Backup {} was successfully sent to {}"
+                    .format(bkp_folder_path,
+                            ", ".join(transfer[0].name for transfer in transfers)))
+
+    success_list = ["Onsite was successfully created and sent to OMBS"]
+    if warning_list:
+        success_list.append("Backups out of the usual range of their node:")
+        success_list.extend(sorted(warning_list))
+    if summary_list:
+        success_list.extend(summary_list)
+    report_success(notification_handler, logger, success_list, "")
+
+    return True
+
+
 def execute_backup_creation_and_sending(node_config_dict, backup_config, delay, ombs_config,
-                                        notification_handler, logger):
+                                        notification_handler, logger, resume=False,
+                                        governor=None, history=None, baselines=None,
+                                        gnupg_config=None, target_configs=None,
+                                        coordinator=None, run_locks=None):
     """
     Run backup creation and transferring to OMBS.
 
@@ -341,34 +1168,71 @@ def execute_backup_creation_and_sending(node_config_dict, backup_config, delay,
     :param ombs_config: OMBS configuration.
     :param notification_handler: instance of Notification Handler.
     :param logger: instance of Custom Logger.
+    :param resume: capture only the nodes not captured yet in the folder of the day.
+    :param governor: instance of Governor limiting the management network traffic.
+    :param history: instance of RunHistory to learn the timeouts of each node from.
+    :param baselines: instance of BackupBaselines, to compare the files with the node baselines.
+    :param gnupg_config: instance of GnupgConfig to encrypt the backups before they are sent.
+    :param target_configs: list of TargetConfig the backups are sent to.
+    :param coordinator: instance of ShardCoordinator to capture only the nodes of this runner.
+    :param run_locks: instance of RunLocks, to lock each node while it is captured.
     :return: Exit code in case of failure.
     """
     try:
         bkp_folder_path = create_backup_folder_onsite(BKP_FOLDER_TEMPLATE, backup_config.path,
                                                       logger)
-
-        for node_config in node_config_dict.values():
-            get_sw_config = NodeBackupHandler(node_config, backup_config, delay, logger)
-            get_sw_config.create_node_backup(bkp_folder_path)
-
-        validation_result = validate_backup_folder_and_files_onsite(len(node_config_dict),
-                                                                    backup_config,
-                                                                    bkp_folder_path, logger)
-
-        if not validation_result:
-            error_list = ["Backup {} will not be sent to OMBS".format(bkp_folder_path)]
+        checkpoint = RunCheckpoint(bkp_folder_path)
+
+        node_config_list = node_config_dict.values()
+        if resume:
+            node_config_list = [node_config for node_config in node_config_list
+                                if not checkpoint.is_captured(node_config.hostname)]
+            logger.info("Resuming backup {}: {} of {} nodes to be captured."
+                        .format(bkp_folder_path, len(node_config_list), len(node_config_dict)))
+
+        def create_backups(node_configs):
+            """Create the backup files of a list of nodes."""
+            return create_node_backups(node_configs, backup_config, delay, bkp_folder_path,
+                                       logger, checkpoint, governor, history, gnupg_config,
+                                       run_locks)
+
+        with span("backup"):
+            if coordinator is not None:
+                results = create_shard_backups(node_config_list, coordinator,
+                                               os.path.basename(bkp_folder_path), logger,
+                                               create_backups)
+            else:
+                results = create_backups(node_config_list)
+
+        backup_files = [checkpoint.get_backup_file(node_config.hostname)
+                        for node_config in node_config_dict.values()]
+        backup_files = [backup_file for backup_file in backup_files if backup_file]
+
+        failed_results = [result for result in results if not result.success]
+        if failed_results:
+            error_list = ["Backup of {} of {} nodes could not be created."
+                          .format(len(failed_results), len(node_config_dict))]
+            error_list.extend(str(result) for result in failed_results)
             logger.error(error_list)
             report_error(notification_handler, logger, error_list,
-                         EXIT_CODES.FAILED_BKP_VALIDATION.value, "")
+                         EXIT_CODES.FAILED_BKP_CREATION.value, "")
+
+        if not backup_files:
             return False
 
-        logger.info("Backup folder {} is valid and can be sent to OMBS".format(bkp_folder_path))
-        send_result = send_backup_to_ombs(bkp_folder_path, ombs_config, logger)
-        if send_result:
-            logger.log_info("Backup {} was successfully sent to OMBS".format(bkp_folder_path))
+        summary_list = [str(result.diff) for result in results if result.diff is not None]
+
+        # The nodes backed up successfully are still sent; the failed ones were reported above.
+        send_result = validate_and_send_backup(backup_files, bkp_folder_path, backup_config,
+                                               ombs_config, notification_handler, logger,
+                                               checkpoint=checkpoint,
+                                               number_nodes=len(backup_files),
+                                               summary_list=summary_list, governor=governor,
+                                               baselines=baselines, gnupg_config=gnupg_config,
+                                               target_configs=target_configs,
+                                               update_index=True)
 
-        success_list = ["Onsite was successfully created and sent to OMBS"]
-        report_success(notification_handler, logger, success_list, "")
+        return send_result and not failed_results
 
     except Exception as bkp_creation_exception:
         error_list = ["Backup could not be created. Cause: {}".format(bkp_creation_exception)]
@@ -376,7 +1240,246 @@ def execute_backup_creation_and_sending(node_config_dict, backup_config, delay,
                      EXIT_CODES.FAILED_BKP_CREATION.value, "")
         return False
 
-    return True
+
+def execute_backup_daemon(node_config_dict, backup_config, delay, ombs_config,
+                          notification_handler, scheduler_config, logger, governor=None,
+                          history=None, baselines=None, gnupg_config=None,
+                          target_configs=None, run_locks=None):
+    """
+    Run the backups as a daemon, spreading the node captures according to their schedules.
+
+    The configuration is read and validated once; each capture goes to the folder of the day it
+    was taken and the captures are validated and sent to OMBS in batches.
+
+    :param node_config_dict: list of node configurations.
+    :param backup_config: backup configuration.
+    :param delay: max number of seconds to wait.
+    :param ombs_config: OMBS configuration.
+    :param notification_handler: instance of Notification Handler.
+    :param scheduler_config: scheduler configuration.
+    :param logger: instance of Custom Logger.
+    :param governor: instance of Governor limiting the management network traffic.
+    :param history: instance of RunHistory to learn the timeouts of each node from.
+    :param baselines: instance of BackupBaselines, to compare the files with the node baselines.
+    :param gnupg_config: instance of GnupgConfig to encrypt the backups before they are sent.
+    :param target_configs: list of TargetConfig the backups are sent to.
+    :param run_locks: instance of RunLocks, to lock each node while it is captured.
+    """
+    def capture_node(node_config):
+        """Create the backup of one node in the folder of the day."""
+        bkp_folder_path = create_backup_folder_onsite(BKP_FOLDER_TEMPLATE, backup_config.path,
+                                                      logger)
+        result = create_node_backups([node_config], backup_config, delay, bkp_folder_path,
+                                     logger, RunCheckpoint(bkp_folder_path), governor,
+                                     history, gnupg_config, run_locks)[0]
+        if not result.success:
+            raise NodeBackupException(str(result), ExceptionCodes.NodeBackupCaptureError)
+
+        return result.backup_file
+
+    def flush(backup_files):
+        """Validate and send the backup files, grouped by their folder."""
+        files_by_folder = {}
+        for backup_file in backup_files:
+            files_by_folder.setdefault(os.path.dirname(backup_file), []).append(backup_file)
+
+        for bkp_folder_path, folder_files in sorted(files_by_folder.items()):
+            try:
+                validate_and_send_backup(folder_files, bkp_folder_path, backup_config,
+                                         ombs_config, notification_handler, logger,
+                                         keep_alive=True,
+                                         checkpoint=RunCheckpoint(bkp_folder_path),
+                                         governor=governor, baselines=baselines,
+                                         gnupg_config=gnupg_config,
+                                         target_configs=target_configs, update_index=True)
+            except Exception as send_exception:
+                report_error(notification_handler, logger,
+                             ["Backup could not be sent. Cause: {}".format(send_exception)],
+                             EXIT_CODES.FAILED_BKP_SEND.value, "")
+
+    logger.log_info("Running ntwk_bkp_onsite as daemon")
+
+    scheduler = BackupScheduler(node_config_dict, scheduler_config, capture_node, flush, logger,
+                                governor.max_workers if governor is not None else 1)
+    scheduler.run()
+
+
+@timed("index")
+def update_config_index(backup_config, logger):
+    """
+    Add the backups not indexed yet to the search index. A failure is only logged.
+
+    :param backup_config: backup configuration.
+    :param logger: instance of Custom Logger.
+    """
+    try:
+        config_index = ConfigIndex(backup_config.path)
+        try:
+            indexed = config_index.update(backup_config.path, BKP_FOLDER_TEMPLATE)
+        finally:
+            config_index.close()
+
+        logger.info("{} backup file(s) added to the search index.".format(indexed))
+
+    except Exception as index_exception:
+        logger.warning("Search index could not be updated: {}".format(index_exception))
+
+
+def execute_search(query, logger):
+    """
+    Search the configuration lines with the text in the index of the backups.
+
+    :param query: text to be searched.
+    :param logger: instance of Custom Logger.
+    :return: SUCCESS exit code, INVALID_INPUT if the index can't be read.
+    """
+    try:
+        script_objects = validate_script_settings(CONF_FILE_NAME, {}, logger)
+        backup_config = script_objects[SCRIPT_OBJECTS.BACKUP_CONFIG.name]
+
+        start_time = time.time()
+        config_index = ConfigIndex(backup_config.path)
+        try:
+            results = config_index.search(query)
+        finally:
+            config_index.close()
+    except Exception as search_exception:
+        logger.log_error_exit("Search failed: {}".format(search_exception),
+                              EXIT_CODES.INVALID_INPUT.value)
+
+    for result in results:
+        print str(result)
+
+    print "{} line(s) found in {:.1f} ms.".format(len(results), (time.time() - start_time) * 1000)
+
+    return EXIT_CODES.SUCCESS.value
+
+
+def get_retrieve_stores(backup_config, target_configs, folder_name):
+    """
+    Get the stores of a backup folder, in order of preference: the onsite folder, the local
+    targets, then the remote targets.
+
+    :param backup_config: backup configuration.
+    :param target_configs: list of TargetConfig.
+    :param folder_name: name of the backup folder.
+    :return: list of LocalStore and RemoteStore.
+    """
+    stores = [LocalStore(os.path.join(backup_config.path, folder_name))]
+    stores.extend(LocalStore(os.path.join(target_config.path, folder_name))
+                  for target_config in target_configs if target_config.ombs_config is None)
+    stores.extend(RemoteStore(target_config.ombs_config, folder_name,
+                              get_ssh_options(target_config.ombs_config))
+                  for target_config in target_configs if target_config.ombs_config is not None)
+
+    return stores
+
+
+def execute_retrieve(node, date, output_file, logger):
+    """
+    Write a backup of a node to the standard output or to a file.
+
+    :param node: node name.
+    :param date: date of the backup, or LATEST for the latest date in the index.
+    :param output_file: file to write the backup to, None for the standard output.
+    :param logger: instance of Custom Logger.
+    :return: SUCCESS exit code, INVALID_INPUT if the backup can't be retrieved.
+    """
+    try:
+        script_objects = validate_script_settings(CONF_FILE_NAME, {}, logger)
+        backup_config = script_objects[SCRIPT_OBJECTS.BACKUP_CONFIG.name]
+
+        if date == LATEST:
+            config_index = ConfigIndex(backup_config.path)
+            try:
+                dates = config_index.get_backup_dates(node)
+            finally:
+                config_index.close()
+
+            if not dates:
+                raise Exception("No backup of {} in the index.".format(node))
+            date = dates[-1]
+
+        stores = get_retrieve_stores(backup_config,
+                                     script_objects[SCRIPT_OBJECTS.TARGET_CONFIGS.name],
+                                     BKP_FOLDER_TEMPLATE + date)
+        gnupg_config = script_objects[SCRIPT_OBJECTS.GNUPG_CONFIG.name]
+
+        start_time = time.time()
+        if output_file is None:
+            source = retrieve_backup(stores, BKP_FOLDER_TEMPLATE + date, node, date, sys.stdout,
+                                     gnupg_config)
+            sys.stdout.flush()
+        else:
+            # The file is only created once the backup is completely retrieved.
+            with open(output_file + TEMP_FILE_SUFFIX, "wb") as output:
+                source = retrieve_backup(stores, BKP_FOLDER_TEMPLATE + date, node, date, output,
+                                         gnupg_config)
+            os.rename(output_file + TEMP_FILE_SUFFIX, output_file)
+
+    except Exception as retrieve_exception:
+        if output_file is not None and os.path.exists(output_file + TEMP_FILE_SUFFIX):
+            os.remove(output_file + TEMP_FILE_SUFFIX)
+        logger.log_error_exit("Retrieve failed: {}".format(retrieve_exception),
+                              EXIT_CODES.INVALID_INPUT.value)
+
+    logger.info("Backup of {} from {} retrieved from {} in {:.1f} ms."
+                .format(node, date, source, (time.time() - start_time) * 1000))
+
+    return EXIT_CODES.SUCCESS.value
+
+
+def execute_plan(logger):
+    """
+    Simulate a backup run with the configured limits and print the prediction.
+
+    No node is contacted: the durations and sizes come from the run history.
+
+    :param logger: instance of Custom Logger.
+    :return: SUCCESS exit code, INVALID_INPUT if the configuration can't be read.
+    """
+    try:
+        script_objects = validate_script_settings(CONF_FILE_NAME, {}, logger)
+        backup_config = script_objects[SCRIPT_OBJECTS.BACKUP_CONFIG.name]
+        history = RunHistory(backup_config.path,
+                             script_objects[SCRIPT_OBJECTS.TIMEOUTS_CONFIG.name])
+
+        run_plan = plan_run(script_objects[SCRIPT_OBJECTS.NODE_CONFIG_DICT.name].values(),
+                            history, script_objects[SCRIPT_OBJECTS.GOVERNOR_CONFIG.name])
+    except Exception as plan_exception:
+        logger.log_error_exit("Plan failed: {}".format(plan_exception),
+                              EXIT_CODES.INVALID_INPUT.value)
+
+    for line in run_plan.get_report():
+        print line
+
+    return EXIT_CODES.SUCCESS.value
+
+
+def execute_daemon_request(hostname, logger):
+    """
+    Request a running daemon to back up a node.
+
+    :param hostname: node to be backed up.
+    :param logger: instance of Custom Logger.
+    :return: SUCCESS exit code if the request was queued, INVALID_INPUT otherwise.
+    """
+    try:
+        script_objects = validate_script_settings(CONF_FILE_NAME, {}, logger)
+        scheduler_config = script_objects[SCRIPT_OBJECTS.SCHEDULER_CONFIG.name]
+
+        response = send_daemon_request(scheduler_config.socket_path,
+                                       "backup {}".format(hostname))
+    except Exception as request_exception:
+        logger.log_error_exit("Request to the daemon failed: {}".format(request_exception),
+                              EXIT_CODES.INVALID_INPUT.value)
+
+    logger.info(response.strip())
+
+    if not response.startswith("queued"):
+        return EXIT_CODES.INVALID_INPUT.value
+
+    return EXIT_CODES.SUCCESS.value
 
 
 def report_success(notification_handler, logger, success_list, sender):
@@ -394,7 +1497,9 @@ def report_success(notification_handler, logger, success_list, sender):
         if sender is None or not sender.strip():
             sender = "network_bkp_onsite"
 
-        notification_handler.send_success_email(sender, report_title, success_list)
+        with span("notify"):
+            notification_handler.send_success_email(
+                sender, report_title, success_list + get_span_recorder().get_summary())
 
     except NotificationHandlerException as notification_exp:
         logger.error(notification_exp.message)
@@ -419,7 +1524,9 @@ def report_error(notification_handler, logger, error_list, error_code, sender, e
 
         if sender is None or not sender.strip():
             sender = "ntwk_bkp_onsite"
-        notification_handler.send_error_email(sender, subject, error_list, error_code)
+        with span("notify"):
+            notification_handler.send_error_email(
+                sender, subject, error_list + get_span_recorder().get_summary(), error_code)
 
     except NotificationHandlerException as notification_exp:
         logger.error(notification_exp.message)
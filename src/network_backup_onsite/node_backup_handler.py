@@ -22,10 +22,12 @@ import datetime
 import os
 import time
 
-import pexpect
-
-from network_backup_onsite.logger import CustomLogger
-from network_backup_onsite.utils import create_path, to_seconds
+from network_backup_onsite.device_drivers import FILE_RETRIEVAL, PARTIAL_FILE_SUFFIX, get_driver
+from network_backup_onsite.encryptor import GpgEncryptor, get_encrypted_file
+from network_backup_onsite.exceptions import NodeBackupException
+from network_backup_onsite.logger import STEP, CustomLogger, get_span_recorder, span
+from network_backup_onsite.run_history import CAPTURE_PHASE, CONNECT_PHASE, LOGIN_PHASE, SIZE
+from network_backup_onsite.utils import create_path, get_backoff_delay, to_seconds
 
 SCRIPT_FILE = os.path.basename(__file__).split('.')[0]
 TIME_FORMAT = "%Y%m%d"
@@ -33,6 +35,9 @@ SEPARATOR = "-------------------------------------------------------------------
 TIME_OUT_1 = 120
 TIME_OUT_2 = 240
 
+# Timeouts of each phase of a node session, used until the node has enough run history.
+DEFAULT_TIMEOUTS = {CONNECT_PHASE: TIME_OUT_1, LOGIN_PHASE: TIME_OUT_1, CAPTURE_PHASE: TIME_OUT_2}
+
 
 def create_backup_folder_onsite(template, path, logger):
     """
@@ -68,105 +73,241 @@ def write_to_file(file_name, messages):
     f.close()
 
 
+class NodeBackupResult:
+    """Final status of the backup of one node."""
+
+    def __init__(self, hostname, backup_file=None, attempts=0, error=None, duration=0.0):
+        """
+        Initialize the result.
+
+        :param hostname: node name.
+        :param backup_file: backup file created, None if the backup failed.
+        :param attempts: number of attempts executed.
+        :param error: error of the last attempt, if the backup failed.
+        :param duration: total time spent in seconds, including retries.
+        """
+        self.hostname = hostname
+        self.backup_file = backup_file
+        self.attempts = attempts
+        self.error = error
+        self.duration = duration
+        self.diff = None
+
+    @property
+    def success(self):
+        """Check if the node backup was created."""
+        return self.backup_file is not None
+
+    def __str__(self):
+        """Represent the result as a report line."""
+        if self.success:
+            return "{}: backup created ({} attempt(s), {:.1f}s).".format(
+                self.hostname, self.attempts, self.duration)
+
+        return "{}: backup failed after {} attempt(s). Cause: {}".format(
+            self.hostname, self.attempts, self.error)
+
+    def __repr__(self):
+        """Represent the result."""
+        return self.__str__()
+
+
 class NodeBackupHandler:
     """Class for creating a backup for a node."""
 
-    def __init__(self, node_config, backup_config, delay_config, logger):
+    def __init__(self, node_config, backup_config, delay_config, logger, governor=None,
+                 history=None, gnupg_config=None):
         """
         Method to initiate the class.
 
         :param node_config: instance of NodeConfig class.
         :param backup_config: instance of BackupConfig class.
-        :param delay_config: instance of DelayConfig class.
+        :param delay_config: instance of DelayConfig class, deprecated and not used.
         :param logger: instance of CustomLogger class.
+        :param governor: instance of Governor limiting the sessions and traffic of the site.
+        :param history: instance of RunHistory to learn the timeouts from, None for the defaults.
+        :param gnupg_config: instance of GnupgConfig to encrypt the backup while it is captured.
         """
         self.node_config = node_config
         self.backup_config = backup_config
         self.delay_config = delay_config
+        self.governor = governor
+        self.history = history
+        self.gnupg_config = gnupg_config
 
         logger_script_reference = "{}_{}".format(SCRIPT_FILE, "network_device_backup")
 
         self.logger = CustomLogger(logger_script_reference, logger.log_root_path,
                                    logger.log_file_name, logger.log_level)
 
-    def create_node_backup(self, bkp_folder_path):
+    def get_timeouts(self, attempt=1):
+        """
+        Get the timeout of each phase of the session, learned from the run history of the node.
+
+        :param attempt: attempt number, starting at 1.
+        :return: dictionary of phase and timeout in seconds.
+        """
+        if self.history is None:
+            return dict(DEFAULT_TIMEOUTS)
+
+        return dict((phase, self.history.get_timeout(self.node_config.hostname, phase, default,
+                                                     attempt))
+                    for phase, default in DEFAULT_TIMEOUTS.items())
+
+    def create_node_backup(self, bkp_folder_path, bucket=None, attempt=1):
         """
         Creates a backup for a node an keeps it as a file.
 
+        The dialogue with the node (login, paging, config retrieval) is delegated to the driver
+        registered for the node type. With a GNUPG key, the configuration is also encrypted in the
+        same pass, to the encrypted folder of the backup folder.
+
         :param bkp_folder_path: path to the folder to store backup.
+        :param bucket: TokenBucket limiting the traffic with the node, None for no limit.
+        :param attempt: attempt number, starting at 1, used to extend the timeouts.
+        :return: path of the backup file.
+        :raise NodeBackupException: if the node type is not supported or the backup fails.
         """
+        driver = get_driver(self.node_config, self.backup_config.mask_volatile, bucket)
+        timeouts = self.get_timeouts(attempt)
+        durations = {}
+
         now = datetime.datetime.now()
         file_name = self.node_config.hostname.lower() + "-backup-" + now.strftime(TIME_FORMAT)
-        remote_host = self.node_config.host
 
-        # Creating a file
+        # The backup is written to a partial file, renamed once complete, so a failed attempt
+        # never leaves a truncated backup behind.
         backup_file_location = os.path.join(bkp_folder_path, file_name)
+        partial_file_location = backup_file_location + PARTIAL_FILE_SUFFIX
 
-        messages = []
+        messages = [SEPARATOR,
+                    "Equipment type: {} -> {} with IP: {}\n".format(self.node_config.type,
+                                                                    self.node_config.hostname,
+                                                                    self.node_config.ip),
+                    SEPARATOR]
 
         try:
-            backup_file = open(backup_file_location, "w+")
-            backup_file.close()
+            with span("write", STEP, node=self.node_config.hostname, attempt=attempt):
+                write_to_file(partial_file_location, messages)
         except Exception as file_exception:
-            self.logger.error("Backup file {} was not created due to {}.")\
-                .format(file_name, file_exception)
-
-        messages.append(SEPARATOR)
-        messages.append("Equipment type: {} -> {} with IP: {}\n"
-                        .format(self.node_config.type, self.node_config.hostname,
-                                self.node_config.ip))
-        messages.append(SEPARATOR)
+            raise NodeBackupException("Backup file {} was not created due to {}."
+                                      .format(file_name, file_exception))
 
-        # Start spawning
+        encryptor = None
         try:
-            child = pexpect.spawn("ssh {}".format(remote_host), timeout=TIME_OUT_1,
-                                  maxread=self.backup_config.buffer_size)
-
-        except pexpect.exceptions.TIMEOUT:
-            error_msg = "Connection timed out. Cannot connect to node: {}!"\
-                .format(self.node_config.hostname)
-            messages.append(error_msg)
-            raise Exception(error_msg)
-
-        child.expect("assword:")
-        try:
-            child.sendline(self.node_config.password)
-
-        except pexpect.exceptions.TIMEOUT:
-            raise Exception("Can't establish connection to {}. Check username and password"
-                            .format(self.node_config.hostname))
+            if self.gnupg_config is not None and self.gnupg_config.enabled:
+                encryptor = GpgEncryptor(get_encrypted_file(backup_file_location),
+                                         self.gnupg_config)
+                encryptor.write("".join(messages))
+                driver.copy_stream = encryptor
+
+            start_time = time.time()
+            child = driver.spawn(timeouts[CONNECT_PHASE], self.backup_config.buffer_size)
+
+            try:
+                durations[CONNECT_PHASE] = driver.login(child, timeouts[LOGIN_PHASE],
+                                                        timeouts[CONNECT_PHASE])
+                self.logger.info("Connected to {}".format(self.node_config.hostname))
+
+                driver.disable_pager(child, timeouts[LOGIN_PHASE])
+                durations[LOGIN_PHASE] = time.time() - start_time - durations[CONNECT_PHASE]
+
+                recorder = get_span_recorder()
+                recorder.record(CONNECT_PHASE, STEP, start_time, durations[CONNECT_PHASE],
+                                node=self.node_config.hostname, attempt=attempt)
+                recorder.record(LOGIN_PHASE, STEP, start_time + durations[CONNECT_PHASE],
+                                durations[LOGIN_PHASE], node=self.node_config.hostname,
+                                attempt=attempt)
+
+                # The configuration is normalized and appended to the file while received.
+                start_time = time.time()
+                with span(CAPTURE_PHASE, STEP, node=self.node_config.hostname, attempt=attempt):
+                    if self.node_config.retrieval == FILE_RETRIEVAL:
+                        driver.retrieve_config_file(child, partial_file_location,
+                                                    timeouts[CAPTURE_PHASE])
+                    else:
+                        driver.retrieve_config(child, partial_file_location,
+                                               timeouts[CAPTURE_PHASE])
+                durations[CAPTURE_PHASE] = time.time() - start_time
+
+                driver.logout(child)
+                self.logger.info("Closed the connection for {}".format(self.node_config.hostname))
+
+            finally:
+                if child.isalive():
+                    child.close(force=True)
+
+            with span("write", STEP, node=self.node_config.hostname, attempt=attempt):
+                if encryptor is not None:
+                    encryptor.close()
+
+                os.rename(partial_file_location, backup_file_location)
+
+        finally:
+            if encryptor is not None:
+                encryptor.abort()
+
+            if os.path.exists(partial_file_location):
+                os.remove(partial_file_location)
 
-        self.logger.info("Connected to {}".format(self.node_config.hostname))
+        self.logger.log_info("Created backup file for {}".format(self.node_config.hostname))
 
-        # Check node type as commands are different
-        if str(self.node_config.type) == "srx":
-            child.expect(self.node_config.eq_prompt, timeout=TIME_OUT_2)
-            child.sendline("show config | display set | no-more")
+        if self.history is not None:
+            durations[SIZE] = os.path.getsize(backup_file_location)
+            self.history.record(self.node_config.hostname, durations)
 
-            time.sleep(to_seconds(self.delay_config.max_delay))
+        return backup_file_location
 
-        # For connectivity switch
-        elif str(self.node_config.type) == "connectivitySwitch":
-            child.expect(self.node_config.eq_prompt, timeout=TIME_OUT_2)
-            child.sendline("disable clipaging")
+    def create_backup_in_session(self, bkp_folder_path, attempt=1):
+        """
+        Create the backup once a session is allowed in the site of the node by the governor.
 
-            child.expect('#')
-            child.sendline("show configuration")
+        :param bkp_folder_path: path to the folder to store backup.
+        :param attempt: attempt number, starting at 1.
+        :return: path of the backup file.
+        """
+        if self.governor is None:
+            return self.create_node_backup(bkp_folder_path, attempt=attempt)
 
-            time.sleep(to_seconds(self.delay_config.max_delay))
+        with self.governor.site_session(self.node_config) as bucket:
+            return self.create_node_backup(bkp_folder_path, bucket, attempt)
 
-        else:
-            messages.append("Equipment not supported!")
-            write_to_file(backup_file_location, messages)
-            return
+    def backup_node(self, bkp_folder_path):
+        """
+        Create the backup of the node, retrying with exponential backoff if it fails.
 
-        if str(self.node_config.type) == "srx":
-            child.expect('set')
-        else:
-            child.expect('#')
-        messages.append(child.buffer)
+        Any error (connection, timeout, unexpected output) is caught, so the failure of one node
+        does not stop the backup of the others.
 
-        write_to_file(backup_file_location, messages)
-        self.logger.log_info("Created backup file for {}".format(self.node_config.hostname))
-        child.send("exit")
-        self.logger.info("Closed the connection for {}".format(self.node_config.hostname))
+        :param bkp_folder_path: path to the folder to store backup.
+        :return: instance of NodeBackupResult.
+        """
+        start_time = time.time()
+        max_attempts = self.backup_config.retries + 1
+        result = NodeBackupResult(self.node_config.hostname)
+
+        for attempt in range(1, max_attempts + 1):
+            result.attempts = attempt
+            try:
+                result.backup_file = self.create_backup_in_session(bkp_folder_path, attempt)
+                result.error = None
+                break
+
+            except Exception as backup_exception:
+                result.error = backup_exception
+                self.logger.error("Attempt {} of {} to back up {} failed: {}"
+                                  .format(attempt, max_attempts, self.node_config.hostname,
+                                          backup_exception))
+
+                if attempt < max_attempts:
+                    delay = get_backoff_delay(attempt,
+                                              to_seconds(self.backup_config.retry_delay),
+                                              to_seconds(self.backup_config.max_retry_delay))
+                    self.logger.info("Retrying backup of {} in {:.1f}s."
+                                     .format(self.node_config.hostname, delay))
+                    with span("backoff", STEP, node=self.node_config.hostname):
+                        time.sleep(delay)
+
+        result.duration = time.time() - start_time
+
+        return result
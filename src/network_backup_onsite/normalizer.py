@@ -0,0 +1,184 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too many arguments
+# pylint: disable=C0103,R0913
+
+"""Module to normalize the configuration output captured from a node while it is received."""
+
+import re
+
+# CSI sequences (colors, cursor movement, line erasing), OSC sequences and other escapes.
+ANSI_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+CONTROL_CHARACTERS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+
+VOLATILE_MASK = "<masked>"
+
+
+class ConfigNormalizer(object):
+    """
+    File-like object normalizing the output of a node chunk by chunk.
+
+    Data is written as it is received (e.g. as pexpect logfile_read); only complete lines are
+    processed, so an escape sequence or a CRLF split between two chunks is handled correctly.
+    For each line:
+
+    1. Escape sequences and control characters are removed.
+    2. CRLF is converted to LF; text overwritten after a lone CR is discarded.
+    3. Trailing spaces are removed.
+    4. The echo of the commands sent and the node prompt lines are dropped.
+    5. Volatile values (timestamps, counters) are replaced by a mask, if requested.
+    """
+
+    def __init__(self, output, prompt_re=None, echo_lines=(), volatile_patterns=(),
+                 mask_volatile=False):
+        """
+        Initialize the normalizer.
+
+        :param output: file object receiving the normalized lines.
+        :param prompt_re: compiled expression of the node prompt.
+        :param echo_lines: commands whose echo must be dropped before the output.
+        :param volatile_patterns: expressions of volatile values; group 1, or the whole match if
+        the expression has no group, is masked.
+        :param mask_volatile: true to mask the volatile values.
+        """
+        self.output = output
+        self.prompt_re = prompt_re
+        # The prompt must take the whole line, not end a line of the configuration.
+        self._line_prompt_re = re.compile("(?:{})\\Z".format(prompt_re.pattern), prompt_re.flags) \
+            if prompt_re is not None else None
+        self.volatile_res = [re.compile(pattern) for pattern in volatile_patterns] \
+            if mask_volatile else []
+
+        self._echo_lines = [echo_line.strip() for echo_line in echo_lines if echo_line]
+        self._partial = ""
+
+        self.lines_written = 0
+        self.bytes_written = 0
+
+    def write(self, data):
+        """
+        Receive a chunk of output; the complete lines are normalized and written.
+
+        :param data: chunk of output.
+        """
+        if not data:
+            return
+
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+
+        normalized = []
+        for line in lines:
+            line = self.normalize_line(line)
+            if line is not None:
+                normalized.append(line + "\n")
+
+        self._write_lines(normalized)
+
+    def flush(self):
+        """Flush the output file."""
+        self.output.flush()
+
+    def close(self):
+        """Process the last line, which is usually the prompt, and flush the output."""
+        if self._partial:
+            line = self.normalize_line(self._partial)
+            self._partial = ""
+            if line is not None:
+                self._write_lines([line + "\n"])
+
+        self.flush()
+
+    def _write_lines(self, lines):
+        """
+        Write the normalized lines at once.
+
+        :param lines: list of lines, with their line ending.
+        """
+        if not lines:
+            return
+
+        data = "".join(lines)
+        self.output.write(data)
+
+        self.lines_written += len(lines)
+        self.bytes_written += len(data)
+
+    def normalize_line(self, line):
+        """
+        Normalize one line of output.
+
+        :param line: line without its LF.
+        :return: normalized line, or None if the line must be dropped.
+        """
+        line = ANSI_ESCAPE_RE.sub("", line.rstrip("\r"))
+
+        # A lone CR moves the cursor back; only the text written after it is visible.
+        if "\r" in line:
+            line = line.rsplit("\r", 1)[1]
+
+        line = CONTROL_CHARACTERS_RE.sub("", line).rstrip()
+
+        if self._is_echo(line) or self._is_prompt(line):
+            return None
+
+        # The echo is only expected before the output of the commands.
+        if line:
+            self._echo_lines = []
+
+        for volatile_re in self.volatile_res:
+            line = volatile_re.sub(self._mask, line)
+
+        return line
+
+    def _is_echo(self, line):
+        """
+        Check if the line is the echo of a command sent, with or without the prompt before it.
+
+        :param line: normalized line.
+        :return: true if it is the echo of a command.
+        """
+        for echo_line in self._echo_lines:
+            if line.endswith(echo_line) and \
+                    (line == echo_line or self._is_prompt(line[:-len(echo_line)].rstrip())):
+                return True
+
+        return False
+
+    def _is_prompt(self, line):
+        """
+        Check if the line contains only the node prompt.
+
+        :param line: normalized line.
+        :return: true if the prompt expression matches the whole line.
+        """
+        if self._line_prompt_re is None or not line:
+            return False
+
+        return self._line_prompt_re.match(line) is not None
+
+    @staticmethod
+    def _mask(match):
+        """
+        Mask the volatile part of a match.
+
+        :param match: match object of a volatile expression.
+        :return: matched text with the volatile value replaced by the mask.
+        """
+        if not match.re.groups:
+            return VOLATILE_MASK
+
+        text = match.group(0)
+        start = match.start(1) - match.start(0)
+        end = match.end(1) - match.start(0)
+
+        return text[:start] + VOLATILE_MASK + text[end:]
@@ -0,0 +1,214 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# For too many instance attributes
+# pylint: disable=C0103,R0903,R0902
+
+"""Module to predict the duration of a backup run from the run history, without any session."""
+
+import datetime
+import heapq
+
+from network_backup_onsite.governor import Governor
+from network_backup_onsite.run_history import PHASES, SIZE, get_percentile
+
+# The typical duration and size of a node are the median of its history.
+ESTIMATE_PERCENTILE = 50
+
+
+def format_duration(seconds):
+    """
+    Format a duration as hours, minutes and seconds.
+
+    :param seconds: duration in seconds.
+    :return: duration as H:MM:SS.
+    """
+    return str(datetime.timedelta(seconds=int(round(seconds))))
+
+
+class NodeEstimate(object):
+    """Predicted backup of one node: duration, size and place in the simulated run."""
+
+    def __init__(self, hostname, site, duration, size, known=True):
+        """
+        Initialize the estimate.
+
+        :param hostname: node name.
+        :param site: site name of the node.
+        :param duration: seconds of the session with the node.
+        :param size: bytes of the backup file.
+        :param known: false if the node has no history and the values are the fleet median.
+        """
+        self.hostname = hostname
+        self.site = site
+        self.duration = duration
+        self.size = size
+        self.known = known
+
+        self.start = 0.0
+        self.end = 0.0
+        self.blocker = None
+
+    def __str__(self):
+        """Represent the estimate as a report line."""
+        return "{}  {} - {}  site {}{}".format(self.hostname, format_duration(self.start),
+                                               format_duration(self.end), self.site,
+                                               "" if self.known else "  (no history)")
+
+    def __repr__(self):
+        """Represent the estimate."""
+        return self.__str__()
+
+
+class RunPlan(object):
+    """Result of the simulation of a backup run."""
+
+    def __init__(self, estimates, max_workers, ombs_rate):
+        """
+        Initialize the plan from the simulated estimates.
+
+        :param estimates: list of NodeEstimate, with their start and end times.
+        :param max_workers: number of nodes captured in parallel.
+        :param ombs_rate: max bytes per second sent to OMBS, 0 for no limit.
+        """
+        self.estimates = estimates
+        self.max_workers = max_workers
+        self.ombs_rate = ombs_rate
+
+        self.capture_time = max([estimate.end for estimate in estimates] + [0])
+        self.total_size = sum(estimate.size for estimate in estimates)
+        self.transfer_time = float(self.total_size) / ombs_rate if ombs_rate else 0.0
+
+    @property
+    def wall_time(self):
+        """Get the predicted time of the captures followed by the transfer to OMBS."""
+        return self.capture_time + self.transfer_time
+
+    def get_critical_path(self):
+        """
+        Get the chain of nodes which determines the end of the captures.
+
+        Starting from the last node to finish, each node is preceded by the node whose end freed
+        the worker or site session it waited for.
+
+        :return: list of NodeEstimate, in run order.
+        """
+        if not self.estimates:
+            return []
+
+        path = []
+        estimate = max(self.estimates, key=lambda node_estimate: node_estimate.end)
+        while estimate is not None:
+            path.append(estimate)
+            estimate = estimate.blocker
+
+        return path[::-1]
+
+    def get_report(self):
+        """
+        Get the plan as report lines.
+
+        :return: list of lines.
+        """
+        unknown = len([estimate for estimate in self.estimates if not estimate.known])
+        transfer = "{} at {} B/s".format(format_duration(self.transfer_time), self.ombs_rate) \
+            if self.ombs_rate else "not limited, not estimated"
+
+        lines = ["Plan of the backup of {} node(s) with {} worker(s), {} without history."
+                 .format(len(self.estimates), self.max_workers, unknown),
+                 "Captures: {}".format(format_duration(self.capture_time)),
+                 "Bytes to transfer: {}".format(self.total_size),
+                 "Transfer to OMBS: {}".format(transfer),
+                 "Predicted wall time: {}".format(format_duration(self.wall_time)),
+                 "Critical path:"]
+        lines.extend("  {}".format(estimate) for estimate in self.get_critical_path())
+
+        return lines
+
+
+def get_node_estimate(node_config, history):
+    """
+    Estimate the session duration and backup size of a node from its history.
+
+    :param node_config: instance of NodeConfig.
+    :param history: instance of RunHistory.
+    :return: instance of NodeEstimate, or None if the node has no history.
+    """
+    durations = [history.get_durations(node_config.hostname, phase) for phase in PHASES]
+    sizes = history.get_durations(node_config.hostname, SIZE)
+
+    if not all(durations) or not sizes:
+        return None
+
+    return NodeEstimate(node_config.hostname, Governor.get_site(node_config),
+                        sum(get_percentile(phase_durations, ESTIMATE_PERCENTILE)
+                            for phase_durations in durations),
+                        get_percentile(sizes, ESTIMATE_PERCENTILE))
+
+
+def plan_run(node_config_list, history, governor_config):
+    """
+    Simulate a backup run with the worker, session and bandwidth limits of the governor.
+
+    The nodes are started in order by the first free worker, once a session is free in their
+    site, as the worker pool does. The sessions of a site share its bandwidth, so a node ends no
+    earlier than the site could transfer its backup after the previous ones. Nodes without history
+    are estimated with the median of the other nodes.
+
+    :param node_config_list: list of NodeConfig, in run order.
+    :param history: instance of RunHistory.
+    :param governor_config: instance of GovernorConfig.
+    :return: instance of RunPlan.
+    """
+    estimates = [get_node_estimate(node_config, history) for node_config in node_config_list]
+    known = [estimate for estimate in estimates if estimate is not None]
+
+    default_duration = get_percentile([estimate.duration for estimate in known],
+                                      ESTIMATE_PERCENTILE) if known else 0.0
+    default_size = get_percentile([estimate.size for estimate in known],
+                                  ESTIMATE_PERCENTILE) if known else 0
+
+    for index, node_config in enumerate(node_config_list):
+        if estimates[index] is None:
+            estimates[index] = NodeEstimate(node_config.hostname, Governor.get_site(node_config),
+                                            default_duration, default_size, known=False)
+
+    # Heap entries are (free time, run order, node which frees it), so ties keep the run order.
+    max_workers = min(governor_config.max_workers, len(node_config_list)) or 1
+    workers = [(0.0, -1, None)] * max_workers
+    site_sessions = {}
+    site_transfer_end = {}
+
+    for order, estimate in enumerate(estimates):
+        if estimate.site not in site_sessions:
+            site_sessions[estimate.site] = \
+                [(0.0, -1, None)] * governor_config.get_site_sessions(estimate.site)
+            site_transfer_end[estimate.site] = 0.0
+
+        worker_free, _, worker_blocker = heapq.heappop(workers)
+        session_free, _, session_blocker = heapq.heappop(site_sessions[estimate.site])
+
+        estimate.start = max(worker_free, session_free)
+        estimate.blocker = worker_blocker if worker_free >= session_free else session_blocker
+        estimate.end = estimate.start + estimate.duration
+
+        site_rate = governor_config.get_site_rate(estimate.site)
+        if site_rate:
+            site_transfer_end[estimate.site] = max(site_transfer_end[estimate.site],
+                                                   estimate.start) + \
+                float(estimate.size) / site_rate
+            estimate.end = max(estimate.end, site_transfer_end[estimate.site])
+
+        heapq.heappush(workers, (estimate.end, order, estimate))
+        heapq.heappush(site_sessions[estimate.site], (estimate.end, order, estimate))
+
+    return RunPlan(estimates, max_workers, governor_config.ombs_rate)
@@ -0,0 +1,75 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to run the CPU-bound stages on the backup files in a pool of processes."""
+
+import multiprocessing
+import threading
+
+# Wait for the results with a timeout, so an interrupt is not blocked by the wait.
+RESULT_TIMEOUT = 24 * 3600
+
+
+class PostProcessor(object):
+    """
+    Pool of processes running the CPU-bound stages after the capture, e.g. the content checks and
+    the diffs, out of the capture process and its global interpreter lock.
+
+    The stages get file paths and return small results: the backups are read from the files by
+    the workers, never pickled. The pool is started before the capture threads, as a process
+    forked while other threads hold locks could not use them. Until it is started, and with one
+    worker, the stages run in the calling thread.
+    """
+
+    def __init__(self, workers):
+        """
+        Initialize the post processor.
+
+        :param workers: number of processes, 0 for one per core.
+        """
+        self.workers = workers if workers > 0 else multiprocessing.cpu_count()
+
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def start(self):
+        """Start the pool of processes, if more than one worker is configured."""
+        with self._lock:
+            if self._pool is None and self.workers > 1:
+                self._pool = multiprocessing.Pool(self.workers)
+
+    def run(self, function, *args):
+        """
+        Run a stage in the pool and wait for its result.
+
+        :param function: module level function, so it can be sent to the workers.
+        :param args: arguments of the function, e.g. file paths.
+        :return: result of the function.
+        :raise Exception: the exception raised by the function.
+        """
+        with self._lock:
+            pool = self._pool
+
+        if pool is None:
+            return function(*args)
+
+        return pool.apply_async(function, args).get(RESULT_TIMEOUT)
+
+    def close(self):
+        """Stop the pool once the running stages end."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+
+        if pool is not None:
+            pool.close()
+            pool.join()
@@ -0,0 +1,421 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to run the child processes and enforce their deadlines from one event loop."""
+
+import errno
+import fcntl
+import os
+import select
+from subprocess import PIPE, Popen
+import threading
+import time
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Interval to check the exit of a process whose output is already closed.
+REAP_INTERVAL = 0.05
+
+POLL_IN = select.POLLIN | select.POLLPRI
+POLL_OUT = select.POLLOUT
+POLL_CLOSED = select.POLLHUP | select.POLLERR | select.POLLNVAL
+
+
+def set_non_blocking(fd):
+    """
+    Set a file descriptor in non blocking mode.
+
+    :param fd: file descriptor.
+    """
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+
+class ProcessResult(object):
+    """Outcome of a child process."""
+
+    def __init__(self, returncode, stdout, stderr, duration, timed_out):
+        """
+        Initialize the result.
+
+        :param returncode: exit status of the process, negative if killed by a signal.
+        :param stdout: standard output of the process.
+        :param stderr: error output of the process.
+        :param duration: time between the start and the exit of the process in seconds.
+        :param timed_out: true if the process was killed at its deadline.
+        """
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def succeeded(self):
+        """Check if the process ended in time with exit status 0."""
+        return self.returncode == 0 and not self.timed_out
+
+    def __str__(self):
+        """Represent the result as string."""
+        return "({}, {:.3f}, {})".format(self.returncode, self.duration, self.timed_out)
+
+    def __repr__(self):
+        """Represent the result."""
+        return self.__str__()
+
+
+class ProcessJob(object):
+    """
+    Child process followed by the event loop of a ProcessManager.
+
+    A watched job is a process whose pipes are streamed by its caller, e.g. gpg: the loop only
+    kills it at its deadline, until the caller releases it once its output is read.
+    """
+
+    def __init__(self, process, input_data, timeout, watched=False):
+        """
+        Initialize the job.
+
+        :param process: Popen object with its streams piped.
+        :param input_data: data written to the standard input, which is then closed.
+        :param timeout: time allowed to the process in seconds, None for no deadline.
+        :param watched: true if the pipes and the exit of the process are left to the caller.
+        """
+        self.process = process
+        self.start_time = time.time()
+        self.deadline = self.start_time + timeout if timeout is not None else None
+        self.watched = watched
+        self.timed_out = False
+        self.released = False
+        self.result = None
+        self.on_release = None
+
+        self._input = input_data or ""
+        self._output = {}
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def get_streams(self):
+        """
+        Get the pipes of the process followed by the loop.
+
+        :return: list of tuple of file object and true if it is written.
+        """
+        if self.watched:
+            return []
+
+        streams = [(stream, False) for stream in (self.process.stdout, self.process.stderr)
+                   if stream is not None]
+        if self.process.stdin is not None:
+            streams.append((self.process.stdin, True))
+
+        return streams
+
+    def feed(self, fd):
+        """
+        Write the next chunk of the input to the process.
+
+        :param fd: file descriptor of the standard input.
+        :return: true once the whole input is written or the process closed its input.
+        """
+        try:
+            written = os.write(fd, self._input[:READ_CHUNK_SIZE])
+        except OSError as write_error:
+            if write_error.errno == errno.EAGAIN:
+                return False
+            if write_error.errno != errno.EPIPE:
+                raise
+            written = len(self._input)
+
+        self._input = self._input[written:]
+
+        return not self._input
+
+    def collect(self, fd):
+        """
+        Read the available output of the process.
+
+        :param fd: file descriptor of the standard or error output.
+        :return: true once the output is closed.
+        """
+        try:
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+        except OSError as read_error:
+            if read_error.errno == errno.EAGAIN:
+                return False
+            raise
+
+        self._output.setdefault(fd, []).append(chunk)
+
+        return not chunk
+
+    def kill(self):
+        """Kill the process at its deadline, unless its caller already released it."""
+        with self._lock:
+            if self.released:
+                return
+
+            self.timed_out = True
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+
+    def release(self):
+        """
+        Stop watching the process, once its caller read its output and before it waits for its
+        exit, so the loop never kills a process reaped by the caller.
+
+        :return: true if the process was killed at its deadline.
+        """
+        with self._lock:
+            self.released = True
+
+        if self.on_release is not None:
+            self.on_release()
+
+        return self.timed_out
+
+    def finish(self):
+        """Build the result of the exited process and release the callers waiting for it."""
+        def get_output(stream):
+            """Get the output read from a stream."""
+            if stream is None:
+                return None
+            return "".join(self._output.get(stream.fileno(), []))
+
+        if self.watched:
+            self.result = ProcessResult(None, None, None, time.time() - self.start_time,
+                                        self.timed_out)
+            self._done.set()
+            return
+
+        self.result = ProcessResult(self.process.returncode, get_output(self.process.stdout),
+                                    get_output(self.process.stderr),
+                                    time.time() - self.start_time, self.timed_out)
+
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            if stream is not None:
+                stream.close()
+
+        self._done.set()
+
+    def wait(self):
+        """
+        Wait for the end of the process.
+
+        :return: instance of ProcessResult.
+        """
+        while not self._done.wait(1):
+            pass
+
+        return self.result
+
+
+class ProcessManager(object):
+    """
+    Runner of child processes which follows all of them from one event loop thread.
+
+    The loop polls the pipes of every process, writing its input and reading its outputs as they
+    are ready so none of them can fill and block the process, and kills each process reaching its
+    deadline. A caller waits for its process without any thread of its own.
+    """
+
+    def __init__(self):
+        """Initialize the manager, the loop is started by the first process."""
+        self._lock = threading.Lock()
+        self._pending = []
+        self._thread = None
+        self._wake_read, self._wake_write = os.pipe()
+        set_non_blocking(self._wake_read)
+        set_non_blocking(self._wake_write)
+
+    def start(self, args, input_data=None, timeout=None, **popen_args):
+        """
+        Start a process followed by the loop.
+
+        :param args: command and its arguments.
+        :param input_data: data written to the standard input of the process.
+        :param timeout: time allowed to the process in seconds, None for no deadline.
+        :param popen_args: other arguments of Popen, e.g. env.
+        :return: instance of ProcessJob.
+        :raise OSError: if the command can't be started.
+        """
+        process = Popen(args, stdin=PIPE, stdout=PIPE, stderr=PIPE, close_fds=True,
+                        **popen_args)
+
+        return self._add(ProcessJob(process, input_data, timeout))
+
+    def watch(self, process, timeout):
+        """
+        Enforce the deadline of a process whose pipes are streamed by the caller.
+
+        The caller releases the job once it read the output, then waits for the process.
+
+        :param process: Popen object.
+        :param timeout: time allowed to the process in seconds.
+        :return: instance of ProcessJob.
+        """
+        job = ProcessJob(process, None, timeout, watched=True)
+        job.on_release = self._wake
+
+        return self._add(job)
+
+    def _add(self, job):
+        """
+        Follow a job from the loop, starting the loop if needed.
+
+        :param job: instance of ProcessJob.
+        :return: the job.
+        """
+        with self._lock:
+            self._pending.append(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="ProcessManager")
+                self._thread.daemon = True
+                self._thread.start()
+
+        self._wake()
+
+        return job
+
+    def run(self, args, input_data=None, timeout=None, **popen_args):
+        """
+        Run a process until it exits or reaches its deadline.
+
+        :param args: command and its arguments.
+        :param input_data: data written to the standard input of the process.
+        :param timeout: time allowed to the process in seconds, None for no deadline.
+        :param popen_args: other arguments of Popen, e.g. env.
+        :return: instance of ProcessResult.
+        :raise OSError: if the command can't be started.
+        """
+        return self.start(args, input_data, timeout, **popen_args).wait()
+
+    def _wake(self):
+        """Interrupt the poll of the loop so it follows the new processes."""
+        try:
+            os.write(self._wake_write, "x")
+        except OSError as write_error:
+            if write_error.errno != errno.EAGAIN:
+                raise
+
+    def _loop(self):
+        """Poll the pipes of the processes until none is left."""
+        poller = select.poll()
+        poller.register(self._wake_read, POLL_IN)
+        streams = {}
+        jobs = []
+
+        while True:
+            with self._lock:
+                new_jobs, self._pending = self._pending, []
+                if not new_jobs and not jobs:
+                    self._thread = None
+                    return
+
+            for job in new_jobs:
+                jobs.append(job)
+                for stream, is_input in job.get_streams():
+                    set_non_blocking(stream.fileno())
+                    streams[stream.fileno()] = (job, is_input)
+                    poller.register(stream.fileno(), POLL_OUT if is_input else POLL_IN)
+
+            for fd, event in poller.poll(self._get_poll_timeout(jobs, streams)):
+                if fd == self._wake_read:
+                    os.read(self._wake_read, READ_CHUNK_SIZE)
+                    continue
+
+                job, is_input = streams[fd]
+                if is_input:
+                    closed = event & POLL_CLOSED or job.feed(fd)
+                    if closed:
+                        job.process.stdin.close()
+                else:
+                    closed = job.collect(fd) if event & POLL_IN else event & POLL_CLOSED
+
+                if closed:
+                    poller.unregister(fd)
+                    del streams[fd]
+
+            now = time.time()
+            for job in list(jobs):
+                if job.deadline is not None and now >= job.deadline and not job.timed_out:
+                    job.kill()
+
+                if self._is_finished(job, streams):
+                    for fd in [fd for fd, (owner, _) in streams.items() if owner is job]:
+                        poller.unregister(fd)
+                        del streams[fd]
+                    jobs.remove(job)
+                    job.finish()
+
+    @staticmethod
+    def _is_finished(job, streams):
+        """
+        Check if a process exited and its outputs are read. A killed process is finished as soon
+        as it exits, as a child it started may still hold its outputs.
+
+        :param job: instance of ProcessJob.
+        :param streams: dictionary of the pipes followed by the loop.
+        :return: true if the result of the process can be built.
+        """
+        if job.watched:
+            return job.released
+
+        if job.process.poll() is None:
+            return False
+
+        return job.timed_out or not any(owner is job and not is_input
+                                        for owner, is_input in streams.values())
+
+    @staticmethod
+    def _get_poll_timeout(jobs, streams):
+        """
+        Get the time to wait for the pipes, up to the next deadline.
+
+        :param jobs: processes followed by the loop.
+        :param streams: dictionary of the pipes followed by the loop.
+        :return: timeout of poll in milliseconds, None to wait for the pipes only.
+        """
+        timeouts = []
+        for job in jobs:
+            if job.watched:
+                if job.deadline is not None and not job.timed_out:
+                    timeouts.append(max(job.deadline - time.time(), 0))
+            elif job.timed_out or not any(owner is job for owner, _ in streams.values()):
+                timeouts.append(REAP_INTERVAL)
+            elif job.deadline is not None:
+                timeouts.append(max(job.deadline - time.time(), 0))
+
+        return int(min(timeouts) * 1000) + 1 if timeouts else None
+
+
+_process_manager = None
+_process_manager_lock = threading.Lock()
+
+
+def get_process_manager():
+    """
+    Get the process manager shared by the whole script.
+
+    :return: instance of ProcessManager.
+    """
+    global _process_manager  # pylint: disable=W0603
+
+    with _process_manager_lock:
+        if _process_manager is None:
+            _process_manager = ProcessManager()
+
+    return _process_manager
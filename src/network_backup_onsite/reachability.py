@@ -0,0 +1,166 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to cache the reachability of the nodes across runs, so fresh results are not probed."""
+
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+import time
+
+from network_backup_onsite.run_lock import file_update_lock
+from network_backup_onsite.utils import is_host_accessible, read_json_file, to_seconds, \
+    write_json_file
+
+REACHABILITY_FILE_NAME = ".ntwk_bkp_onsite_reachability.json"
+
+LAST_UP = "last_up"
+LAST_DOWN = "last_down"
+LATENCY = "latency"
+
+PROBE_WORKERS = 16
+
+
+class ReachabilityCache(object):
+    """
+    Last time each node answered a ping, last time it did not and the latency of its last answer.
+
+    A node seen up within TTL is up without a new ping. The other nodes are probed, in parallel:
+    a node seen down is pinged again too, as a node reported down fails the validation of the
+    run. The cache is kept in a json file in the backup root folder, shared by the runs, and
+    rewritten atomically after the probes.
+    """
+
+    def __init__(self, backup_path, reachability_config):
+        """
+        Load the cache of a backup root folder.
+
+        :param backup_path: root folder of the backup folders.
+        :param reachability_config: instance of ReachabilityConfig.
+        """
+        self.path = os.path.join(backup_path, REACHABILITY_FILE_NAME)
+        self.ttl = to_seconds(reachability_config.ttl)
+
+        self._lock = threading.Lock()
+
+        # Dictionary of node IP and dictionary of LAST_UP, LAST_DOWN and LATENCY.
+        self._entries = read_json_file(self.path)
+
+    def get_state(self, ip, now=None):
+        """
+        Get the cached reachability of a node.
+
+        :param ip: IP of the node.
+        :param now: current time, the time of the call by default.
+        :return: True if seen up within TTL and not seen down since, None otherwise.
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            entry = self._entries.get(ip, {})
+
+        last_up = entry.get(LAST_UP, 0)
+        last_down = entry.get(LAST_DOWN, 0)
+
+        if last_up >= last_down and now - last_up < self.ttl:
+            return True
+
+        return None
+
+    def get_latency(self, ip):
+        """
+        Get the latency of the last ping answered by a node.
+
+        :param ip: IP of the node.
+        :return: latency in seconds, None if it never answered.
+        """
+        with self._lock:
+            return self._entries.get(ip, {}).get(LATENCY)
+
+    def record(self, ip, accessible, latency=None, now=None):
+        """
+        Record the result of a probe.
+
+        :param ip: IP of the node.
+        :param accessible: true if the node answered.
+        :param latency: time to the answer in seconds.
+        :param now: time of the probe, the time of the call by default.
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            entry = self._entries.setdefault(ip, {})
+            if accessible:
+                entry[LAST_UP] = now
+                entry[LATENCY] = latency
+            else:
+                entry[LAST_DOWN] = now
+
+    def probe(self, ip):
+        """
+        Ping a node and record the result.
+
+        :param ip: IP of the node.
+        :return: true if the node answered.
+        """
+        start_time = time.time()
+        accessible = is_host_accessible(ip)
+        self.record(ip, accessible, time.time() - start_time)
+
+        return accessible
+
+    def check_hosts(self, ips):
+        """
+        Get the reachability of nodes, probing the ones not seen up recently, and save the cache.
+
+        :param ips: IPs of the nodes.
+        :return: dictionary of IP and true if the node is accessible.
+        """
+        states = dict((ip, self.get_state(ip)) for ip in set(ips))
+        stale_ips = [ip for ip, state in states.items() if state is None]
+
+        if len(stale_ips) == 1:
+            states[stale_ips[0]] = self.probe(stale_ips[0])
+        elif stale_ips:
+            pool = ThreadPool(min(PROBE_WORKERS, len(stale_ips)))
+            try:
+                states.update(zip(stale_ips, pool.map(self.probe, stale_ips, chunksize=1)))
+            finally:
+                pool.close()
+                pool.join()
+
+        if stale_ips:
+            self.save()
+
+        return states
+
+    def save(self):
+        """
+        Write the cache to its file, if the backup root folder exists, merged with the probes
+        recorded meanwhile by another run sharing the folder.
+        """
+        if not os.path.isdir(os.path.dirname(self.path)):
+            return
+
+        with self._lock, file_update_lock(self.path):
+            entries = read_json_file(self.path)
+            for ip, entry in self._entries.items():
+                saved_entry = entries.setdefault(ip, {})
+                if entry.get(LAST_UP, 0) > saved_entry.get(LAST_UP, 0):
+                    saved_entry[LAST_UP] = entry[LAST_UP]
+                    saved_entry[LATENCY] = entry.get(LATENCY)
+                if entry.get(LAST_DOWN, 0) > saved_entry.get(LAST_DOWN, 0):
+                    saved_entry[LAST_DOWN] = entry[LAST_DOWN]
+
+            self._entries = entries
+            write_json_file(self.path, self._entries)
@@ -0,0 +1,163 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to run a batch of commands on a remote server in one ssh session."""
+
+import uuid
+
+from network_backup_onsite.process_manager import get_process_manager
+from network_backup_onsite.utils import LOG_LEVEL, TIMEOUT
+
+REMOTE_SHELL = ["bash", "-s"]
+MARKER_PREFIX = "__NTWK_BKP_"
+
+
+class CommandResult(object):
+    """Outcome of one command of a remote session."""
+
+    def __init__(self, command, returncode=None, stdout="", stderr=""):
+        """
+        Initialize the result.
+
+        :param command: shell command.
+        :param returncode: exit status of the command, None if it did not run.
+        :param stdout: standard output of the command.
+        :param stderr: error output of the command.
+        """
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+    @property
+    def succeeded(self):
+        """Check if the command ran with exit status 0."""
+        return self.returncode == 0
+
+    def __str__(self):
+        """Represent the result as string."""
+        return "({}, {})".format(self.command, self.returncode)
+
+    def __repr__(self):
+        """Represent the result."""
+        return self.__str__()
+
+
+def split_output(output, marker):
+    """
+    Split the output of a session into the output of each command.
+
+    Each command is followed by a line with the marker, its index and, on the standard output,
+    its exit status. The line starts with a newline which is not part of the command output.
+
+    :param output: standard or error output of the session.
+    :param marker: marker of the session.
+    :return: dictionary of command index and tuple of output and list of the marker fields.
+    """
+    parts = output.split("\n" + marker + " ")
+    outputs = {}
+
+    text = parts[0]
+    for trailer in parts[1:]:
+        line, _, rest = trailer.partition("\n")
+        fields = line.split()
+        outputs[int(fields[0])] = (text, fields[1:])
+        text = rest
+
+    return outputs
+
+
+class RemoteSession(object):
+    """
+    Batch of shell commands run by one remote bash over one ssh connection.
+
+    The commands are sent as one script. A marker line written to both outputs after each
+    command frames its standard output, error output and exit status, so the batch pays one
+    process spawn and one ssh handshake instead of one per command.
+    """
+
+    def __init__(self, host, ssh_options=None, timeout=TIMEOUT, stop_on_error=False):
+        """
+        Initialize the session.
+
+        :param host: remote host, optionally with the user, e.g. user@host.
+        :param ssh_options: other ssh options, e.g. the key file.
+        :param timeout: time allowed to the whole batch in seconds.
+        :param stop_on_error: skip the next commands once a command fails.
+        """
+        self.host = host
+        self.ssh_options = list(ssh_options or [])
+        self.timeout = timeout
+        self.stop_on_error = stop_on_error
+        self.commands = []
+        self.marker = MARKER_PREFIX + uuid.uuid4().hex
+
+    def add(self, command):
+        """
+        Add a command to the batch. The command reads nothing from the standard input.
+
+        :param command: shell command.
+        :return: index of the command in the results.
+        """
+        self.commands.append(command)
+
+        return len(self.commands) - 1
+
+    def get_script(self, commands):
+        """
+        Get the script sent to the remote bash.
+
+        :param commands: list of shell commands.
+        :return: script of the commands with their framing.
+        """
+        lines = []
+        for index, command in enumerate(commands):
+            # The subshell keeps an exit or a cd of a command from affecting the next ones.
+            lines.append("( {}\n) </dev/null".format(command))
+            lines.append("__status=$?")
+            lines.append("printf '\\n%s %d %d\\n' {} {} $__status".format(self.marker, index))
+            lines.append("printf '\\n%s %d\\n' {} {} >&2".format(self.marker, index))
+            if self.stop_on_error:
+                lines.append("[ $__status -eq 0 ] || exit $__status")
+
+        return "\n".join(lines) + "\n"
+
+    def run(self):
+        """
+        Run the batch and clear it.
+
+        :return: tuple of list of CommandResult, in the order of the commands, and the
+                 ProcessResult of the session. The commands which did not run have no status.
+        """
+        commands, self.commands = self.commands, []
+        if not commands:
+            return [], None
+
+        session = get_process_manager().run(
+            ["ssh", "-o", LOG_LEVEL] + self.ssh_options + [self.host] + REMOTE_SHELL,
+            self.get_script(commands), self.timeout)
+
+        stdouts = split_output(session.stdout, self.marker)
+        stderrs = split_output(session.stderr, self.marker)
+
+        results = []
+        for index, command in enumerate(commands):
+            result = CommandResult(command)
+            if index in stdouts:
+                result.stdout, fields = stdouts[index]
+                result.returncode = int(fields[0])
+                result.stderr = stderrs.get(index, ("", []))[0]
+            results.append(result)
+
+        return results, session
@@ -0,0 +1,426 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too few public methods
+# pylint: disable=C0103,R0903
+
+"""Module to retrieve the backup of a node from the onsite store or from the backup targets."""
+
+import os
+import pipes
+from subprocess import PIPE, Popen
+import tempfile
+
+from network_backup_onsite.archive import ARCHIVE_SUFFIX, BackupArchive
+from network_backup_onsite.baseline import BACKUP_FILE_SEPARATOR
+from network_backup_onsite.encryptor import ENCRYPTED_FILE_SUFFIX, ENCRYPTED_FOLDER_NAME, \
+    READ_CHUNK_SIZE, GpgDecryptor
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+from network_backup_onsite.process_manager import get_process_manager
+from network_backup_onsite.remote_session import RemoteSession
+from network_backup_onsite.utils import TIMEOUT
+
+LATEST = "latest"
+
+# Time allowed to stream one file from a remote target.
+COPY_TIMEOUT = 3600
+
+# Bytes read at once from the end of a remote archive, enough for the index of most runs.
+TAIL_SIZE = 64 * 1024
+
+
+def get_backup_name(node, date):
+    """
+    Get the name of the backup file of a node.
+
+    :param node: node name.
+    :param date: date of the backup.
+    :return: file name.
+    """
+    return "{}{}{}".format(node.lower(), BACKUP_FILE_SEPARATOR, date)
+
+
+def copy_stream(source, output):
+    """
+    Copy a stream to another one, one chunk at a time.
+
+    :param source: file-like object to read.
+    :param output: file-like object to write.
+    """
+    for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), ""):
+        output.write(chunk)
+
+
+class LocalStore(object):
+    """Backup folder on a local file system: the onsite store or a local target."""
+
+    def __init__(self, folder):
+        """
+        Initialize the store.
+
+        :param folder: backup folder of the run.
+        """
+        self.folder = folder
+
+    def list_files(self):
+        """
+        List the files of the backup folder, with the encrypted ones.
+
+        :return: dictionary of file name and path.
+        """
+        files = {}
+        for folder in (self.folder, os.path.join(self.folder, ENCRYPTED_FOLDER_NAME)):
+            if os.path.isdir(folder):
+                files.update((file_name, os.path.join(folder, file_name))
+                             for file_name in os.listdir(folder))
+
+        return files
+
+    def copy_file(self, path, output):
+        """
+        Copy a file of the store to a stream.
+
+        :param path: path of the file, from list_files.
+        :param output: file-like object.
+        """
+        with open(path, "rb") as source:
+            copy_stream(source, output)
+
+    def open_archive(self, path):
+        """
+        Open an archive of the store.
+
+        :param path: path of the archive, from list_files.
+        :return: instance of BackupArchive.
+        """
+        return BackupArchive(path)
+
+    def extract(self, archive, name, output):
+        """
+        Copy one backup file of an archive of the store to a stream.
+
+        :param archive: instance of BackupArchive, from open_archive.
+        :param name: name of the backup file.
+        :param output: file-like object.
+        """
+        archive.extract(name, output)
+
+    def __str__(self):
+        """Represent the store."""
+        return self.folder
+
+
+class RemoteStore(object):
+    """
+    Backup folder of the run on a remote target, read through ssh.
+
+    The folder is listed in one ssh session with the size and the end of the archive of the run,
+    so the index of the archive is read without another connection.
+    """
+
+    def __init__(self, ombs_config, folder_name, ssh_options):
+        """
+        Initialize the store.
+
+        :param ombs_config: instance of OMBSConfig of the target.
+        :param folder_name: name of the backup folder of the run.
+        :param ssh_options: ssh options to connect to the target.
+        """
+        self.ombs_config = ombs_config
+        self.folder = os.path.join(ombs_config.dir, folder_name)
+        self.archive_path = os.path.join(self.folder, folder_name + ARCHIVE_SUFFIX)
+        self.ssh_options = ssh_options
+
+        self._tails = {}
+
+    def _get_command(self, remote_command):
+        """
+        Get the ssh command running a shell command on the target.
+
+        :param remote_command: shell command.
+        :return: list of arguments.
+        """
+        return ["ssh", "-n"] + self.ssh_options + [self.ombs_config.host, remote_command]
+
+    def _run(self, remote_command, stdout):
+        """
+        Start a command on the target streaming its output, killed at COPY_TIMEOUT.
+
+        :param remote_command: shell command.
+        :param stdout: standard output of the ssh process.
+        :return: tuple of Popen object, temporary file with its error output and the ProcessJob
+                 watching its deadline.
+        """
+        errors = tempfile.TemporaryFile()
+        process = Popen(self._get_command(remote_command), stdout=stdout, stderr=errors)
+
+        return process, errors, get_process_manager().watch(process, COPY_TIMEOUT)
+
+    def _check(self, process, errors, job, description):
+        """
+        Wait for a command on the target and check its exit status.
+
+        :raise NodeBackupException: if the command failed or timed out.
+        """
+        timed_out = job.release()
+        if process.wait() != 0:
+            errors.seek(0)
+            raise NodeBackupException("{} on {} failed: {}".format(
+                description, self.ombs_config.host,
+                "timeout" if timed_out else errors.read().strip()),
+                ExceptionCodes.NodeConnectionError)
+
+    def list_files(self):
+        """
+        List the files of the backup folder on the target.
+
+        :return: dictionary of file name and remote path, empty if the folder can't be read.
+        """
+        session = RemoteSession(self.ombs_config.host, self.ssh_options, TIMEOUT)
+        session.add("ls -1 {}".format(pipes.quote(self.folder)))
+        session.add("wc -c < {}".format(pipes.quote(self.archive_path)))
+        session.add("tail -c {} {}".format(TAIL_SIZE, pipes.quote(self.archive_path)))
+        (listing, size, tail), _ = session.run()
+
+        if not listing.succeeded:
+            return {}
+
+        if size.succeeded and tail.succeeded and size.stdout.strip().isdigit():
+            self._tails[self.archive_path] = (int(size.stdout), tail.stdout)
+
+        return dict((file_name, os.path.join(self.folder, file_name))
+                    for file_name in listing.stdout.splitlines() if file_name)
+
+    def copy_file(self, path, output):
+        """
+        Stream a file of the target to a stream.
+
+        :param path: remote path of the file, from list_files.
+        :param output: file-like object.
+        :raise NodeBackupException: if the file can't be read.
+        """
+        process, errors, job = self._run("cat {}".format(pipes.quote(path)), PIPE)
+        copy_stream(process.stdout, output)
+        self._check(process, errors, job, "Reading {}".format(path))
+
+    def get_size(self, path):
+        """
+        Get the size of a file of the target.
+
+        :param path: remote path of the file, from list_files.
+        :return: size in bytes.
+        :raise NodeBackupException: if the file can't be read.
+        """
+        result = get_process_manager().run(
+            self._get_command("wc -c < {}".format(pipes.quote(path))), timeout=TIMEOUT)
+        if not result.succeeded or not result.stdout.strip().isdigit():
+            raise NodeBackupException("Reading the size of {} on {} failed: {}".format(
+                path, self.ombs_config.host,
+                "timeout" if result.timed_out else result.stderr.strip()),
+                ExceptionCodes.NodeConnectionError)
+
+        return int(result.stdout)
+
+    @staticmethod
+    def _get_range_command(path, offset, length):
+        """
+        Get the shell command writing a range of a file.
+
+        :param path: remote path of the file.
+        :param offset: position of the range.
+        :param length: length of the range.
+        :return: shell command.
+        """
+        return "tail -c +{} {} | head -c {}".format(offset + 1, pipes.quote(path), length)
+
+    def read_range(self, path, offset, length):
+        """
+        Read a range of a file of the target.
+
+        :param path: remote path of the file, from list_files.
+        :param offset: position of the range.
+        :param length: length of the range.
+        :return: content of the range.
+        :raise NodeBackupException: if the range can't be read.
+        """
+        result = get_process_manager().run(
+            self._get_command(self._get_range_command(path, offset, length)), timeout=TIMEOUT)
+        if not result.succeeded or len(result.stdout) != length:
+            raise NodeBackupException("Reading {} bytes at {} of {} on {} failed: {}".format(
+                length, offset, path, self.ombs_config.host,
+                "timeout" if result.timed_out else result.stderr.strip() or "short read"),
+                ExceptionCodes.NodeConnectionError)
+
+        return result.stdout
+
+    def copy_range(self, path, offset, length, output):
+        """
+        Stream a range of a file of the target to a stream.
+
+        :param path: remote path of the file, from list_files.
+        :param offset: position of the range.
+        :param length: length of the range.
+        :param output: file-like object.
+        :raise NodeBackupException: if the range can't be read.
+        """
+        process, errors, job = self._run(self._get_range_command(path, offset, length), PIPE)
+        copy_stream(process.stdout, output)
+        self._check(process, errors, job, "Reading {} bytes at {} of {}".format(length, offset,
+                                                                               path))
+
+    def open_archive(self, path):
+        """
+        Open an archive of the target, read by ranges: its index is read from the end of the
+        file, without downloading the archive.
+
+        :param path: remote path of the archive, from list_files.
+        :return: instance of BackupArchive.
+        """
+        size, tail = self._tails.get(path, (None, None))
+
+        return BackupArchive(path, RemoteFile(self, path, size=size, tail=tail))
+
+    def extract(self, archive, name, output):
+        """
+        Stream one backup file of an archive of the target to a stream, transferring only the
+        content of its entry.
+
+        :param archive: instance of BackupArchive, from open_archive.
+        :param name: name of the backup file.
+        :param output: file-like object.
+        """
+        archive.extract(name, output, lambda offset, length, range_output: self.copy_range(
+            archive.path, offset, length, range_output))
+
+    def __str__(self):
+        """Represent the store."""
+        return "{}:{}".format(self.ombs_config.host, self.folder)
+
+
+class RemoteFile(object):
+    """
+    Read-only seekable file of a remote target, read by ranges over ssh.
+
+    The end of the file, which holds the index of an archive, is read once with the first read
+    in it, unless it was read with the listing of the store; the other reads are ranges of their
+    own.
+    """
+
+    def __init__(self, store, path, tail_size=TAIL_SIZE, size=None, tail=None):
+        """
+        Initialize the file, reading its size if unknown.
+
+        :param store: instance of RemoteStore.
+        :param path: remote path of the file.
+        :param tail_size: bytes read at once from the end of the file.
+        :param size: size of the file, if already read.
+        :param tail: end of the file, if already read with its size.
+        """
+        self.store = store
+        self.path = path
+        self.size = store.get_size(path) if size is None else size
+
+        self._position = 0
+        self._tail_offset = max(0, self.size - (tail_size if tail is None else len(tail)))
+        self._tail = tail
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """
+        Move the position of the file.
+
+        :param offset: offset from the start, the position or the end of the file.
+        :param whence: os.SEEK_SET, os.SEEK_CUR or os.SEEK_END.
+        :raise IOError: if the position is before the start of the file.
+        """
+        position = offset + {os.SEEK_SET: 0, os.SEEK_CUR: self._position,
+                             os.SEEK_END: self.size}[whence]
+        if position < 0:
+            raise IOError("Invalid position {} in {}.".format(position, self.path))
+
+        self._position = position
+
+    def tell(self):
+        """Get the position of the file."""
+        return self._position
+
+    def read(self, size=-1):
+        """
+        Read from the position of the file.
+
+        :param size: bytes to read, until the end of the file by default.
+        :return: data read.
+        """
+        start = min(self._position, self.size)
+        end = self.size if size < 0 else min(self.size, start + size)
+
+        if start >= self._tail_offset:
+            if self._tail is None:
+                self._tail = self.store.read_range(self.path, self._tail_offset,
+                                                   self.size - self._tail_offset)
+            data = self._tail[start - self._tail_offset:end - self._tail_offset]
+        else:
+            data = self.store.read_range(self.path, start, end - start) if end > start else ""
+
+        self._position = start + len(data)
+
+        return data
+
+
+def retrieve_backup(stores, folder_name, node, date, output, gnupg_config):
+    """
+    Copy the backup of a node from the first store which has it, decrypting it if needed.
+
+    In each store the backup is looked up as a plain file, as an encrypted file, then in the
+    archive of the run.
+
+    :param stores: list of LocalStore or RemoteStore, in order of preference.
+    :param folder_name: name of the backup folder of the run.
+    :param node: node name.
+    :param date: date of the backup.
+    :param output: file-like object receiving the configuration.
+    :param gnupg_config: instance of GnupgConfig, with the gpg home of the private key.
+    :return: description of the file retrieved.
+    :raise NodeBackupException: if no store has the backup or it can't be read.
+    """
+    name = get_backup_name(node, date)
+    encrypted_name = name + ENCRYPTED_FILE_SUFFIX
+    archive_name = folder_name + ARCHIVE_SUFFIX
+
+    for store in stores:
+        files = store.list_files()
+
+        if name in files:
+            store.copy_file(files[name], output)
+            return "{}/{}".format(store, name)
+
+        if encrypted_name in files:
+            decryptor = GpgDecryptor(output, gnupg_config)
+            store.copy_file(files[encrypted_name], decryptor)
+            decryptor.close()
+            return "{}/{}".format(store, encrypted_name)
+
+        if archive_name in files:
+            archive = store.open_archive(files[archive_name])
+            index = archive.get_index()
+
+            if name in index:
+                store.extract(archive, name, output)
+                return "{}/{}:{}".format(store, archive_name, name)
+
+            if encrypted_name in index:
+                decryptor = GpgDecryptor(output, gnupg_config)
+                store.extract(archive, encrypted_name, decryptor)
+                decryptor.close()
+                return "{}/{}:{}".format(store, archive_name, encrypted_name)
+
+    raise NodeBackupException("Backup {} was not found in {}."
+                              .format(name, ", ".join(str(store) for store in stores)),
+                              ExceptionCodes.InvalidPath)
@@ -0,0 +1,125 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to keep the durations of the node sessions across runs and derive their timeouts."""
+
+import math
+import os
+import threading
+
+from network_backup_onsite.run_lock import file_update_lock
+from network_backup_onsite.utils import read_json_file, to_seconds, write_json_file
+
+HISTORY_FILE_NAME = ".ntwk_bkp_onsite_history.json"
+
+CONNECT_PHASE = "connect"
+LOGIN_PHASE = "login"
+CAPTURE_PHASE = "capture"
+PHASES = (CONNECT_PHASE, LOGIN_PHASE, CAPTURE_PHASE)
+SIZE = "size"
+
+TIMEOUT_PERCENTILE = 99
+
+
+def get_percentile(values, percentile):
+    """
+    Get a percentile of a list of values by the nearest-rank method.
+
+    :param values: non-empty list of values.
+    :param percentile: percentile between 0 and 100.
+    :return: smallest value greater than or equal to the percentile of the values.
+    """
+    ordered = sorted(values)
+    rank = int(math.ceil(percentile / 100.0 * len(ordered)))
+
+    return ordered[max(rank, 1) - 1]
+
+
+class RunHistory(object):
+    """
+    Durations of the connect, login and capture phases and sizes of the last backups of each node.
+
+    The history is kept in a json file in the backup root folder, rewritten atomically after each
+    successful session, so an interrupted run never leaves it truncated.
+    """
+
+    def __init__(self, backup_path, timeouts_config):
+        """
+        Load the history of a backup root folder.
+
+        :param backup_path: root folder of the backup folders.
+        :param timeouts_config: instance of TimeoutsConfig.
+        """
+        self.path = os.path.join(backup_path, HISTORY_FILE_NAME)
+        self.timeouts_config = timeouts_config
+
+        self._lock = threading.Lock()
+
+        # Dictionary of node name and dictionary of phase (or SIZE) and list of values.
+        self._history = read_json_file(self.path)
+
+    def get_durations(self, node, phase):
+        """
+        Get the durations recorded for a phase of a node, or its sizes.
+
+        :param node: node name.
+        :param phase: one of PHASES, or SIZE.
+        :return: list of durations in seconds or sizes in bytes, oldest first.
+        """
+        with self._lock:
+            return list(self._history.get(node.lower(), {}).get(phase, []))
+
+    def record(self, node, values):
+        """
+        Add the values of a successful session, keeping only the last HISTORY_SIZE ones.
+
+        :param node: node name.
+        :param values: dictionary of phase and duration in seconds, and SIZE in bytes.
+        """
+        with self._lock, file_update_lock(self.path):
+            # The history is read again, as another run sharing the folder may have updated it.
+            self._history = read_json_file(self.path)
+
+            node_history = self._history.setdefault(node.lower(), {})
+            for key, value in values.items():
+                samples = node_history.setdefault(key, [])
+                samples.append(round(value, 3))
+                del samples[:-self.timeouts_config.history_size]
+
+            write_json_file(self.path, self._history)
+
+    def get_timeout(self, node, phase, default, attempt=1):
+        """
+        Get the timeout of a phase of a node: the p99 of its durations times MARGIN.
+
+        The default is used until MIN_SAMPLES durations are recorded. Each retry doubles the
+        timeout, so a node slower than its history is not cut off again. The result is bounded
+        by MIN_TIMEOUT and MAX_TIMEOUT.
+
+        :param node: node name.
+        :param phase: one of PHASES.
+        :param default: timeout in seconds used without enough history.
+        :param attempt: attempt number, starting at 1.
+        :return: timeout in seconds.
+        """
+        durations = self.get_durations(node, phase)
+
+        if len(durations) < self.timeouts_config.min_samples:
+            timeout = default
+        else:
+            timeout = get_percentile(durations, TIMEOUT_PERCENTILE) * self.timeouts_config.margin
+
+        timeout *= 2 ** (attempt - 1)
+
+        return min(max(timeout, to_seconds(self.timeouts_config.min_timeout)),
+                   to_seconds(self.timeouts_config.max_timeout))
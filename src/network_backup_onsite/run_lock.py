@@ -0,0 +1,307 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to keep overlapping runs from backing up the same nodes at the same time."""
+
+from contextlib import contextmanager
+import errno
+import fcntl
+import json
+import os
+import socket
+import time
+
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+
+LOCK_FOLDER_NAME = ".ntwk_bkp_onsite_locks"
+RUN_LOCK_FILE_NAME = "run.lock"
+NODE_LOCK_PREFIX = "node_"
+NODE_LOCK_SUFFIX = ".lock"
+
+WAIT = "wait"
+SKIP = "skip"
+FAIL = "fail"
+LOCK_MODES = (WAIT, SKIP, FAIL)
+
+WAIT_INTERVAL = 5
+
+# Interval of the attempts to lock a shared file, held only while it is updated.
+UPDATE_INTERVAL = 0.05
+
+PID = "pid"
+HOST = "host"
+STARTED = "started"
+
+
+def is_process_alive(pid):
+    """
+    Check if a process of this host is running.
+
+    :param pid: process id.
+    :return: true if the process exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except OSError as kill_error:
+        return kill_error.errno == errno.EPERM
+
+    return True
+
+
+class FileLock(object):
+    """
+    Exclusive fcntl lock of a file, holding the process, host and start time of its holder.
+
+    The lock is released by the kernel when its holder dies, but also held by the processes
+    which inherited its descriptor, e.g. a persistent ssh master started by the run. The
+    descriptor is not inherited by the commands run, and a lock held on this host after the
+    process which took it is gone is stale: its file is removed and a new one is locked.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the lock.
+
+        :param path: lock file.
+        """
+        self.path = path
+        self.holder = {}
+
+        self._fd = None
+
+    @property
+    def locked(self):
+        """Check if the lock is held by this instance."""
+        return self._fd is not None
+
+    def _read_holder(self):
+        """
+        Read the holder written in the lock file.
+
+        :return: dictionary of PID, HOST and STARTED, empty if unknown.
+        """
+        try:
+            with open(self.path) as lock_file:
+                holder = json.loads(lock_file.read())
+        except (IOError, ValueError):
+            return {}
+
+        return holder if isinstance(holder, dict) else {}
+
+    def is_stale(self, holder):
+        """
+        Check if a lock is held after the process which took it is gone.
+
+        :param holder: holder read from the lock file.
+        :return: true if the holder was a process of this host which is not running any more.
+        """
+        return holder.get(HOST) == socket.gethostname() and bool(holder.get(PID)) and \
+            not is_process_alive(holder[PID])
+
+    def get_holder_text(self):
+        """
+        Describe the holder of the lock, as read when it could not be taken.
+
+        :return: description of the holder.
+        """
+        if not self.holder:
+            return "an unknown process"
+
+        return "process {} on {} since {}".format(
+            self.holder.get(PID), self.holder.get(HOST),
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.holder.get(STARTED, 0))))
+
+    def try_acquire(self):
+        """
+        Take the lock if it is free or stale, without waiting.
+
+        :return: true if the lock was taken; otherwise its holder is kept in holder.
+        """
+        while True:
+            lock_fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.fcntl(lock_fd, fcntl.F_SETFD,
+                        fcntl.fcntl(lock_fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError as lock_error:
+                os.close(lock_fd)
+                if lock_error.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+
+                self.holder = self._read_holder()
+                if not self.is_stale(self.holder):
+                    return False
+
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    return False
+                continue
+
+            # The file may have been removed by its holder or as stale since it was opened.
+            try:
+                current = os.stat(self.path).st_ino == os.fstat(lock_fd).st_ino
+            except OSError:
+                current = False
+
+            if not current:
+                os.close(lock_fd)
+                continue
+
+            os.ftruncate(lock_fd, 0)
+            os.write(lock_fd, json.dumps({PID: os.getpid(), HOST: socket.gethostname(),
+                                          STARTED: time.time()}))
+
+            self._fd = lock_fd
+            self.holder = {}
+
+            return True
+
+    def acquire(self, mode=WAIT, logger=None, interval=WAIT_INTERVAL):
+        """
+        Take the lock, according to the lock mode if it is held by another process.
+
+        :param mode: WAIT until it is released, SKIP or FAIL.
+        :param logger: instance of Custom Logger, to log the wait.
+        :param interval: seconds between the attempts while waiting.
+        :return: true if the lock was taken, false if skipped.
+        :raise NodeBackupException: if the lock is held and the mode is FAIL.
+        """
+        waiting = False
+        while not self.try_acquire():
+            if mode == SKIP:
+                return False
+
+            if mode == FAIL:
+                raise NodeBackupException("'{}' is locked by {}."
+                                          .format(self.path, self.get_holder_text()),
+                                          ExceptionCodes.ResourceLocked)
+
+            if not waiting and logger is not None:
+                logger.info("Waiting for '{}', locked by {}.".format(self.path,
+                                                                     self.get_holder_text()))
+            waiting = True
+            time.sleep(interval)
+
+        return True
+
+    def release(self):
+        """Release the lock, removing its file first so no one locks the released file."""
+        if self._fd is None:
+            return
+
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+        os.close(self._fd)
+        self._fd = None
+
+
+def get_update_lock_file(file_path):
+    """
+    Get the hidden lock file of a file shared by the runs.
+
+    :param file_path: shared file.
+    :return: path of its lock file.
+    """
+    folder, name = os.path.split(file_path)
+
+    return os.path.join(folder, (name if name.startswith(".") else "." + name) +
+                        NODE_LOCK_SUFFIX)
+
+
+@contextmanager
+def file_update_lock(file_path):
+    """
+    Hold the lock of a file shared by the runs while it is read, modified and written, e.g. the
+    json files of the backup root folder, the manifest or the archive of a backup folder.
+
+    The lock is taken between processes and between threads of the same process.
+
+    :param file_path: shared file.
+    """
+    update_lock = FileLock(get_update_lock_file(file_path))
+    update_lock.acquire(WAIT, interval=UPDATE_INTERVAL)
+    try:
+        yield
+    finally:
+        update_lock.release()
+
+
+class RunLocks(object):
+    """
+    Locks of the runs sharing a backup root folder.
+
+    A full run holds the run lock for its whole duration, so two full runs never write the
+    same backup folder. Every run, including the targeted runs and the daemon which do not
+    take the run lock, holds the lock of a node while capturing it, so runs with different
+    nodes proceed side by side and a node is never captured by two runs at once.
+    """
+
+    def __init__(self, backup_path, mode=FAIL, interval=WAIT_INTERVAL):
+        """
+        Initialize the locks of a backup root folder.
+
+        :param backup_path: root folder of the backup folders.
+        :param mode: what to do if the run lock is held: WAIT, SKIP or FAIL.
+        :param interval: seconds between the attempts while waiting.
+        """
+        self.path = os.path.join(backup_path, LOCK_FOLDER_NAME)
+        self.mode = mode
+        self.interval = interval
+
+        self.run_lock = FileLock(os.path.join(self.path, RUN_LOCK_FILE_NAME))
+
+    def _create_folder(self):
+        """Create the lock folder, which may be created at the same time by another run."""
+        try:
+            os.makedirs(self.path)
+        except OSError:
+            if not os.path.isdir(self.path):
+                raise
+
+    def acquire_run(self, logger=None):
+        """
+        Take the run lock according to the lock mode.
+
+        :param logger: instance of Custom Logger, to log the wait.
+        :return: true if the lock was taken, false if the run is to be skipped.
+        :raise NodeBackupException: if the lock is held and the mode is FAIL.
+        """
+        self._create_folder()
+
+        return self.run_lock.acquire(self.mode, logger, self.interval)
+
+    def release_run(self):
+        """Release the run lock."""
+        self.run_lock.release()
+
+    def acquire_node(self, hostname, logger=None):
+        """
+        Wait for and take the lock of a node. The capture of a node by another run is short, so
+        the node is always waited for, whatever the lock mode.
+
+        :param hostname: node name.
+        :param logger: instance of Custom Logger, to log the wait.
+        :return: instance of FileLock of the node, to be released after the capture.
+        """
+        self._create_folder()
+
+        node_lock = FileLock(os.path.join(
+            self.path, NODE_LOCK_PREFIX + hostname.lower() + NODE_LOCK_SUFFIX))
+        node_lock.acquire(WAIT, logger, self.interval)
+
+        return node_lock
@@ -0,0 +1,382 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# For too many arguments
+# For too many instance attributes
+# For too broad exception
+# pylint: disable=C0103,R0913,R0902,W0703
+
+"""Module to run the node backups as a long-running daemon with staggered schedules."""
+
+import heapq
+import os
+import Queue
+import random
+import select
+import signal
+import socket
+import threading
+import time
+
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+from network_backup_onsite.logger import CustomLogger
+from network_backup_onsite.utils import to_seconds
+
+SCRIPT_FILE = os.path.basename(__file__).split('.')[0]
+
+# Captures are sent to OMBS once no other capture is expected within this time.
+FLUSH_IDLE_TIME = 300
+MAX_SELECT_TIMEOUT = 1.0
+SOCKET_BACKLOG = 16
+REQUEST_MAX_SIZE = 1024
+
+BACKUP_REQUEST = "backup"
+STATUS_REQUEST = "status"
+
+
+class NodeJob(object):
+    """A capture of one node, either scheduled or requested on demand."""
+
+    def __init__(self, node_config, on_demand=False):
+        """
+        Initialize the job.
+
+        :param node_config: instance of NodeConfig.
+        :param on_demand: true if the job was requested through the socket.
+        """
+        self.node_config = node_config
+        self.on_demand = on_demand
+
+
+class BackupScheduler(object):
+    """
+    Schedule node captures over time and execute them in a pool of worker threads.
+
+    The captures of each cycle are spread over the configured window, each node with its own
+    interval (node SCHEDULE, group schedule or the default INTERVAL) plus a random jitter. Up to
+    workers captures run at the same time. Created backup files are handed to the flush callable
+    (validation and transfer) once the queue is idle and no capture is running, one flush at a
+    time.
+    """
+
+    def __init__(self, node_config_dict, scheduler_config, capture_node, flush, logger,
+                 workers=1):
+        """
+        Initialize the scheduler.
+
+        :param node_config_dict: dictionary of NodeConfig objects.
+        :param scheduler_config: instance of SchedulerConfig.
+        :param capture_node: callable receiving a NodeConfig, returns the backup file created.
+        :param flush: callable receiving the list of backup files created since the last flush.
+        :param logger: instance of CustomLogger.
+        :param workers: number of captures running at the same time.
+        """
+        self.node_config_dict = node_config_dict
+        self.scheduler_config = scheduler_config
+        self.capture_node = capture_node
+        self.flush = flush
+        self.workers = max(1, workers)
+
+        self.logger = CustomLogger(SCRIPT_FILE, logger.log_root_path, logger.log_file_name,
+                                   logger.log_level)
+
+        self.window = to_seconds(scheduler_config.window)
+        self.jitter = to_seconds(scheduler_config.jitter)
+
+        self._schedule = []
+        self._schedule_lock = threading.Lock()
+        self._jobs = Queue.Queue()
+        self._stop_event = threading.Event()
+        self._server = None
+
+        # Backup files captured since the last flush and captures running, shared by the workers.
+        self._captured = []
+        self._active = 0
+        self._captured_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def plan_cycle(self, start_time):
+        """
+        Plan the first capture of every node, spreading the nodes with the same interval over
+        the window, whatever their schedule group.
+
+        :param start_time: epoch time of the beginning of the cycle.
+        """
+        nodes_by_interval = {}
+        for node_config in self.node_config_dict.values():
+            interval = self.scheduler_config.get_node_interval(node_config)
+            nodes_by_interval.setdefault(interval, []).append(node_config)
+
+        with self._schedule_lock:
+            self._schedule = []
+            for interval, node_configs in nodes_by_interval.items():
+                node_configs.sort(key=lambda node_config: node_config.hostname)
+                slot = self.window / float(len(node_configs))
+
+                for index, node_config in enumerate(node_configs):
+                    base_time = start_time + index * slot
+                    heapq.heappush(self._schedule, (base_time + self._get_jitter(), base_time,
+                                                    interval, node_config.hostname))
+
+    def _get_jitter(self):
+        """
+        Get a random delay to be added to a capture.
+
+        :return: delay in seconds.
+        """
+        return random.uniform(0, self.jitter) if self.jitter else 0
+
+    def get_node_config(self, name):
+        """
+        Find a node by its HOSTNAME or section name, ignoring case.
+
+        :param name: name informed in the request.
+        :return: NodeConfig object or None.
+        """
+        for section, node_config in self.node_config_dict.items():
+            if name.lower() in (section.lower(), node_config.hostname.lower()):
+                return node_config
+
+        return None
+
+    def seconds_to_next_capture(self):
+        """
+        Get the time until the next scheduled capture.
+
+        :return: seconds, or None if nothing is scheduled.
+        """
+        with self._schedule_lock:
+            if not self._schedule:
+                return None
+
+            return max(0, self._schedule[0][0] - time.time())
+
+    def queue_due_captures(self, now):
+        """
+        Move the captures due until now to the job queue and reschedule them.
+
+        :param now: epoch time.
+        """
+        with self._schedule_lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                _, base_time, interval, hostname = heapq.heappop(self._schedule)
+
+                self._jobs.put(NodeJob(self.get_node_config(hostname)))
+
+                next_base_time = base_time + interval
+                while next_base_time <= now:
+                    next_base_time += interval
+
+                heapq.heappush(self._schedule, (next_base_time + self._get_jitter(),
+                                                next_base_time, interval, hostname))
+
+    def handle_request(self, request):
+        """
+        Process a request received through the unix socket.
+
+        :param request: request line, 'backup <hostname>' or 'status'.
+        :return: response line.
+        """
+        words = request.strip().split()
+
+        if len(words) == 2 and words[0].lower() == BACKUP_REQUEST:
+            node_config = self.get_node_config(words[1])
+            if node_config is None:
+                return "error unknown node {}\n".format(words[1])
+
+            self._jobs.put(NodeJob(node_config, on_demand=True))
+            self.logger.info("On-demand backup of {} queued.".format(node_config.hostname))
+            return "queued {}\n".format(node_config.hostname)
+
+        if len(words) == 1 and words[0].lower() == STATUS_REQUEST:
+            with self._schedule_lock:
+                next_captures = sorted(self._schedule)[:10]
+
+            lines = ["queued jobs {}".format(self._jobs.qsize())]
+            lines.extend("next {} {}".format(hostname, time.strftime("%Y-%m-%d %H:%M:%S",
+                                                                     time.localtime(due)))
+                         for due, _, _, hostname in next_captures)
+            return "\n".join(lines) + "\n"
+
+        return "error invalid request, use '{} <hostname>' or '{}'\n".format(BACKUP_REQUEST,
+                                                                              STATUS_REQUEST)
+
+    def _open_socket(self):
+        """
+        Open the unix socket used for on-demand requests, replacing a stale one.
+
+        :raise NodeBackupException: if another daemon is listening on the socket.
+        """
+        socket_path = self.scheduler_config.socket_path
+
+        if os.path.exists(socket_path):
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.connect(socket_path)
+            except socket.error:
+                os.remove(socket_path)
+            else:
+                raise NodeBackupException("A daemon is already listening on '{}'."
+                                          .format(socket_path), ExceptionCodes.ResourceLocked)
+            finally:
+                client.close()
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        self._server.listen(SOCKET_BACKLOG)
+
+        self.logger.info("Listening for on-demand requests on '{}'.".format(socket_path))
+
+    def _accept_request(self):
+        """Read one request from the unix socket and answer it."""
+        connection, _ = self._server.accept()
+        try:
+            connection.settimeout(5)
+            request = connection.recv(REQUEST_MAX_SIZE)
+            connection.sendall(self.handle_request(request))
+        except Exception as request_exception:
+            self.logger.error("Error handling request: {}".format(request_exception))
+        finally:
+            connection.close()
+
+    def _worker(self):
+        """Execute queued captures and flush them once no capture is expected soon."""
+        while not self._stop_event.is_set():
+            try:
+                job = self._jobs.get(timeout=MAX_SELECT_TIMEOUT)
+            except Queue.Empty:
+                job = None
+
+            if job is not None:
+                with self._captured_lock:
+                    self._active += 1
+                try:
+                    backup_file = self.capture_node(job.node_config)
+                except Exception as capture_exception:
+                    backup_file = None
+                    self.logger.error("Backup of {} failed: {}".format(job.node_config.hostname,
+                                                                       capture_exception))
+                with self._captured_lock:
+                    self._active -= 1
+                    if backup_file is not None:
+                        self._captured.append(backup_file)
+
+            captured = self._take_captured(job is not None and job.on_demand)
+            if captured:
+                self._flush(captured)
+
+    def _take_captured(self, on_demand=False):
+        """
+        Take the backup files to be flushed, once the queue is empty, no other capture is running
+        and no capture is expected soon.
+
+        :param on_demand: true if the last capture was requested through the socket.
+        :return: list of backup files, empty if they are not to be flushed yet.
+        """
+        with self._captured_lock:
+            if not self._captured or self._active or not self._jobs.empty():
+                return []
+
+            next_capture = self.seconds_to_next_capture()
+            if not on_demand and next_capture is not None and next_capture <= FLUSH_IDLE_TIME:
+                return []
+
+            captured, self._captured = self._captured, []
+
+        return captured
+
+    def _flush(self, captured):
+        """
+        Call the flush callable, logging any failure.
+
+        :param captured: list of backup files created since the last flush.
+        """
+        with self._flush_lock:
+            try:
+                self.flush(captured)
+            except Exception as flush_exception:
+                self.logger.error("Error sending backups: {}".format(flush_exception))
+
+    def stop(self, *_):
+        """Request the scheduler to stop; the running captures are finished first."""
+        self.logger.info("Stopping ntwk_bkp_onsite daemon.")
+        self._stop_event.set()
+
+    def run(self):
+        """
+        Run the scheduler until stopped by SIGTERM/SIGINT.
+
+        :raise NodeBackupException: if another daemon is listening on the socket.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.plan_cycle(time.time())
+        self._open_socket()
+
+        workers = [threading.Thread(target=self._worker, name="backup-worker-{}".format(index))
+                   for index in xrange(self.workers)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            while not self._stop_event.is_set():
+                self.queue_due_captures(time.time())
+
+                timeout = self.seconds_to_next_capture()
+                timeout = MAX_SELECT_TIMEOUT if timeout is None else \
+                    min(timeout, MAX_SELECT_TIMEOUT)
+
+                try:
+                    readable, _, _ = select.select([self._server], [], [], timeout)
+                except select.error:
+                    continue
+
+                if readable:
+                    self._accept_request()
+        finally:
+            self._stop_event.set()
+            for worker in workers:
+                worker.join()
+            if self._captured:
+                self._flush(self._captured)
+                self._captured = []
+            self._server.close()
+            if os.path.exists(self.scheduler_config.socket_path):
+                os.remove(self.scheduler_config.socket_path)
+
+
+def send_daemon_request(socket_path, request, timeout=10):
+    """
+    Send a request to a running daemon through its unix socket.
+
+    :param socket_path: unix socket of the daemon.
+    :param request: request line.
+    :param timeout: time to wait for the answer.
+    :return: response of the daemon.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall(request + "\n")
+
+        response = []
+        while True:
+            data = client.recv(REQUEST_MAX_SIZE)
+            if not data:
+                break
+            response.append(data)
+    finally:
+        client.close()
+
+    return "".join(response)
@@ -0,0 +1,301 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For snake_case comments (invalid-name)
+# pylint: disable=C0103
+
+"""Module to share the nodes of one inventory between several runners through a shared folder."""
+
+import bisect
+import errno
+import hashlib
+import os
+import threading
+import time
+
+from network_backup_onsite.utils import to_seconds
+
+RUNNERS_FOLDER_NAME = "runners"
+LEASE_SUFFIX = ".lease"
+DONE_SUFFIX = ".done"
+STALE_SUFFIX = ".stale"
+
+# Points of each runner on the ring, so the nodes are spread evenly between the runners.
+VIRTUAL_NODES = 64
+
+# Seconds between the checks of the leases held by other runners.
+LEASE_POLL_INTERVAL = 1
+
+
+def get_hash(key):
+    """
+    Get the position of a key on the ring.
+
+    :param key: string.
+    :return: integer position.
+    """
+    return int(hashlib.md5(key).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """
+    Consistent hash ring of the runners.
+
+    A node belongs to the first runner point after its hash. When a runner joins or leaves, only
+    the nodes of the ring segments it owns change of runner.
+    """
+
+    def __init__(self, runners, virtual_nodes=VIRTUAL_NODES):
+        """
+        Build the ring.
+
+        :param runners: runner ids.
+        :param virtual_nodes: points of each runner on the ring.
+        """
+        self.runners = sorted(set(runners))
+        self._points = sorted((get_hash("{}#{}".format(runner, index)), runner)
+                              for runner in self.runners for index in xrange(virtual_nodes))
+        self._keys = [point[0] for point in self._points]
+
+    def get_runner(self, node):
+        """
+        Get the runner of a node.
+
+        :param node: node name.
+        :return: runner id, None if the ring is empty.
+        """
+        if not self._points:
+            return None
+
+        index = bisect.bisect(self._keys, get_hash(node.lower())) % len(self._points)
+
+        return self._points[index][1]
+
+
+class ShardCoordinator(object):
+    """
+    Share of the nodes of one runner, coordinated with the other runners by files in a folder on
+    shared storage, e.g. an NFS mount.
+
+    Each runner refreshes a heartbeat file; the runners with a heartbeat younger than LEASE_TIME
+    are alive and the nodes are spread between them by a consistent hash ring, so the nodes of a
+    dead runner go to the others. A node is captured under a lease file created exclusively in
+    the folder of the cycle and marked done once captured, so it is captured once per cycle. The
+    lease of a runner which died while capturing expires after LEASE_TIME and is taken over.
+    """
+
+    def __init__(self, sharding_config):
+        """
+        Initialize the coordinator.
+
+        :param sharding_config: instance of ShardingConfig.
+        """
+        self.shared_path = sharding_config.shared_path
+        self.runner_id = sharding_config.runner_id
+        self.lease_time = to_seconds(sharding_config.lease_time)
+
+        self.runners_path = os.path.join(self.shared_path, RUNNERS_FOLDER_NAME)
+        self.heartbeat_file = os.path.join(self.runners_path, self.runner_id)
+
+        self._lock = threading.Lock()
+        self._leases = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _create_folder(path):
+        """
+        Create a folder, which may be created at the same time by another runner.
+
+        :param path: folder.
+        """
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+
+    def _is_expired(self, path, now=None):
+        """
+        Check if a heartbeat or lease file was not refreshed within LEASE_TIME.
+
+        :param path: file.
+        :param now: current time, the time of the call by default.
+        :return: true if expired, None if the file does not exist.
+        """
+        try:
+            modified = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        return (time.time() if now is None else now) - modified >= self.lease_time
+
+    def heartbeat(self):
+        """Refresh the heartbeat of the runner and the leases it holds."""
+        self._create_folder(self.runners_path)
+        with open(self.heartbeat_file, "w") as heartbeat_file:
+            heartbeat_file.write(str(os.getpid()))
+
+        with self._lock:
+            leases = list(self._leases)
+
+        for lease_file in leases:
+            try:
+                os.utime(lease_file, None)
+            except OSError:
+                pass
+
+    def start(self):
+        """Start refreshing the heartbeat in the background, a third of LEASE_TIME apart."""
+        self.heartbeat()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh, name="ShardHeartbeat")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _refresh(self):
+        """Refresh the heartbeat until the coordinator is stopped."""
+        while not self._stop.wait(self.lease_time / 3.0):
+            self.heartbeat()
+
+    def stop(self):
+        """Stop refreshing the heartbeat and remove it, so the runner is not alive any more."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        try:
+            os.remove(self.heartbeat_file)
+        except OSError:
+            pass
+
+    def get_live_runners(self):
+        """
+        Get the runners with a fresh heartbeat, always including this one.
+
+        :return: sorted list of runner ids.
+        """
+        runners = set([self.runner_id])
+        if os.path.isdir(self.runners_path):
+            now = time.time()
+            runners.update(runner for runner in os.listdir(self.runners_path)
+                           if self._is_expired(os.path.join(self.runners_path, runner),
+                                               now) is False)
+
+        return sorted(runners)
+
+    def get_shard(self, nodes, cycle):
+        """
+        Get the nodes of this runner not captured yet in a cycle.
+
+        :param nodes: node names of the inventory.
+        :param cycle: name of the cycle, e.g. the backup folder of the day.
+        :return: list of node names.
+        """
+        ring = HashRing(self.get_live_runners())
+        cycle_path = os.path.join(self.shared_path, cycle)
+
+        return [node for node in nodes if ring.get_runner(node) == self.runner_id and
+                not os.path.exists(os.path.join(cycle_path, node.lower() + DONE_SUFFIX))]
+
+    def claim(self, node, cycle):
+        """
+        Take the lease of a node for a cycle, taking over an expired lease.
+
+        :param node: node name.
+        :param cycle: name of the cycle.
+        :return: true if the node is to be captured by this runner.
+        """
+        cycle_path = os.path.join(self.shared_path, cycle)
+        self._create_folder(cycle_path)
+
+        if os.path.exists(os.path.join(cycle_path, node.lower() + DONE_SUFFIX)):
+            return False
+
+        lease_file = os.path.join(cycle_path, node.lower() + LEASE_SUFFIX)
+        if self._is_expired(lease_file):
+            # Only one runner can rename the expired lease away, the others get ENOENT.
+            stale_file = "{}{}.{}".format(lease_file, STALE_SUFFIX, self.runner_id)
+            try:
+                os.rename(lease_file, stale_file)
+            except OSError as rename_error:
+                if rename_error.errno != errno.ENOENT:
+                    raise
+            else:
+                # Another runner may have taken over the lease since it was checked.
+                if not self._is_expired(stale_file):
+                    try:
+                        os.link(stale_file, lease_file)
+                    except OSError:
+                        pass
+                os.remove(stale_file)
+
+        try:
+            lease_fd = os.open(lease_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except OSError as create_error:
+            if create_error.errno == errno.EEXIST:
+                return False
+            raise
+
+        os.write(lease_fd, self.runner_id)
+        os.close(lease_fd)
+
+        with self._lock:
+            self._leases.add(lease_file)
+
+        return True
+
+    def wait_for_leases(self, nodes, cycle):
+        """
+        Wait until one of the nodes leased by other runners is released or its lease expires, at
+        most LEASE_TIME, as the runner holding it may have died or failed to capture it.
+
+        :param nodes: node names leased by other runners.
+        :param cycle: name of the cycle.
+        :return: true if one of the nodes is not leased any more, false if they are all still
+                 leased.
+        """
+        cycle_path = os.path.join(self.shared_path, cycle)
+        deadline = time.time() + self.lease_time
+
+        while True:
+            if any(self._is_expired(os.path.join(cycle_path, node.lower() + LEASE_SUFFIX))
+                   is not False for node in nodes):
+                return True
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+
+            time.sleep(min(LEASE_POLL_INTERVAL, self.lease_time / 10.0, remaining))
+
+    def release(self, node, cycle, done):
+        """
+        Release the lease of a node, marking it done for the cycle if it was captured.
+
+        :param node: node name.
+        :param cycle: name of the cycle.
+        :param done: true if the node was captured.
+        """
+        cycle_path = os.path.join(self.shared_path, cycle)
+        lease_file = os.path.join(cycle_path, node.lower() + LEASE_SUFFIX)
+
+        if done:
+            with open(os.path.join(cycle_path, node.lower() + DONE_SUFFIX), "w") as done_file:
+                done_file.write(self.runner_id)
+
+        with self._lock:
+            self._leases.discard(lease_file)
+
+        try:
+            os.remove(lease_file)
+        except OSError:
+            pass
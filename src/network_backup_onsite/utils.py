@@ -13,21 +13,27 @@
 
 """Module to handle helper functions."""
 
+import json
 import os
+import random
 import socket
-from subprocess import PIPE, Popen
 import sys
-from threading import Timer
+import tempfile
 import time
 
+from network_backup_onsite.process_manager import get_process_manager
+
 
 LOG_SUFFIX = "log"
 
 SUCCESS_FLAG_FILE = "BACKUP_OK"
 
+TEMP_FILE_SUFFIX = ".tmp"
+
 LOG_ROOT_PATH_CLI = "--log_root_path"
 
 TIMEOUT = 120
+PING_TIMEOUT = 10
 LOG_LEVEL = "LogLevel=ERROR"
 
 PLATFORM_NAME = str(sys.platform).lower()
@@ -64,6 +70,8 @@ def popen_communicate(host, command, timeout=TIMEOUT):
     """
     Use Popen library to communicate to a remote server by using ssh protocol.
 
+    The ssh process is followed by the shared process manager, which kills it at its deadline.
+
     :param host: remote host to connect.
     :param command: command to execute on remote server.
     :param timeout: timeout to wait for the process to finish.
@@ -72,20 +80,12 @@ def popen_communicate(host, command, timeout=TIMEOUT):
     if host == "" or command == "":
         return "", ""
 
-    ssh = Popen(['ssh', '-o', LOG_LEVEL, host, 'bash'],
-                stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    result = get_process_manager().run(['ssh', '-o', LOG_LEVEL, host, 'bash'], command, timeout)
 
-    timer = Timer(timeout, lambda process: process.kill(), [ssh])
+    if result.timed_out:
+        return result.stdout, "Command '{}' timeout.".format(command)
 
-    try:
-        timer.start()
-        stdout, stderr = ssh.communicate(command)
-    finally:
-        if not timer.is_alive():
-            stderr = "Command '{}' timeout.".format(command)
-        timer.cancel()
-
-    return stdout, stderr
+    return result.stdout, result.stderr
 
 
 def to_seconds(duration):
@@ -107,6 +107,102 @@ def to_seconds(duration):
         raise ValueError("Wrong format. It must be number + time unit (3s or 4m or 5h)")
 
 
+def to_rate(rate):
+    """
+    Converts a bandwidth string to bytes per second, where string is of form 500KB, 2MB or 1MB/s.
+
+    :param rate: str with numeric value suffixed with B, KB, MB or GB, optionally followed by /s.
+    :return: bytes per second as int type.
+    :raises KeyError, ValueError: if the string can't be parsed.
+    """
+    rate = rate.strip().upper()
+    if rate.endswith("/S"):
+        rate = rate[:-2]
+
+    units = {"B": 1, "KB": 1000, "MB": 1000000, "GB": 1000000000}
+    unit = rate[-2:] if rate[-2:] in units else rate[-1:]
+
+    if unit not in units:
+        raise KeyError("Rate unit invalid (must be 'B', 'KB', 'MB' or 'GB')")
+
+    try:
+        return int(float(rate[:-len(unit)]) * units[unit])
+    except ValueError:
+        raise ValueError("Wrong format. It must be number + size unit (500KB or 2MB)")
+
+
+def get_backoff_delay(attempt, base_delay, max_delay):
+    """
+    Get the delay before a retry, doubled at each attempt and with a random jitter.
+
+    The delay is drawn between half and the full exponential value, so retries of several nodes
+    failing at the same time do not hit the network together.
+
+    :param attempt: number of the retry, starting at 1.
+    :param base_delay: delay in seconds before the first retry.
+    :param max_delay: max delay in seconds.
+    :return: delay in seconds.
+    """
+    delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+
+    return random.uniform(delay / 2.0, delay)
+
+
+def read_json_file(file_path):
+    """
+    Read a dictionary from a json file; a missing or corrupted file is an empty dictionary.
+
+    :param file_path: json file.
+    :return: dictionary read.
+    """
+    try:
+        with open(file_path) as json_file:
+            data = json.load(json_file)
+    except (IOError, ValueError):
+        return {}
+
+    return data if isinstance(data, dict) else {}
+
+
+def write_json_file(file_path, data):
+    """
+    Write data to a temporary json file and rename it over the file, so it is never truncated.
+
+    Each write has its own hidden temporary file, so concurrent writers, e.g. two runs sharing
+    the backup root folder, never truncate each other's file.
+
+    :param file_path: json file.
+    :param data: data to be written.
+    """
+    folder, name = os.path.split(file_path)
+    temp_fd, temp_path = tempfile.mkstemp(TEMP_FILE_SUFFIX, name if name.startswith(".")
+                                          else "." + name, folder or os.curdir)
+    try:
+        with os.fdopen(temp_fd, "w") as json_file:
+            json.dump(data, json_file, sort_keys=True)
+
+        os.rename(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def is_valid_duration(duration):
+    """
+    Validate if provided duration can be converted by to_seconds.
+
+    :param duration: str with numeric value suffixed with h, s, or m.
+    :return: true if duration is valid, false, otherwise.
+    """
+    try:
+        to_seconds(str(duration))
+    except (KeyError, ValueError, IndexError):
+        return False
+
+    return True
+
+
 def is_valid_ip(ip):
     """
     Validate if provided IP is valid.
@@ -129,9 +225,7 @@ def is_host_accessible(ip):
     :param ip: remote host IP.
     :return: true, if host is accessible, false, otherwise.
     """
-    with open(os.devnull, "w") as devnull:
-        ret_code = Popen(["ping", "-c", "1", ip], stdout=devnull, stderr=devnull).wait()
-        return ret_code == 0
+    return get_process_manager().run(["ping", "-c", "1", ip], timeout=PING_TIMEOUT).succeeded
 
 
 def format_time(elapsed_time, time_format="%H:%M:%S"):
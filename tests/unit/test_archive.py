@@ -0,0 +1,110 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the archive.py script."""
+
+import hashlib
+import os
+import shutil
+from StringIO import StringIO
+import tempfile
+import unittest
+import zipfile
+
+from network_backup_onsite.archive import BackupArchive, get_archive_file
+
+BKP_FOLDER_NAME = "network_device_backup_20180101"
+
+
+class BackupArchiveTestCase(unittest.TestCase):
+    """Test case for the BackupArchive class."""
+
+    def setUp(self):
+        """Create a backup folder with the backups of two nodes in its archive."""
+        self.bkp_folder_path = os.path.join(tempfile.mkdtemp(), BKP_FOLDER_NAME)
+        os.mkdir(self.bkp_folder_path)
+
+        self.archive = BackupArchive(get_archive_file(self.bkp_folder_path))
+        self.contents = {}
+        for node in ("srx-1", "sw-1"):
+            self.contents[node] = "set system host-name {}\n".format(node) * 100
+            self.archive.add(self.write_backup(node, self.contents[node]))
+
+    def tearDown(self):
+        """Remove the backup folder."""
+        shutil.rmtree(os.path.dirname(self.bkp_folder_path))
+
+    def write_backup(self, node, content):
+        """Write the backup file of a node."""
+        backup_file = os.path.join(self.bkp_folder_path, "{}-backup-20180101".format(node))
+        with open(backup_file, "w") as backup:
+            backup.write(content)
+
+        return backup_file
+
+    def test_archive_file(self):
+        """Test the archive is named after its backup folder."""
+        self.assertEqual(os.path.join(self.bkp_folder_path, BKP_FOLDER_NAME + ".zip"),
+                         self.archive.path)
+
+    def test_index(self):
+        """Test the index has the offset, length and sha256 of each backup."""
+        index = self.archive.get_index()
+
+        self.assertEqual(["srx-1-backup-20180101", "sw-1-backup-20180101"], sorted(index))
+        self.assertEqual(0, index["srx-1-backup-20180101"].offset)
+        self.assertLess(index["srx-1-backup-20180101"].length,
+                        index["sw-1-backup-20180101"].offset)
+        self.assertEqual(hashlib.sha256(self.contents["sw-1"]).hexdigest(),
+                         index["sw-1-backup-20180101"].sha256)
+
+    def test_extract_node(self):
+        """Test the backup of one node is extracted from the archive."""
+        entry = self.archive.find_node("SW-1")
+        output = StringIO()
+
+        self.archive.extract(entry.name, output)
+
+        self.assertEqual(self.contents["sw-1"], output.getvalue())
+        self.assertIsNone(self.archive.find_node("sw-2"))
+
+    def test_add_again_replaces_entry(self):
+        """Test a backup recaptured with another content replaces the previous entry."""
+        self.archive.add(self.write_backup("sw-1", "recaptured\n"))
+        output = StringIO()
+
+        self.archive.extract(self.archive.find_node("sw-1").name, output)
+
+        self.assertEqual("recaptured\n", output.getvalue())
+        self.assertEqual(2, len(self.archive.get_index()))
+        with zipfile.ZipFile(self.archive.path) as archive:
+            self.assertEqual(["srx-1-backup-20180101", "sw-1-backup-20180101"],
+                             archive.namelist())
+            self.assertIsNone(archive.testzip())
+
+        output = StringIO()
+        self.archive.extract("srx-1-backup-20180101", output)
+        self.assertEqual(self.contents["srx-1"], output.getvalue())
+        self.assertEqual([BKP_FOLDER_NAME + ".zip", "srx-1-backup-20180101",
+                          "sw-1-backup-20180101"], sorted(os.listdir(self.bkp_folder_path)))
+
+    def test_add_again_same_content(self):
+        """Test a backup recaptured with the same content is not added again."""
+        size = os.path.getsize(self.archive.path)
+        entry = self.archive.get_index()["sw-1-backup-20180101"]
+
+        added = self.archive.add(self.write_backup("sw-1", self.contents["sw-1"]))
+
+        self.assertEqual(size, os.path.getsize(self.archive.path))
+        self.assertEqual((entry.offset, entry.sha256), (added.offset, added.sha256))
@@ -18,6 +18,7 @@
 from ConfigParser import ConfigParser, MissingSectionHeaderError, ParsingError
 from StringIO import StringIO
 import logging
+import os
 import unittest
 
 import mock
@@ -181,3 +182,241 @@ class ScriptSettingsGetConfigDetailsTestCase(unittest.TestCase):
             self.script_settings._get_config_details()
 
         self.assertEqual(error_msg, cex.exception.message)
+
+
+class ScriptSettingsGetGovernorConfigTestCase(unittest.TestCase):
+    """Class for unit testing the get_governor_config from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_governor_config_defaults(self):
+        """Assert the defaults are used when the GOVERNOR section is not defined."""
+        governor_config = self.script_settings.get_governor_config()
+
+        self.assertEqual((1, 2, 0, 0), (governor_config.max_workers,
+                                        governor_config.site_sessions,
+                                        governor_config.site_rate, governor_config.ombs_rate))
+
+    def test_get_governor_config_site_limits(self):
+        """Assert the limits of a site override the default limits."""
+        self.script_settings.config.readfp(StringIO("[GOVERNOR]\nMAX_WORKERS=4\nSITE_RATE=1MB\n"
+                                                    "SESSIONS_DC1=1\nRATE_DC1=200KB/s\n"))
+
+        governor_config = self.script_settings.get_governor_config()
+
+        self.assertEqual(4, governor_config.max_workers)
+        self.assertEqual((1, 200000), (governor_config.get_site_sessions("DC1"),
+                                       governor_config.get_site_rate("dc1")))
+        self.assertEqual((2, 1000000), (governor_config.get_site_sessions("dc2"),
+                                        governor_config.get_site_rate("dc2")))
+
+    def test_get_governor_config_invalid_value(self):
+        """Assert an exception is raised for an invalid number of workers."""
+        self.script_settings.config.readfp(StringIO("[GOVERNOR]\nMAX_WORKERS=0\n"))
+
+        with self.assertRaises(Exception):
+            self.script_settings.get_governor_config()
+
+
+class ScriptSettingsGetDelayConfigTestCase(unittest.TestCase):
+    """Class for unit testing the get_delay_config from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_delay_config_not_defined(self):
+        """Assert the DELAY section is optional."""
+        self.assertIsNone(self.script_settings.get_delay_config().max_delay)
+        self.script_settings.logger.warning.assert_not_called()
+
+    def test_get_delay_config_deprecated(self):
+        """Assert a warning is logged when the deprecated DELAY section is defined."""
+        self.script_settings.config.readfp(StringIO("[DELAY]\nBKP_MAX_DELAY=2s\n"))
+
+        self.assertEqual("2s", self.script_settings.get_delay_config().max_delay)
+        self.assertIn("deprecated", self.script_settings.logger.warning.call_args[0][0])
+
+
+class ScriptSettingsGetTimeoutsConfigTestCase(unittest.TestCase):
+    """Class for unit testing the get_timeouts_config from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_timeouts_config(self):
+        """Assert the defaults are overridden by the TIMEOUTS section."""
+        self.script_settings.config.readfp(StringIO("[TIMEOUTS]\nMARGIN=1.5\nMAX_TIMEOUT=20m\n"))
+
+        timeouts_config = self.script_settings.get_timeouts_config()
+
+        self.assertEqual((1.5, "10s", "20m", 5, 50),
+                         (timeouts_config.margin, timeouts_config.min_timeout,
+                          timeouts_config.max_timeout, timeouts_config.min_samples,
+                          timeouts_config.history_size))
+
+    def test_get_timeouts_config_invalid_bounds(self):
+        """Assert an exception is raised when MIN_TIMEOUT is greater than MAX_TIMEOUT."""
+        self.script_settings.config.readfp(StringIO("[TIMEOUTS]\nMIN_TIMEOUT=1h\n"))
+
+        with self.assertRaises(Exception):
+            self.script_settings.get_timeouts_config()
+
+
+class ScriptSettingsGetGnupgConfigTestCase(unittest.TestCase):
+    """Class for unit testing the get_gnupg_config from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_gnupg_config_disabled(self):
+        """Assert the backups are not encrypted when the GNUPG section is not defined."""
+        self.assertFalse(self.script_settings.get_gnupg_config().enabled)
+
+    def test_get_gnupg_config_user_email(self):
+        """Assert GPG_USER_EMAIL is the recipient when GPG_RECIPIENT is not defined."""
+        self.script_settings.config.readfp(StringIO("[GNUPG]\nGPG_USER_NAME=backup\n"
+                                                    "GPG_USER_EMAIL=backup@root.com\n"))
+
+        gnupg_config = self.script_settings.get_gnupg_config()
+
+        self.assertTrue(gnupg_config.enabled)
+        self.assertEqual("backup@root.com", gnupg_config.recipient)
+
+    def test_get_gnupg_config_unreadable_key_file(self):
+        """Assert an exception is raised when the key file can't be read."""
+        self.script_settings.config.readfp(StringIO("[GNUPG]\nGPG_KEY_FILE=/not/a/key.asc\n"))
+
+        with self.assertRaises(Exception):
+            self.script_settings.get_gnupg_config()
+
+    @mock.patch('network_backup_onsite.backup_settings.find_executable', return_value=None)
+    def test_get_gnupg_config_gpg_missing(self, _):
+        """Assert an exception is raised when the backups are encrypted without gpg."""
+        self.script_settings.config.readfp(StringIO("[GNUPG]\nGPG_RECIPIENT=backup@root.com\n"))
+
+        with self.assertRaises(Exception) as context:
+            self.script_settings.get_gnupg_config()
+
+        self.assertIn("gpg is not installed", context.exception.message)
+
+
+class ScriptSettingsGetReachabilityConfigTestCase(unittest.TestCase):
+    """Class for unit testing the get_reachability_config from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_reachability_config(self):
+        """Assert the defaults are overridden by the REACHABILITY section."""
+        self.script_settings.config.readfp(StringIO("[REACHABILITY]\nTTL=30s\n"))
+
+        reachability_config = self.script_settings.get_reachability_config()
+
+        self.assertEqual(("30s", "1m"), (reachability_config.ttl, reachability_config.down_ttl))
+
+    def test_get_reachability_config_invalid_ttl(self):
+        """Assert an exception is raised when a TTL is not a duration."""
+        self.script_settings.config.readfp(StringIO("[REACHABILITY]\nDOWN_TTL=soon\n"))
+
+        with self.assertRaises(Exception):
+            self.script_settings.get_reachability_config()
+
+    def test_get_reachability_config_down_ttl_deprecated(self):
+        """Assert a warning is logged when the deprecated DOWN_TTL is set."""
+        self.script_settings.config.readfp(StringIO("[REACHABILITY]\nDOWN_TTL=5m\n"))
+
+        self.script_settings.get_reachability_config()
+
+        self.script_settings.logger.warning.assert_called_once_with(mock.ANY, CONFIG_FILE_NAME)
+
+
+class ScriptSettingsGetShardingConfigTestCase(unittest.TestCase):
+    """Class for unit testing the get_sharding_config from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_sharding_config_disabled(self):
+        """Assert the nodes are not shared when the SHARDING section is not defined."""
+        sharding_config = self.script_settings.get_sharding_config()
+
+        self.assertFalse(sharding_config.enabled)
+        self.assertTrue(sharding_config.runner_id)
+
+    def test_get_sharding_config(self):
+        """Assert the shared folder and the runner id are read."""
+        self.script_settings.config.readfp(StringIO("[SHARDING]\nSHARED_PATH={}\n"
+                                                    "RUNNER_ID=runner1\n"
+                                                    .format(os.path.dirname(__file__))))
+
+        sharding_config = self.script_settings.get_sharding_config()
+
+        self.assertTrue(sharding_config.enabled)
+        self.assertEqual(("runner1", "10m"), (sharding_config.runner_id,
+                                              sharding_config.lease_time))
+
+    def test_get_sharding_config_missing_folder(self):
+        """Assert an exception is raised when the shared folder does not exist."""
+        self.script_settings.config.readfp(StringIO("[SHARDING]\nSHARED_PATH=/not/a/folder\n"))
+
+        with self.assertRaises(Exception):
+            self.script_settings.get_sharding_config()
+
+
+class ScriptSettingsGetTargetConfigsTestCase(unittest.TestCase):
+    """Class for unit testing the get_target_configs from ScriptSetting class."""
+
+    def setUp(self):
+        """Set up a ScriptSettings object with an empty configuration."""
+        with mock.patch(MOCK_LOGGER) as logger:
+            with mock.patch(MOCK_SCRIPT_SETTINGS + '._get_config_details') as mock_get_config:
+                mock_get_config.return_value = ConfigParser()
+                self.script_settings = ScriptSettings(CONFIG_FILE_NAME, logger)
+
+    def test_get_target_configs(self):
+        """Assert OMBS_CONFIG is the first target, followed by the TARGET sections."""
+        self.script_settings.config.readfp(StringIO(
+            "[TARGET_SITE2]\nIP=10.0.3.4\nUSERNAME=bkp\nBKP_DIR=/bkp\nKEY_PATH=/k\nRETRIES=4\n"
+            "[TARGET_NFS]\nPATH=/mnt/nfs\n"))
+
+        target_configs = self.script_settings.get_target_configs("ombs_config")
+
+        self.assertEqual(["ombs", "nfs", "site2"],
+                         [target_config.name for target_config in target_configs])
+        self.assertEqual("ombs_config", target_configs[0].ombs_config)
+        self.assertEqual(("/mnt/nfs", None), (target_configs[1].path,
+                                              target_configs[1].ombs_config))
+        self.assertEqual(("bkp@10.0.3.4", 4), (target_configs[2].ombs_config.host,
+                                               target_configs[2].retries))
+
+    def test_get_target_configs_missing_option(self):
+        """Assert an exception is raised for a remote target without IP."""
+        self.script_settings.config.readfp(StringIO("[TARGET_SITE2]\nUSERNAME=bkp\n"))
+
+        with self.assertRaises(Exception):
+            self.script_settings.get_target_configs("ombs_config")
@@ -0,0 +1,109 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the backup_validator.py script."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from network_backup_onsite.backup_settings import BaselineConfig
+from network_backup_onsite.backup_validator import validate_backup_file
+from network_backup_onsite.baseline import BackupBaselines
+
+SEPARATOR = "-" * 83 + "\n"
+SRX_HEADER = SEPARATOR + "Equipment type: srx -> SRX-1 with IP: 10.0.0.3\n" + SEPARATOR
+EXOS_HEADER = SEPARATOR + "Equipment type: connectivitySwitch -> SW-1 with IP: 10.0.0.4\n" + \
+    SEPARATOR
+
+
+class ValidateBackupFileTestCase(unittest.TestCase):
+    """Test case for the content validation of the backup files."""
+
+    def setUp(self):
+        """Create a temporary folder."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmp_dir)
+
+    def validate(self, content, min_backup_size=10, baselines=None, file_name="backup"):
+        """
+        Write a backup file and validate it.
+
+        :param content: content of the file.
+        :param min_backup_size: minimal size of the file.
+        :param baselines: instance of BackupBaselines.
+        :param file_name: name of the file.
+        :return: instance of BackupVerdict.
+        """
+        backup_file = os.path.join(self.tmp_dir, file_name)
+        with open(backup_file, "wb") as backup:
+            backup.write(content)
+
+        return validate_backup_file(backup_file, min_backup_size, baselines)
+
+    def test_valid_srx_backup(self):
+        """Test a complete SRX configuration is valid."""
+        verdict = self.validate(SRX_HEADER + "set version 15.1\nset system host-name srx\n\n")
+
+        self.assertTrue(verdict.valid, str(verdict))
+        self.assertEqual("srx", verdict.node_type)
+
+    def test_truncated_srx_backup(self):
+        """Test an SRX configuration cut in the middle of a line is invalid."""
+        verdict = self.validate(SRX_HEADER + "set version 15.1\nset system host-\n{master}\n")
+
+        self.assertFalse(verdict.valid)
+        self.assertIn("truncated", str(verdict))
+
+    def test_error_output(self):
+        """Test a big enough file with the error of the session is invalid."""
+        verdict = self.validate(SRX_HEADER + "Connection timed out\n" * 20)
+
+        self.assertFalse(verdict.valid)
+        self.assertIn("Error output found: 'Connection timed out'.", verdict.problems)
+
+    def test_exos_backup(self):
+        """Test the EXOS configuration needs its module sections."""
+        self.assertTrue(self.validate(EXOS_HEADER + "#\n# Module vlan configuration.\n#\n"
+                                                    "configure vlan Default tag 1\n").valid)
+        self.assertFalse(self.validate(EXOS_HEADER + "configure vlan Default tag 1\n").valid)
+
+    def test_small_and_missing_files(self):
+        """Test the size is checked and a missing file is invalid."""
+        self.assertFalse(self.validate(SRX_HEADER, min_backup_size=1000).valid)
+        self.assertFalse(validate_backup_file(os.path.join(self.tmp_dir, "missing"), 1).valid)
+
+    def test_baseline_replaces_min_backup_size(self):
+        """Test a small node passes with its baseline and is warned about when it shrinks."""
+        baselines = BackupBaselines(self.tmp_dir, BaselineConfig(min_samples=2))
+        content = SRX_HEADER + "set version 15.1\n" + "set system host-name srx\n" * 10
+
+        for day in ("20180101", "20180102"):
+            self.assertFalse(self.validate(content, 10000, baselines,
+                                           "srx-1-backup-" + day).valid)
+            baselines.record("srx-1", day, len(content), 14)
+
+        verdict = self.validate(content, 10000, baselines, "srx-1-backup-20180103")
+        self.assertTrue(verdict.valid, str(verdict))
+        self.assertEqual(14, verdict.lines)
+
+        verdict = self.validate(SRX_HEADER + "set version 15.1\n", 10000, baselines,
+                                "srx-1-backup-20180104")
+        self.assertTrue(verdict.valid)
+        self.assertEqual(2, len(verdict.warnings))
+        self.assertIn("usual range", str(verdict))
@@ -0,0 +1,78 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the baseline.py script."""
+
+import shutil
+import tempfile
+import unittest
+
+from network_backup_onsite.backup_settings import BaselineConfig
+from network_backup_onsite.baseline import BackupBaselines, get_median, get_node_and_date
+
+NODE = "sw-1"
+
+
+class BackupBaselinesTestCase(unittest.TestCase):
+    """Test case for the BackupBaselines class."""
+
+    def setUp(self):
+        """Create a baseline of five daily backups of about 1000 bytes and 50 lines."""
+        self.backup_path = tempfile.mkdtemp()
+        self.baselines = BackupBaselines(self.backup_path,
+                                         BaselineConfig(min_samples=5, deviation=5,
+                                                        tolerance=0.1, history_size=6))
+
+        for day, size in enumerate((1000, 1010, 990, 1000, 1005)):
+            self.baselines.record(NODE, "2018010{}".format(day + 1), size, 50)
+
+    def tearDown(self):
+        """Remove the backup folder."""
+        shutil.rmtree(self.backup_path)
+
+    def test_helpers(self):
+        """Test the median and the parsing of the backup file names."""
+        self.assertEqual(2.5, get_median([4, 1, 3, 2]))
+        self.assertEqual(("srx-1", "20180101"), get_node_and_date("/b/srx-1-backup-20180101"))
+        self.assertEqual((None, None), get_node_and_date("/b/.checkpoint"))
+
+    def test_usual_backup(self):
+        """Test a backup within the tolerance of the median is accepted."""
+        self.assertTrue(self.baselines.has_baseline(NODE, "20180106"))
+        self.assertEqual([], self.baselines.check(NODE, "20180106", 1080, 52))
+
+    def test_deviating_backup(self):
+        """Test a backup which lost half of its content is flagged."""
+        problems = self.baselines.check(NODE, "20180106", 500, 25)
+
+        self.assertEqual(2, len(problems))
+        self.assertIn("Size 500 is out of the usual range", problems[0])
+
+    def test_only_previous_dates(self):
+        """Test a backup is compared only with the backups of the previous dates."""
+        self.assertFalse(self.baselines.has_baseline(NODE, "20180105"))
+        self.assertEqual([], self.baselines.check(NODE, "20180105", 10, 1))
+
+    def test_record_replaces_date_and_is_persisted(self):
+        """Test recording a date again replaces its sample and old dates are dropped."""
+        self.baselines.record(NODE, "20180105", 2000, 60)
+        self.baselines.record(NODE, "20180106", 1000, 50)
+        self.baselines.record(NODE, "20180107", 1000, 50)
+
+        baselines = BackupBaselines(self.backup_path, self.baselines.baseline_config)
+        samples = baselines.get_samples(NODE, "20180108")
+
+        self.assertEqual(6, len(samples))
+        self.assertEqual(("20180102", 1010, 50), samples[0])
+        self.assertIn(("20180105", 2000, 60), samples)
@@ -0,0 +1,103 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the checkpoint.py script."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from network_backup_onsite.checkpoint import CAPTURED, FAILED, RunCheckpoint, SENT
+
+
+class RunCheckpointTestCase(unittest.TestCase):
+    """Test case for the RunCheckpoint journal."""
+
+    def setUp(self):
+        """Create a backup folder with two backup files."""
+        self.bkp_folder_path = tempfile.mkdtemp()
+        self.files = {}
+
+        for hostname in ("node-1", "node-2"):
+            self.files[hostname] = os.path.join(self.bkp_folder_path,
+                                                "{}-backup-20181010".format(hostname))
+            with open(self.files[hostname], "w") as backup_file:
+                backup_file.write("config")
+
+    def tearDown(self):
+        """Remove the backup folder."""
+        shutil.rmtree(self.bkp_folder_path)
+
+    def test_state_is_reloaded(self):
+        """Test a new checkpoint object replays the events written by a previous run."""
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+        checkpoint.record("node-1", CAPTURED, self.files["node-1"])
+        checkpoint.record("node-2", FAILED)
+
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+
+        self.assertTrue(checkpoint.is_captured("node-1"))
+        self.assertFalse(checkpoint.is_captured("node-2"))
+        self.assertEqual(FAILED, checkpoint.get_status("node-2"))
+        self.assertIsNone(checkpoint.get_status("node-3"))
+
+    def test_unsent_files(self):
+        """Test only files captured after their last transfer are returned as unsent."""
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+        checkpoint.record("node-1", CAPTURED, self.files["node-1"])
+        checkpoint.record("node-2", CAPTURED, self.files["node-2"])
+        checkpoint.record("node-1", SENT, self.files["node-1"])
+
+        self.assertEqual({"node-2": self.files["node-2"]},
+                         RunCheckpoint(self.bkp_folder_path).get_unsent_files())
+
+        checkpoint.record("node-1", CAPTURED, self.files["node-1"])
+
+        self.assertEqual(self.files, RunCheckpoint(self.bkp_folder_path).get_unsent_files())
+
+    def test_unsent_files_per_target(self):
+        """Test a file sent to one target is still unsent for the others."""
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+        checkpoint.record("node-1", CAPTURED, self.files["node-1"])
+        checkpoint.record("node-1", SENT, self.files["node-1"], "nfs")
+
+        reloaded = RunCheckpoint(self.bkp_folder_path)
+
+        self.assertEqual({}, reloaded.get_unsent_files("nfs"))
+        self.assertEqual({"node-1": self.files["node-1"]}, reloaded.get_unsent_files())
+
+    def test_truncated_line_is_ignored(self):
+        """Test an event partially written by a crashed run does not break the journal."""
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+        checkpoint.record("node-1", CAPTURED, self.files["node-1"])
+
+        with open(checkpoint.path, "a") as journal:
+            journal.write('{"node": "node-2", "sta')
+
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+        self.assertTrue(checkpoint.is_captured("node-1"))
+
+        checkpoint.record("node-2", CAPTURED, self.files["node-2"])
+
+        self.assertTrue(RunCheckpoint(self.bkp_folder_path).is_captured("node-2"))
+
+    def test_deleted_file_is_not_captured(self):
+        """Test a node whose backup file was removed must be captured again."""
+        checkpoint = RunCheckpoint(self.bkp_folder_path)
+        checkpoint.record("node-1", CAPTURED, self.files["node-1"])
+
+        os.remove(self.files["node-1"])
+
+        self.assertFalse(RunCheckpoint(self.bkp_folder_path).is_captured("node-1"))
@@ -0,0 +1,130 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the config_diff.py script."""
+
+import difflib
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from network_backup_onsite.config_diff import DIFF_FOLDER_NAME, create_backup_diff, \
+    diff_backup_files, find_previous_backup
+
+FOLDER_TEMPLATE = "network_device_backup_"
+OLD_LINES = ["set interfaces ge-0/0/{} unit 0\n".format(index) for index in range(20)]
+
+
+def write_backup(backup_path, date, lines, hostname="srx-1"):
+    """
+    Write the backup file of a node in the folder of a date.
+
+    :param backup_path: root folder of the backups.
+    :param date: date of the backup folder.
+    :param lines: lines of the backup file.
+    :param hostname: node name.
+    :return: path of the backup file.
+    """
+    folder = os.path.join(backup_path, FOLDER_TEMPLATE + date)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    backup_file = os.path.join(folder, "{}-backup-{}".format(hostname, date))
+    with open(backup_file, "w") as backup:
+        backup.writelines(lines)
+
+    return backup_file
+
+
+class ConfigDiffTestCase(unittest.TestCase):
+    """Test case for the comparison of backups."""
+
+    def setUp(self):
+        """Create the root backup folder."""
+        self.backup_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the root backup folder."""
+        shutil.rmtree(self.backup_path)
+
+    def test_find_previous_backup_skips_missing_days(self):
+        """Test the latest older folder having a backup of the node is chosen."""
+        previous_file = write_backup(self.backup_path, "20181008", OLD_LINES)
+        write_backup(self.backup_path, "20181009", OLD_LINES, hostname="switch-1")
+        write_backup(self.backup_path, "20181011", OLD_LINES)
+        backup_file = write_backup(self.backup_path, "20181010", OLD_LINES)
+
+        self.assertEqual(previous_file,
+                         find_previous_backup(backup_file, self.backup_path, FOLDER_TEMPLATE))
+
+    def test_diff_is_equal_to_difflib(self):
+        """Test the stored diff is the same unified diff produced by difflib."""
+        new_lines = list(OLD_LINES)
+        new_lines[2] = "set interfaces ge-0/0/2 unit 1\n"
+        del new_lines[15]
+        new_lines.append("set version 2\n")
+
+        old_file = write_backup(self.backup_path, "20181009", OLD_LINES)
+        new_file = write_backup(self.backup_path, "20181010", new_lines)
+        diff_file = os.path.join(self.backup_path, "diff")
+
+        self.assertEqual((2, 2), diff_backup_files(old_file, new_file, diff_file))
+
+        expected = "".join(difflib.unified_diff(OLD_LINES, new_lines, old_file, new_file))
+        with open(diff_file) as diff:
+            self.assertEqual(expected.replace("\t", ""), diff.read())
+
+    def test_create_backup_diff(self):
+        """Test the diff is stored in the diffs subfolder and summarized."""
+        write_backup(self.backup_path, "20181009", OLD_LINES)
+        backup_file = write_backup(self.backup_path, "20181010", OLD_LINES + ["set version 2\n"])
+
+        config_diff = create_backup_diff(backup_file, self.backup_path, FOLDER_TEMPLATE)
+
+        self.assertEqual((1, 0), (config_diff.added, config_diff.removed))
+        self.assertEqual(os.path.join(os.path.dirname(backup_file), DIFF_FOLDER_NAME,
+                                      "srx-1-backup-20181010.diff"), config_diff.diff_file)
+        self.assertEqual("srx-1-backup-20181010: +1 -0 lines since network_device_backup_20181009.",
+                         str(config_diff))
+
+    def test_create_backup_diff_unchanged(self):
+        """Test no diff file is stored when the configuration did not change."""
+        write_backup(self.backup_path, "20181009", OLD_LINES)
+        backup_file = write_backup(self.backup_path, "20181010", OLD_LINES)
+
+        config_diff = create_backup_diff(backup_file, self.backup_path, FOLDER_TEMPLATE)
+
+        self.assertFalse(config_diff.changed)
+        self.assertIsNone(config_diff.diff_file)
+
+    def test_create_backup_diff_folder_created_meanwhile(self):
+        """Test the diffs subfolder created by the diff of another node at the same time."""
+        write_backup(self.backup_path, "20181009", OLD_LINES)
+        backup_file = write_backup(self.backup_path, "20181010", OLD_LINES + ["set version 2\n"])
+        makedirs = os.makedirs
+
+        def create_meanwhile(path):
+            """Create the folder as another process would, then fail as makedirs would."""
+            makedirs(path)
+            raise OSError(errno.EEXIST, "File exists", path)
+
+        with mock.patch('network_backup_onsite.config_diff.os.makedirs',
+                        side_effect=create_meanwhile):
+            config_diff = create_backup_diff(backup_file, self.backup_path, FOLDER_TEMPLATE)
+
+        self.assertTrue(os.path.exists(config_diff.diff_file))
@@ -0,0 +1,152 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the config_index.py script."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from network_backup_onsite.config_index import ConfigIndex, INDEX_FILE_NAME
+
+FOLDER_TEMPLATE = "network_device_backup_"
+HEADER = ["-" * 83 + "\n", "Equipment type: srx -> SRX-1 with IP: 10.0.0.1\n", "-" * 83 + "\n"]
+
+
+class ConfigIndexTestCase(unittest.TestCase):
+    """Test case for the ConfigIndex class."""
+
+    def setUp(self):
+        """Create the root backup folder and the index."""
+        self.backup_path = tempfile.mkdtemp()
+        self.config_index = ConfigIndex(self.backup_path)
+
+    def tearDown(self):
+        """Close the index and remove the root backup folder."""
+        self.config_index.close()
+        shutil.rmtree(self.backup_path)
+
+    def write_backup(self, date, hostname, lines):
+        """
+        Write the backup file of a node in the folder of a date.
+
+        :param date: date of the backup folder.
+        :param hostname: node name.
+        :param lines: configuration lines.
+        :return: path of the backup file.
+        """
+        folder = os.path.join(self.backup_path, FOLDER_TEMPLATE + date)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        backup_file = os.path.join(folder, "{}-backup-{}".format(hostname, date))
+        with open(backup_file, "w") as backup:
+            backup.writelines(HEADER + [line + "\n" for line in lines])
+
+        return backup_file
+
+    def test_search_intervals(self):
+        """Test a line is reported with the dates it was present in the backups of each node."""
+        self.write_backup("20181008", "srx-1", ["set vlans v100 vlan-id 100"])
+        self.write_backup("20181009", "srx-1", ["set system ntp server 10.0.0.5"])
+        self.write_backup("20181010", "srx-1", ["set vlans v100 vlan-id 100",
+                                                "set system ntp server 10.0.0.5"])
+        self.write_backup("20181010", "switch-1", ["configure vlan v100 tag 100"])
+
+        self.assertEqual(4, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
+
+        results = [(result.node, result.first_date, result.last_date, result.current)
+                   for result in self.config_index.search("V100")]
+        self.assertEqual([("srx-1", "20181008", "20181008", False),
+                          ("srx-1", "20181010", "20181010", True),
+                          ("switch-1", "20181010", "20181010", True)], results)
+
+        ntp_results = self.config_index.search("ntp server 10.0.0.5")
+        self.assertEqual(1, len(ntp_results))
+        self.assertEqual(("20181009", "20181010"),
+                         (ntp_results[0].first_date, ntp_results[0].last_date))
+
+    def test_backup_dates_survive_pruning(self):
+        """Test the dates of the backups of a node are kept after their folders are removed."""
+        self.write_backup("20181008", "srx-1", ["set vlans v100 vlan-id 100"])
+        self.write_backup("20181009", "srx-1", ["set vlans v100 vlan-id 100"])
+        self.config_index.update(self.backup_path, FOLDER_TEMPLATE)
+
+        shutil.rmtree(os.path.join(self.backup_path, FOLDER_TEMPLATE + "20181008"))
+
+        self.assertEqual(["20181008", "20181009"], self.config_index.get_backup_dates("SRX-1"))
+
+    def test_update_is_incremental(self):
+        """Test only the new backups are indexed and the header is not indexed."""
+        self.write_backup("20181009", "srx-1", ["set vlans v100 vlan-id 100"])
+        self.config_index.update(self.backup_path, FOLDER_TEMPLATE)
+
+        self.write_backup("20181010", "srx-1", ["set vlans v100 vlan-id 100"])
+
+        self.assertEqual(1, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
+        self.assertEqual(0, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
+        self.assertEqual([], self.config_index.search("Equipment type"))
+
+        result = self.config_index.search("vlan-id 100")[0]
+        self.assertEqual(("20181009", "20181010"), (result.first_date, result.last_date))
+
+    def test_search_requires_the_whole_text(self):
+        """Test a line having all the tokens but not the text is not returned."""
+        self.write_backup("20181009", "srx-1", ["set vlans 100 vlan-id v100"])
+        self.config_index.update(self.backup_path, FOLDER_TEMPLATE)
+
+        self.assertEqual([], self.config_index.search("v100 vlan-id"))
+        self.assertEqual(1, len(self.config_index.search("vlan-id v100")))
+
+    def test_update_recaptured_same_day(self):
+        """Test the latest backup of a node captured again the same day is indexed again."""
+        self.write_backup("20181009", "srx-1", ["set vlans v100 vlan-id 100"])
+        self.write_backup("20181010", "srx-1", ["set vlans v100 vlan-id 100",
+                                                "set system ntp server 10.0.0.5"])
+        self.config_index.update(self.backup_path, FOLDER_TEMPLATE)
+
+        backup_file = self.write_backup("20181010", "srx-1", ["set vlans v100 vlan-id 100",
+                                                              "set system ntp server 10.0.0.6"])
+        modified = time.time() + 10
+        os.utime(backup_file, (modified, modified))
+
+        self.assertEqual(1, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
+        self.assertEqual(0, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
+
+        self.assertEqual([], self.config_index.search("10.0.0.5"))
+        self.assertEqual([("20181010", "20181010", True)],
+                         [(result.first_date, result.last_date, result.current)
+                          for result in self.config_index.search("10.0.0.6")])
+        self.assertEqual([("20181009", "20181010")],
+                         [(result.first_date, result.last_date)
+                          for result in self.config_index.search("vlan-id 100")])
+        self.assertEqual(["20181009", "20181010"], self.config_index.get_backup_dates("srx-1"))
+
+    def test_index_of_previous_version(self):
+        """Test an index without the modification time and size of the backups is upgraded."""
+        self.config_index.close()
+        os.remove(os.path.join(self.backup_path, INDEX_FILE_NAME))
+        connection = sqlite3.connect(os.path.join(self.backup_path, INDEX_FILE_NAME))
+        connection.execute("CREATE TABLE backups (node TEXT NOT NULL, date TEXT NOT NULL, "
+                           "PRIMARY KEY (node, date))")
+        connection.close()
+
+        self.config_index = ConfigIndex(self.backup_path)
+        self.write_backup("20181009", "srx-1", ["set vlans v100 vlan-id 100"])
+
+        self.assertEqual(1, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
+        self.assertEqual(0, self.config_index.update(self.backup_path, FOLDER_TEMPLATE))
@@ -0,0 +1,227 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the device_drivers.py script."""
+
+import gzip
+import os
+import shutil
+from StringIO import StringIO
+import tempfile
+import unittest
+
+import mock
+import pexpect
+
+from network_backup_onsite.backup_settings import NodeConfig
+from network_backup_onsite.device_drivers import ExosDriver, SrxDriver, get_driver, \
+    get_supported_node_types, is_supported_node_type
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+
+SRX_NODE = NodeConfig("SRX1500-1", "10.0.70.75", "srx", "genie@SRX1500-1>", "genie", "password")
+SWITCH_NODE = NodeConfig("Connectivity_Switch-1", "10.0.60.3", "connectivitySwitch",
+                         "Connectivity_Switch-1", "genie", "password")
+
+
+class DeviceDriversRegistryTestCase(unittest.TestCase):
+    """Test case for the driver registry functions."""
+
+    def test_supported_node_types(self):
+        """Test the shipped drivers are registered."""
+        self.assertEqual(["connectivityswitch", "srx"], get_supported_node_types())
+        self.assertTrue(is_supported_node_type("connectivitySwitch"))
+        self.assertFalse(is_supported_node_type("conectivitySwitch"))
+
+    def test_get_driver(self):
+        """Test the driver class is chosen by node type."""
+        self.assertIsInstance(get_driver(SRX_NODE), SrxDriver)
+        self.assertIsInstance(get_driver(SWITCH_NODE), ExosDriver)
+
+    def test_get_driver_unsupported_type(self):
+        """Test an exception is raised for unknown node types."""
+        node = NodeConfig("router", "10.0.0.1", "router", "router#", "user", "password")
+
+        with self.assertRaises(NodeBackupException) as cex:
+            get_driver(node)
+
+        self.assertEqual(ExceptionCodes.UnsupportedNodeType, cex.exception.code)
+
+
+class DeviceDriversPromptTestCase(unittest.TestCase):
+    """Test case for the prompt and end of output expressions."""
+
+    def test_srx_prompt(self):
+        """Test SRX prompt is matched with or without the trailing character configured."""
+        self.assertIsNotNone(get_driver(SRX_NODE).prompt_re.search("\r\ngenie@SRX1500-1> "))
+
+        node = NodeConfig("SRX1500-1", "10.0.70.75", "srx", "genie@SRX1500-1", "genie", "pwd")
+        self.assertIsNotNone(get_driver(node).prompt_re.search("\r\ngenie@SRX1500-1> "))
+
+    def test_exos_prompt(self):
+        """Test EXOS prompt is matched, but not a configuration line with the host name."""
+        driver = get_driver(SWITCH_NODE)
+
+        self.assertIsNotNone(driver.prompt_re.search("* Connectivity_Switch-1.4 # "))
+        self.assertIsNone(driver.prompt_re.search('configure snmp sysName '
+                                                  '"Connectivity_Switch-1"\r\n'))
+
+    def test_end_of_output(self):
+        """Test the output ends with the prompt on its own line, at the end of the output."""
+        end_of_output_re = get_driver(SRX_NODE).end_of_output_re
+
+        self.assertIsNotNone(end_of_output_re.search("set version 1\r\ngenie@SRX1500-1> "))
+        self.assertIsNone(end_of_output_re.search("set system login message genie@SRX1500-1>"))
+        self.assertIsNone(end_of_output_re.search("genie@SRX1500-1> show\r\nset version 1\r\n"))
+
+        self.assertIsNotNone(get_driver(SWITCH_NODE).end_of_output_re.search(
+            "# Module vlan configuration.\r\n* Connectivity_Switch-1.4 # "))
+
+    def test_exos_unsaved_prompt_is_dropped(self):
+        """Test the prompt and the echo are dropped when the prompt shows an unsaved config."""
+        output = StringIO()
+        normalizer = get_driver(SWITCH_NODE).get_normalizer(output, ["show configuration"])
+
+        normalizer.write("* Connectivity_Switch-1.3 # show configuration\r\n"
+                         "# Module vlan configuration.\r\n* Connectivity_Switch-1.4 # ")
+        normalizer.close()
+
+        self.assertEqual("# Module vlan configuration.\n", output.getvalue())
+
+
+class DeviceDriversSessionTestCase(unittest.TestCase):
+    """Test case for the terminal dialogue of a driver."""
+
+    def setUp(self):
+        """Set up a mocked pexpect session."""
+        self.child = mock.Mock()
+        self.driver = get_driver(SRX_NODE)
+
+    def test_login_answers_password(self):
+        """Test the password is sent once and the login finishes on the prompt."""
+        self.child.expect_list.side_effect = [5, 0]
+
+        self.driver.login(self.child, 1)
+
+        self.child.sendline.assert_called_once_with("password")
+
+    def test_login_wrong_password(self):
+        """Test a second password prompt is reported as a login failure."""
+        self.child.expect_list.side_effect = [5, 5]
+
+        with self.assertRaises(NodeBackupException) as cex:
+            self.driver.login(self.child, 1)
+
+        self.assertEqual(ExceptionCodes.NodeConnectionError, cex.exception.code)
+
+    def test_retrieve_config_is_normalized(self):
+        """Test the output is normalized and appended to the backup file while received."""
+        def expect_list(*_, **__):
+            for chunk in ("show configuration | display set | no-more\r\nset ver",
+                          "sion 1\r\n\r\ngenie@SRX1500-1> "):
+                self.child.logfile_read.write(chunk)
+            return 0
+
+        self.child.expect_list.side_effect = expect_list
+        tmp_dir = tempfile.mkdtemp()
+        backup_file = os.path.join(tmp_dir, "backup")
+
+        try:
+            self.driver.retrieve_config(self.child, backup_file, 1)
+
+            with open(backup_file) as backup:
+                self.assertEqual("set version 1\n\n", backup.read())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertIsNone(self.child.logfile_read)
+
+    def test_retrieve_config_timeout(self):
+        """Test an exception is raised if the output does not finish with the prompt."""
+        self.child.expect_list.return_value = 1
+        tmp_dir = tempfile.mkdtemp()
+
+        try:
+            with self.assertRaises(NodeBackupException) as cex:
+                self.driver.retrieve_config(self.child, os.path.join(tmp_dir, "backup"), 1)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual(ExceptionCodes.NodeBackupCaptureError, cex.exception.code)
+
+    def test_retrieve_config_line_with_prompt(self):
+        """Test a configuration line containing the prompt does not end the capture."""
+        child = pexpect.spawn("sh", ["-c", r"read command; printf 'set system login message "
+                                           r"genie@SRX1500-1>\r\n'; sleep 0.5; "
+                                           r"printf 'set version 1\r\ngenie@SRX1500-1> '; "
+                                           r"sleep 5"])
+        tmp_dir = tempfile.mkdtemp()
+        backup_file = os.path.join(tmp_dir, "backup")
+
+        try:
+            self.driver.retrieve_config(child, backup_file, 5)
+
+            with open(backup_file) as backup:
+                self.assertEqual("set system login message genie@SRX1500-1>\nset version 1\n",
+                                 backup.read())
+        finally:
+            child.close(force=True)
+            shutil.rmtree(tmp_dir)
+
+
+class DeviceDriversFileRetrievalTestCase(unittest.TestCase):
+    """Test case for the file based retrieval of the configuration."""
+
+    def setUp(self):
+        """Set up a temporary backup file and a mocked pexpect session."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.backup_file = os.path.join(self.tmp_dir, "srx1500-1-backup-20181010")
+        self.child = mock.Mock()
+        self.child.expect_list.return_value = 0
+
+        with open(self.backup_file, "w") as backup_file:
+            backup_file.write("header\n")
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_retrieve_config_file_decompresses(self):
+        """Test the compressed file pulled from the device is appended to the backup file."""
+        def pull_file(_, local_path, __):
+            with gzip.open(local_path, "wb") as remote_file:
+                remote_file.write("set version 1\r\n")
+
+        driver = get_driver(SRX_NODE)
+        with mock.patch.object(driver, "pull_file", side_effect=pull_file):
+            driver.retrieve_config_file(self.child, self.backup_file, 1)
+
+        with open(self.backup_file) as backup_file:
+            self.assertEqual("header\nset version 1\n", backup_file.read())
+
+        self.assertEqual([os.path.basename(self.backup_file)], os.listdir(self.tmp_dir))
+        sent = [call[0][0] for call in self.child.sendline.call_args_list]
+        self.assertEqual(list(SrxDriver.save_config_commands + SrxDriver.remove_config_commands),
+                         sent)
+
+    def test_retrieve_config_file_confirmation(self):
+        """Test a confirmation asked by the device is answered."""
+        self.child.expect_list.side_effect = [1, 0, 0]
+        driver = get_driver(SWITCH_NODE)
+
+        with mock.patch.object(driver, "pull_file", side_effect=NodeBackupException("failed")):
+            with self.assertRaises(NodeBackupException):
+                driver.retrieve_config_file(self.child, self.backup_file, 1)
+
+        self.child.sendline.assert_any_call("y")
+        self.assertEqual([os.path.basename(self.backup_file)], os.listdir(self.tmp_dir))
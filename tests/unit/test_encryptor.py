@@ -0,0 +1,111 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the encryptor.py script."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from network_backup_onsite.backup_settings import GnupgConfig
+from network_backup_onsite.encryptor import GpgEncryptor, TeeStream, encrypt_file, \
+    get_encrypted_file, get_gpg_command, get_manifest_file
+from network_backup_onsite.exceptions import NodeBackupException
+
+MOCK_GPG_COMMAND = 'network_backup_onsite.encryptor.get_gpg_command'
+
+GNUPG_CONFIG = GnupgConfig("backup@root.com")
+
+
+class GpgEncryptorTestCase(unittest.TestCase):
+    """Test case for the GpgEncryptor class, with commands standing in for gpg."""
+
+    def setUp(self):
+        """Create a backup folder."""
+        self.bkp_folder = tempfile.mkdtemp()
+        self.backup_file = os.path.join(self.bkp_folder, "sw-1-backup-20180101")
+        self.encrypted_file = get_encrypted_file(self.backup_file)
+
+    def tearDown(self):
+        """Remove the backup folder."""
+        shutil.rmtree(self.bkp_folder)
+
+    def test_get_gpg_command(self):
+        """Test the key file is used instead of the keyring recipient."""
+        self.assertEqual(["--recipient", "backup@root.com", "--encrypt"],
+                         get_gpg_command(GNUPG_CONFIG)[-3:])
+        self.assertEqual(["--homedir", "/g", "--recipient-file", "/k.asc", "--encrypt"],
+                         get_gpg_command(GnupgConfig(None, "/k.asc", "/g"))[-5:])
+
+    @mock.patch(MOCK_GPG_COMMAND, return_value=["cat"])
+    def test_close_records_manifest(self, _):
+        """Test the output is stored, hashed and recorded in the manifest."""
+        encryptor = GpgEncryptor(self.encrypted_file, GNUPG_CONFIG)
+        TeeStream(encryptor).write("set system host-name sw-1\n" * 1000)
+        sha256 = encryptor.close()
+
+        with open(self.encrypted_file, "rb") as encrypted:
+            content = encrypted.read()
+        with open(get_manifest_file(self.encrypted_file)) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        self.assertEqual("set system host-name sw-1\n" * 1000, content)
+        self.assertEqual(hashlib.sha256(content).hexdigest(), sha256)
+        self.assertEqual({"sw-1-backup-20180101.gpg": {"size": len(content), "sha256": sha256}},
+                         manifest)
+
+    @mock.patch(MOCK_GPG_COMMAND, return_value=["sh", "-c", "cat >/dev/null; echo no key >&2; "
+                                                            "exit 2"])
+    def test_close_failure(self, _):
+        """Test a gpg failure raises an exception and leaves no encrypted file."""
+        encryptor = GpgEncryptor(self.encrypted_file, GNUPG_CONFIG)
+        encryptor.write("config\n")
+
+        with self.assertRaises(NodeBackupException) as context:
+            encryptor.close()
+
+        self.assertIn("no key", context.exception.message)
+        self.assertEqual([], os.listdir(os.path.dirname(self.encrypted_file)))
+
+    @mock.patch(MOCK_GPG_COMMAND, return_value=["/not/a/gpg"])
+    def test_start_failure(self, _):
+        """Test a gpg which can't be started raises an exception and leaves no file."""
+        with self.assertRaises(NodeBackupException) as context:
+            GpgEncryptor(self.encrypted_file, GNUPG_CONFIG)
+
+        self.assertIn("gpg can't be started", context.exception.message)
+        self.assertEqual([], os.listdir(os.path.dirname(self.encrypted_file)))
+
+    @mock.patch(MOCK_GPG_COMMAND, return_value=["cat"])
+    def test_abort(self, _):
+        """Test an aborted encryption leaves no file."""
+        encryptor = GpgEncryptor(self.encrypted_file, GNUPG_CONFIG)
+        encryptor.write("config\n")
+        encryptor.abort()
+
+        self.assertEqual([], os.listdir(os.path.dirname(self.encrypted_file)))
+
+    @mock.patch(MOCK_GPG_COMMAND, return_value=["cat"])
+    def test_encrypt_file(self, _):
+        """Test an existing backup file is encrypted to the encrypted folder."""
+        with open(self.backup_file, "wb") as backup:
+            backup.write("config\n")
+
+        self.assertEqual(self.encrypted_file, encrypt_file(self.backup_file, GNUPG_CONFIG))
+        self.assertTrue(os.path.exists(get_manifest_file(self.encrypted_file)))
@@ -0,0 +1,162 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the governor.py script."""
+
+import threading
+import time
+import unittest
+
+import mock
+
+from network_backup_onsite.backup_settings import GovernorConfig, NodeConfig
+from network_backup_onsite.governor import Governor, RateLimitedStream, TokenBucket
+
+MOCK_TIME = 'network_backup_onsite.governor.time'
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    """Test case for the TokenBucket class."""
+
+    @mock.patch(MOCK_TIME)
+    def test_wait_time(self, mock_time):
+        """
+        Test the burst is consumed without waiting and the excess waits for the refill.
+
+        :param mock_time: mocked time module.
+        """
+        mock_time.time.return_value = 100.0
+        bucket = TokenBucket(1000)
+
+        self.assertEqual(0, bucket.get_wait_time(1000))
+        self.assertEqual(0.5, bucket.get_wait_time(500))
+
+        mock_time.time.return_value = 101.5
+        self.assertEqual(0, bucket.get_wait_time(1000))
+
+    @mock.patch(MOCK_TIME)
+    def test_rate_limited_stream(self, mock_time):
+        """
+        Test the data is forwarded after waiting for the bucket.
+
+        :param mock_time: mocked time module.
+        """
+        mock_time.time.return_value = 100.0
+        stream = mock.Mock()
+
+        RateLimitedStream(stream, TokenBucket(10)).write("x" * 30)
+
+        mock_time.sleep.assert_called_once_with(2.0)
+        stream.write.assert_called_once_with("x" * 30)
+
+    @mock.patch(MOCK_TIME)
+    def test_transfer_share_not_refilled(self, mock_time):
+        """
+        Test the consumers only get the rate left by the running transfers.
+
+        :param mock_time: mocked time module.
+        """
+        mock_time.time.return_value = 100.0
+        bucket = TokenBucket(1000, transfers=2)
+        self.assertEqual(0, bucket.get_wait_time(1000))
+
+        with bucket.transfer_slot() as scp_limit:
+            self.assertEqual(4, scp_limit)
+            self.assertEqual(1.0, bucket.get_wait_time(500))
+
+            mock_time.time.return_value = 102.0
+
+        # 2 seconds at the half rate left paid the debt and refilled 500 bytes.
+        self.assertEqual(0.5, bucket.get_wait_time(1000))
+
+    def test_scp_limit(self):
+        """Test the rate is converted to Kbit/s for scp."""
+        self.assertEqual(8000, TokenBucket(1000000).get_scp_limit())
+
+    def test_transfer_slots_share_rate(self):
+        """Test the concurrent transfers never exceed the rate together."""
+        bucket = TokenBucket(1000000, transfers=3)
+        lock = threading.Lock()
+        limits = []
+        max_limit = [0]
+
+        def transfer():
+            """Hold a transfer slot for a short time, recording the combined limit."""
+            with bucket.transfer_slot() as scp_limit:
+                with lock:
+                    limits.append(scp_limit)
+                    max_limit[0] = max(max_limit[0], sum(limits))
+                time.sleep(0.05)
+                with lock:
+                    limits.remove(scp_limit)
+
+        threads = [threading.Thread(target=transfer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(2666, bucket.get_scp_limit())
+        self.assertEqual(3 * 2666, max_limit[0])
+
+
+class GovernorTestCase(unittest.TestCase):
+    """Test case for the Governor class."""
+
+    def test_site_sessions_are_limited(self):
+        """Test no more sessions than allowed run at once in a site."""
+        governor = Governor(GovernorConfig(max_workers=4, site_sessions=1,
+                                           sessions_by_site={"dc2": 2}))
+        nodes = [NodeConfig("node-{}".format(index), "10.0.0.1", "srx", "node>", "user", "pwd",
+                            site="DC1" if index < 3 else "DC2") for index in range(6)]
+
+        lock = threading.Lock()
+        running = {}
+        max_running = {}
+
+        def session(node_config):
+            """Hold a session for a short time, recording the concurrent sessions."""
+            site = Governor.get_site(node_config)
+            with governor.site_session(node_config):
+                with lock:
+                    running[site] = running.get(site, 0) + 1
+                    max_running[site] = max(max_running.get(site, 0), running[site])
+                time.sleep(0.05)
+                with lock:
+                    running[site] -= 1
+
+        threads = [threading.Thread(target=session, args=(node,)) for node in nodes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual({"dc1": 1, "dc2": 2}, max_running)
+
+    def test_site_bucket_is_shared(self):
+        """Test the nodes of a site share one bucket and unlimited sites have none."""
+        governor = Governor(GovernorConfig(rate_by_site={"dc1": 1000}))
+
+        self.assertIs(governor.get_site_bucket("dc1"), governor.get_site_bucket("dc1"))
+        self.assertIsNone(governor.get_site_bucket("default"))
+        self.assertIsNone(governor.ombs_bucket)
+
+    def test_buckets_divide_rate_between_transfers(self):
+        """Test the rate of a site is divided between its sessions and OMBS between workers."""
+        governor = Governor(GovernorConfig(max_workers=4, site_sessions=2, site_rate=1000000,
+                                           ombs_rate=1000000, sessions_by_site={"dc2": 5}))
+
+        self.assertEqual(4000, governor.get_site_bucket("dc1").get_scp_limit())
+        self.assertEqual(1600, governor.get_site_bucket("dc2").get_scp_limit())
+        self.assertEqual(2000, governor.ombs_bucket.get_scp_limit())
@@ -26,10 +26,11 @@ BACKUP_SETTINGS = 'network_backup_onsite.backup_settings.'
 CONFIG_FILE_NAME = 'fake_config_file'
 
 TEST_IP = '127.0.0.1'
-TEST_TYPE = 'test_type'
+TEST_TYPE = 'srx'
 TEST_EQ_PROMPT = 'test_prompt'
 TEST_USERNAME = 'test_username'
 TEST_PASSWORD = 'test_password'
+TEST_RETRIEVAL = 'terminal'
 
 
 class InputValidatorsValidateScriptSettingsTestCase(unittest.TestCase):
@@ -252,6 +253,32 @@ class InputValidatorsValidateNodesTestCase(unittest.TestCase):
 
         self.assertFalse(validators.validate_nodes(self.mock_node_config_dict, CONFIG_FILE_NAME))
 
+    @mock.patch(INPUT_VALIDATORS + 'is_host_accessible')
+    @mock.patch(INPUT_VALIDATORS + 'is_valid_ip')
+    def test_validate_nodes_cached_unreachable(self, mock_is_valid_ip, mock_is_host_accessible):
+        """
+        Check the reachability cache is used instead of pinging the nodes.
+
+        :param mock_is_valid_ip: mock of is_valid_ip method.
+        :param mock_is_host_accessible: mock of is_host_accessible method.
+        """
+        self.mock_node_config_dict.get('customer_0').ip = TEST_IP
+        self.mock_node_config_dict.get('customer_0').type = TEST_TYPE
+        self.mock_node_config_dict.get('customer_0').eq_prompt = TEST_EQ_PROMPT
+        self.mock_node_config_dict.get('customer_0').username = TEST_USERNAME
+        self.mock_node_config_dict.get('customer_0').password = TEST_PASSWORD
+        self.mock_node_config_dict.get('customer_0').retrieval = TEST_RETRIEVAL
+        self.mock_node_config_dict.get('customer_0').schedule = None
+
+        mock_is_valid_ip.return_value = True
+        reachability = mock.Mock()
+        reachability.check_hosts.return_value = {TEST_IP: False}
+
+        self.assertFalse(validators.validate_nodes(self.mock_node_config_dict, CONFIG_FILE_NAME,
+                                                   reachability=reachability))
+        reachability.check_hosts.assert_called_once_with([TEST_IP])
+        self.assertFalse(mock_is_host_accessible.called)
+
     @mock.patch(INPUT_VALIDATORS + 'is_host_accessible')
     @mock.patch(INPUT_VALIDATORS + 'is_valid_ip')
     def test_validate_nodes_success(self, mock_is_valid_ip, mock_is_host_accessible):
@@ -266,6 +293,8 @@ class InputValidatorsValidateNodesTestCase(unittest.TestCase):
         self.mock_node_config_dict.get('customer_0').eq_prompt = TEST_EQ_PROMPT
         self.mock_node_config_dict.get('customer_0').username = TEST_USERNAME
         self.mock_node_config_dict.get('customer_0').password = TEST_PASSWORD
+        self.mock_node_config_dict.get('customer_0').retrieval = TEST_RETRIEVAL
+        self.mock_node_config_dict.get('customer_0').schedule = None
 
         mock_is_valid_ip.return_value = True
         mock_is_host_accessible.return_value = True
@@ -273,6 +302,27 @@ class InputValidatorsValidateNodesTestCase(unittest.TestCase):
         self.assertTrue(validators.validate_nodes(self.mock_node_config_dict, CONFIG_FILE_NAME))
 
 
+    @mock.patch(INPUT_VALIDATORS + 'is_host_accessible')
+    @mock.patch(INPUT_VALIDATORS + 'is_valid_ip')
+    def test_validate_nodes_unsupported_type(self, mock_is_valid_ip, mock_is_host_accessible):
+        """
+        Check the return value if there is no driver for the node type.
+
+        :param mock_is_valid_ip: mock of is_valid_ip method.
+        :param mock_is_host_accessible: mock of is_host_accessible method.
+        """
+        self.mock_node_config_dict.get('customer_0').ip = TEST_IP
+        self.mock_node_config_dict.get('customer_0').type = 'conectivitySwitch'
+        self.mock_node_config_dict.get('customer_0').eq_prompt = TEST_EQ_PROMPT
+        self.mock_node_config_dict.get('customer_0').username = TEST_USERNAME
+        self.mock_node_config_dict.get('customer_0').password = TEST_PASSWORD
+
+        mock_is_valid_ip.return_value = True
+        mock_is_host_accessible.return_value = True
+
+        self.assertFalse(validators.validate_nodes(self.mock_node_config_dict, CONFIG_FILE_NAME))
+
+
 class InputValidatorsValidateBackupLocationTestCase(unittest.TestCase):
     """Class to test validate_backup_location."""
 
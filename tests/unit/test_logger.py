@@ -0,0 +1,235 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the logger.py script."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from network_backup_onsite.logger import NODE, NULL_SPAN, PHASE, STEP, SpanRecorder, \
+    TRACE_COMPLETE, TRACE_METADATA
+
+
+class SpanRecorderTestCase(unittest.TestCase):
+    """Test Cases for SpanRecorder class in logger.py."""
+
+    def setUp(self):
+        """Create an enabled recorder."""
+        self.recorder = SpanRecorder()
+        self.recorder.enable()
+
+    def test_span_disabled(self):
+        """Test nothing is recorded while the recorder is disabled."""
+        self.recorder.disable()
+
+        with self.recorder.span("capture") as span:
+            self.assertIs(NULL_SPAN, span)
+
+        self.assertEqual([], self.recorder.get_spans())
+        self.assertEqual([], self.recorder.get_summary())
+
+    @mock.patch("network_backup_onsite.logger.time.time")
+    def test_span_nested(self, mock_time):
+        """
+        Test a span is timed and nested in the span open in the same thread.
+
+        :param mock_time: mocking time function.
+        """
+        mock_time.side_effect = [10.0, 11.0, 14.0, 20.0]
+
+        with self.recorder.span("capture") as capture:
+            with self.recorder.span("node1", NODE) as node:
+                pass
+
+        self.assertEqual([node, capture], self.recorder.get_spans())
+        self.assertIs(capture, node.parent)
+        self.assertIsNone(capture.parent)
+        self.assertEqual(3.0, node.duration)
+        self.assertEqual(10.0, capture.duration)
+
+    def test_span_worker_threads(self):
+        """Test the spans of worker threads nest in their own thread."""
+        parents = []
+
+        def worker(name):
+            """Record a node and a step in a worker thread."""
+            with self.recorder.span(name, NODE) as node:
+                with self.recorder.span("diff", STEP, node=name) as step:
+                    parents.append((node.parent, step.parent is node))
+
+        with self.recorder.span("capture"):
+            threads = [threading.Thread(target=worker, args=("node{}".format(index),))
+                       for index in xrange(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([(None, True)] * 4, parents)
+        self.assertEqual(9, len(self.recorder.get_spans()))
+
+    def test_span_exception(self):
+        """Test a span is recorded when its section raises."""
+        with self.assertRaises(ValueError):
+            with self.recorder.span("transfer"):
+                raise ValueError("failed")
+
+        self.assertEqual(["transfer"], [span.name for span in self.recorder.get_spans()])
+
+    def test_timed(self):
+        """Test a decorated function is timed on each call."""
+        @self.recorder.timed()
+        def validation(value):
+            """Return the value."""
+            return value
+
+        self.assertEqual(1, validation(1))
+        self.assertEqual(2, validation(2))
+
+        self.assertEqual([("validation", PHASE)] * 2,
+                         [(span.name, span.category) for span in self.recorder.get_spans()])
+
+    @mock.patch("network_backup_onsite.logger.time.time")
+    def test_get_summary(self, mock_time):
+        """
+        Test the phases are sorted by total time and the nodes by duration.
+
+        :param mock_time: mocking time function.
+        """
+        mock_time.side_effect = [0.0, 1.0, 0.0, 4.0, 0.0, 2.0, 0.0, 3.5, 0.0, 5.0]
+
+        for name, category in [("diff", STEP), ("node1", NODE), ("diff", STEP),
+                               ("transfer", PHASE), ("node2", NODE)]:
+            with self.recorder.span(name, category):
+                pass
+
+        self.assertEqual(["Slowest phases:",
+                          "transfer (phase): 3.5s (1 time(s), max 3.5s).",
+                          "diff (step): 3.0s (2 time(s), max 2.0s).",
+                          "Slowest nodes:",
+                          "node2: 5.0s.",
+                          "node1: 4.0s."], self.recorder.get_summary())
+
+    @mock.patch("network_backup_onsite.logger.time.time")
+    def test_get_summary_same_name(self, mock_time):
+        """
+        Test a phase and a step with the same name are summed apart.
+
+        :param mock_time: mocking time function.
+        """
+        mock_time.side_effect = [0.0, 10.0, 0.0, 2.0, 0.0, 1.0]
+
+        for category in (PHASE, STEP, STEP):
+            with self.recorder.span("capture", category):
+                pass
+
+        self.assertEqual(["Slowest phases:",
+                          "capture (phase): 10.0s (1 time(s), max 10.0s).",
+                          "capture (step): 3.0s (2 time(s), max 2.0s)."],
+                         self.recorder.get_summary())
+
+    def test_enable_drops_previous_spans(self):
+        """Test a new run does not list the spans of the previous one."""
+        with self.recorder.span("capture"):
+            pass
+
+        self.recorder.enable()
+
+        self.assertEqual([], self.recorder.get_spans())
+
+    def test_record(self):
+        """Test a section timed by the caller is nested in the span open in the thread."""
+        with self.recorder.span("node1", NODE) as node:
+            self.recorder.record("connect", STEP, node.start, 2.5, node="node1")
+
+        step = self.recorder.get_spans()[0]
+        self.assertEqual(("connect", 2.5, {"node": "node1"}), (step.name, step.duration,
+                                                               step.args))
+        self.assertIs(node, step.parent)
+
+        self.recorder.disable()
+        self.recorder.record("login", STEP, 0, 1)
+        self.assertEqual(2, len(self.recorder.get_spans()))
+
+
+class SpanRecorderTraceTestCase(unittest.TestCase):
+    """Test Cases for the trace export of SpanRecorder class in logger.py."""
+
+    def setUp(self):
+        """Create an enabled recorder and the trace folder."""
+        self.recorder = SpanRecorder()
+        self.recorder.enable()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the trace folder."""
+        shutil.rmtree(self.folder)
+
+    @mock.patch("network_backup_onsite.logger.time.time")
+    def test_get_trace_events(self, mock_time):
+        """
+        Test the spans are complete events in microseconds from the start of the run.
+
+        :param mock_time: mocking time function.
+        """
+        mock_time.side_effect = [100.0, 101.0, 101.5, 102.0, 104.0]
+        self.recorder.enable()
+
+        with self.recorder.span("backup"):
+            with self.recorder.span("node1", NODE, attempt=1):
+                pass
+
+        metadata, backup, node = self.recorder.get_trace_events()
+
+        self.assertEqual(TRACE_METADATA, metadata["ph"])
+        self.assertEqual(threading.current_thread().name, metadata["args"]["name"])
+        self.assertEqual(("backup", PHASE, TRACE_COMPLETE, 1000000, 3000000),
+                         (backup["name"], backup["cat"], backup["ph"], backup["ts"],
+                          backup["dur"]))
+        self.assertEqual(("node1", NODE, 1500000, 500000, {"attempt": 1}),
+                         (node["name"], node["cat"], node["ts"], node["dur"], node["args"]))
+        self.assertEqual(backup["tid"], node["tid"])
+        self.assertEqual(os.getpid(), node["pid"])
+
+    def test_write_trace_worker_threads(self):
+        """Test each worker thread has its own track in the trace file."""
+        def worker(name):
+            """Record a node in a worker thread."""
+            with self.recorder.span(name, NODE):
+                pass
+
+        threads = [threading.Thread(target=worker, args=("node{}".format(index),),
+                                    name="Worker-{}".format(index)) for index in xrange(3)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        trace_file = os.path.join(self.folder, "trace.json")
+        self.recorder.write_trace(trace_file)
+
+        with open(trace_file) as trace:
+            events = json.load(trace)["traceEvents"]
+
+        tracks = dict((event["tid"], event["args"]["name"]) for event in events
+                      if event["ph"] == TRACE_METADATA)
+        self.assertEqual(["Worker-0", "Worker-1", "Worker-2"], sorted(tracks.values()))
+        self.assertEqual(dict(("node{}".format(index), "Worker-{}".format(index))
+                              for index in xrange(3)),
+                         dict((event["name"], tracks[event["tid"]]) for event in events
+                              if event["ph"] == TRACE_COMPLETE))
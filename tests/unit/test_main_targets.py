@@ -0,0 +1,265 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the transfers of main.py script to several targets."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from network_backup_onsite.backup_settings import BackupConfig, GovernorConfig, OMBSConfig, \
+    TargetConfig
+from network_backup_onsite.checkpoint import CAPTURED, RunCheckpoint
+from network_backup_onsite.governor import Governor, SCP_LIMIT_UNIT
+from network_backup_onsite.main import TRANSFER_TIMEOUT, send_backup_to_ombs, \
+    validate_and_send_backup
+from network_backup_onsite.process_manager import ProcessResult
+from network_backup_onsite.remote_session import CommandResult
+
+MAIN = 'network_backup_onsite.main.'
+BKP_FOLDER_NAME = 'network_device_backup_20180101'
+
+
+class MainValidateAndSendBackupTargetsTestCase(unittest.TestCase):
+    """Test case for the transfer of a backup folder to several local targets."""
+
+    def setUp(self):
+        """Create a backup folder with one captured file and two target folders."""
+        self.root = tempfile.mkdtemp()
+        self.bkp_folder_path = os.path.join(self.root, BKP_FOLDER_NAME)
+        os.mkdir(self.bkp_folder_path)
+
+        self.backup_file = os.path.join(self.bkp_folder_path, "sw-1-backup-20180101")
+        with open(self.backup_file, "w") as backup:
+            backup.write("config\n")
+
+        self.checkpoint = RunCheckpoint(self.bkp_folder_path)
+        self.checkpoint.record("sw-1", CAPTURED, self.backup_file)
+
+        self.backup_config = BackupConfig(self.root, 1000, 1, retries=0, retry_delay="0s",
+                                          max_retry_delay="0s")
+        self.logger = mock.MagicMock()
+
+    def tearDown(self):
+        """Remove the folders."""
+        shutil.rmtree(self.root)
+
+    def send(self, target_configs):
+        """Validate and send the backup file to the targets."""
+        return validate_and_send_backup([self.backup_file], self.bkp_folder_path,
+                                        self.backup_config, None, mock.MagicMock(), self.logger,
+                                        checkpoint=self.checkpoint, target_configs=target_configs)
+
+    @mock.patch(MAIN + 'validate_backup_folder_and_files_onsite', return_value=True)
+    def test_send_to_all_targets(self, _):
+        """Test the backup is copied to every target and journaled for each one."""
+        target_configs = [TargetConfig("nfs", path=os.path.join(self.root, "nfs")),
+                          TargetConfig("site2", path=os.path.join(self.root, "site2"))]
+
+        self.assertTrue(self.send(target_configs))
+
+        for target in ("nfs", "site2"):
+            self.assertTrue(os.path.isfile(os.path.join(self.root, target, BKP_FOLDER_NAME,
+                                                        "sw-1-backup-20180101")))
+            self.assertEqual({}, self.checkpoint.get_unsent_files(target))
+
+    @mock.patch(MAIN + 'update_config_index')
+    @mock.patch(MAIN + 'validate_backup_folder_and_files_onsite')
+    def test_index_updated_once_valid(self, mock_validate, mock_update_index):
+        """
+        Test the backup files are indexed only once they are valid, before they are sent.
+
+        :param mock_validate: mocking validate_backup_folder_and_files_onsite function.
+        :param mock_update_index: mocking update_config_index function.
+        """
+        target_configs = [TargetConfig("nfs", path=os.path.join(self.root, "nfs"))]
+        mock_validate.return_value = False
+
+        self.assertFalse(validate_and_send_backup(
+            [self.backup_file], self.bkp_folder_path, self.backup_config, None,
+            mock.MagicMock(), self.logger, target_configs=target_configs, update_index=True))
+        mock_update_index.assert_not_called()
+
+        mock_validate.return_value = True
+        with mock.patch(MAIN + 'copy_backup_to_folder', side_effect=IOError("full")):
+            with self.assertRaises(Exception):
+                validate_and_send_backup([self.backup_file], self.bkp_folder_path,
+                                         self.backup_config, None, mock.MagicMock(),
+                                         self.logger, target_configs=target_configs,
+                                         update_index=True)
+        mock_update_index.assert_called_once_with(self.backup_config, self.logger)
+
+    @mock.patch(MAIN + 'validate_backup_folder_and_files_onsite', return_value=True)
+    def test_failed_target_is_retried_alone(self, _):
+        """Test a failed target does not prevent the others and is the only one sent again."""
+        blocked_path = os.path.join(self.root, "blocked")
+        with open(blocked_path, "w") as blocked:
+            blocked.write("not a folder")
+
+        target_configs = [TargetConfig("nfs", path=os.path.join(self.root, "nfs")),
+                          TargetConfig("site2", path=blocked_path, retries=1)]
+
+        with self.assertRaises(Exception) as context:
+            self.send(target_configs)
+
+        self.assertIn("1 of 2 targets", str(context.exception))
+        self.assertEqual({}, self.checkpoint.get_unsent_files("nfs"))
+        self.assertEqual(1, len(self.checkpoint.get_unsent_files("site2")))
+
+        os.remove(blocked_path)
+        with mock.patch(MAIN + 'copy_backup_to_folder') as mock_copy:
+            self.assertTrue(self.send(target_configs))
+
+        mock_copy.assert_called_once_with(self.bkp_folder_path, blocked_path,
+                                          [self.backup_file])
+
+    @mock.patch(MAIN + 'validate_backup_folder_and_files_onsite', return_value=True)
+    def test_send_archive(self, _):
+        """Test only the archive of the folder is sent with ARCHIVE."""
+        self.backup_config.archive = True
+        nfs_path = os.path.join(self.root, "nfs")
+
+        self.assertTrue(self.send([TargetConfig("nfs", path=nfs_path)]))
+
+        self.assertEqual([BKP_FOLDER_NAME + ".zip"],
+                         os.listdir(os.path.join(nfs_path, BKP_FOLDER_NAME)))
+
+
+class MainSendBackupToOmbsTestCase(unittest.TestCase):
+    """Test case for the scp of a backup folder to OMBS."""
+
+    def setUp(self):
+        """Create the OMBS configuration."""
+        self.ombs_config = OMBSConfig("10.0.2.4", "bkp", "/backups", "/k")
+        self.logger = mock.MagicMock()
+
+    @mock.patch(MAIN + 'get_process_manager')
+    def test_send_deadline(self, mock_manager):
+        """
+        Test the scp is run with a deadline.
+
+        :param mock_manager: mocking get_process_manager function.
+        """
+        mock_manager.return_value.run.return_value = ProcessResult(0, "", "", 1, False)
+
+        self.assertTrue(send_backup_to_ombs(BKP_FOLDER_NAME, self.ombs_config, self.logger))
+
+        args, kwargs = mock_manager.return_value.run.call_args
+        self.assertEqual("scp", args[0][0])
+        self.assertEqual(TRANSFER_TIMEOUT, kwargs["timeout"])
+
+    @mock.patch(MAIN + 'get_process_manager')
+    def test_send_error(self, mock_manager):
+        """
+        Test the error output of scp is reported.
+
+        :param mock_manager: mocking get_process_manager function.
+        """
+        mock_manager.return_value.run.return_value = ProcessResult(
+            1, "", "scp: /backups: Permission denied\n", 1, False)
+
+        with self.assertRaises(Exception) as context:
+            send_backup_to_ombs(BKP_FOLDER_NAME, self.ombs_config, self.logger)
+
+        self.assertIn("Permission denied", context.exception.message)
+
+    @mock.patch(MAIN + 'get_process_manager')
+    def test_send_timeout(self, mock_manager):
+        """
+        Test a hung scp killed at its deadline is reported.
+
+        :param mock_manager: mocking get_process_manager function.
+        """
+        mock_manager.return_value.run.return_value = ProcessResult(-9, "", "", 1, True)
+
+        with self.assertRaises(Exception) as context:
+            send_backup_to_ombs(BKP_FOLDER_NAME, self.ombs_config, self.logger)
+
+        self.assertIn("Timeout", context.exception.message)
+
+    @mock.patch(MAIN + 'get_process_manager')
+    def test_send_combined_rate(self, mock_manager):
+        """
+        Test the concurrent transfers to OMBS share its rate.
+
+        :param mock_manager: mocking get_process_manager function.
+        """
+        governor = Governor(GovernorConfig(max_workers=2, ombs_rate=1000000))
+        lock = threading.Lock()
+        limits = []
+        max_limit = [0]
+
+        def run(command, **_):
+            """Run the scp for a short time, recording the combined limit."""
+            scp_limit = int(command[command.index("-l") + 1])
+            with lock:
+                limits.append(scp_limit)
+                max_limit[0] = max(max_limit[0], sum(limits))
+            time.sleep(0.05)
+            with lock:
+                limits.remove(scp_limit)
+            return ProcessResult(0, "", "", 0.05, False)
+
+        mock_manager.return_value.run.side_effect = run
+
+        threads = [threading.Thread(target=send_backup_to_ombs,
+                                    args=(BKP_FOLDER_NAME, self.ombs_config, self.logger),
+                                    kwargs={"governor": governor}) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(5, mock_manager.return_value.run.call_count)
+        self.assertLessEqual(max_limit[0], 1000000 / SCP_LIMIT_UNIT)
+        self.assertEqual(8000, max_limit[0])
+
+    @mock.patch(MAIN + 'RemoteSession')
+    @mock.patch(MAIN + 'get_process_manager')
+    def test_send_files_checked(self, mock_manager, mock_session):
+        """
+        Test the folder is created and the size of the files sent checked, in one session each.
+
+        :param mock_manager: mocking get_process_manager function.
+        :param mock_session: mocking RemoteSession class.
+        """
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        backup_files = []
+        for node in ("sw-1", "sw-2"):
+            backup_file = os.path.join(folder, "{}-backup-20180101".format(node))
+            with open(backup_file, "w") as backup:
+                backup.write("config\n")
+            backup_files.append(backup_file)
+
+        mock_manager.return_value.run.return_value = ProcessResult(0, "", "", 1, False)
+        ssh_result = ProcessResult(0, "", "", 1, False)
+        mock_session.return_value.run.side_effect = [
+            ([CommandResult("mkdir", 0)], ssh_result),
+            ([CommandResult("wc", 0, "7\n"), CommandResult("wc", 0, "3\n")], ssh_result)]
+
+        with self.assertRaises(Exception) as context:
+            send_backup_to_ombs(folder, self.ombs_config, self.logger,
+                                backup_files=backup_files)
+
+        self.assertIn("sw-2-backup-20180101 has 3 bytes instead of 7",
+                      context.exception.message)
+        self.assertNotIn("sw-1", context.exception.message)
+        self.assertEqual(2, mock_session.return_value.run.call_count)
+        self.assertEqual(3, mock_session.return_value.add.call_count)
@@ -18,6 +18,7 @@ import unittest
 
 import mock
 
+from network_backup_onsite.backup_validator import BackupVerdict
 from network_backup_onsite.main import validate_backup_file_onsite, \
     validate_backup_folder_and_files_onsite
 
@@ -49,20 +50,44 @@ class NodeBackupHandlerValidateBackupFileOnsiteTestCase(unittest.TestCase):
 
     @mock.patch('network_backup_onsite.backup_settings.BackupConfig')
     @mock.patch('network_backup_onsite.logger.CustomLogger')
-    @mock.patch(MAIN + 'os')
-    def test_validate_backup_file_onsite_success(self, mock_os, mock_logger, mock_backup_config):
+    @mock.patch(MAIN + 'validate_backup_file')
+    def test_validate_backup_file_onsite_success(self, mock_validate_backup_file, mock_logger,
+                                                 mock_backup_config):
         """
         Check return value if execution is successful.
 
-        :param mock_os: mock of os library.
+        :param mock_validate_backup_file: mock of the size and content validation.
         :param mock_logger: mock instance of CustomLogger.
         :param mock_backup_config:  mock instance of BackupConfig.
         """
-        mock_os.path.getsize.return_value = 2
+        mock_validate_backup_file.return_value = BackupVerdict(TEST_FILE, 2)
         mock_backup_config.min_backup_size = 1
 
         self.assertTrue(validate_backup_file_onsite(mock_backup_config, TEST_FILE, mock_logger))
 
+    @mock.patch('network_backup_onsite.backup_settings.BackupConfig')
+    @mock.patch('network_backup_onsite.logger.CustomLogger')
+    @mock.patch(MAIN + 'validate_backup_file')
+    def test_validate_backup_file_onsite_baseline_warning(self, mock_validate_backup_file,
+                                                          mock_logger, mock_backup_config):
+        """
+        Check a file out of the usual range of its node is valid, with a warning reported.
+
+        :param mock_validate_backup_file: mock of the size and content validation.
+        :param mock_logger: mock instance of CustomLogger.
+        :param mock_backup_config:  mock instance of BackupConfig.
+        """
+        warning = "Size 2 is out of the usual range 10-20 of the node."
+        mock_validate_backup_file.return_value = BackupVerdict("/bkp/" + TEST_FILE, 2,
+                                                               warnings=[warning])
+        warning_list = []
+
+        self.assertTrue(validate_backup_file_onsite(mock_backup_config, "/bkp/" + TEST_FILE,
+                                                    mock_logger, warning_list=warning_list))
+
+        self.assertEqual([TEST_FILE + ": " + warning], warning_list)
+        mock_logger.warning.assert_called_once_with(mock.ANY)
+
 
 class NodeBackupHandlerValidateBackupFolderAndFilesOnsiteTestCase(unittest.TestCase):
     """Test case to test validate_backup_folder_and_files_onsite method."""
@@ -19,7 +19,11 @@ import unittest
 
 import mock
 
-from network_backup_onsite.node_backup_handler import TIME_FORMAT, create_backup_folder_onsite
+from network_backup_onsite.backup_settings import BackupConfig, NodeConfig
+from network_backup_onsite.exceptions import NodeBackupException
+from network_backup_onsite.node_backup_handler import TIME_FORMAT, TIME_OUT_1, TIME_OUT_2, \
+    NodeBackupHandler, create_backup_folder_onsite
+from network_backup_onsite.run_history import CAPTURE_PHASE, CONNECT_PHASE
 
 NODE_BACKUP_HANDLER = 'network_backup_onsite.node_backup_handler.'
 TEMPLATE = 'template_1'
@@ -102,3 +106,63 @@ class MainCreateBackupFolderOnsiteTestCase(unittest.TestCase):
         result = create_backup_folder_onsite(TEMPLATE, TEST_PATH, mock_logger)
 
         self.assertEqual(mock_bkp_folder_name, result)
+
+
+class NodeBackupHandlerBackupNodeTestCase(unittest.TestCase):
+    """Test case to test the retries of backup_node method."""
+
+    def setUp(self):
+        """Create a handler allowing two retries."""
+        node_config = NodeConfig("srx-1", "10.0.0.3", "srx", "user@srx-1>", "user", "password")
+        backup_config = BackupConfig(TEST_PATH, 1024, 1, retries=2, retry_delay="1s",
+                                     max_retry_delay="4s")
+
+        with mock.patch(NODE_BACKUP_HANDLER + 'CustomLogger'):
+            self.handler = NodeBackupHandler(node_config, backup_config, 0, mock.Mock())
+
+    @mock.patch(NODE_BACKUP_HANDLER + 'time.sleep')
+    def test_backup_node_retries_until_success(self, mock_sleep):
+        """
+        Test a failed attempt is retried and the backup file of the next attempt is returned.
+
+        :param mock_sleep: mocked sleep between the attempts.
+        """
+        with mock.patch.object(self.handler, 'create_node_backup',
+                               side_effect=[NodeBackupException("timeout"), TEST_FILE]):
+            result = self.handler.backup_node(TEST_PATH)
+
+        self.assertTrue(result.success)
+        self.assertEqual(TEST_FILE, result.backup_file)
+        self.assertEqual(2, result.attempts)
+        self.assertEqual(1, mock_sleep.call_count)
+
+    @mock.patch(NODE_BACKUP_HANDLER + 'time.sleep')
+    def test_backup_node_failure_is_caught(self, mock_sleep):
+        """
+        Test the error of the last attempt is kept in the result instead of being raised.
+
+        :param mock_sleep: mocked sleep between the attempts.
+        """
+        with mock.patch.object(self.handler, 'create_node_backup',
+                               side_effect=ValueError("EOF")) as mock_create:
+            result = self.handler.backup_node(TEST_PATH)
+
+        self.assertFalse(result.success)
+        self.assertEqual(3, result.attempts)
+        self.assertEqual(3, mock_create.call_count)
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertIn("EOF", str(result))
+
+    def test_get_timeouts_from_history(self):
+        """Test the defaults are used without history and the learned timeouts otherwise."""
+        self.assertEqual((TIME_OUT_1, TIME_OUT_2),
+                         (self.handler.get_timeouts()[CONNECT_PHASE],
+                          self.handler.get_timeouts()[CAPTURE_PHASE]))
+
+        self.handler.history = mock.Mock()
+        self.handler.history.get_timeout.return_value = 15
+
+        timeouts = self.handler.get_timeouts(attempt=2)
+
+        self.assertEqual(15, timeouts[CONNECT_PHASE])
+        self.handler.history.get_timeout.assert_any_call("srx-1", CAPTURE_PHASE, TIME_OUT_2, 2)
@@ -0,0 +1,86 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the normalizer.py script."""
+
+import re
+from StringIO import StringIO
+import unittest
+
+from network_backup_onsite.normalizer import VOLATILE_MASK, ConfigNormalizer
+
+PROMPT_RE = re.compile(r"genie@SRX1500\-1[^\r\n]*> ?")
+COMMAND = "show configuration | display set | no-more"
+
+
+class ConfigNormalizerTestCase(unittest.TestCase):
+    """Test case for the ConfigNormalizer class."""
+
+    def setUp(self):
+        """Create a normalizer writing to memory."""
+        self.output = StringIO()
+        self.normalizer = ConfigNormalizer(self.output, PROMPT_RE, [COMMAND],
+                                           [r"^## Last commit: (.*)$"], mask_volatile=True)
+
+    def feed(self, chunks):
+        """
+        Write the chunks to the normalizer and close it.
+
+        :param chunks: list of output chunks.
+        :return: normalized output.
+        """
+        for chunk in chunks:
+            self.normalizer.write(chunk)
+        self.normalizer.close()
+
+        return self.output.getvalue()
+
+    def test_escape_sequences_split_between_chunks(self):
+        """Test escape sequences and CRLF split between two chunks are removed."""
+        output = self.feed(["set system \x1b[1", "mhost-name\x1b[0m SRX\r", "\nset version 1\r\n"])
+
+        self.assertEqual("set system host-name SRX\nset version 1\n", output)
+
+    def test_echo_and_prompt_are_dropped(self):
+        """Test the echo of the command with its prompt and the final prompt are dropped."""
+        output = self.feed(["genie@SRX1500-1> " + COMMAND + "\r\n",
+                            "set version 1\r\n", "genie@SRX1500-1> "])
+
+        self.assertEqual("set version 1\n", output)
+        self.assertEqual(1, self.normalizer.lines_written)
+
+    def test_line_ending_with_prompt_is_kept(self):
+        """Test a configuration line ending with the prompt text is not taken for the prompt."""
+        output = self.feed(["set system login message genie@SRX1500-1>\r\n",
+                            "genie@SRX1500-1> "])
+
+        self.assertEqual("set system login message genie@SRX1500-1>\n", output)
+
+    def test_carriage_return_overwrite(self):
+        """Test the text overwritten after a lone CR is discarded."""
+        self.assertEqual("set version 1\n", self.feed(["---(more)---\r            \r",
+                                                       "set version 1\n"]))
+
+    def test_volatile_value_is_masked(self):
+        """Test the volatile value is replaced by the mask, keeping the rest of the line."""
+        output = self.feed(["## Last commit: 2018-10-10 10:00:00 UTC by genie\r\n"])
+
+        self.assertEqual("## Last commit: {}\n".format(VOLATILE_MASK), output)
+
+    def test_echo_is_kept_after_output(self):
+        """Test a line equal to the command is kept once the output has started."""
+        output = self.feed([COMMAND + "\r\n", COMMAND + "\r\n", "set version 1\r\n",
+                            COMMAND + "\r\n"])
+
+        self.assertEqual("set version 1\n{}\n".format(COMMAND), output)
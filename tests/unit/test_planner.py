@@ -0,0 +1,86 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the planner.py script."""
+
+import shutil
+import tempfile
+import unittest
+
+from network_backup_onsite.backup_settings import GovernorConfig, NodeConfig, TimeoutsConfig
+from network_backup_onsite.planner import plan_run
+from network_backup_onsite.run_history import CAPTURE_PHASE, CONNECT_PHASE, LOGIN_PHASE, SIZE, \
+    RunHistory
+
+
+def get_node(hostname, site=None):
+    """
+    Create a node configuration.
+
+    :param hostname: node name.
+    :param site: site of the node.
+    :return: instance of NodeConfig.
+    """
+    return NodeConfig(hostname, "10.0.0.1", "srx", "user@srx>", "user", "password", site=site)
+
+
+class PlanRunTestCase(unittest.TestCase):
+    """Test case for the simulation of a backup run."""
+
+    def setUp(self):
+        """Create a run history with the durations of three nodes."""
+        self.backup_path = tempfile.mkdtemp()
+        self.history = RunHistory(self.backup_path, TimeoutsConfig())
+
+        for hostname, capture, size in (("a", 58, 1000), ("b", 18, 3000), ("c", 28, 2000)):
+            self.history.record(hostname, {CONNECT_PHASE: 1, LOGIN_PHASE: 1,
+                                           CAPTURE_PHASE: capture, SIZE: size})
+
+    def tearDown(self):
+        """Remove the backup folder."""
+        shutil.rmtree(self.backup_path)
+
+    def test_plan_sequential_run(self):
+        """Test one worker captures the nodes one after the other."""
+        nodes = [get_node("a"), get_node("b"), get_node("c")]
+
+        run_plan = plan_run(nodes, self.history, GovernorConfig(ombs_rate=100))
+
+        self.assertEqual(110, run_plan.capture_time)
+        self.assertEqual(6000, run_plan.total_size)
+        self.assertEqual(170, run_plan.wall_time)
+        self.assertEqual(["a", "b", "c"],
+                         [estimate.hostname for estimate in run_plan.get_critical_path()])
+
+    def test_plan_parallel_run_with_site_limits(self):
+        """Test the workers are limited by the sessions of the site and unknown nodes estimated."""
+        nodes = [get_node("a", "dc1"), get_node("b", "dc1"), get_node("c", "dc2"),
+                 get_node("new", "dc2")]
+
+        run_plan = plan_run(nodes, self.history,
+                            GovernorConfig(max_workers=4, sessions_by_site={"dc1": 1}))
+
+        self.assertEqual(80, run_plan.capture_time)
+        self.assertEqual(["a", "b"],
+                         [estimate.hostname for estimate in run_plan.get_critical_path()])
+        self.assertFalse(run_plan.estimates[3].known)
+        self.assertEqual((30, 2000), (run_plan.estimates[3].duration, run_plan.estimates[3].size))
+        self.assertIn("Predicted wall time: 0:01:20", run_plan.get_report())
+
+    def test_plan_site_bandwidth(self):
+        """Test a node ends no earlier than the site bandwidth allows."""
+        run_plan = plan_run([get_node("a"), get_node("b")], self.history,
+                            GovernorConfig(max_workers=2, site_rate=20))
+
+        self.assertEqual((60, 200), (run_plan.estimates[0].end, run_plan.estimates[1].end))
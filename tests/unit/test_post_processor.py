@@ -0,0 +1,98 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the post_processor.py script."""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from network_backup_onsite.backup_validator import validate_backup_file
+from network_backup_onsite.post_processor import PostProcessor
+
+CONFIG = "Equipment type: SRX -> sw-1 with IP: 10.0.0.1\n----\nset system host-name sw-1\n" \
+         "set interfaces ge-0/0/0 unit 0\n"
+
+
+def get_pid(_):
+    """
+    Get the process running a stage.
+
+    :return: process id.
+    """
+    return os.getpid()
+
+
+def fail(message):
+    """
+    Raise an exception in a stage.
+
+    :param message: message of the exception.
+    :raise ValueError: always.
+    """
+    raise ValueError(message)
+
+
+class PostProcessorTestCase(unittest.TestCase):
+    """Test Cases for PostProcessor class in post_processor.py."""
+
+    def setUp(self):
+        """Create a post processor with two workers."""
+        self.post_processor = PostProcessor(2)
+
+    def tearDown(self):
+        """Stop the workers."""
+        self.post_processor.close()
+
+    def test_run_in_pool(self):
+        """Test the stages run out of the calling process once the pool is started."""
+        self.assertEqual(os.getpid(), self.post_processor.run(get_pid, None))
+
+        self.post_processor.start()
+        self.assertNotEqual(os.getpid(), self.post_processor.run(get_pid, None))
+
+    def test_run_in_process_with_one_worker(self):
+        """Test one worker runs the stages in the calling process."""
+        post_processor = PostProcessor(1)
+        post_processor.start()
+
+        self.assertEqual(os.getpid(), post_processor.run(get_pid, None))
+
+    def test_run_exception(self):
+        """Test the exception of a stage is raised to the caller."""
+        self.post_processor.start()
+
+        with self.assertRaises(ValueError):
+            self.post_processor.run(fail, "error")
+
+    def test_workers_default(self):
+        """Test 0 workers means one per core."""
+        self.assertEqual(multiprocessing.cpu_count(), PostProcessor(0).workers)
+
+    def test_validate_backup_file_in_pool(self):
+        """Test a backup file is scanned by a worker, reading it from its path."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            backup_file = os.path.join(tmp_dir, "sw-1-backup-20180101")
+            with open(backup_file, "w") as backup:
+                backup.write(CONFIG)
+
+            self.post_processor.start()
+            verdict = validate_backup_file(backup_file, 1, post_processor=self.post_processor)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual("SRX", verdict.node_type)
+        self.assertEqual(4, verdict.lines)
@@ -0,0 +1,144 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the process_manager.py script."""
+
+from subprocess import PIPE, Popen
+import threading
+import time
+import unittest
+
+import mock
+
+from network_backup_onsite import utils
+from network_backup_onsite.process_manager import ProcessManager, ProcessResult
+
+BIG_OUTPUT_SIZE = 1024 * 1024
+
+
+class ProcessManagerTestCase(unittest.TestCase):
+    """Test Cases for ProcessManager class in process_manager.py."""
+
+    def setUp(self):
+        """Create the manager."""
+        self.manager = ProcessManager()
+
+    def test_run(self):
+        """Test the result of a process writing to both outputs."""
+        result = self.manager.run(["sh", "-c", "cat; echo error >&2; exit 3"], "input")
+
+        self.assertEqual("input", result.stdout)
+        self.assertEqual("error\n", result.stderr)
+        self.assertEqual(3, result.returncode)
+        self.assertFalse(result.timed_out)
+        self.assertFalse(result.succeeded)
+
+    def test_run_big_input_and_output(self):
+        """Test the pipes do not block a process reading and writing more than their buffers."""
+        data = "x" * BIG_OUTPUT_SIZE
+        result = self.manager.run(["sh", "-c", "cat; head -c {} /dev/zero >&2"
+                                   .format(BIG_OUTPUT_SIZE)], data, 30)
+
+        self.assertTrue(result.succeeded)
+        self.assertEqual(data, result.stdout)
+        self.assertEqual(BIG_OUTPUT_SIZE, len(result.stderr))
+
+    def test_run_timeout(self):
+        """Test a process is killed at its deadline and flagged."""
+        result = self.manager.run(["sleep", "10"], timeout=0.2)
+
+        self.assertTrue(result.timed_out)
+        self.assertNotEqual(0, result.returncode)
+        self.assertLess(result.duration, 5)
+
+    def test_run_timeout_child_holds_output(self):
+        """Test a killed process ends even if a child it started still holds its output."""
+        result = self.manager.run(["sh", "-c", "sleep 3 & sleep 10"], timeout=0.2)
+
+        self.assertTrue(result.timed_out)
+        self.assertLess(result.duration, 2)
+
+    def test_run_concurrent_deadlines(self):
+        """Test one loop follows several processes, each with its own deadline."""
+        slow = self.manager.start(["sleep", "10"], timeout=0.3)
+        fast = self.manager.start(["echo", "done"], timeout=5)
+        self.assertEqual(1, len([thread for thread in threading.enumerate()
+                                 if thread.name == "ProcessManager"]))
+
+        self.assertEqual("done\n", fast.wait().stdout)
+        self.assertFalse(fast.wait().timed_out)
+        self.assertTrue(slow.wait().timed_out)
+
+    def test_loop_stops_when_idle(self):
+        """Test the loop thread ends without processes and starts again for a new one."""
+        self.manager.run(["true"])
+        time.sleep(0.2)
+        self.assertIsNone(self.manager._thread)  # pylint: disable=W0212
+
+        self.assertEqual(0, self.manager.run(["true"]).returncode)
+
+    def test_watch_timeout(self):
+        """Test a process streamed by its caller is killed at its deadline."""
+        process = Popen(["sleep", "10"], stdout=PIPE)
+        job = self.manager.watch(process, 0.2)
+
+        self.assertEqual("", process.stdout.read())
+        self.assertTrue(job.release())
+        self.assertNotEqual(0, process.wait())
+        self.assertTrue(job.wait().timed_out)
+
+    def test_watch_released(self):
+        """Test a process released by its caller before its deadline is left alone."""
+        process = Popen(["echo", "done"], stdout=PIPE)
+        job = self.manager.watch(process, 5)
+
+        self.assertEqual("done\n", process.stdout.read())
+        self.assertFalse(job.release())
+        self.assertEqual(0, process.wait())
+        self.assertFalse(job.wait().timed_out)
+        self.assertLess(job.wait().duration, 5)
+
+    def test_start_invalid_command(self):
+        """Test a command which can't be started."""
+        with self.assertRaises(OSError):
+            self.manager.run(["/nonexistent/command"])
+
+
+class PopenCommunicateTestCase(unittest.TestCase):
+    """Test Cases for popen_communicate method in utils.py with the process manager."""
+
+    @mock.patch("network_backup_onsite.utils.get_process_manager")
+    def test_timeout(self, mock_manager):
+        """
+        Test a timed out command is reported in the error output.
+
+        :param mock_manager: mocking get_process_manager function.
+        """
+        mock_manager.return_value.run.return_value = ProcessResult(-9, "partial", "", 1, True)
+
+        stdout, stderr = utils.popen_communicate("host", "ls", 1)
+
+        self.assertEqual("partial", stdout)
+        self.assertEqual("Command 'ls' timeout.", stderr)
+
+    @mock.patch("network_backup_onsite.utils.get_process_manager")
+    def test_no_timeout(self, mock_manager):
+        """
+        Test the outputs of a command ended in time.
+
+        :param mock_manager: mocking get_process_manager function.
+        """
+        mock_manager.return_value.run.return_value = ProcessResult(0, "out", "err", 1, False)
+
+        self.assertEqual(("out", "err"), utils.popen_communicate("host", "ls", 1))
+        self.assertEqual("ls", mock_manager.return_value.run.call_args[0][1])
@@ -0,0 +1,121 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the reachability.py script."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from network_backup_onsite.backup_settings import ReachabilityConfig
+from network_backup_onsite.reachability import REACHABILITY_FILE_NAME, ReachabilityCache
+
+MOCK_IS_HOST_ACCESSIBLE = 'network_backup_onsite.reachability.is_host_accessible'
+
+UP_IP = "10.0.0.1"
+DOWN_IP = "10.0.0.2"
+NOW = 1000000.0
+
+
+class ReachabilityCacheTestCase(unittest.TestCase):
+    """Test Cases for ReachabilityCache class in reachability.py."""
+
+    def setUp(self):
+        """Create an empty backup root folder."""
+        self.backup_path = tempfile.mkdtemp()
+        self.cache = ReachabilityCache(self.backup_path, ReachabilityConfig("5m", "1m"))
+
+    def tearDown(self):
+        """Remove the backup root folder."""
+        shutil.rmtree(self.backup_path)
+
+    def test_get_state(self):
+        """Test a node seen up is fresh within its TTL, and a node seen down is always stale."""
+        self.cache.record(UP_IP, True, 0.01, now=NOW)
+        self.cache.record(DOWN_IP, False, now=NOW)
+
+        self.assertTrue(self.cache.get_state(UP_IP, NOW + 299))
+        self.assertIsNone(self.cache.get_state(UP_IP, NOW + 300))
+        self.assertIsNone(self.cache.get_state(DOWN_IP, NOW + 1))
+        self.assertIsNone(self.cache.get_state("10.0.0.3", NOW))
+        self.assertEqual(0.01, self.cache.get_latency(UP_IP))
+
+    def test_get_state_latest_result(self):
+        """Test the latest of the up and down results is used."""
+        self.cache.record(UP_IP, True, 0.01, now=NOW)
+        self.cache.record(UP_IP, False, now=NOW + 10)
+
+        self.assertIsNone(self.cache.get_state(UP_IP, NOW + 20))
+
+    @mock.patch(MOCK_IS_HOST_ACCESSIBLE)
+    def test_check_hosts_probes_stale_only(self, mock_is_host_accessible):
+        """
+        Test the nodes seen up are not pinged again by the next run, the nodes seen down are.
+
+        :param mock_is_host_accessible: mocking is_host_accessible function.
+        """
+        mock_is_host_accessible.side_effect = lambda ip: ip == UP_IP
+
+        self.assertEqual({UP_IP: True, DOWN_IP: False},
+                         self.cache.check_hosts([UP_IP, DOWN_IP, UP_IP]))
+        self.assertEqual(2, mock_is_host_accessible.call_count)
+        self.assertTrue(os.path.exists(os.path.join(self.backup_path, REACHABILITY_FILE_NAME)))
+
+        next_run = ReachabilityCache(self.backup_path, ReachabilityConfig())
+        self.assertEqual({UP_IP: True, DOWN_IP: False}, next_run.check_hosts([UP_IP, DOWN_IP]))
+        self.assertEqual(3, mock_is_host_accessible.call_count)
+        mock_is_host_accessible.assert_called_with(DOWN_IP)
+
+    @mock.patch(MOCK_IS_HOST_ACCESSIBLE)
+    def test_check_hosts_down_node_back_up(self, mock_is_host_accessible):
+        """
+        Test a node seen down a moment ago is pinged again and reported up once it answers.
+
+        :param mock_is_host_accessible: mocking is_host_accessible function.
+        """
+        mock_is_host_accessible.return_value = True
+        self.cache.record(DOWN_IP, False)
+
+        self.assertEqual({DOWN_IP: True}, self.cache.check_hosts([DOWN_IP]))
+        mock_is_host_accessible.assert_called_once_with(DOWN_IP)
+
+    @mock.patch(MOCK_IS_HOST_ACCESSIBLE)
+    def test_check_hosts_ttl_zero(self, mock_is_host_accessible):
+        """
+        Test every node is pinged when the TTL is 0.
+
+        :param mock_is_host_accessible: mocking is_host_accessible function.
+        """
+        mock_is_host_accessible.return_value = True
+        cache = ReachabilityCache(self.backup_path, ReachabilityConfig("0s", "0s"))
+
+        cache.check_hosts([UP_IP])
+        cache.check_hosts([UP_IP])
+
+        self.assertEqual(2, mock_is_host_accessible.call_count)
+
+    @mock.patch(MOCK_IS_HOST_ACCESSIBLE)
+    def test_check_hosts_missing_folder(self, mock_is_host_accessible):
+        """
+        Test the cache is not written when the backup root folder does not exist.
+
+        :param mock_is_host_accessible: mocking is_host_accessible function.
+        """
+        mock_is_host_accessible.return_value = True
+        cache = ReachabilityCache(os.path.join(self.backup_path, "missing"), ReachabilityConfig())
+
+        self.assertEqual({UP_IP: True}, cache.check_hosts([UP_IP]))
+        self.assertFalse(os.path.exists(os.path.join(self.backup_path, "missing")))
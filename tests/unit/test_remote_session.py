@@ -0,0 +1,95 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the remote_session.py script."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from network_backup_onsite.remote_session import RemoteSession, split_output
+
+MARKER = "__MARK__"
+
+# Stands for ssh, running the remote shell locally.
+FAKE_SSH = "#!/bin/sh\nexec bash -s\n"
+
+
+class SplitOutputTestCase(unittest.TestCase):
+    """Test Cases for split_output method in remote_session.py."""
+
+    def test_split_output(self):
+        """Test the framing of the outputs, with and without a trailing newline."""
+        output = "a\nb\n\n{0} 0 0\nc\n{0} 1 2\n\n{0} 2 0\n".format(MARKER)
+
+        self.assertEqual({0: ("a\nb\n", ["0"]), 1: ("c", ["2"]), 2: ("", ["0"])},
+                         split_output(output, MARKER))
+
+    def test_split_output_interrupted(self):
+        """Test the commands after the end of the session have no output."""
+        self.assertEqual({0: ("a", ["0"])}, split_output("a\n{} 0 0\nb".format(MARKER), MARKER))
+
+
+class RemoteSessionTestCase(unittest.TestCase):
+    """Test Cases for RemoteSession class in remote_session.py."""
+
+    def setUp(self):
+        """Put a fake ssh first in the path."""
+        self.bin_dir = tempfile.mkdtemp()
+        ssh_path = os.path.join(self.bin_dir, "ssh")
+        with open(ssh_path, "w") as ssh_file:
+            ssh_file.write(FAKE_SSH)
+        os.chmod(ssh_path, 0o755)
+
+        path_patcher = mock.patch.dict(os.environ, {
+            "PATH": self.bin_dir + os.pathsep + os.environ.get("PATH", "")})
+        path_patcher.start()
+        self.addCleanup(path_patcher.stop)
+
+    def tearDown(self):
+        """Remove the fake ssh."""
+        shutil.rmtree(self.bin_dir)
+
+    def test_run(self):
+        """Test the output and status of each command of a batch."""
+        session = RemoteSession("host", ["-i", "key"])
+        session.add("echo one; echo error >&2")
+        session.add("printf two; exit 3")
+        session.add("cat")
+
+        results, ssh_result = session.run()
+
+        self.assertEqual(["one\n", "two", ""], [result.stdout for result in results])
+        self.assertEqual(["error\n", "", ""], [result.stderr for result in results])
+        self.assertEqual([0, 3, 0], [result.returncode for result in results])
+        self.assertEqual(0, ssh_result.returncode)
+        self.assertEqual([], session.commands)
+
+    def test_run_stop_on_error(self):
+        """Test the commands after a failed one do not run."""
+        session = RemoteSession("host", stop_on_error=True)
+        session.add("false")
+        session.add("echo skipped")
+
+        results, _ = session.run()
+
+        self.assertEqual(1, results[0].returncode)
+        self.assertIsNone(results[1].returncode)
+        self.assertFalse(results[1].succeeded)
+
+    def test_run_empty(self):
+        """Test an empty batch opens no session."""
+        self.assertEqual(([], None), RemoteSession("host").run())
@@ -0,0 +1,242 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the retriever.py script."""
+
+import os
+import shutil
+from StringIO import StringIO
+import tempfile
+import unittest
+
+import mock
+
+from network_backup_onsite.archive import BackupArchive, get_archive_file
+from network_backup_onsite.backup_settings import GnupgConfig, OMBSConfig
+from network_backup_onsite.encryptor import GpgEncryptor, get_encrypted_file
+from network_backup_onsite.exceptions import NodeBackupException
+from network_backup_onsite.retriever import TAIL_SIZE, LocalStore, RemoteFile, RemoteStore, \
+    retrieve_backup
+
+MOCK_ENCRYPT_COMMAND = 'network_backup_onsite.encryptor.get_gpg_command'
+MOCK_DECRYPT_COMMAND = 'network_backup_onsite.encryptor.get_gpg_decrypt_command'
+
+FOLDER_NAME = "network_device_backup_20180101"
+BACKUP_NAME = "sw-1-backup-20180101"
+CONTENT = "configure vlan v100 tag 100\n" * 50
+
+# Stands for ssh, logging the connection and running the remote command locally.
+FAKE_SSH = """#!/bin/sh
+echo connection >> "$(dirname "$0")/connections"
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -o|-i) shift 2 ;;
+        -*) shift ;;
+        *) shift; break ;;
+    esac
+done
+exec sh -c "$*"
+"""
+
+
+class RecordingStore(RemoteStore):
+    """Remote store recording the ranges of the files read."""
+
+    def __init__(self, *args):
+        """Initialize the store."""
+        RemoteStore.__init__(self, *args)
+        self.ranges = []
+
+    def read_range(self, path, offset, length):
+        """Read a range, recording it."""
+        self.ranges.append((offset, length))
+        return RemoteStore.read_range(self, path, offset, length)
+
+    def copy_range(self, path, offset, length, output):
+        """Stream a range, recording it."""
+        self.ranges.append((offset, length))
+        RemoteStore.copy_range(self, path, offset, length, output)
+
+
+class RetrieveBackupTestCase(unittest.TestCase):
+    """Test case for retrieve_backup, with the onsite folder and a local target."""
+
+    def setUp(self):
+        """Create an empty onsite folder and a local target folder."""
+        self.root = tempfile.mkdtemp()
+        self.onsite_folder = os.path.join(self.root, "onsite", FOLDER_NAME)
+        self.target_folder = os.path.join(self.root, "nfs", FOLDER_NAME)
+        os.makedirs(self.onsite_folder)
+        os.makedirs(self.target_folder)
+
+        self.stores = [LocalStore(self.onsite_folder), LocalStore(self.target_folder)]
+
+    def tearDown(self):
+        """Remove the folders."""
+        shutil.rmtree(self.root)
+
+    def write_backup(self, folder):
+        """Write the backup file in a folder."""
+        backup_file = os.path.join(folder, BACKUP_NAME)
+        with open(backup_file, "w") as backup:
+            backup.write(CONTENT)
+
+        return backup_file
+
+    def retrieve(self):
+        """Retrieve the backup of the node."""
+        output = StringIO()
+        source = retrieve_backup(self.stores, FOLDER_NAME, "SW-1", "20180101", output,
+                                 GnupgConfig())
+
+        self.assertEqual(CONTENT, output.getvalue())
+
+        return source
+
+    def test_retrieve_onsite(self):
+        """Test the onsite file is preferred."""
+        self.write_backup(self.onsite_folder)
+        self.write_backup(self.target_folder)
+
+        self.assertEqual(os.path.join(self.onsite_folder, BACKUP_NAME), self.retrieve())
+
+    def test_retrieve_pruned_from_archive(self):
+        """Test a backup removed onsite is extracted from the archive of a target."""
+        backup_file = self.write_backup(self.target_folder)
+        BackupArchive(get_archive_file(self.target_folder)).add(backup_file)
+        os.remove(backup_file)
+
+        self.assertEqual("{}/{}.zip:{}".format(self.target_folder, FOLDER_NAME, BACKUP_NAME),
+                         self.retrieve())
+
+    @mock.patch(MOCK_DECRYPT_COMMAND, return_value=["cat"])
+    @mock.patch(MOCK_ENCRYPT_COMMAND, return_value=["cat"])
+    def test_retrieve_encrypted(self, *_):
+        """Test an encrypted backup is decrypted while it is read."""
+        encryptor = GpgEncryptor(get_encrypted_file(os.path.join(self.onsite_folder,
+                                                                 BACKUP_NAME)), GnupgConfig())
+        encryptor.write(CONTENT)
+        encryptor.close()
+
+        self.assertTrue(self.retrieve().endswith(BACKUP_NAME + ".gpg"))
+
+    def test_backup_not_found(self):
+        """Test an exception is raised when no store has the backup."""
+        with self.assertRaises(NodeBackupException):
+            self.retrieve()
+
+
+class RemoteStoreTestCase(unittest.TestCase):
+    """Test case for the RemoteStore class."""
+
+    def setUp(self):
+        """Put a fake ssh first in the path."""
+        self.bin_dir = tempfile.mkdtemp()
+        ssh_path = os.path.join(self.bin_dir, "ssh")
+        with open(ssh_path, "w") as ssh_file:
+            ssh_file.write(FAKE_SSH)
+        os.chmod(ssh_path, 0o755)
+
+        path_patcher = mock.patch.dict(os.environ, {
+            "PATH": self.bin_dir + os.pathsep + os.environ.get("PATH", "")})
+        path_patcher.start()
+        self.addCleanup(path_patcher.stop)
+
+    def tearDown(self):
+        """Remove the fake ssh."""
+        shutil.rmtree(self.bin_dir)
+
+    def get_connections(self):
+        """Get the number of ssh connections opened."""
+        connections_file = os.path.join(self.bin_dir, "connections")
+        if not os.path.exists(connections_file):
+            return 0
+
+        with open(connections_file) as connections:
+            return len(connections.readlines())
+
+    def test_list_files(self):
+        """Test the files of the remote backup folder are listed in one ssh session."""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, FOLDER_NAME))
+        for file_name in (BACKUP_NAME, "other"):
+            open(os.path.join(root, FOLDER_NAME, file_name), "w").close()
+
+        store = RemoteStore(OMBSConfig("10.0.2.4", "bkp", root, "/k"), FOLDER_NAME, [])
+
+        self.assertEqual({BACKUP_NAME: "{}/{}/{}".format(root, FOLDER_NAME, BACKUP_NAME),
+                          "other": "{}/{}/other".format(root, FOLDER_NAME)}, store.list_files())
+        self.assertEqual(1, self.get_connections())
+
+    def test_list_files_missing_folder(self):
+        """Test a missing remote backup folder has no files."""
+        store = RemoteStore(OMBSConfig("10.0.2.4", "bkp", self.bin_dir, "/k"), FOLDER_NAME, [])
+
+        self.assertEqual({}, store.list_files())
+
+    def test_remote_file(self):
+        """Test a remote file is read by ranges, with its end read once."""
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, "data")
+        with open(path, "w") as data:
+            data.write("".join(chr(index % 256) for index in xrange(1000)))
+
+        store = RecordingStore(OMBSConfig("10.0.2.4", "bkp", folder, "/k"), "", [])
+        remote_file = RemoteFile(store, path, tail_size=100)
+
+        remote_file.seek(-10, os.SEEK_END)
+        self.assertEqual("".join(chr(index % 256) for index in xrange(990, 1000)),
+                         remote_file.read())
+        remote_file.seek(950)
+        self.assertEqual("".join(chr(index % 256) for index in xrange(950, 960)),
+                         remote_file.read(10))
+        remote_file.seek(10)
+        self.assertEqual("".join(chr(index % 256) for index in xrange(10, 15)),
+                         remote_file.read(5))
+        self.assertEqual(15, remote_file.tell())
+        self.assertEqual([(900, 100), (10, 5)], store.ranges)
+
+    def test_retrieve_from_remote_archive(self):
+        """
+        Test only the end of a remote archive, read with the listing, and the entry of a backup
+        are transferred.
+        """
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        folder = os.path.join(root, FOLDER_NAME)
+        os.makedirs(folder)
+
+        archive = BackupArchive(get_archive_file(folder))
+        for node in ("sw-0", "sw-1", "sw-2"):
+            backup_file = os.path.join(folder, "{}-backup-20180101".format(node))
+            with open(backup_file, "w") as backup:
+                backup.write(CONTENT if node == "sw-1" else os.urandom(200 * 1024))
+            archive.add(backup_file)
+            os.remove(backup_file)
+
+        store = RecordingStore(OMBSConfig("10.0.2.4", "bkp", root, "/k"), FOLDER_NAME, [])
+        output = StringIO()
+
+        self.assertEqual("bkp@10.0.2.4:{}/{}.zip:{}".format(folder, FOLDER_NAME, BACKUP_NAME),
+                         retrieve_backup([store], FOLDER_NAME, "SW-1", "20180101", output,
+                                         GnupgConfig()))
+        self.assertEqual(CONTENT, output.getvalue())
+
+        archive_size = os.path.getsize(archive.path)
+        entry, data_offset = archive.locate(BACKUP_NAME)
+        self.assertEqual([(entry.offset, 30), (data_offset, len(CONTENT))], store.ranges)
+        self.assertGreater(archive_size, len(CONTENT) + TAIL_SIZE + 300 * 1024)
+        self.assertEqual(3, self.get_connections())
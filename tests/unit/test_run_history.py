@@ -0,0 +1,79 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# pylint: disable=C0103,E0401
+
+"""Module for unit testing the run_history.py script."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from network_backup_onsite.backup_settings import TimeoutsConfig
+from network_backup_onsite.run_history import CAPTURE_PHASE, CONNECT_PHASE, HISTORY_FILE_NAME, \
+    RunHistory, get_percentile
+
+NODE = "SRX-1"
+
+
+class RunHistoryTestCase(unittest.TestCase):
+    """Test case for the RunHistory class."""
+
+    def setUp(self):
+        """Create an empty backup folder."""
+        self.backup_path = tempfile.mkdtemp()
+        self.timeouts_config = TimeoutsConfig(margin=2, min_timeout="10s", max_timeout="5m",
+                                              min_samples=3, history_size=4)
+
+    def tearDown(self):
+        """Remove the backup folder."""
+        shutil.rmtree(self.backup_path)
+
+    def test_get_percentile(self):
+        """Test the nearest-rank percentile."""
+        self.assertEqual(4, get_percentile([4, 1, 3, 2], 99))
+        self.assertEqual(2, get_percentile([4, 1, 3, 2], 50))
+        self.assertEqual(7, get_percentile([7], 99))
+
+    def test_record_is_persisted_and_trimmed(self):
+        """Test the durations survive a reload and only the last HISTORY_SIZE are kept."""
+        history = RunHistory(self.backup_path, self.timeouts_config)
+        for duration in range(6):
+            history.record(NODE, {CONNECT_PHASE: duration})
+
+        history = RunHistory(self.backup_path, self.timeouts_config)
+
+        self.assertEqual([2, 3, 4, 5], history.get_durations("srx-1", CONNECT_PHASE))
+        self.assertEqual([], history.get_durations(NODE, CAPTURE_PHASE))
+
+    def test_corrupted_file_is_empty_history(self):
+        """Test a corrupted history file does not prevent the backups."""
+        with open(os.path.join(self.backup_path, HISTORY_FILE_NAME), "w") as history_file:
+            history_file.write("{\"srx-1\": [")
+
+        history = RunHistory(self.backup_path, self.timeouts_config)
+
+        self.assertEqual([], history.get_durations(NODE, CONNECT_PHASE))
+
+    def test_get_timeout(self):
+        """Test the default is used without history, then the p99 times the margin, bounded."""
+        history = RunHistory(self.backup_path, self.timeouts_config)
+        self.assertEqual(120, history.get_timeout(NODE, CAPTURE_PHASE, 120))
+
+        for duration in (30, 40, 50):
+            history.record(NODE, {CAPTURE_PHASE: duration, CONNECT_PHASE: 1})
+
+        self.assertEqual(100, history.get_timeout(NODE, CAPTURE_PHASE, 120))
+        self.assertEqual(200, history.get_timeout(NODE, CAPTURE_PHASE, 120, attempt=2))
+        self.assertEqual(300, history.get_timeout(NODE, CAPTURE_PHASE, 120, attempt=3))
+        self.assertEqual(10, history.get_timeout(NODE, CONNECT_PHASE, 120))
@@ -0,0 +1,295 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the run_lock.py script."""
+
+import json
+from multiprocessing import Pool
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from network_backup_onsite.archive import BackupArchive
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+from network_backup_onsite.main import select_nodes
+from network_backup_onsite.run_lock import FAIL, FileLock, HOST, LOCK_FOLDER_NAME, PID, \
+    RunLocks, SKIP, STARTED, WAIT, file_update_lock
+from network_backup_onsite.utils import read_json_file, write_json_file
+
+UPDATES = 25
+
+# Locks a file, writes its holder with the pid given as argument and waits for its input.
+HOLDER_SCRIPT = """
+import fcntl, json, os, socket, sys, time
+lock_file = open(sys.argv[1], "a+")
+fcntl.flock(lock_file, fcntl.LOCK_EX)
+lock_file.truncate(0)
+lock_file.write(json.dumps({"pid": int(sys.argv[2]) or os.getpid(),
+                            "host": socket.gethostname(), "started": time.time()}))
+lock_file.flush()
+print "locked"
+sys.stdout.flush()
+sys.stdin.read()
+"""
+
+
+def update_counter(args):
+    """
+    Increment a counter of a json file, one read-modify-write at a time.
+
+    :param args: tuple of json file and key of the counter.
+    """
+    file_path, key = args
+    for _ in xrange(UPDATES):
+        with file_update_lock(file_path):
+            data = read_json_file(file_path)
+            data[key] = data.get(key, 0) + 1
+            write_json_file(file_path, data)
+
+
+def add_to_archive(args):
+    """
+    Add backup files to an archive.
+
+    :param args: tuple of archive file and list of backup files.
+    """
+    archive_file, backup_files = args
+    for backup_file in backup_files:
+        BackupArchive(archive_file).add(backup_file)
+
+
+class FileLockTestCase(unittest.TestCase):
+    """Test Cases for FileLock class in run_lock.py."""
+
+    def setUp(self):
+        """Create the lock folder."""
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "run.lock")
+        self.holders = []
+
+    def tearDown(self):
+        """Stop the holder processes and remove the lock folder."""
+        for holder in self.holders:
+            if not holder.stdin.closed:
+                holder.stdin.close()
+            holder.wait()
+        shutil.rmtree(self.folder)
+
+    def start_holder(self, pid=None):
+        """
+        Lock the file from another process.
+
+        :param pid: pid written as holder, the pid of the process by default.
+        :return: holder process, which releases the lock when its input is closed.
+        """
+        holder = subprocess.Popen([sys.executable, "-c", HOLDER_SCRIPT, self.path,
+                                   str(pid or 0)], stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE)
+        self.holders.append(holder)
+        self.assertEqual("locked\n", holder.stdout.readline())
+
+        return holder
+
+    def test_acquire_release(self):
+        """Test a free lock is taken with its holder written, and removed when released."""
+        lock = FileLock(self.path)
+
+        self.assertTrue(lock.acquire(FAIL))
+        self.assertTrue(lock.locked)
+        with open(self.path) as lock_file:
+            holder = json.loads(lock_file.read())
+        self.assertEqual(os.getpid(), holder[PID])
+        self.assertEqual(socket.gethostname(), holder[HOST])
+
+        lock.release()
+        self.assertFalse(lock.locked)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_acquire_held_in_same_process(self):
+        """Test a lock taken by another instance of the same process is busy."""
+        lock = FileLock(self.path)
+        self.assertTrue(lock.acquire(FAIL))
+
+        self.assertFalse(FileLock(self.path).try_acquire())
+
+        lock.release()
+        self.assertTrue(FileLock(self.path).try_acquire())
+
+    def test_acquire_skip_and_fail(self):
+        """Test a lock held by a running process is skipped or fails according to the mode."""
+        holder = self.start_holder()
+
+        lock = FileLock(self.path)
+        self.assertFalse(lock.acquire(SKIP))
+        self.assertEqual(holder.pid, lock.holder[PID])
+
+        with self.assertRaises(NodeBackupException) as context:
+            lock.acquire(FAIL)
+
+        self.assertEqual(ExceptionCodes.ResourceLocked, context.exception.code)
+        self.assertIn("locked by process {}".format(holder.pid), context.exception.message)
+
+    def test_acquire_wait(self):
+        """Test a lock is taken once the process holding it ends."""
+        holder = self.start_holder(os.getpid())
+        threading.Timer(0.3, holder.stdin.close).start()
+
+        lock = FileLock(self.path)
+        start_time = time.time()
+        self.assertTrue(lock.acquire(WAIT, interval=0.05))
+
+        self.assertGreaterEqual(time.time() - start_time, 0.2)
+        lock.release()
+
+    def test_acquire_stale(self):
+        """Test a lock inherited by a process after the process which took it died is taken."""
+        dead_process = subprocess.Popen(["true"])
+        dead_process.wait()
+
+        self.start_holder(dead_process.pid)
+
+        lock = FileLock(self.path)
+        self.assertTrue(lock.acquire(FAIL))
+
+        with open(self.path) as lock_file:
+            self.assertEqual(os.getpid(), json.loads(lock_file.read())[PID])
+        lock.release()
+
+    def test_acquire_not_stale_on_other_host(self):
+        """Test a lock held for a process of another host is not taken over."""
+        lock = FileLock(self.path)
+
+        self.assertFalse(lock.is_stale({PID: 1, HOST: "other-host", STARTED: 0}))
+        self.assertFalse(lock.is_stale({}))
+
+
+class RunLocksTestCase(unittest.TestCase):
+    """Test Cases for RunLocks class in run_lock.py."""
+
+    def setUp(self):
+        """Create the backup root folder."""
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the backup root folder."""
+        shutil.rmtree(self.folder)
+
+    def test_acquire_run(self):
+        """Test a second full run is skipped while the first holds the run lock."""
+        first = RunLocks(self.folder, FAIL)
+        self.assertTrue(first.acquire_run())
+        self.assertTrue(os.path.isdir(os.path.join(self.folder, LOCK_FOLDER_NAME)))
+
+        self.assertFalse(RunLocks(self.folder, SKIP).acquire_run())
+
+        first.release_run()
+        self.assertTrue(RunLocks(self.folder, SKIP).acquire_run())
+
+    def test_acquire_node(self):
+        """Test a node is captured by one run at a time while other nodes proceed."""
+        run_locks = RunLocks(self.folder, FAIL, 0.01)
+        other_locks = RunLocks(self.folder, FAIL, 0.01)
+        events = []
+
+        node_lock = run_locks.acquire_node("Node1")
+        other_locks.acquire_node("node2").release()
+
+        def capture():
+            """Capture the node held by the first run."""
+            other_lock = other_locks.acquire_node("node1")
+            events.append("other")
+            other_lock.release()
+
+        thread = threading.Thread(target=capture)
+        thread.start()
+        time.sleep(0.1)
+        events.append("first")
+        node_lock.release()
+        thread.join()
+
+        self.assertEqual(["first", "other"], events)
+
+
+class SelectNodesTestCase(unittest.TestCase):
+    """Test Cases for select_nodes method in main.py."""
+
+    def setUp(self):
+        """Create the node configurations."""
+        self.node_config_dict = dict((section, mock.Mock(hostname=hostname)) for section, hostname
+                                     in [("NODE1", "Switch_A"), ("NODE2", "Switch_B")])
+
+    def test_select_nodes(self):
+        """Test the nodes are selected by hostname, case insensitive."""
+        self.assertEqual(["NODE2"], select_nodes(self.node_config_dict, ["switch_b"]).keys())
+
+    def test_select_nodes_missing(self):
+        """Test a node missing from the configuration file."""
+        with self.assertRaises(Exception) as context:
+            select_nodes(self.node_config_dict, ["Switch_A", "Switch_C"])
+
+        self.assertIn("switch_c", context.exception.message)
+
+
+class FileUpdateLockTestCase(unittest.TestCase):
+    """Test Cases for file_update_lock method in run_lock.py, with several processes."""
+
+    def setUp(self):
+        """Create the shared folder."""
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the shared folder."""
+        shutil.rmtree(self.folder)
+
+    def test_json_updates(self):
+        """Test no update of a json file is lost when several processes update it."""
+        file_path = os.path.join(self.folder, ".history.json")
+
+        pool = Pool(4)
+        try:
+            pool.map(update_counter, [(file_path, "count")] * 4 + [(file_path, "other")])
+        finally:
+            pool.close()
+            pool.join()
+
+        self.assertEqual({"count": 4 * UPDATES, "other": UPDATES}, read_json_file(file_path))
+        self.assertEqual([".history.json"], os.listdir(self.folder))
+
+    def test_archive_adds(self):
+        """Test the archive keeps every backup when several processes add to it."""
+        backup_files = []
+        for index in xrange(20):
+            backup_file = os.path.join(self.folder, "node{}-backup-20181010".format(index))
+            with open(backup_file, "w") as backup:
+                backup.write("config {}\n".format(index) * 100)
+            backup_files.append(backup_file)
+
+        archive_file = os.path.join(self.folder, "run.zip")
+        pool = Pool(4)
+        try:
+            pool.map(add_to_archive, [(archive_file, backup_files[index::4])
+                                      for index in xrange(4)])
+        finally:
+            pool.close()
+            pool.join()
+
+        self.assertEqual(sorted(os.path.basename(backup_file) for backup_file in backup_files),
+                         sorted(BackupArchive(archive_file).get_index().keys()))
@@ -0,0 +1,228 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For unable to import
+# For the snake_case comments (invalid test names)
+# For access a protected member
+# pylint: disable=C0103,E0401,W0212
+
+"""Module for unit testing the scheduler.py script."""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from network_backup_onsite.backup_settings import NodeConfig, SchedulerConfig
+from network_backup_onsite.exceptions import ExceptionCodes, NodeBackupException
+from network_backup_onsite.main import parse_arguments
+from network_backup_onsite.scheduler import BackupScheduler, NodeJob
+
+MOCK_LOGGER = 'network_backup_onsite.scheduler.CustomLogger'
+
+
+def get_node_config_dict():
+    """
+    Build a node configuration dictionary for the tests.
+
+    :return: dictionary of NodeConfig.
+    """
+    return {"SWITCH_1": NodeConfig("switch-1", "10.0.0.1", "connectivitySwitch", "switch-1",
+                                   "user", "password", group="switches"),
+            "SWITCH_2": NodeConfig("switch-2", "10.0.0.2", "connectivitySwitch", "switch-2",
+                                   "user", "password", group="switches"),
+            "SRX": NodeConfig("srx-1", "10.0.0.3", "srx", "user@srx-1>", "user", "password",
+                              schedule="6h")}
+
+
+class SchedulerPlanCycleTestCase(unittest.TestCase):
+    """Test case for the planning of the captures."""
+
+    def setUp(self):
+        """Create the scheduler with a 1h window, no jitter and a 12h group schedule."""
+        scheduler_config = SchedulerConfig("24h", "1h", "0s", "socket",
+                                           {"switches": "12h"})
+
+        with mock.patch(MOCK_LOGGER):
+            self.scheduler = BackupScheduler(get_node_config_dict(), scheduler_config,
+                                             mock.Mock(), mock.Mock(), mock.Mock())
+
+    def test_get_node_interval(self):
+        """Test node schedule has precedence over the group schedule and the default."""
+        scheduler_config = self.scheduler.scheduler_config
+        node_config_dict = get_node_config_dict()
+
+        self.assertEqual(6 * 3600, scheduler_config.get_node_interval(node_config_dict["SRX"]))
+        self.assertEqual(12 * 3600,
+                         scheduler_config.get_node_interval(node_config_dict["SWITCH_1"]))
+
+        node_config_dict["SWITCH_1"].group = None
+        self.assertEqual(24 * 3600,
+                         scheduler_config.get_node_interval(node_config_dict["SWITCH_1"]))
+
+    def test_plan_cycle_spreads_group_over_window(self):
+        """Test the nodes with the same interval are spread over the window."""
+        self.scheduler.plan_cycle(1000)
+
+        planned = sorted((hostname, due) for due, _, _, hostname in self.scheduler._schedule)
+
+        self.assertEqual([("srx-1", 1000), ("switch-1", 1000), ("switch-2", 1000 + 1800)],
+                         planned)
+
+    def test_queue_due_captures_reschedules(self):
+        """Test due captures are queued and planned again after their interval."""
+        self.scheduler.plan_cycle(1000)
+
+        self.scheduler.queue_due_captures(1000)
+
+        self.assertEqual(2, self.scheduler._jobs.qsize())
+        planned = sorted((hostname, due) for due, _, _, hostname in self.scheduler._schedule)
+        self.assertEqual([("srx-1", 1000 + 6 * 3600), ("switch-1", 1000 + 12 * 3600),
+                          ("switch-2", 1000 + 1800)], planned)
+
+
+class SchedulerHandleRequestTestCase(unittest.TestCase):
+    """Test case for the on-demand requests."""
+
+    def setUp(self):
+        """Create the scheduler."""
+        scheduler_config = SchedulerConfig("24h", "1h", "0s", "socket")
+
+        with mock.patch(MOCK_LOGGER):
+            self.scheduler = BackupScheduler(get_node_config_dict(), scheduler_config,
+                                             mock.Mock(), mock.Mock(), mock.Mock())
+
+    def test_backup_request(self):
+        """Test a backup request is queued as an on-demand job."""
+        self.assertEqual("queued switch-2\n", self.scheduler.handle_request("backup SWITCH_2\n"))
+
+        job = self.scheduler._jobs.get_nowait()
+        self.assertEqual("switch-2", job.node_config.hostname)
+        self.assertTrue(job.on_demand)
+
+    def test_backup_request_unknown_node(self):
+        """Test an unknown node is reported."""
+        self.assertEqual("error unknown node router\n",
+                         self.scheduler.handle_request("backup router"))
+        self.assertTrue(self.scheduler._jobs.empty())
+
+    def test_invalid_request(self):
+        """Test an invalid request is answered with an error."""
+        self.assertTrue(self.scheduler.handle_request("restore all").startswith("error"))
+
+
+class SchedulerSocketTestCase(unittest.TestCase):
+    """Test case for the unix socket of the daemon."""
+
+    def setUp(self):
+        """Create the scheduler with a socket in a temporary folder."""
+        self.folder = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.folder, "daemon.sock")
+        scheduler_config = SchedulerConfig("24h", "1h", "0s", self.socket_path)
+
+        with mock.patch(MOCK_LOGGER):
+            self.scheduler = BackupScheduler(get_node_config_dict(), scheduler_config,
+                                             mock.Mock(), mock.Mock(), mock.Mock())
+
+    def tearDown(self):
+        """Close the socket and remove the temporary folder."""
+        if self.scheduler._server is not None:
+            self.scheduler._server.close()
+        shutil.rmtree(self.folder)
+
+    def test_open_socket_daemon_listening(self):
+        """Test the socket of a daemon still listening is not replaced."""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(1)
+
+        try:
+            with self.assertRaises(NodeBackupException) as context:
+                self.scheduler._open_socket()
+        finally:
+            listener.close()
+
+        self.assertEqual(ExceptionCodes.ResourceLocked, context.exception.code)
+        self.assertIsNone(self.scheduler._server)
+        self.assertTrue(os.path.exists(self.socket_path))
+
+    def test_open_socket_stale(self):
+        """Test the socket left by a daemon which is gone is replaced."""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.close()
+
+        self.scheduler._open_socket()
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(self.socket_path)
+        finally:
+            client.close()
+
+
+class SchedulerWorkerTestCase(unittest.TestCase):
+    """Test case for the worker threads executing the captures."""
+
+    def test_workers_capture_in_parallel(self):
+        """Test the captures run side by side and are flushed once, after the last one."""
+        running = []
+        both_running = threading.Event()
+        flushed = threading.Event()
+        flush = mock.Mock(side_effect=lambda captured: flushed.set())
+
+        def capture_node(node_config):
+            """Wait for the other capture to start."""
+            running.append(node_config.hostname)
+            if len(running) == 2:
+                both_running.set()
+            self.assertTrue(both_running.wait(5))
+            return node_config.hostname + "-backup"
+
+        scheduler_config = SchedulerConfig("24h", "1h", "0s", "socket")
+        with mock.patch(MOCK_LOGGER):
+            scheduler = BackupScheduler(get_node_config_dict(), scheduler_config, capture_node,
+                                        flush, mock.Mock(), workers=2)
+
+        node_config_dict = get_node_config_dict()
+        for section in ("SWITCH_1", "SWITCH_2"):
+            scheduler._jobs.put(NodeJob(node_config_dict[section], on_demand=True))
+
+        workers = [threading.Thread(target=scheduler._worker) for _ in xrange(2)]
+        for worker in workers:
+            worker.start()
+        flushed.wait(5)
+        scheduler.stop()
+        for worker in workers:
+            worker.join()
+
+        self.assertTrue(both_running.is_set())
+        flush.assert_called_once_with(mock.ANY)
+        self.assertEqual(["switch-1-backup", "switch-2-backup"], sorted(flush.call_args[0][0]))
+
+
+class SchedulerTriggerArgumentTestCase(unittest.TestCase):
+    """Test case for the --trigger option sending a request to the daemon."""
+
+    def test_trigger_needs_node(self):
+        """Test a trigger without a node is refused instead of running a full backup."""
+        with mock.patch("sys.argv", ["ntwk_bkp_onsite", "--trigger"]):
+            with self.assertRaises(SystemExit):
+                parse_arguments()
+
+        with mock.patch("sys.argv", ["ntwk_bkp_onsite", "--trigger", " "]):
+            with self.assertRaises(Exception) as context:
+                parse_arguments()
+
+        self.assertIn("--trigger", context.exception.message)
@@ -0,0 +1,292 @@
+##############################################################################
+# COPYRIGHT Ericsson 2018
+#
+# The copyright to the computer program(s) herein is the property of
+# Ericsson Inc. The programs may be used and/or copied only with written
+# permission from Ericsson Inc. or in accordance with the terms and
+# conditions stipulated in the agreement/contract under which the
+# program(s) have been supplied.
+##############################################################################
+
+# For the snake_case comments
+# pylint: disable=C0103
+
+"""This module is for unit tests from the sharding.py script."""
+
+from multiprocessing import Pool, Process, Queue
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+
+import mock
+
+from network_backup_onsite.backup_settings import ShardingConfig
+from network_backup_onsite.main import create_shard_backups
+from network_backup_onsite.sharding import DONE_SUFFIX, HashRing, LEASE_SUFFIX, \
+    RUNNERS_FOLDER_NAME, ShardCoordinator
+
+CYCLE = "network_device_backup_20181010"
+NODES = ["node{}".format(index) for index in xrange(60)]
+RUNNERS = ["runner1", "runner2", "runner3"]
+
+
+def run_shard(args):
+    """
+    Capture the nodes of one runner process, recording them in the shared folder.
+
+    :param args: tuple of shared folder and runner id.
+    :return: list of the nodes captured.
+    """
+    shared_path, runner_id = args
+    coordinator = ShardCoordinator(ShardingConfig(shared_path, runner_id, "1m"))
+    coordinator.heartbeat()
+
+    # Every runner is alive before the shards are computed.
+    while len(coordinator.get_live_runners()) < len(RUNNERS):
+        time.sleep(0.01)
+
+    captured = []
+    for node in coordinator.get_shard(NODES, CYCLE):
+        if coordinator.claim(node, CYCLE):
+            captured.append(node)
+            coordinator.release(node, CYCLE, True)
+
+    return captured
+
+
+def hold_lease(shared_path, runner_id, node, queue):
+    """
+    Claim a node in a runner process and keep capturing it until the process is killed.
+
+    :param shared_path: shared folder.
+    :param runner_id: runner id.
+    :param node: node name.
+    :param queue: Queue receiving the result of the claim.
+    """
+    coordinator = ShardCoordinator(ShardingConfig(shared_path, runner_id, "1s"))
+    coordinator.start()
+    queue.put(coordinator.claim(node, CYCLE))
+
+    while True:
+        time.sleep(1)
+
+
+class HashRingTestCase(unittest.TestCase):
+    """Test Cases for HashRing class in sharding.py."""
+
+    def test_get_runner_spread(self):
+        """Test every runner gets a share of the nodes."""
+        ring = HashRing(RUNNERS)
+        runners = [ring.get_runner(node) for node in NODES]
+
+        for runner in RUNNERS:
+            self.assertGreater(runners.count(runner), len(NODES) / len(RUNNERS) / 3)
+
+    def test_get_runner_consistent(self):
+        """Test only the nodes of a dead runner change of runner."""
+        before = HashRing(RUNNERS)
+        after = HashRing(RUNNERS[:2])
+
+        for node in NODES:
+            if before.get_runner(node) != RUNNERS[2]:
+                self.assertEqual(before.get_runner(node), after.get_runner(node))
+
+    def test_get_runner_empty(self):
+        """Test an empty ring has no runner."""
+        self.assertIsNone(HashRing([]).get_runner("node"))
+
+
+class ShardCoordinatorTestCase(unittest.TestCase):
+    """Test Cases for ShardCoordinator class in sharding.py."""
+
+    def setUp(self):
+        """Create the shared folder."""
+        self.shared_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the shared folder."""
+        shutil.rmtree(self.shared_path)
+
+    def get_coordinator(self, runner_id):
+        """
+        Get a coordinator of the shared folder.
+
+        :param runner_id: runner id.
+        :return: instance of ShardCoordinator.
+        """
+        return ShardCoordinator(ShardingConfig(self.shared_path, runner_id, "1m"))
+
+    def expire(self, path):
+        """
+        Age a heartbeat or lease file past the lease time.
+
+        :param path: file.
+        """
+        old_time = time.time() - 120
+        os.utime(path, (old_time, old_time))
+
+    def test_runner_processes_capture_each_node_once(self):
+        """Test several runner processes sharing one folder capture every node exactly once."""
+        pool = Pool(len(RUNNERS))
+        try:
+            shards = pool.map(run_shard, [(self.shared_path, runner) for runner in RUNNERS])
+        finally:
+            pool.close()
+            pool.join()
+
+        captured = [node for shard in shards for node in shard]
+        self.assertEqual(sorted(NODES), sorted(captured))
+        self.assertTrue(all(shards))
+
+    def test_claim_exclusive(self):
+        """Test a leased or done node can't be claimed by another runner."""
+        first = self.get_coordinator(RUNNERS[0])
+        second = self.get_coordinator(RUNNERS[1])
+
+        self.assertTrue(first.claim("node1", CYCLE))
+        self.assertFalse(second.claim("node1", CYCLE))
+
+        first.release("node1", CYCLE, True)
+        self.assertFalse(second.claim("node1", CYCLE))
+        self.assertTrue(os.path.exists(os.path.join(self.shared_path, CYCLE,
+                                                    "node1" + DONE_SUFFIX)))
+
+    def test_claim_failed_node_again(self):
+        """Test a node released without being captured can be claimed again."""
+        first = self.get_coordinator(RUNNERS[0])
+
+        self.assertTrue(first.claim("node1", CYCLE))
+        first.release("node1", CYCLE, False)
+
+        self.assertTrue(self.get_coordinator(RUNNERS[1]).claim("node1", CYCLE))
+
+    def test_claim_expired_lease(self):
+        """Test the lease of a runner which died while capturing is taken over."""
+        self.assertTrue(self.get_coordinator(RUNNERS[0]).claim("node1", CYCLE))
+        lease_file = os.path.join(self.shared_path, CYCLE, "node1" + LEASE_SUFFIX)
+        self.expire(lease_file)
+
+        self.assertTrue(self.get_coordinator(RUNNERS[1]).claim("node1", CYCLE))
+        with open(lease_file) as lease:
+            self.assertEqual(RUNNERS[1], lease.read())
+
+    def test_heartbeat_keeps_leases(self):
+        """Test the heartbeat refreshes the leases held by the runner."""
+        first = self.get_coordinator(RUNNERS[0])
+        first.claim("node1", CYCLE)
+        self.expire(os.path.join(self.shared_path, CYCLE, "node1" + LEASE_SUFFIX))
+
+        first.heartbeat()
+
+        self.assertFalse(self.get_coordinator(RUNNERS[1]).claim("node1", CYCLE))
+
+    def test_get_shard_dead_runner(self):
+        """Test the nodes of a runner with an expired heartbeat go to the live runners."""
+        coordinators = [self.get_coordinator(runner) for runner in RUNNERS]
+        for coordinator in coordinators:
+            coordinator.heartbeat()
+
+        alive_shard = coordinators[0].get_shard(NODES, CYCLE)
+        self.expire(os.path.join(self.shared_path, RUNNERS_FOLDER_NAME, RUNNERS[2]))
+
+        self.assertEqual(RUNNERS[:2], coordinators[0].get_live_runners())
+        self.assertGreater(len(coordinators[0].get_shard(NODES, CYCLE)), len(alive_shard))
+        self.assertEqual(sorted(NODES), sorted(coordinators[0].get_shard(NODES, CYCLE) +
+                                               coordinators[1].get_shard(NODES, CYCLE)))
+
+    def test_get_shard_skips_done_nodes(self):
+        """Test the nodes captured by another runner are not in the shard."""
+        coordinator = self.get_coordinator(RUNNERS[0])
+        coordinator.claim(NODES[0], CYCLE)
+        coordinator.release(NODES[0], CYCLE, True)
+
+        self.assertNotIn(NODES[0], coordinator.get_shard(NODES, CYCLE))
+
+
+class CreateShardBackupsTestCase(unittest.TestCase):
+    """Test Cases for create_shard_backups method in main.py."""
+
+    def setUp(self):
+        """Create the shared folder."""
+        self.shared_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the shared folder."""
+        shutil.rmtree(self.shared_path)
+
+    def test_create_shard_backups_takes_over_dead_runner(self):
+        """Test the nodes of a runner dying during the run are captured in the next round."""
+        coordinator = ShardCoordinator(ShardingConfig(self.shared_path, RUNNERS[0], "1m"))
+        other = ShardCoordinator(ShardingConfig(self.shared_path, RUNNERS[1], "1m"))
+        other.heartbeat()
+
+        node_configs = [mock.Mock(hostname=node) for node in NODES]
+        rounds = []
+
+        def create_backups(claimed_list):
+            """Capture the nodes and let the other runner die after the first round."""
+            rounds.append([node_config.hostname for node_config in claimed_list])
+            other.stop()
+            return [mock.Mock(success=True) for _ in claimed_list]
+
+        results = create_shard_backups(node_configs, coordinator, CYCLE, mock.Mock(),
+                                       create_backups)
+
+        self.assertEqual(2, len(rounds))
+        self.assertEqual(sorted(NODES), sorted(rounds[0] + rounds[1]))
+        self.assertEqual(len(NODES), len(results))
+        self.assertFalse(os.path.exists(coordinator.heartbeat_file))
+
+    def test_create_shard_backups_lease_holder_killed(self):
+        """Test a node of the shard leased by a runner killed during its capture is captured."""
+        nodes = NODES[:10]
+        ring = HashRing(RUNNERS[:2])
+        leased_node = [node for node in nodes if ring.get_runner(node) == RUNNERS[1]][0]
+
+        queue = Queue()
+        holder = Process(target=hold_lease,
+                         args=(self.shared_path, RUNNERS[0], leased_node, queue))
+        holder.start()
+        self.addCleanup(holder.join)
+        self.assertTrue(queue.get(timeout=10))
+
+        coordinator = ShardCoordinator(ShardingConfig(self.shared_path, RUNNERS[1], "1s"))
+        node_configs = [mock.Mock(hostname=node) for node in nodes]
+        rounds = []
+
+        def create_backups(claimed_list):
+            """Capture the nodes and kill the runner holding the lease during the first round."""
+            rounds.append([node_config.hostname for node_config in claimed_list])
+            if holder.is_alive():
+                os.kill(holder.pid, signal.SIGKILL)
+            return [mock.Mock(success=True) for _ in claimed_list]
+
+        results = create_shard_backups(node_configs, coordinator, CYCLE, mock.Mock(),
+                                       create_backups)
+
+        self.assertNotIn(leased_node, rounds[0])
+        self.assertIn(leased_node, rounds[-1])
+        self.assertEqual(sorted(nodes), sorted(node for shard in rounds for node in shard))
+        self.assertEqual(len(nodes), len(results))
+
+    def test_create_shard_backups_waits_for_failed_capture(self):
+        """Test a node of the shard released without being captured by another runner is taken."""
+        other = ShardCoordinator(ShardingConfig(self.shared_path, RUNNERS[0], "1s"))
+        coordinator = ShardCoordinator(ShardingConfig(self.shared_path, RUNNERS[1], "1s"))
+        self.assertTrue(other.claim(NODES[0], CYCLE))
+        rounds = []
+
+        def create_backups(claimed_list):
+            """Capture the nodes, the capture of the other runner failing meanwhile."""
+            rounds.append([node_config.hostname for node_config in claimed_list])
+            other.release(NODES[0], CYCLE, False)
+            return [mock.Mock(success=True) for _ in claimed_list]
+
+        results = create_shard_backups([mock.Mock(hostname=node) for node in NODES[:2]],
+                                       coordinator, CYCLE, mock.Mock(), create_backups)
+
+        self.assertEqual([[NODES[1]], [NODES[0]]], rounds)
+        self.assertEqual(2, len(results))
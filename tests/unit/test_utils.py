@@ -118,3 +118,13 @@ class UtilsValidateHostIsAccessibleTestCase(unittest.TestCase):
     def test_validate_host_is_accessible_invalid_host(self):
         """Test invalid host is not accessible."""
         self.assertFalse(utils.is_host_accessible(INVALID_HOST))
+
+
+class UtilsGetBackoffDelayTestCase(unittest.TestCase):
+    """Test Cases for get_backoff_delay method in utils.py."""
+
+    def test_get_backoff_delay_is_doubled_and_bounded(self):
+        """Test the delay doubles at each attempt, with jitter, and never exceeds the max."""
+        for attempt, expected in ((1, 10), (2, 20), (3, 40), (6, 60)):
+            delay = utils.get_backoff_delay(attempt, 10, 60)
+            self.assertTrue(expected / 2.0 <= delay <= expected)